@@ -53,7 +53,16 @@ from indexer.controller.dispatcher.aggregates_dispatcher import AggregatesDispat
     envvar="DATE_BATCH_SIZE",
     help="How many DATEs to batch in single sync round",
 )
-def aggregates(postgres_url, provider_uri, start_date, end_date, date_batch_size):
+@click.option(
+    "--full-aggregation",
+    is_flag=True,
+    default=False,
+    show_default=True,
+    envvar="FULL_AGGREGATION",
+    help="Aggregate every day of the range in full. "
+    "By default a day aggregated before only counts the blocks indexed since.",
+)
+def aggregates(postgres_url, provider_uri, start_date, end_date, date_batch_size, full_aggregation):
     if not start_date and not end_date:
         start_date, end_date = get_yesterday_date()
     elif not end_date:
@@ -63,7 +72,7 @@ def aggregates(postgres_url, provider_uri, start_date, end_date, date_batch_size
 
     check_data_completeness(db_service, provider_uri, end_date)
 
-    config = {"db_service": db_service}
+    config = {"db_service": db_service, "full_aggregation": full_aggregation}
     dispatcher = AggregatesDispatcher(config)
 
     controller = AggregatesController(job_dispatcher=dispatcher)
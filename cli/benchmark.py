@@ -0,0 +1,225 @@
+import json
+import logging
+import os
+import time
+
+import click
+
+from indexer.benchmark.replay_server import RpcReplayServer
+from indexer.benchmark.rpc_fixture import RpcFixture
+from indexer.benchmark.runner import PIPELINES, compare_reports, format_reports, record, replay
+from indexer.utils.logging_utils import configure_logging
+
+
+def parse_pipelines(pipelines):
+    if not pipelines:
+        return None
+    pipelines = [pipeline.strip() for pipeline in pipelines.split(",")]
+    unknown = [pipeline for pipeline in pipelines if pipeline not in PIPELINES]
+    if unknown:
+        raise click.ClickException(f"Unknown pipelines {unknown}, should be some of {', '.join(PIPELINES)}")
+    return pipelines
+
+
+def load_config_file(config_file):
+    if not config_file:
+        return None
+    if not os.path.exists(config_file):
+        raise click.ClickException(f"Config file {config_file} not found")
+    with open(config_file, "r") as f:
+        if config_file.endswith(".json"):
+            return json.load(f)
+        elif config_file.endswith(".yaml") or config_file.endswith(".yml"):
+            import yaml
+
+            return yaml.safe_load(f)
+    raise click.ClickException(f"Config file {config_file} is not supported")
+
+
+def write_reports(reports, report_file):
+    click.echo(format_reports(reports))
+    if report_file:
+        with open(report_file, "w") as f:
+            json.dump(reports, f, indent=2)
+
+
+def run_options(function):
+    for option in reversed(
+        [
+            click.option(
+                "--output",
+                default="void",
+                show_default=True,
+                type=str,
+                help="Where the indexed items are written, as the --output of stream, e.g. void, jsonfile://path",
+            ),
+            click.option(
+                "-B", "--block-batch-size", default=10, show_default=True, type=int, help="Blocks per sync round."
+            ),
+            click.option(
+                "-b", "--batch-size", default=10, show_default=True, type=int, help="Non-debug RPC requests per batch."
+            ),
+            click.option(
+                "--debug-batch-size", default=1, show_default=True, type=int, help="Debug RPC requests per batch."
+            ),
+            click.option("-w", "--max-workers", default=5, show_default=True, type=int, help="Workers of every job."),
+            click.option(
+                "--multicall", default=True, show_default=True, type=bool, help="Batch eth_calls in multicalls."
+            ),
+            click.option(
+                "--pipeline-batch-size",
+                default=None,
+                show_default=True,
+                type=int,
+                help="Run the jobs as a pipeline over micro-batches of this many blocks, as with stream.",
+            ),
+            click.option("--export-mode", default="sync", show_default=True, type=click.Choice(["sync", "async"])),
+            click.option(
+                "--report-file", default=None, type=str, help="Write the reports as JSON to this file, e.g. to compare."
+            ),
+            click.option("--log-level", default="WARNING", show_default=True, type=str, help="The logging level."),
+        ]
+    ):
+        function = option(function)
+    return function
+
+
+def benchmark_options(kwargs):
+    return {
+        name: kwargs[name]
+        for name in (
+            "output",
+            "block_batch_size",
+            "batch_size",
+            "debug_batch_size",
+            "max_workers",
+            "multicall",
+            "pipeline_batch_size",
+            "export_mode",
+        )
+    }
+
+
+@click.group(context_settings=dict(help_option_names=["-h", "--help"]))
+def benchmark():
+    """Record the RPC responses of a block range and benchmark indexing pipelines against their replay."""
+
+
+@benchmark.command("record", context_settings=dict(help_option_names=["-h", "--help"]))
+@click.option("--fixture", required=True, type=str, help="The fixture file to record to, e.g. eth-20000000.jsonl.gz")
+@click.option("-p", "--provider-uri", required=True, type=str, envvar="PROVIDER_URI", help="The node to record.")
+@click.option(
+    "-d",
+    "--debug-provider-uri",
+    default=None,
+    type=str,
+    envvar="DEBUG_PROVIDER_URI",
+    help="The node to record debug_ and trace_ requests from, the provider by default.",
+)
+@click.option("-s", "--start-block", required=True, type=int, help="The first block of the range.")
+@click.option("-e", "--end-block", required=True, type=int, help="The last block of the range.")
+@click.option(
+    "--pipelines",
+    default=",".join(PIPELINES),
+    show_default=True,
+    type=str,
+    help="The pipelines to record the requests of.",
+)
+@click.option(
+    "--config-file",
+    default=None,
+    type=str,
+    help="The job config the pipelines run with, kept in the fixture for its replays.",
+)
+@run_options
+def record_fixture(fixture, provider_uri, debug_provider_uri, start_block, end_block, pipelines, config_file, **kwargs):
+    """Index a block range through a recording proxy of the node, saving every response to a fixture."""
+    configure_logging(kwargs["log_level"], None)
+    try:
+        reports = record(
+            fixture,
+            provider_uri,
+            start_block,
+            end_block,
+            parse_pipelines(pipelines),
+            debug_provider_uri=debug_provider_uri,
+            config=load_config_file(config_file),
+            **benchmark_options(kwargs),
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    write_reports(reports, kwargs["report_file"])
+
+
+@benchmark.command("run", context_settings=dict(help_option_names=["-h", "--help"]))
+@click.option("--fixture", required=True, type=str, help="The recorded fixture file.")
+@click.option("--pipelines", default=None, type=str, help="The pipelines to run, every recorded one by default.")
+@click.option("--latency", default=0.0, show_default=True, type=float, help="Seconds every HTTP request waits.")
+@click.option("--jitter", default=0.0, show_default=True, type=float, help="Seconds the latency varies by, up or down.")
+@click.option("--call-latency", default=0.0, show_default=True, type=float, help="Seconds added per call of a batch.")
+@click.option("--seed", default=0, show_default=True, type=int, help="Seed of the jitter.")
+@click.option("--baseline", default=None, type=str, help="A report file of a previous run to compare with.")
+@click.option(
+    "--tolerance",
+    default=0.1,
+    show_default=True,
+    type=float,
+    help="How much worse than the baseline a measure can get before the run fails.",
+)
+@run_options
+def run_fixture(fixture, pipelines, latency, jitter, call_latency, seed, baseline, tolerance, **kwargs):
+    """Benchmark pipelines over a recorded fixture, without network access."""
+    configure_logging(kwargs["log_level"], None)
+    try:
+        reports = replay(
+            fixture,
+            parse_pipelines(pipelines),
+            latency=latency,
+            jitter=jitter,
+            call_latency=call_latency,
+            seed=seed,
+            **benchmark_options(kwargs),
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    write_reports(reports, kwargs["report_file"])
+
+    missed = [report["pipeline"] for report in reports if report["misses"]]
+    if missed:
+        raise click.ClickException(f"Pipelines {missed} sent requests the fixture does not hold, record it again.")
+    if baseline:
+        with open(baseline, "r") as f:
+            regressions = compare_reports(json.load(f), reports, tolerance)
+        if regressions:
+            raise click.ClickException("Regressions against the baseline:\n" + "\n".join(regressions))
+
+
+@benchmark.command("serve", context_settings=dict(help_option_names=["-h", "--help"]))
+@click.option("--fixture", required=True, type=str, help="The recorded fixture file.")
+@click.option("--host", default="127.0.0.1", show_default=True, type=str, help="The address to listen on.")
+@click.option("--port", default=8545, show_default=True, type=int, help="The port to listen on.")
+@click.option("--latency", default=0.0, show_default=True, type=float, help="Seconds every HTTP request waits.")
+@click.option("--jitter", default=0.0, show_default=True, type=float, help="Seconds the latency varies by, up or down.")
+@click.option("--call-latency", default=0.0, show_default=True, type=float, help="Seconds added per call of a batch.")
+@click.option("--seed", default=0, show_default=True, type=int, help="Seed of the jitter.")
+def serve_fixture(fixture, host, port, latency, jitter, call_latency, seed):
+    """Serve a recorded fixture as a JSON-RPC node to run stream against."""
+    configure_logging("INFO", None)
+    server = RpcReplayServer(
+        RpcFixture.load(fixture),
+        port=port,
+        host=host,
+        latency=latency,
+        jitter=jitter,
+        call_latency=call_latency,
+        seed=seed,
+    ).start()
+    logging.getLogger("ROOT").info(f"Replaying {fixture} at {server.uri}")
+    try:
+        while True:
+            time.sleep(60)
+            logging.getLogger("ROOT").info(f"Replay stats: {server.stats.snapshot()}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
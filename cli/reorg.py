@@ -11,7 +11,7 @@ from indexer.exporters.postgres_item_exporter import PostgresItemExporter
 from indexer.utils.exception_recorder import ExceptionRecorder
 from indexer.utils.logging_utils import configure_logging, configure_signals
 from indexer.utils.provider import get_provider_from_uri
-from indexer.utils.rpc_utils import pick_random_provider_uri
+from indexer.utils.rpc_utils import split_provider_uris
 from indexer.utils.thread_local_proxy import ThreadLocalProxy
 
 exception_recorder = ExceptionRecorder()
@@ -144,8 +144,8 @@ def reorg(
     configure_logging(log_level=log_level, log_file=log_file)
     configure_signals()
 
-    provider_uri = pick_random_provider_uri(provider_uri)
-    debug_provider_uri = pick_random_provider_uri(debug_provider_uri)
+    provider_uri = ",".join(split_provider_uris(provider_uri))
+    debug_provider_uri = ",".join(split_provider_uris(debug_provider_uri))
     logging.info("Using provider " + provider_uri)
     logging.info("Using debug provider " + debug_provider_uri)
 
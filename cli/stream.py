@@ -12,15 +12,19 @@ from indexer.controller.scheduler.job_scheduler import JobScheduler
 from indexer.controller.stream_controller import StreamController
 from indexer.exporters.item_exporter import create_item_exporters
 from indexer.utils.exception_recorder import ExceptionRecorder
+from indexer.utils.http_pool import DEFAULT_POOL_SIZE, endpoint_session_pool
 from indexer.utils.limit_reader import create_limit_reader
 from indexer.utils.logging_utils import configure_logging, configure_signals
+from indexer.utils.metrics import start_metrics
+from indexer.utils.multicall_hemera.call_cache import call_result_cache
 from indexer.utils.parameter_utils import (
     check_file_exporter_parameter,
     check_source_load_parameter,
     generate_dataclass_type_list_from_parameter,
 )
 from indexer.utils.provider import get_provider_from_uri
-from indexer.utils.rpc_utils import pick_random_provider_uri
+from indexer.utils.rpc_balancer import configure_load_balancing
+from indexer.utils.rpc_utils import split_provider_uris
 from indexer.utils.sync_recorder import create_recorder
 from indexer.utils.thread_local_proxy import ThreadLocalProxy
 
@@ -48,7 +52,8 @@ def calculate_execution_time(func):
     type=str,
     envvar="PROVIDER_URI",
     help="The URI of the web3 provider e.g. "
-    "file://$HOME/Library/Ethereum/geth.ipc or https://ethereum-rpc.publicnode.com",
+    "file://$HOME/Library/Ethereum/geth.ipc or https://ethereum-rpc.publicnode.com. "
+    "Several http(s) URIs separated by commas are load balanced.",
 )
 @click.option(
     "-pg",
@@ -66,7 +71,8 @@ def calculate_execution_time(func):
     type=str,
     envvar="DEBUG_PROVIDER_URI",
     help="The URI of the web3 debug provider e.g. "
-    "file://$HOME/Library/Ethereum/geth.ipc or https://ethereum-rpc.publicnode.com",
+    "file://$HOME/Library/Ethereum/geth.ipc or https://ethereum-rpc.publicnode.com. "
+    "Several http(s) URIs separated by commas are load balanced.",
 )
 @click.option(
     "-o",
@@ -78,6 +84,7 @@ def calculate_execution_time(func):
     "or postgresql e.g. postgres"
     "or local json file e.g. jsonfile://your-file-path; "
     "or local csv file e.g. csvfile://your-file-path; "
+    "or local parquet file e.g. parquetfile://your-file-path; "
     "or both. e.g. console,jsonfile://your-file-path,csvfile://your-file-path",
 )
 @click.option(
@@ -114,6 +121,16 @@ def calculate_execution_time(func):
     "e.g. head, indicates the latest version."
     "or base, indicates the empty database without any table.",
 )
+@click.option(
+    "--pg-load-mode",
+    default="insert",
+    show_default=True,
+    type=click.Choice(["insert", "copy"], case_sensitive=False),
+    envvar="PG_LOAD_MODE",
+    help="How the postgres exporter writes rows. "
+    "'insert' sends batched INSERT statements, 'copy' streams rows with COPY into a staging table "
+    "and upserts them with one INSERT ... SELECT per table, all in a single transaction.",
+)
 @click.option(
     "-s",
     "--start-block",
@@ -149,6 +166,14 @@ def calculate_execution_time(func):
     envvar="BLOCKS_PER_FILE",
     help="How many blocks data was written to each file",
 )
+@click.option(
+    "--parquet-compression",
+    default="zstd",
+    show_default=True,
+    type=click.Choice(["zstd", "snappy", "gzip", "lz4", "brotli", "none"], case_sensitive=False),
+    envvar="PARQUET_COMPRESSION",
+    help="The compression codec of the files written by parquetfile:// outputs.",
+)
 @click.option(
     "--period-seconds",
     default=2,
@@ -157,6 +182,16 @@ def calculate_execution_time(func):
     envvar="PERIOD_SECONDS",
     help="How many seconds to sleep between syncs",
 )
+@click.option(
+    "--head-provider-uri",
+    default=None,
+    show_default=True,
+    type=str,
+    envvar="HEAD_PROVIDER_URI",
+    help="A ws://, wss:// or file:// (IPC) uri to subscribe to newHeads on. "
+    "New blocks are synced as soon as the node announces them instead of after period-seconds, "
+    "the head is polled from the provider while the subscription is down.",
+)
 @click.option(
     "-b",
     "--batch-size",
@@ -183,6 +218,42 @@ def calculate_execution_time(func):
     envvar="BLOCK_BATCH_SIZE",
     help="How many blocks to batch in single sync round",
 )
+@click.option(
+    "--pipeline-batch-size",
+    default=None,
+    show_default=True,
+    type=int,
+    envvar="PIPELINE_BATCH_SIZE",
+    help="Split every sync round into micro-batches of this many blocks and run the jobs as a pipeline over them, "
+    "so that different jobs work on different micro-batches at the same time. "
+    "Only takes effect when it is smaller than -B. Disabled by default.",
+)
+@click.option(
+    "--pipeline-max-in-flight",
+    default=3,
+    show_default=True,
+    type=int,
+    envvar="PIPELINE_MAX_IN_FLIGHT",
+    help="The maximum number of micro-batches held in the pipeline at the same time.",
+)
+@click.option(
+    "--export-mode",
+    default="sync",
+    show_default=True,
+    type=click.Choice(["sync", "async"], case_sensitive=False),
+    envvar="EXPORT_MODE",
+    help="sync: every job writes its output before the next job starts. "
+    "async: jobs hand their output to a background writer and keep going, "
+    "the sync record only advances once everything of the range has been written.",
+)
+@click.option(
+    "--export-queue-size",
+    default=2,
+    show_default=True,
+    type=int,
+    envvar="EXPORT_QUEUE_SIZE",
+    help="In async export mode, the number of job outputs allowed to wait for the writer before jobs block.",
+)
 @click.option(
     "-w",
     "--max-workers",
@@ -192,6 +263,23 @@ def calculate_execution_time(func):
     help="The number of workers during a request to rpc.",
     envvar="MAX_WORKERS",
 )
+@click.option(
+    "--rpc-pool-size",
+    default=DEFAULT_POOL_SIZE,
+    show_default=True,
+    type=int,
+    envvar="RPC_POOL_SIZE",
+    help="The number of keep-alive connections kept per rpc endpoint, shared by all jobs and threads.",
+)
+@click.option(
+    "--rpc-hedge-methods",
+    default=None,
+    show_default=True,
+    type=str,
+    envvar="RPC_HEDGE_METHODS",
+    help="When several provider uris are given, requests of these rpc methods are duplicated to a second "
+    "endpoint if the first is slow to answer, e.g. debug_traceBlockByNumber. Comma separated.",
+)
 @click.option(
     "-pn",
     "--process-numbers",
@@ -219,6 +307,17 @@ def calculate_execution_time(func):
     help="Timeout for every processor, default to {ps} * 300 , see above",
     envvar="PROCESS_TIME_OUT",
 )
+@click.option(
+    "--parallel-mode",
+    default="process",
+    show_default=True,
+    type=click.Choice(["process", "thread"], case_sensitive=False),
+    help="How to run the ranges split by {ps} when {pn} > 1. "
+    "'process' uses a process pool, 'thread' uses threads sharing providers and caches in one process. "
+    "In 'thread' mode a range exceeding {pto} fails the round, but its thread cannot be stopped "
+    "and keeps running in the background until the range is done or fails.",
+    envvar="PARALLEL_MODE",
+)
 @click.option(
     "--delay",
     default=0,
@@ -294,6 +393,23 @@ def calculate_execution_time(func):
     help="if `multicall` is set to True, it will decrease the consume of rpc calls",
     envvar="MULTI_CALL_ENABLE",
 )
+@click.option(
+    "--multicall-cache-size",
+    default=0,
+    show_default=True,
+    type=int,
+    envvar="MULTICALL_CACHE_SIZE",
+    help="The number of eth_call results at fixed blocks kept in memory and shared by all jobs, 0 disables the cache.",
+)
+@click.option(
+    "--multicall-cache",
+    default="memory",
+    show_default=True,
+    type=str,
+    envvar="MULTICALL_CACHE",
+    help="Where to keep eth_call results besides memory. "
+    "e.g redis://localhost:6379 keeps them across runs, memory keeps them in memory only.",
+)
 @click.option(
     "--auto-reorg",
     default=False,
@@ -334,6 +450,39 @@ def calculate_execution_time(func):
     envvar="LOG_LEVEL",
     help="Set the logging output level.",
 )
+@click.option(
+    "--metrics-port",
+    default=None,
+    show_default=True,
+    type=int,
+    envvar="METRICS_PORT",
+    help="Serve Prometheus metrics of jobs, executors, RPC requests and exporters on this port at /metrics. "
+    "With --parallel-mode process, the metrics of ranges indexed in worker processes are not included.",
+)
+@click.option(
+    "--metrics-host",
+    default="0.0.0.0",
+    show_default=True,
+    type=str,
+    envvar="METRICS_HOST",
+    help="The address the metrics endpoint listens on.",
+)
+@click.option(
+    "--metrics-push-gateway",
+    default=None,
+    show_default=True,
+    type=str,
+    envvar="METRICS_PUSH_GATEWAY",
+    help="The url of a Prometheus Pushgateway to push the metrics to, e.g. http://127.0.0.1:9091",
+)
+@click.option(
+    "--metrics-push-interval",
+    default=15,
+    show_default=True,
+    type=float,
+    envvar="METRICS_PUSH_INTERVAL",
+    help="Seconds between two pushes to the Pushgateway.",
+)
 @calculate_execution_time
 def stream(
     provider_uri,
@@ -349,13 +498,21 @@ def stream(
     blocks_per_file,
     delay=0,
     period_seconds=10,
+    head_provider_uri=None,
     batch_size=10,
     debug_batch_size=1,
     block_batch_size=1,
+    pipeline_batch_size=None,
+    pipeline_max_in_flight=3,
+    export_mode="sync",
+    export_queue_size=2,
     max_workers=5,
+    rpc_pool_size=DEFAULT_POOL_SIZE,
+    rpc_hedge_methods=None,
     process_numbers=1,
     process_size=None,
     process_time_out=None,
+    parallel_mode="process",
     log_file=None,
     pid_file=None,
     source_path=None,
@@ -364,16 +521,29 @@ def stream(
     cache="memory",
     auto_reorg=False,
     multicall=True,
+    multicall_cache_size=0,
+    multicall_cache="memory",
     config_file=None,
     force_filter_mode=False,
     auto_upgrade_db=True,
     log_level="INFO",
+    pg_load_mode="insert",
+    parquet_compression="zstd",
+    metrics_port=None,
+    metrics_host="0.0.0.0",
+    metrics_push_gateway=None,
+    metrics_push_interval=15,
 ):
     print_logo()
     configure_logging(log_level, log_file)
+    metrics_services = start_metrics(metrics_port, metrics_host, metrics_push_gateway, metrics_push_interval)
     configure_signals()
-    provider_uri = pick_random_provider_uri(provider_uri)
-    debug_provider_uri = pick_random_provider_uri(debug_provider_uri)
+    endpoint_session_pool.configure(pool_size=rpc_pool_size)
+    call_result_cache.configure(max_size=multicall_cache_size, uri=multicall_cache)
+    if rpc_hedge_methods:
+        configure_load_balancing(hedge_methods=[method.strip() for method in rpc_hedge_methods.split(",")])
+    provider_uri = ",".join(split_provider_uris(provider_uri))
+    debug_provider_uri = ",".join(split_provider_uris(debug_provider_uri))
     logging.getLogger("ROOT").info("Using provider " + provider_uri)
     logging.getLogger("ROOT").info("Using debug provider " + debug_provider_uri)
 
@@ -386,7 +556,10 @@ def stream(
     config = {
         "blocks_per_file": blocks_per_file,
         "source_path": source_path,
-        "chain_id": Web3(Web3.HTTPProvider(provider_uri)).eth.chain_id,
+        "chain_id": Web3(get_provider_from_uri(provider_uri)).eth.chain_id,
+        "pg_load_mode": pg_load_mode.lower(),
+        "parquet_compression": parquet_compression.lower(),
+        "parallel_ranges": (process_numbers or 1) > 1,
     }
 
     if postgres_url:
@@ -445,6 +618,10 @@ def stream(
         auto_reorg=auto_reorg,
         multicall=multicall,
         force_filter_mode=force_filter_mode,
+        pipeline_batch_size=pipeline_batch_size,
+        pipeline_max_in_flight=pipeline_max_in_flight,
+        export_mode=export_mode.lower(),
+        export_queue_size=export_queue_size,
     )
 
     if process_numbers is None:
@@ -459,19 +636,26 @@ def stream(
         job_scheduler=job_scheduler,
         sync_recorder=create_recorder(sync_recorder, config),
         limit_reader=create_limit_reader(
-            source_path, ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=False))
+            source_path,
+            ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=False)),
+            head_uri=head_provider_uri,
         ),
         retry_from_record=retry_from_record,
         delay=delay,
         process_numbers=process_numbers,
         process_size=process_size,
         process_time_out=process_time_out,
+        parallel_mode=parallel_mode.lower(),
     )
 
-    controller.action(
-        start_block=start_block,
-        end_block=end_block,
-        block_batch_size=block_batch_size,
-        period_seconds=period_seconds,
-        pid_file=pid_file,
-    )
+    try:
+        controller.action(
+            start_block=start_block,
+            end_block=end_block,
+            block_batch_size=block_batch_size,
+            period_seconds=period_seconds,
+            pid_file=pid_file,
+        )
+    finally:
+        for metrics_service in metrics_services:
+            metrics_service.close()
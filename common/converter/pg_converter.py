@@ -1,25 +1,61 @@
-from common.models import HemeraModel, model_path_patterns
-from common.utils.module_loading import import_string, scan_subclass_by_path_patterns
+import threading
+from collections.abc import Mapping
 
+from common.converter.row_converter import RowConverter
+from common.utils.discovery_manifest import class_path, get_manifest
+from common.utils.module_loading import import_string
 
-def scan_convert_config():
-    class_mapping = scan_subclass_by_path_patterns(model_path_patterns, HemeraModel)
 
+def model_convert_configs(model) -> dict:
     config_mapping = {}
-    for class_name, path in class_mapping.items():
-        full_class_path = path["cls_import_path"]
-        module = import_string(full_class_path)
-
-        module_configs = module.model_domain_mapping()
-        if module_configs:
-            for config in module_configs:
-                config_mapping[config["domain"]] = {
-                    "table": module,
-                    "conflict_do_update": config["conflict_do_update"],
-                    "update_strategy": config["update_strategy"],
-                    "converter": config["converter"],
-                }
+    for config in model.model_domain_mapping() or []:
+        config_mapping[config["domain"]] = {
+            "table": model,
+            "conflict_do_update": config["conflict_do_update"],
+            "update_strategy": config["update_strategy"],
+            "converter": config["converter"],
+            "row_converter": RowConverter(config["domain"], model, config["converter"], config["conflict_do_update"]),
+        }
     return config_mapping
 
 
-domain_model_mapping = scan_convert_config()
+class DomainModelMapping(Mapping):
+    """
+    The table and converters of every domain stored in postgres, keyed by domain class. The models of a domain
+    are imported the first time it is looked up, the discovery manifest tells which ones they are.
+    """
+
+    def __init__(self):
+        self._configs = {}
+        self._loaded_models = set()
+        self._lock = threading.Lock()
+
+    def _load_models(self, model_paths):
+        with self._lock:
+            for model_path in model_paths:
+                if model_path not in self._loaded_models:
+                    self._configs.update(model_convert_configs(import_string(model_path)))
+                    self._loaded_models.add(model_path)
+
+    def __getitem__(self, domain):
+        if domain not in self._configs:
+            self._load_models(get_manifest().models_of_domain(class_path(domain)))
+        return self._configs[domain]
+
+    def __contains__(self, domain):
+        try:
+            self[domain]
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        self._load_models(get_manifest().models)
+        return iter(dict(self._configs))
+
+    def __len__(self):
+        self._load_models(get_manifest().models)
+        return len(self._configs)
+
+
+domain_model_mapping = DomainModelMapping()
@@ -0,0 +1,175 @@
+import inspect
+from dataclasses import fields, is_dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple, Type
+
+from psycopg2._json import Json
+from sqlalchemy import NUMERIC as SQL_NUMERIC
+from sqlalchemy import Numeric as SQL_Numeric
+from sqlalchemy.dialects.postgresql import ARRAY, BYTEA, JSON, JSONB, NUMERIC, TIMESTAMP
+
+from common.models import HemeraModel, general_converter
+from common.utils.format_utils import hex_str_to_bytes
+from indexer.domain import Domain
+
+
+def _to_bytea(value):
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return hex_str_to_bytes(value) if value else None
+    if isinstance(value, int):
+        return value.to_bytes(32, byteorder="big")
+    return None
+
+
+def _to_bytea_array(value):
+    return [hex_str_to_bytes(address) for address in value]
+
+
+def _to_json(value):
+    return Json(value)
+
+
+def _to_json_or_none(value):
+    return Json(value) if value is not None else value
+
+
+def _to_numeric(value):
+    return None if isinstance(value, str) else value
+
+
+def _now():
+    return datetime.utcfromtimestamp(datetime.now(timezone.utc).timestamp())
+
+
+def resolve_column_function(column_type) -> Optional[Callable]:
+    """
+    The conversion general_converter would apply to a value of this column type, resolved once.
+    None means the value is passed through unchanged.
+    """
+    if isinstance(column_type, BYTEA):
+        return _to_bytea
+    if isinstance(column_type, TIMESTAMP):
+        return datetime.utcfromtimestamp
+    if isinstance(column_type, ARRAY) and isinstance(column_type.item_type, BYTEA):
+        return _to_bytea_array
+    if isinstance(column_type, JSONB):
+        return _to_json
+    if isinstance(column_type, JSON):
+        return _to_json_or_none
+    if isinstance(column_type, (NUMERIC, SQL_NUMERIC, SQL_Numeric)):
+        return _to_numeric
+    return None
+
+
+def sets_every_field(domain: Type[Domain]) -> bool:
+    """
+    Whether every instance carries every dataclass field. Domains with their own __init__ (e.g. Contract
+    filling itself from a dict) may leave fields unset, general_converter then skips those columns.
+    """
+    if not is_dataclass(domain):
+        return False
+    parameters = [name for name in inspect.signature(domain.__init__).parameters if name != "self"]
+    return parameters == [field.name for field in fields(domain) if field.init]
+
+
+class RowConverter:
+    """
+    Converts domain items of one type into value tuples for one table.
+
+    For mappings using general_converter or general_converter_with the tuple building function is
+    generated once from the dataclass fields, the column getters and the table's column types, so no
+    column lookup or type check happens per item. Other custom converters are wrapped as they are and
+    the columns are taken from their first result.
+    """
+
+    def __init__(self, domain: Type[Domain], table: Type[HemeraModel], converter: Callable, is_update: bool):
+        self.domain = domain
+        self.table = table
+        self.converter = converter
+        self.is_update = is_update
+        self.columns: Optional[List[str]] = None
+        self.is_compiled = False
+
+        # Converters built with general_converter_with are general_converter plus column getters.
+        self.column_getters = getattr(converter, "column_getters", None)
+        if (converter is general_converter or self.column_getters is not None) and sets_every_field(domain):
+            self.columns, self._convert = compile_general_converter(domain, table, is_update, self.column_getters)
+            self.is_compiled = True
+        else:
+            self._convert = self._convert_with_converter
+
+    def _convert_with_converter(self, item) -> tuple:
+        converted = self.converter(self.table, item, self.is_update)
+        if self.columns is None:
+            self.columns = list(converted.keys())
+        return tuple(converted.values())
+
+    def convert(self, item) -> tuple:
+        return self._convert(item)
+
+    def convert_many(self, items) -> List[tuple]:
+        convert = self._convert
+        return [convert(item) for item in items]
+
+
+def compile_general_converter(
+    domain: Type[Domain],
+    table: Type[HemeraModel],
+    is_update: bool,
+    column_getters: Optional[Dict[str, Callable]] = None,
+) -> Tuple[List[str], Callable[[Domain], tuple]]:
+    """
+    Generate `def convert(item): return (f0(item.a), item.b, ...)` following general_converter's rules:
+    dataclass fields present in the table in field order, then update_time and reorg when they apply.
+    Column getters stand in for the value of a field column, or add their column at the end.
+    """
+    column_getters = column_getters or {}
+    table_columns = table.__table__.c
+    namespace = {"_now": _now}
+    columns, expressions = [], []
+
+    def getter_expression(column):
+        namespace[f"_g_{column}"] = column_getters[column]
+        return f"_g_{column}(item)"
+
+    for field in fields(domain):
+        if field.name not in table_columns:
+            continue
+        columns.append(field.name)
+        if field.name in column_getters:
+            function = resolve_column_function(table_columns[field.name].type)
+            if function is None:
+                expressions.append(getter_expression(field.name))
+            else:
+                namespace[f"_f_{field.name}"] = function
+                expressions.append(f"_f_{field.name}({getter_expression(field.name)})")
+        elif is_update and field.name == "update_time":
+            expressions.append("_now()")
+        elif field.name == "reorg" and "reorg" in table.__table__.columns:
+            expressions.append("False")
+        else:
+            function = resolve_column_function(table_columns[field.name].type)
+            if function is None:
+                expressions.append(f"item.{field.name}")
+            else:
+                namespace[f"_f_{field.name}"] = function
+                expressions.append(f"_f_{field.name}(item.{field.name})")
+
+    if is_update and "update_time" not in columns:
+        columns.append("update_time")
+        expressions.append("_now()")
+
+    if "reorg" in table.__table__.columns and "reorg" not in columns:
+        columns.append("reorg")
+        expressions.append("False")
+
+    for column in column_getters:
+        if column not in columns:
+            columns.append(column)
+            expressions.append(getter_expression(column))
+
+    source = f"def convert(item):\n    return ({', '.join(expressions)}{',' if len(expressions) == 1 else ''})\n"
+    exec(compile(source, f"<row_converter {domain.__name__} -> {table.__tablename__}>", "exec"), namespace)
+    return columns, namespace["convert"]
@@ -7,8 +7,9 @@ from sqlalchemy import NUMERIC as SQL_NUMERIC
 from sqlalchemy import Numeric as SQL_Numeric
 from sqlalchemy.dialects.postgresql import ARRAY, BYTEA, JSON, JSONB, NUMERIC, TIMESTAMP
 
+from common.utils.discovery_manifest import get_manifest
 from common.utils.format_utils import hex_str_to_bytes
-from common.utils.module_loading import import_string, scan_subclass_by_path_patterns
+from common.utils.module_loading import import_string
 from indexer.domain import Domain
 
 model_path_patterns = [
@@ -42,32 +43,33 @@ def get_column_type(table: Type[HemeraModel], column_name):
     return table.__table__.c[column_name].type
 
 
+def convert_column_value(column_type, value):
+    if isinstance(column_type, BYTEA) and not isinstance(value, bytes):
+        if isinstance(value, str):
+            return hex_str_to_bytes(value) if value else None
+        elif isinstance(value, int):
+            return value.to_bytes(32, byteorder="big")
+        else:
+            return None
+    elif isinstance(column_type, TIMESTAMP):
+        return datetime.utcfromtimestamp(value)
+    elif isinstance(column_type, ARRAY) and isinstance(column_type.item_type, BYTEA):
+        return [hex_str_to_bytes(address) for address in value]
+    elif isinstance(column_type, JSONB) or isinstance(column_type, JSON) and value is not None:
+        return Json(value)
+    elif (
+        isinstance(column_type, NUMERIC) or isinstance(column_type, SQL_NUMERIC) or isinstance(column_type, SQL_Numeric)
+    ) and isinstance(value, str):
+        return None
+    else:
+        return value
+
+
 def general_converter(table: Type[HemeraModel], data: Domain, is_update=False):
     converted_data = {}
     for key in data.__dict__.keys():
         if key in table.__table__.c:
-            column_type = get_column_type(table, key)
-            if isinstance(column_type, BYTEA) and not isinstance(getattr(data, key), bytes):
-                if isinstance(getattr(data, key), str):
-                    converted_data[key] = hex_str_to_bytes(getattr(data, key)) if getattr(data, key) else None
-                elif isinstance(getattr(data, key), int):
-                    converted_data[key] = getattr(data, key).to_bytes(32, byteorder="big")
-                else:
-                    converted_data[key] = None
-            elif isinstance(column_type, TIMESTAMP):
-                converted_data[key] = datetime.utcfromtimestamp(getattr(data, key))
-            elif isinstance(column_type, ARRAY) and isinstance(column_type.item_type, BYTEA):
-                converted_data[key] = [hex_str_to_bytes(address) for address in getattr(data, key)]
-            elif isinstance(column_type, JSONB) or isinstance(column_type, JSON) and getattr(data, key) is not None:
-                converted_data[key] = Json(getattr(data, key))
-            elif (
-                isinstance(column_type, NUMERIC)
-                or isinstance(column_type, SQL_NUMERIC)
-                or isinstance(column_type, SQL_Numeric)
-            ) and isinstance(getattr(data, key), str):
-                converted_data[key] = None
-            else:
-                converted_data[key] = getattr(data, key)
+            converted_data[key] = convert_column_value(get_column_type(table, key), getattr(data, key))
 
     if is_update:
         converted_data["update_time"] = datetime.utcfromtimestamp(datetime.now(timezone.utc).timestamp())
@@ -78,23 +80,59 @@ def general_converter(table: Type[HemeraModel], data: Domain, is_update=False):
     return converted_data
 
 
-def import_all_models():
-    for name in __models_imports:
-        if name != "ImportError":
-            path = __models_imports.get(name)
-            if not path:
-                raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+def general_converter_with(**column_getters):
+    """
+    A converter doing what general_converter does, with the value of every column in column_getters
+    taken from column_getters[column](data). Getters of field columns stand in for the field and their
+    value is converted like the field's would be, getters of other columns give the final value.
+    Keeping the changes declarative lets RowConverter compile them into the same generated function
+    as the dataclass fields, and the domain is never modified.
+    """
+
+    def converter(table: Type[HemeraModel], data: Domain, is_update=False):
+        converted_data = general_converter(table, data, is_update)
+        for column, getter in column_getters.items():
+            if column in converted_data and column in data.__dict__:
+                converted_data[column] = convert_column_value(get_column_type(table, column), getter(data))
+            else:
+                converted_data[column] = getter(data)
+        return converted_data
+
+    converter.column_getters = column_getters
+    return converter
 
-            val = import_string(f"{path}.{name}")
 
-        # Store for next time
-        globals()[name] = val
-        return val
+def general_columnar_converter(table: Type[HemeraModel], batch, is_update=False):
+    """
+    Column-wise equivalent of general_converter for a ColumnarBatch, returns the column names and
+    one value tuple per row. Hex columns hand out their raw bytes directly for BYTEA columns.
+    """
+    columns, values = [], []
+    for key, column in batch.columns():
+        if key in table.__table__.c:
+            column_type = get_column_type(table, key)
+            columns.append(key)
+            if is_update and key == "update_time":
+                values.append([datetime.utcfromtimestamp(datetime.now(timezone.utc).timestamp())] * len(batch))
+            elif key == "reorg":
+                values.append([False] * len(batch))
+            elif isinstance(column_type, BYTEA) and hasattr(column, "to_bytes_list"):
+                values.append(column.to_bytes_list())
+            else:
+                values.append([convert_column_value(column_type, value) for value in column])
+
+    if is_update and "update_time" not in columns:
+        columns.append("update_time")
+        values.append([datetime.utcfromtimestamp(datetime.now(timezone.utc).timestamp())] * len(batch))
 
+    if "reorg" in table.__table__.columns and "reorg" not in columns:
+        columns.append("reorg")
+        values.append([False] * len(batch))
 
-__models_imports = {
-    k: v["module_import_path"]
-    for k, v in scan_subclass_by_path_patterns(
-        model_path_patterns, HemeraModel, exclude_path=model_path_exclude
-    ).items()
-}
+    return columns, list(zip(*values))
+
+
+def import_all_models():
+    """Imports every model, for tools needing the complete metadata such as alembic."""
+    for model_path in get_manifest().models:
+        import_string(model_path)
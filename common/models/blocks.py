@@ -1,9 +1,7 @@
-from typing import Type, Union
-
 from sqlalchemy import Column, Index, desc, func, text
 from sqlalchemy.dialects.postgresql import BIGINT, BOOLEAN, BYTEA, NUMERIC, TIMESTAMP
 
-from common.models import HemeraModel, general_converter
+from common.models import HemeraModel, general_converter, general_converter_with
 from indexer.domain.block import Block, UpdateBlockInternalCount
 
 
@@ -56,7 +54,7 @@ class Blocks(HemeraModel):
                 "domain": UpdateBlockInternalCount,
                 "conflict_do_update": True,
                 "update_strategy": None,
-                "converter": converter,
+                "converter": general_converter,
             },
         ]
 
@@ -77,13 +75,6 @@ Index(
 )
 
 
-def converter(
-    table: Type[HemeraModel],
-    data: Union[Block, UpdateBlockInternalCount],
-    is_update=False,
-):
-    converted_data = general_converter(table, data, is_update)
-    if isinstance(data, Block):
-        converted_data["transactions_count"] = len(data.transactions) if data.transactions else 0
-
-    return converted_data
+converter = general_converter_with(
+    transactions_count=lambda data: len(data.transactions) if data.transactions else 0,
+)
@@ -1,19 +1,15 @@
-from typing import Type
 from urllib import parse
 
 from sqlalchemy import Column, Index, PrimaryKeyConstraint, desc, func, text
 from sqlalchemy.dialects.postgresql import BIGINT, BOOLEAN, BYTEA, JSONB, NUMERIC, TIMESTAMP, VARCHAR
 
-from common.models import HemeraModel, general_converter
+from common.models import HemeraModel, general_converter, general_converter_with
 from indexer.domain.token_id_infos import ERC721TokenIdDetail, UpdateERC721TokenIdDetail
 
-
-def token_uri_format_converter(table: Type[HemeraModel], data, is_update=False):
-
-    if data.token_uri is not None:
-        data.token_uri = parse.quote_plus(data.token_uri)
-
-    return general_converter(table, data, is_update)
+# Quotes token_uri in the row only, the domain keeps the uri as fetched.
+token_uri_format_converter = general_converter_with(
+    token_uri=lambda data: parse.quote_plus(data.token_uri) if data.token_uri is not None else None,
+)
 
 
 class ERC721TokenIdDetails(HemeraModel):
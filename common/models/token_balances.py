@@ -1,18 +1,13 @@
-from typing import Type
-
 from sqlalchemy import Column, Index, PrimaryKeyConstraint, desc, func, text
 from sqlalchemy.dialects.postgresql import BIGINT, BOOLEAN, BYTEA, NUMERIC, TIMESTAMP, VARCHAR
 
-from common.models import HemeraModel, general_converter
+from common.models import HemeraModel, general_converter_with
 from indexer.domain.token_balance import TokenBalance
 
-
-def token_balances_general_converter(table: Type[HemeraModel], data: TokenBalance, is_update=False):
-
-    if data.token_id is None:
-        data.token_id = -1
-
-    return general_converter(table, data, is_update)
+# Balances of tokens without ids are stored under token_id -1, the domain keeps None.
+token_balances_general_converter = general_converter_with(
+    token_id=lambda data: -1 if data.token_id is None else data.token_id,
+)
 
 
 class AddressTokenBalances(HemeraModel):
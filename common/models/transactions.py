@@ -1,9 +1,7 @@
-from typing import Type
-
 from sqlalchemy import Column, Computed, Index, asc, desc, func, text
 from sqlalchemy.dialects.postgresql import ARRAY, BIGINT, BOOLEAN, BYTEA, INTEGER, NUMERIC, TEXT, TIMESTAMP, VARCHAR
 
-from common.models import HemeraModel, general_converter
+from common.models import HemeraModel, general_converter_with
 from common.utils.format_utils import hex_str_to_bytes
 from indexer.domain.transaction import Transaction
 
@@ -90,23 +88,29 @@ Index(
 )
 
 
-def converter(table: Type[HemeraModel], data: Transaction, is_update=False):
-    converted_data = general_converter(table, data, is_update)
-    receipt = data.receipt
-
-    converted_data["receipt_root"] = hex_str_to_bytes(receipt.root) if receipt and receipt.root else None
-    converted_data["receipt_status"] = receipt.status if receipt else None
-    converted_data["receipt_gas_used"] = receipt.gas_used if receipt else None
-    converted_data["receipt_cumulative_gas_used"] = receipt.cumulative_gas_used if receipt else None
-    converted_data["receipt_effective_gas_price"] = receipt.effective_gas_price if receipt else None
-    converted_data["receipt_l1_fee"] = receipt.l1_fee if receipt else None
-    converted_data["receipt_l1_fee_scalar"] = receipt.l1_fee_scalar if receipt else None
-    converted_data["receipt_l1_gas_used"] = receipt.l1_gas_used if receipt else None
-    converted_data["receipt_l1_gas_price"] = receipt.l1_gas_price if receipt else None
-    converted_data["receipt_blob_gas_used"] = receipt.blob_gas_used if receipt else None
-    converted_data["receipt_blob_gas_price"] = receipt.blob_gas_price if receipt else None
-    converted_data["receipt_contract_address"] = (
-        hex_str_to_bytes(receipt.contract_address) if receipt and receipt.contract_address else None
-    )
-
-    return converted_data
+def _receipt_value(name):
+    return lambda data: getattr(data.receipt, name) if data.receipt else None
+
+
+def _receipt_bytes(name):
+    def get(data):
+        value = getattr(data.receipt, name) if data.receipt else None
+        return hex_str_to_bytes(value) if value else None
+
+    return get
+
+
+converter = general_converter_with(
+    receipt_root=_receipt_bytes("root"),
+    receipt_status=_receipt_value("status"),
+    receipt_gas_used=_receipt_value("gas_used"),
+    receipt_cumulative_gas_used=_receipt_value("cumulative_gas_used"),
+    receipt_effective_gas_price=_receipt_value("effective_gas_price"),
+    receipt_l1_fee=_receipt_value("l1_fee"),
+    receipt_l1_fee_scalar=_receipt_value("l1_fee_scalar"),
+    receipt_l1_gas_used=_receipt_value("l1_gas_used"),
+    receipt_l1_gas_price=_receipt_value("l1_gas_price"),
+    receipt_blob_gas_used=_receipt_value("blob_gas_used"),
+    receipt_blob_gas_price=_receipt_value("blob_gas_price"),
+    receipt_contract_address=_receipt_bytes("contract_address"),
+)
@@ -12,6 +12,8 @@ import eth_abi
 from ens.utils import get_abi_output_types
 from eth_abi import abi
 from eth_abi.codec import ABICodec
+from eth_abi.decoding import ContextFramesBytesIO, TupleDecoder
+from eth_abi.registry import registry as abi_registry
 from eth_typing import HexStr, TypeStr
 from eth_utils import encode_hex, to_hex
 from hexbytes import HexBytes
@@ -42,11 +44,30 @@ from indexer.utils.abi import (
 abi_codec = ABICodec(eth_abi.registry.registry)
 
 
+def compile_decoder(types: Sequence[str]) -> Callable[[bytes], Tuple[Any, ...]]:
+    """
+    Builds the decoder of a list of ABI types once, it decodes like abi_codec.decode(types, data)
+    without resolving the type strings again for every call.
+    """
+    decoder = TupleDecoder(decoders=[abi_registry.get_decoder(type_str, strict=True) for type_str in types])
+
+    def decode(data: bytes) -> Tuple[Any, ...]:
+        return decoder(ContextFramesBytesIO(data))
+
+    return decode
+
+
+def _is_hashed_when_indexed(abi_input: Dict[str, Any]) -> bool:
+    # Indexed values of dynamic types and structs are stored in the topic as the keccak hash of the value.
+    abi_type = abi_input["type"]
+    return abi_type in ("string", "bytes") or abi_type.endswith("]") or abi_type.startswith("tuple")
+
+
 class Event:
 
     def __init__(self, event_abi: ABIEvent):
         """
-        Initializes an Event object.
+        Initializes an Event object and compiles its decoders.
 
         :param event_abi: The ABI (Application Binary Interface) of the event.
         :type event_abi: ABIEvent
@@ -54,6 +75,26 @@ class Event:
         self._event_abi = event_abi
         self._signature = event_log_abi_to_topic(event_abi)
 
+        indexed_inputs = get_indexed_event_inputs(event_abi)
+        self._indexed_inputs = [
+            {**abi_input, "type": "bytes32"} if _is_hashed_when_indexed(abi_input) else abi_input
+            for abi_input in indexed_inputs
+        ]
+        self._data_inputs = exclude_indexed_event_inputs(event_abi)
+        self._decode_indexed = compile_decoder(get_types_from_abi_type_list(self._indexed_inputs))
+        self._decode_data = compile_decoder(get_types_from_abi_type_list(self._data_inputs))
+        # decode_log_ignore_indexed reads the topics as if they were the head of the data.
+        self._unindexed_inputs = indexed_inputs + self._data_inputs
+        self._decode_unindexed = compile_decoder(get_types_from_abi_type_list(self._unindexed_inputs))
+
+        # Values come out indexed first, output_order puts them back in the order of the ABI inputs.
+        decoded_inputs = self._indexed_inputs + self._data_inputs
+        positions = {id(abi_input): position for position, abi_input in enumerate(indexed_inputs + self._data_inputs)}
+        self._output_order = [positions[id(abi_input)] for abi_input in event_abi["inputs"]]
+        self._output_names = [decoded_inputs[position]["name"] for position in self._output_order]
+        # Structs are named recursively by named_tree, flat events just zip the names with the values.
+        self._is_flat = not any("components" in abi_input for abi_input in event_abi["inputs"])
+
     def get_abi(self) -> ABIEvent:
         """
         Returns the ABI of the Event.
@@ -75,6 +116,22 @@ class Event:
     def get_name(self) -> str:
         return self._event_abi["name"]
 
+    def _decode_values(self, log) -> Tuple[Any, ...]:
+        values = self._decode_indexed(log.get_bytes_topics()) + self._decode_data(log.get_bytes_data())
+        return tuple(values[position] for position in self._output_order)
+
+    def _to_dict(self, values: Tuple[Any, ...]) -> Dict[str, Any]:
+        if self._is_flat:
+            return dict(zip(self._output_names, values))
+        indexed_count = len(self._indexed_inputs)
+        ordered = [None] * len(values)
+        for value, position in zip(values, self._output_order):
+            ordered[position] = value
+        return {
+            **named_tree(self._indexed_inputs, ordered[:indexed_count]),
+            **named_tree(self._data_inputs, ordered[indexed_count:]),
+        }
+
     def decode_log(self, log) -> Optional[Dict[str, Any]]:
         """
         Decodes the given log using the event ABI.
@@ -85,7 +142,36 @@ class Event:
         :return: A dictionary containing the decoded log data, or None if decoding fails.
         :rtype: Optional[Dict[str, Any]]
         """
-        return decode_log(self._event_abi, log)
+        _check_log(log)
+        try:
+            return self._to_dict(self._decode_values(log))
+        except Exception as e:
+            logging.warning(f"Failed to decode log: {e}, log: {log}")
+            return None
+
+    def decode_logs(self, logs, as_tuples: bool = False) -> List[Optional[Union[Dict[str, Any], Tuple[Any, ...]]]]:
+        """
+        Decodes many logs of this event with the same compiled decoders.
+
+        :param logs: The logs to decode.
+        :type logs: Iterable[Log]
+
+        :param as_tuples: Return the values as tuples in the order of the ABI inputs instead of dictionaries.
+        :type as_tuples: bool
+
+        :return: The decoded value of every log, None for the logs which could not be decoded.
+        :rtype: List[Optional[Union[Dict[str, Any], Tuple[Any, ...]]]]
+        """
+        decoded = []
+        for log in logs:
+            _check_log(log)
+            try:
+                values = self._decode_values(log)
+                decoded.append(values if as_tuples else self._to_dict(values))
+            except Exception as e:
+                logging.warning(f"Failed to decode log: {e}, log: {log}")
+                decoded.append(None)
+        return decoded
 
     def decode_log_ignore_indexed(self, log) -> Optional[Dict[str, Any]]:
         """
@@ -94,10 +180,47 @@ class Event:
         :param log: The log to decode.
         :type log: Log
 
-        :return: A dictionary containing the decoded log data, or None if decoding fails.
+        :return: A dictionary containing the decoded log data, or raise exception if decoding fails.
         :rtype: Optional[Dict[str, Any]]
         """
-        return decode_log_ignore_indexed(self._event_abi, log)
+        _check_log(log)
+        return named_tree(self._unindexed_inputs, self._decode_unindexed(log.get_topic_with_data()))
+
+
+def _check_log(log):
+    from indexer.domain.log import Log
+
+    if not isinstance(log, Log):
+        raise ValueError(f"log: {log} is not a Log instance")
+
+
+# Events compiled for the ABI dicts handed to the module level decode functions, keyed by the dict's id.
+# The dict is kept in the entry so its id cannot be reused while the entry exists.
+_compiled_events: Dict[int, Tuple[ABIEvent, Event]] = {}
+MAX_COMPILED_EVENTS = 1024
+
+
+def compiled_event(fn_abi: ABIEvent) -> Event:
+    entry = _compiled_events.get(id(fn_abi))
+    if entry is None or entry[0] is not fn_abi:
+        if len(_compiled_events) >= MAX_COMPILED_EVENTS:
+            _compiled_events.clear()
+        entry = (fn_abi, Event(fn_abi))
+        _compiled_events[id(fn_abi)] = entry
+    return entry[1]
+
+
+def decode_log_ignore_indexed(self, log) -> Optional[Dict[str, Any]]:
+    """
+    Decodes the given log, ignoring indexed parameters.
+
+    :param log: The log to decode.
+    :type log: Log
+
+    :return: A dictionary containing the decoded log data, or None if decoding fails.
+    :rtype: Optional[Dict[str, Any]]
+    """
+    return decode_log_ignore_indexed(self._event_abi, log)
 
 
 def decode_log_ignore_indexed(
@@ -116,15 +239,7 @@ def decode_log_ignore_indexed(
     :return: A dictionary containing the decoded log data, or raise exception if decoding fails.
     :rtype: Optional[Dict[str, Any]]
     """
-    from indexer.domain.log import Log
-
-    if not isinstance(log, Log):
-        raise ValueError(f"log: {log} is not a Log instance")
-
-    data_types = get_indexed_event_inputs(fn_abi) + exclude_indexed_event_inputs(fn_abi)
-    decoded_data = decode_data([t["type"] for t in data_types], log.get_topic_with_data())
-    data = named_tree(data_types, decoded_data)
-    return data
+    return compiled_event(fn_abi).decode_log_ignore_indexed(log)
 
 
 def decode_log(
@@ -143,29 +258,7 @@ def decode_log(
     :return: A dictionary containing the decoded log data, or None if decoding fails.
     :rtype: Optional[Dict[str, Any]]
     """
-    from indexer.domain.log import Log
-
-    if not isinstance(log, Log):
-        raise ValueError(f"log: {log} is not a Log instance")
-
-    try:
-        indexed_types = get_indexed_event_inputs(fn_abi)
-        for indexed_type in indexed_types:
-            if indexed_type["type"] == "string":
-                indexed_type["type"] = "bytes32"
-
-        data_types = exclude_indexed_event_inputs(fn_abi)
-
-        decode_indexed = decode_data(get_types_from_abi_type_list(indexed_types), log.get_bytes_topics())
-        indexed = named_tree(indexed_types, decode_indexed)
-
-        decoded_data = decode_data(get_types_from_abi_type_list(data_types), log.get_bytes_data())
-        data = named_tree(data_types, decoded_data)
-    except Exception as e:
-        logging.warning(f"Failed to decode log: {e}, log: {log}")
-        return None
-
-    return {**indexed, **data}
+    return compiled_event(fn_abi).decode_log(log)
 
 
 class Function:
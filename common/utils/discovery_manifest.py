@@ -0,0 +1,232 @@
+import ast
+import hashlib
+import json
+import logging
+import os
+import pkgutil
+import threading
+from collections import deque
+from importlib import import_module
+from importlib.util import find_spec
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+# Source trees whose modules define domains, models or jobs, the manifest is rebuilt when a file in them changes.
+SOURCE_ROOTS = ["common/models", "indexer/domain", "indexer/jobs", "indexer/modules", "indexer/aggr_jobs"]
+
+# Packages of API routes, they hold no jobs and some of them query a node when imported.
+SKIPPED_PACKAGES = {"endpoint", "endpoints", "tests"}
+
+
+def default_manifest_path() -> str:
+    project_key = hashlib.sha1(PROJECT_ROOT.encode()).hexdigest()[:12]
+    return os.environ.get(
+        "HEMERA_DISCOVERY_MANIFEST",
+        os.path.join(os.path.expanduser("~"), ".cache", "hemera", f"discovery-manifest-{project_key}.json"),
+    )
+
+
+def class_path(cls) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def source_fingerprint(roots: Iterable[str] = SOURCE_ROOTS) -> str:
+    """A digest of the path, mtime and size of every python file under roots, no file is read."""
+    digest = hashlib.sha1(str(MANIFEST_VERSION).encode())
+    for root in roots:
+        for directory, sub_directories, files in os.walk(os.path.join(PROJECT_ROOT, root)):
+            sub_directories.sort()
+            for file in sorted(files):
+                if file.endswith(".py"):
+                    path = os.path.join(directory, file)
+                    stat = os.stat(path)
+                    digest.update(f"{os.path.relpath(path, PROJECT_ROOT)}:{stat.st_mtime_ns}:{stat.st_size};".encode())
+    return digest.hexdigest()
+
+
+def defines_job(module_name: str) -> bool:
+    """Whether the source of module_name defines a class deriving from a *Job class, read without importing it."""
+    spec = find_spec(module_name)
+    if spec is None or spec.origin is None or not spec.origin.endswith(".py"):
+        return True
+    with open(spec.origin, "r", encoding="utf-8") as module_file:
+        tree = ast.parse(module_file.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ClassDef):
+            for base in node.bases:
+                base_name = base.attr if isinstance(base, ast.Attribute) else getattr(base, "id", "")
+                if base_name.endswith("Job"):
+                    return True
+    return False
+
+
+def import_job_packages(package_name: str = "indexer.modules") -> List[str]:
+    """Imports every module of package_name as import_submodules does, returns the modules failing to import."""
+    failed = []
+    package = import_module(package_name)
+    for _, name, is_pkg in pkgutil.iter_modules(package.__path__, prefix=package_name + "."):
+        if name.rsplit(".", 1)[-1] in SKIPPED_PACKAGES:
+            continue
+        try:
+            import_module(name)
+        except Exception as e:
+            if defines_job(name):
+                logger.warning(f"Module {name} could not be imported while discovering jobs: {e}")
+                failed.append(name)
+            else:
+                logger.debug(f"Module {name} without jobs could not be imported while discovering jobs: {e}")
+            continue
+        if is_pkg:
+            failed.extend(import_job_packages(name))
+    return failed
+
+
+class DiscoveryManifest:
+    """
+    Where every domain, model and job is defined and how they relate, so that they can be imported on demand.
+
+    domains maps a domain type (Domain.type()) to its class path. models maps a model class path to the
+    class paths of the domains it stores. jobs maps a job class path to its output and dependency domains.
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+        self.domains: Dict[str, str] = data["domains"]
+        self.models: Dict[str, List[str]] = data["models"]
+        self.jobs: Dict[str, dict] = data["jobs"]
+
+        self._domain_models: Dict[str, List[str]] = {}
+        for model, domains in self.models.items():
+            for domain in domains:
+                self._domain_models.setdefault(domain, []).append(model)
+
+    def domain_path(self, domain_type: str) -> Optional[str]:
+        return self.domains.get(domain_type)
+
+    def models_of_domain(self, domain_path: str) -> List[str]:
+        return self._domain_models.get(domain_path, [])
+
+    def job_modules(self, domain_paths: Iterable[str]) -> List[str]:
+        """The modules of the jobs producing domain_paths, and of the jobs producing what those depend on."""
+        producers: Dict[str, List[str]] = {}
+        for job, job_info in self.jobs.items():
+            for output in job_info["output_types"]:
+                producers.setdefault(output, []).append(job)
+
+        modules = []
+        seen_domains = set()
+        queue = deque(domain_paths)
+        while queue:
+            domain = queue.popleft()
+            if domain in seen_domains:
+                continue
+            seen_domains.add(domain)
+            for job in producers.get(domain, []):
+                module = self.jobs[job]["module"]
+                if module not in modules:
+                    modules.append(module)
+                queue.extend(self.jobs[job]["dependency_types"])
+        return modules
+
+
+def build_manifest(fingerprint: str) -> (DiscoveryManifest, bool):
+    """
+    Imports every domain, model and job module and records where they are, the slow path the manifest saves.
+    Also returns whether every job module could be imported, a partial manifest is not worth persisting.
+    """
+    from common.models import HemeraModel, model_path_exclude
+    from common.models import model_path_patterns as models_path_patterns
+    from common.utils.module_loading import scan_subclass_by_path_patterns
+    from indexer.domain import Domain, DomainMeta
+    from indexer.domain import model_path_patterns as domains_path_patterns
+    from indexer.jobs.base_job import BaseExportJob, ExtensionJob, generate_dependency_types
+
+    scan_subclass_by_path_patterns(domains_path_patterns, Domain)
+    models = {}
+    for model_name, model_info in scan_subclass_by_path_patterns(
+        models_path_patterns, HemeraModel, exclude_path=model_path_exclude
+    ).items():
+        module = import_module(model_info["module_import_path"])
+        model = getattr(module, model_name)
+        configs = model.model_domain_mapping() or []
+        # A few models name their domain instead of giving its class, those are kept as they are.
+        models[class_path(model)] = [
+            config["domain"] if isinstance(config["domain"], str) else class_path(config["domain"])
+            for config in configs
+        ]
+
+    failed = import_job_packages()
+    jobs = {}
+    for job in BaseExportJob.discover_jobs() + ExtensionJob.discover_jobs():
+        generate_dependency_types(job)
+        jobs[class_path(job)] = {
+            "module": job.__module__,
+            "output_types": [class_path(output) for output in job.output_types],
+            "dependency_types": [class_path(dependency) for dependency in job.dependency_types],
+        }
+
+    domains = {
+        domain_type: class_path(domain)
+        for domain_type, domain in DomainMeta.get_all_subclasses_with_type().items()
+        if domain.__module__ != "__main__" and ".tests." not in domain.__module__
+    }
+
+    data = {"version": MANIFEST_VERSION, "fingerprint": fingerprint, "domains": domains, "models": models, "jobs": jobs}
+    return DiscoveryManifest(data), not failed
+
+
+def read_manifest(path: str, fingerprint: str) -> Optional[DiscoveryManifest]:
+    try:
+        with open(path, "r", encoding="utf-8") as manifest_file:
+            data = json.load(manifest_file)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != MANIFEST_VERSION or data.get("fingerprint") != fingerprint:
+        return None
+    return DiscoveryManifest(data)
+
+
+def write_manifest(path: str, manifest: DiscoveryManifest):
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest.data, manifest_file)
+        os.replace(temp_path, path)
+    except OSError as e:
+        logger.info(f"Discovery manifest could not be saved to {path}, it will be rebuilt next time: {e}")
+
+
+_manifest: Optional[DiscoveryManifest] = None
+_manifest_lock = threading.RLock()
+
+
+def get_manifest() -> DiscoveryManifest:
+    """
+    The manifest of this source tree, read from disk when its fingerprint still matches the sources and built
+    and saved otherwise. Loaded once per process.
+    """
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            path = default_manifest_path()
+            fingerprint = source_fingerprint()
+            manifest = read_manifest(path, fingerprint)
+            if manifest is None:
+                logger.info("Discovery manifest missing or out of date, importing every module to rebuild it.")
+                manifest, complete = build_manifest(fingerprint)
+                if complete:
+                    write_manifest(path, manifest)
+            _manifest = manifest
+        return _manifest
+
+
+def import_job_modules(output_types: Iterable[type]):
+    """Imports the modules of the jobs needed to produce output_types, the other job modules stay unloaded."""
+    for module in get_manifest().job_modules(class_path(output_type) for output_type in output_types):
+        import_module(module)
@@ -74,6 +74,17 @@ class FastShutdownError(HemeraBaseException):
         self.message = message
 
 
+class ReorgDetectedError(HemeraBaseException):
+    """The chain reorganized below the blocks being indexed, blocks from fork_point on have to be indexed again."""
+
+    def __init__(self, fork_point: int, message=""):
+        super().__init__(message)
+        self.crashable = False
+        self.retriable = True
+        self.message = message
+        self.fork_point = fork_point
+
+
 class ErrorRollupError(Exception):
     def __init__(self, message="Invalid rollup type", code=404):
         super().__init__(message)
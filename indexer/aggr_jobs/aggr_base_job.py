@@ -8,7 +8,7 @@ class AggrBaseJob:
     def run(self, **kwargs):
         pass
 
-    def get_sql_content(self, file_name, start_date, end_date):
+    def get_sql_content(self, file_name, start_date, end_date, **kwargs):
         base_dir = os.path.dirname(__file__)
         if not file_name.endswith(".sql"):
             file_name += ".sql"
@@ -16,7 +16,7 @@ class AggrBaseJob:
 
         with open(file_path, "r") as f:
             sql_template = f.read()
-        sql = sql_template.format(start_date=start_date, end_date=end_date)
+        sql = sql_template.format(start_date=start_date, end_date=end_date, **kwargs)
         return sql
 
     @staticmethod
@@ -1,236 +1,141 @@
-Begin;
--- Handle outgoing transactions including errors
-WITH out_txn AS (SELECT from_address                                        AS address,
-                        DATE(block_timestamp)                               AS block_date,
-                        COUNT(DISTINCT hash)                                AS txn_out_cnt,
-                        SUM(value)                                          AS txn_out_value,
-                        SUM(CASE WHEN receipt_status = 0 THEN 1 ELSE 0 END) AS txn_out_error_cnt
-                 FROM transactions
-                 WHERE from_address is not null
-                   and block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                 GROUP BY from_address, DATE(block_timestamp))
+-- Counts the blocks of {start_date} numbered ({after_block}, {end_block}] and adds them to the day's counters,
+-- so the job can run it over the whole day once the day's rows are deleted, or over new blocks only.
+-- Every source table is read once, each row yielding one side per address it involves.
+WITH transaction_sides AS (SELECT side.address,
+                                  side.direction,
+                                  t.value,
+                                  t.receipt_status
+                           FROM transactions t
+                                    CROSS JOIN LATERAL (VALUES (t.from_address, 'txn_out'),
+                                                               (t.to_address, 'txn_in'),
+                                                               (CASE WHEN t.from_address = t.to_address
+                                                                         THEN t.from_address END, 'txn_self'))
+                               AS side(address, direction)
+                           WHERE side.address is not null
+                             and t.block_timestamp >= '{start_date}'
+                             and t.block_timestamp < '{end_date}'
+                             and t.block_number > {after_block}
+                             and t.block_number <= {end_block}),
+
+     transfer_sides AS (SELECT side.address, side.direction
+                        FROM erc20_token_transfers t
+                                 CROSS JOIN LATERAL (VALUES (t.from_address, 'erc20_out'),
+                                                            (t.to_address, 'erc20_in')) AS side(address, direction)
+                        WHERE t.block_timestamp >= '{start_date}'
+                          and t.block_timestamp < '{end_date}'
+                          and t.block_number > {after_block}
+                          and t.block_number <= {end_block}
+                        UNION ALL
+                        SELECT side.address, side.direction
+                        FROM erc721_token_transfers t
+                                 CROSS JOIN LATERAL (VALUES (t.from_address, 'erc721_out'),
+                                                            (t.to_address, 'erc721_in')) AS side(address, direction)
+                        WHERE t.block_timestamp >= '{start_date}'
+                          and t.block_timestamp < '{end_date}'
+                          and t.block_number > {after_block}
+                          and t.block_number <= {end_block}
+                        UNION ALL
+                        SELECT side.address, side.direction
+                        FROM erc1155_token_transfers t
+                                 CROSS JOIN LATERAL (VALUES (t.from_address, 'erc1155_out'),
+                                                            (t.to_address, 'erc1155_in')) AS side(address, direction)
+                        WHERE t.block_timestamp >= '{start_date}'
+                          and t.block_timestamp < '{end_date}'
+                          and t.block_number > {after_block}
+                          and t.block_number <= {end_block}
+                        UNION ALL
+                        SELECT transaction_from_address, 'contract_deployed'
+                        FROM contracts
+                        WHERE block_timestamp >= '{start_date}'
+                          and block_timestamp < '{end_date}'
+                          and block_number > {after_block}
+                          and block_number <= {end_block}),
+
+     sides AS (SELECT address, direction, value, receipt_status
+               FROM transaction_sides
+               UNION ALL
+               SELECT address, direction, NULL, NULL
+               FROM transfer_sides
+               WHERE address is not null),
+
+     wallet_metrics AS (SELECT address,
+                               COUNT(*) FILTER (WHERE direction = 'txn_in')                          AS txn_in_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'txn_out')                         AS txn_out_cnt,
+                               COALESCE(SUM(value) FILTER (WHERE direction = 'txn_in'), 0)           AS txn_in_value,
+                               COALESCE(SUM(value) FILTER (WHERE direction = 'txn_out'), 0)          AS txn_out_value,
+                               COUNT(*) FILTER (WHERE direction = 'txn_in' and receipt_status = 0)   AS txn_in_error_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'txn_out' and receipt_status = 0)  AS txn_out_error_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'txn_self')                        AS txn_self_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'txn_self' and receipt_status = 0) AS txn_self_error_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'erc20_in')                        AS erc20_transfer_in_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'erc20_out')                       AS erc20_transfer_out_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'erc721_in')                       AS erc721_transfer_in_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'erc721_out')                      AS erc721_transfer_out_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'erc1155_in')                      AS erc1155_transfer_in_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'erc1155_out')                     AS erc1155_transfer_out_cnt,
+                               COUNT(*) FILTER (WHERE direction = 'contract_deployed')               AS contract_deployed_cnt
+                        FROM sides
+                        GROUP BY address)
 
 INSERT
 INTO daily_wallet_addresses_aggregates
-    (address, block_date, txn_out_cnt, txn_out_value, txn_out_error_cnt)
+(address, block_date, txn_in_cnt, txn_out_cnt, txn_in_value, txn_out_value, txn_in_error_cnt, txn_out_error_cnt,
+ txn_self_cnt, txn_self_error_cnt, erc20_transfer_in_cnt, erc20_transfer_out_cnt, erc721_transfer_in_cnt,
+ erc721_transfer_out_cnt, erc1155_transfer_in_cnt, erc1155_transfer_out_cnt, contract_deployed_cnt)
 SELECT address,
-       block_date,
-       txn_out_cnt,
-       txn_out_value,
-       txn_out_error_cnt
-FROM out_txn
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET txn_out_cnt       = EXCLUDED.txn_out_cnt,
-                  txn_out_value     = EXCLUDED.txn_out_value,
-                  txn_out_error_cnt = EXCLUDED.txn_out_error_cnt;
-
--- Handle incoming transactions including errors
-WITH in_txn AS (SELECT to_address                                          AS address,
-                       DATE(block_timestamp)                               AS block_date,
-                       COUNT(DISTINCT hash)                                AS txn_in_cnt,
-                       SUM(value)                                          AS txn_in_value,
-                       SUM(CASE WHEN receipt_status = 0 THEN 1 ELSE 0 END) AS txn_in_error_cnt
-                FROM transactions
-                WHERE to_address is not null
-                  and block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                GROUP BY to_address, DATE(block_timestamp))
-
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, txn_in_cnt, txn_in_value, txn_in_error_cnt)
-SELECT address,
-       block_date,
+       date('{start_date}'),
        txn_in_cnt,
+       txn_out_cnt,
        txn_in_value,
-       txn_in_error_cnt
-FROM in_txn
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET txn_in_cnt       = EXCLUDED.txn_in_cnt,
-                  txn_in_value     = EXCLUDED.txn_in_value,
-                  txn_in_error_cnt = EXCLUDED.txn_in_error_cnt;
-
-
--- Handle self transactions including errors
-WITH self_txn AS (SELECT from_address                                        AS address,
-                         DATE(block_timestamp)                               AS block_date,
-                         COUNT(DISTINCT hash)                                AS txn_self_cnt,
-                         SUM(CASE WHEN receipt_status = 0 THEN 1 ELSE 0 END) AS txn_self_error_cnt
-                  FROM transactions
-                  WHERE from_address = to_address
-                    and from_address is not null
-                    and block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                  GROUP BY from_address, DATE(block_timestamp))
-
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, txn_self_cnt, txn_self_error_cnt)
-SELECT address,
-       block_date,
+       txn_out_value,
+       txn_in_error_cnt,
+       txn_out_error_cnt,
        txn_self_cnt,
-       txn_self_error_cnt
-FROM self_txn
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET txn_self_cnt       = EXCLUDED.txn_self_cnt,
-                  txn_self_error_cnt = EXCLUDED.txn_self_error_cnt;
-
-WITH erc20_in AS (SELECT to_address            AS address,
-                         DATE(block_timestamp) AS block_date,
-                         COUNT(1)              AS cnt
-                  FROM erc20_token_transfers
-                  WHERE block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                  GROUP BY to_address, DATE(block_timestamp))
-
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, erc20_transfer_in_cnt)
-SELECT address,
-       block_date,
-       cnt
-FROM erc20_in
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET erc20_transfer_in_cnt = EXCLUDED.erc20_transfer_in_cnt;
-
-
-WITH erc20_out AS (SELECT from_address          AS address,
-                          DATE(block_timestamp) AS block_date,
-                          COUNT(1)              AS cnt
-                   FROM erc20_token_transfers
-                   WHERE block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                   GROUP BY from_address, DATE(block_timestamp))
-
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, erc20_transfer_out_cnt)
-SELECT address,
-       block_date,
-       cnt
-FROM erc20_out
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET erc20_transfer_out_cnt = EXCLUDED.erc20_transfer_out_cnt;
-
-
-WITH erc721_in AS (SELECT to_address            AS address,
-                          DATE(block_timestamp) AS block_date,
-                          COUNT(1)              AS cnt
-                   FROM erc721_token_transfers
-                   WHERE block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                   GROUP BY to_address, DATE(block_timestamp))
-
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, erc721_transfer_in_cnt)
-SELECT address,
-       block_date,
-       cnt
-FROM erc721_in
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET erc721_transfer_in_cnt = EXCLUDED.erc721_transfer_in_cnt;
-
-
-WITH erc721_out AS (SELECT from_address          AS address,
-                           DATE(block_timestamp) AS block_date,
-                           COUNT(1)              AS cnt
-                    FROM erc721_token_transfers
-                    WHERE block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                    GROUP BY from_address, DATE(block_timestamp))
-
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, erc721_transfer_out_cnt)
-SELECT address,
-       block_date,
-       cnt
-FROM erc721_out
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET erc721_transfer_out_cnt = EXCLUDED.erc721_transfer_out_cnt;
-
-WITH erc1155_in AS (SELECT to_address            AS address,
-                           DATE(block_timestamp) AS block_date,
-                           COUNT(1)              AS cnt
-                    FROM erc1155_token_transfers
-                    WHERE block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                    GROUP BY to_address, DATE(block_timestamp))
-
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, erc1155_transfer_in_cnt)
-SELECT address,
-       block_date,
-       cnt
-FROM erc1155_in
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET erc1155_transfer_in_cnt = EXCLUDED.erc1155_transfer_in_cnt;
-
-WITH erc1155_out AS (SELECT from_address          AS address,
-                            DATE(block_timestamp) AS block_date,
-                            COUNT(1)              AS cnt
-                     FROM erc1155_token_transfers
-                     WHERE block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                     GROUP BY from_address, DATE(block_timestamp))
-
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, erc1155_transfer_out_cnt)
-SELECT address,
-       block_date,
-       cnt
-FROM erc1155_out
-
-ON CONFLICT (address, block_date)
-    DO UPDATE SET erc1155_transfer_out_cnt = EXCLUDED.erc1155_transfer_out_cnt;
-
-with contract_deployed_table as (select transaction_from_address as address,
-                                        date(block_timestamp)    as block_date,
-                                        count(1)                 as contract_deployed_cnt
-                                 from contracts
-                                 WHERE block_timestamp >= '{start_date}'
-                      and block_timestamp < '{end_date}'
-                                 group by 1, 2)
-INSERT
-INTO daily_wallet_addresses_aggregates
-    (address, block_date, contract_deployed_cnt)
-SELECT address,
-       block_date,
+       txn_self_error_cnt,
+       erc20_transfer_in_cnt,
+       erc20_transfer_out_cnt,
+       erc721_transfer_in_cnt,
+       erc721_transfer_out_cnt,
+       erc1155_transfer_in_cnt,
+       erc1155_transfer_out_cnt,
        contract_deployed_cnt
-FROM contract_deployed_table
+FROM wallet_metrics
 
 ON CONFLICT (address, block_date)
-    DO UPDATE SET contract_deployed_cnt = EXCLUDED.contract_deployed_cnt;
+    DO UPDATE SET txn_in_cnt               = COALESCE(daily_wallet_addresses_aggregates.txn_in_cnt, 0) + EXCLUDED.txn_in_cnt,
+                  txn_out_cnt              = COALESCE(daily_wallet_addresses_aggregates.txn_out_cnt, 0) + EXCLUDED.txn_out_cnt,
+                  txn_in_value             = COALESCE(daily_wallet_addresses_aggregates.txn_in_value, 0) + EXCLUDED.txn_in_value,
+                  txn_out_value            = COALESCE(daily_wallet_addresses_aggregates.txn_out_value, 0) + EXCLUDED.txn_out_value,
+                  txn_in_error_cnt         = COALESCE(daily_wallet_addresses_aggregates.txn_in_error_cnt, 0) + EXCLUDED.txn_in_error_cnt,
+                  txn_out_error_cnt        = COALESCE(daily_wallet_addresses_aggregates.txn_out_error_cnt, 0) + EXCLUDED.txn_out_error_cnt,
+                  txn_self_cnt             = COALESCE(daily_wallet_addresses_aggregates.txn_self_cnt, 0) + EXCLUDED.txn_self_cnt,
+                  txn_self_error_cnt       = COALESCE(daily_wallet_addresses_aggregates.txn_self_error_cnt, 0) + EXCLUDED.txn_self_error_cnt,
+                  erc20_transfer_in_cnt    = COALESCE(daily_wallet_addresses_aggregates.erc20_transfer_in_cnt, 0) + EXCLUDED.erc20_transfer_in_cnt,
+                  erc20_transfer_out_cnt   = COALESCE(daily_wallet_addresses_aggregates.erc20_transfer_out_cnt, 0) + EXCLUDED.erc20_transfer_out_cnt,
+                  erc721_transfer_in_cnt   = COALESCE(daily_wallet_addresses_aggregates.erc721_transfer_in_cnt, 0) + EXCLUDED.erc721_transfer_in_cnt,
+                  erc721_transfer_out_cnt  = COALESCE(daily_wallet_addresses_aggregates.erc721_transfer_out_cnt, 0) + EXCLUDED.erc721_transfer_out_cnt,
+                  erc1155_transfer_in_cnt  = COALESCE(daily_wallet_addresses_aggregates.erc1155_transfer_in_cnt, 0) + EXCLUDED.erc1155_transfer_in_cnt,
+                  erc1155_transfer_out_cnt = COALESCE(daily_wallet_addresses_aggregates.erc1155_transfer_out_cnt, 0) + EXCLUDED.erc1155_transfer_out_cnt,
+                  contract_deployed_cnt    = COALESCE(daily_wallet_addresses_aggregates.contract_deployed_cnt, 0) + EXCLUDED.contract_deployed_cnt;
 
 --
 with contract_interacted_detail_table as (
-select date(d2.block_timestamp) as block_date, from_address, to_address, count(1) as contract_interacted_cnt
+select d2.from_address, d2.to_address, count(1) as contract_interacted_cnt
 from contracts d1
          inner join transactions d2
                     on d1.address = d2.to_address
 WHERE d2.block_timestamp >= '{start_date}' and d2.block_timestamp < '{end_date}'
-group by 1, 2, 3
+  and d2.block_number > {after_block} and d2.block_number <= {end_block}
+group by 1, 2
 )
 
 insert into daily_contract_interacted_aggregates(block_date, from_address, to_address, contract_interacted_cnt)
 select
-    block_date, from_address, to_address, contract_interacted_cnt
+    date('{start_date}'), from_address, to_address, contract_interacted_cnt
 from  contract_interacted_detail_table
 ON CONFLICT (block_date, from_address, to_address)
-    DO UPDATE SET contract_interacted_cnt = EXCLUDED.contract_interacted_cnt;
-    ;
+    DO UPDATE SET contract_interacted_cnt = daily_contract_interacted_aggregates.contract_interacted_cnt
+                                                + EXCLUDED.contract_interacted_cnt;
 
 
 INSERT
@@ -258,4 +163,3 @@ WHERE block_date >= '{start_date}' and block_date < '{end_date}'
 group by 1,2
 ON CONFLICT (address, block_date)
     DO UPDATE SET to_address_unique_interacted_cnt = EXCLUDED.to_address_unique_interacted_cnt;
-commit
\ No newline at end of file
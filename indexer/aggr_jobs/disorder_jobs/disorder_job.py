@@ -1,33 +1,132 @@
-from sqlalchemy import text
+import logging
+from datetime import datetime
 
+from sqlalchemy import and_, func, text
+from sqlalchemy.dialects.postgresql import insert
+
+from common.models.blocks import Blocks
 from indexer.aggr_jobs.aggr_base_job import AggrBaseJob
+from indexer.aggr_jobs.disorder_jobs.models.daily_wallet_addresses_aggregates_records import (
+    DailyWalletAddressesAggregatesRecords,
+)
 from indexer.executors.batch_work_executor import BatchWorkExecutor
 
+logger = logging.getLogger(__name__)
+
+# Upper block bound of a day whose blocks are not in the blocks table, every row of the day is counted then.
+UNBOUNDED_BLOCK = 2**63 - 1
+
 
 class AggrDisorderJob(AggrBaseJob):
+    """
+    Aggregates daily_wallet_addresses_aggregates day by day, days running in parallel.
+
+    A day is first aggregated in full and the last block counted is recorded. Aggregating it again only counts
+    the blocks indexed since, added to the day's counters, unless a reorg replaced the recorded block or
+    full_aggregation is set, which aggregate the whole day again.
+    """
+
     sql_folder = "disorder_jobs"
 
     def __init__(self, **kwargs):
         config = kwargs["config"]
         self.db_service = config["db_service"]
+        self.full_aggregation = config.get("full_aggregation", False)
         self._batch_work_executor = BatchWorkExecutor(5, 5)
 
     def run(self, **kwargs):
         start_date = kwargs["start_date"]
         end_date = kwargs["end_date"]
 
-        execute_sql_list = []
         date_pairs = self.generate_date_pairs(start_date, end_date)
-        for date_pair in date_pairs:
-            start_date, end_date = date_pair
-            sql_content = self.get_sql_content("daily_wallet_addresses_aggregates", start_date, end_date)
-            execute_sql_list.append(sql_content)
-
-        self._batch_work_executor.execute(execute_sql_list, self.execute_sql, total_items=len(execute_sql_list))
+        self._batch_work_executor.execute(date_pairs, self.aggregate_days, total_items=len(date_pairs))
         self._batch_work_executor.wait()
 
-    def execute_sql(self, sql_contents):
+    def aggregate_days(self, date_pairs):
+        for start_date, end_date in date_pairs:
+            self.aggregate_day(start_date, end_date)
+
+    def aggregate_day(self, start_date, end_date):
+        block_date = datetime.strptime(start_date, "%Y-%m-%d").date()
         session = self.db_service.Session()
-        for sql_content in sql_contents:
+        try:
+            first_block, last_block = (
+                session.query(func.min(Blocks.number), func.max(Blocks.number))
+                .filter(
+                    and_(
+                        Blocks.timestamp >= start_date,
+                        Blocks.timestamp < end_date,
+                        Blocks.reorg == False,
+                    )
+                )
+                .one()
+            )
+            record = (
+                session.query(DailyWalletAddressesAggregatesRecords)
+                .filter(DailyWalletAddressesAggregatesRecords.block_date == block_date)
+                .first()
+            )
+
+            after_block = None
+            if not self.full_aggregation and record is not None and last_block is not None:
+                recorded_hash = (
+                    session.query(Blocks.hash)
+                    .filter(and_(Blocks.number == record.last_block_number, Blocks.reorg == False))
+                    .scalar()
+                )
+                if recorded_hash is not None and recorded_hash == record.last_block_hash:
+                    after_block = record.last_block_number
+
+            if after_block is not None and after_block >= last_block:
+                logger.info(f"Daily wallet aggregates of {start_date} are up to date with block {last_block}.")
+                return
+
+            if after_block is None:
+                session.execute(
+                    text("DELETE FROM daily_wallet_addresses_aggregates WHERE block_date = :block_date"),
+                    {"block_date": block_date},
+                )
+                session.execute(
+                    text("DELETE FROM daily_contract_interacted_aggregates WHERE block_date = :block_date"),
+                    {"block_date": block_date},
+                )
+            logger.info(
+                f"Aggregating daily wallet aggregates of {start_date} "
+                f"{'in full' if after_block is None else f'from block {after_block + 1}'}."
+            )
+
+            sql_content = self.get_sql_content(
+                "daily_wallet_addresses_aggregates",
+                start_date,
+                end_date,
+                after_block=-1 if after_block is None else after_block,
+                end_block=UNBOUNDED_BLOCK if last_block is None else last_block,
+            )
             session.execute(text(sql_content))
+
+            if last_block is not None:
+                last_block_hash = (
+                    session.query(Blocks.hash).filter(and_(Blocks.number == last_block, Blocks.reorg == False)).scalar()
+                )
+                statement = insert(DailyWalletAddressesAggregatesRecords).values(
+                    block_date=block_date,
+                    last_block_number=last_block,
+                    last_block_hash=last_block_hash,
+                    update_time=func.now(),
+                )
+                session.execute(
+                    statement.on_conflict_do_update(
+                        index_elements=[DailyWalletAddressesAggregatesRecords.block_date],
+                        set_={
+                            "last_block_number": statement.excluded.last_block_number,
+                            "last_block_hash": statement.excluded.last_block_hash,
+                            "update_time": statement.excluded.update_time,
+                        },
+                    )
+                )
             session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, func
+from sqlalchemy.dialects.postgresql import BIGINT, BYTEA, DATE, TIMESTAMP
+
+from common.models import HemeraModel
+
+
+class DailyWalletAddressesAggregatesRecords(HemeraModel):
+    __tablename__ = "daily_wallet_addresses_aggregates_records"
+
+    # The last block of the day already counted in daily_wallet_addresses_aggregates, and its hash to tell
+    # whether a reorg replaced it since.
+    block_date = Column(DATE, primary_key=True)
+    last_block_number = Column(BIGINT)
+    last_block_hash = Column(BYTEA)
+
+    update_time = Column(TIMESTAMP, server_default=func.now())
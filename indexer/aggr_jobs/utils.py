@@ -4,6 +4,7 @@ import click
 from web3 import Web3
 
 from common.models.sync_record import SyncRecord
+from indexer.utils.provider import get_provider_from_uri
 
 
 def get_yesterday_date():
@@ -33,7 +34,7 @@ def check_data_completeness(db_service, provider_uri, end_date):
     record = read_sync_record(db_service)
     if not record:
         raise click.ClickException("There is something wrong with the sync record")
-    web_ = Web3(Web3.HTTPProvider(provider_uri))
+    web_ = Web3(get_provider_from_uri(provider_uri))
     task_end_ts = convert_date_to_timestramp(end_date)
     block = web_.eth.get_block(record)
     block_timestamp = block.timestamp
@@ -0,0 +1,206 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional
+
+from indexer.benchmark.rpc_fixture import RpcFixture
+from indexer.utils.http_pool import endpoint_session_pool
+
+logger = logging.getLogger(__name__)
+
+# Answered for a request the fixture does not hold. -32600 makes the indexer stop instead of retrying,
+# a replay missing responses measures nothing.
+NOT_RECORDED_CODE = -32600
+
+# Errors of a node that is overloaded or failing rather than of the request, not worth recording.
+TRANSIENT_ERROR_CODES = {-32005, -32603, 429}
+
+DEBUG_METHOD_PREFIXES = ("debug_", "trace_")
+
+
+class ReplayStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.http_requests = 0
+            self.calls = Counter()
+            self.misses = Counter()
+            self.recorded = 0
+            self.bytes_received = 0
+            self.bytes_sent = 0
+
+    def on_request(self, methods: List[str], bytes_received: int, bytes_sent: int, misses: List[str], recorded: int):
+        with self._lock:
+            self.http_requests += 1
+            self.calls.update(methods)
+            self.misses.update(misses)
+            self.recorded += recorded
+            self.bytes_received += bytes_received
+            self.bytes_sent += bytes_sent
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "http_requests": self.http_requests,
+                "rpc_calls": sum(self.calls.values()),
+                "rpc_calls_by_method": dict(self.calls),
+                "misses": sum(self.misses.values()),
+                "misses_by_method": dict(self.misses),
+                "recorded": self.recorded,
+                "bytes_received": self.bytes_received,
+                "bytes_sent": self.bytes_sent,
+            }
+
+
+class RpcReplayServer:
+    """
+    A JSON-RPC node answering from an RpcFixture, for indexing a recorded block range without network access.
+
+    Every HTTP request is answered after latency seconds, give or take up to jitter seconds, plus call_latency
+    seconds per call it carries, drawn from a generator seeded with seed so that runs wait alike.
+
+    Given an upstream_uri, requests the fixture does not hold are sent there and their responses recorded,
+    debug_ and trace_ methods going to debug_upstream_uri when set.
+    """
+
+    def __init__(
+        self,
+        fixture: RpcFixture,
+        port: int = 0,
+        host: str = "127.0.0.1",
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        call_latency: float = 0.0,
+        seed: int = 0,
+        upstream_uri: Optional[str] = None,
+        debug_upstream_uri: Optional[str] = None,
+    ):
+        self.fixture = fixture
+        self.latency = latency
+        self.jitter = jitter
+        self.call_latency = call_latency
+        self.upstream_uri = upstream_uri
+        self.debug_upstream_uri = debug_upstream_uri or upstream_uri
+        self.stats = ReplayStats()
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+
+        replay_server = self
+
+        class ReplayHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                try:
+                    response = replay_server.handle(body)
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                logger.debug("Replay request: " + format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), ReplayHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="rpc-replay-server", daemon=True)
+
+    @property
+    def uri(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "RpcReplayServer":
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "RpcReplayServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def handle(self, body: bytes) -> bytes:
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Request body is not JSON: {e}")
+        requests = payload if isinstance(payload, list) else [payload]
+        if not all(isinstance(request, dict) and "method" in request for request in requests):
+            raise ValueError("Request body is not a JSON-RPC request.")
+
+        responses = [self.fixture.get(request["method"], request.get("params", [])) for request in requests]
+        recorded = 0
+        if self.upstream_uri is not None:
+            recorded = self._record([request for request, response in zip(requests, responses) if response is None])
+            responses = [
+                response or self.fixture.get(request["method"], request.get("params", []))
+                for request, response in zip(requests, responses)
+            ]
+
+        misses = []
+        replies = []
+        for request, response in zip(requests, responses):
+            if response is None:
+                misses.append(request["method"])
+                response = {
+                    "error": {
+                        "code": NOT_RECORDED_CODE,
+                        "message": f"{request['method']} request is not recorded in the fixture.",
+                    }
+                }
+            replies.append({"jsonrpc": "2.0", "id": request.get("id"), **response})
+
+        self._wait(len(requests))
+        content = json.dumps(replies if isinstance(payload, list) else replies[0]).encode("utf-8")
+        self.stats.on_request([request["method"] for request in requests], len(body), len(content), misses, recorded)
+        return content
+
+    def _wait(self, calls: int):
+        with self._random_lock:
+            delay = self.latency + self._random.uniform(-self.jitter, self.jitter) + self.call_latency * calls
+        if delay > 0:
+            time.sleep(delay)
+
+    def _record(self, requests: List[dict]) -> int:
+        recorded = 0
+        debug_requests = [request for request in requests if request["method"].startswith(DEBUG_METHOD_PREFIXES)]
+        other_requests = [request for request in requests if not request["method"].startswith(DEBUG_METHOD_PREFIXES)]
+        for upstream_uri, upstream_requests in (
+            (self.upstream_uri, other_requests),
+            (self.debug_upstream_uri, debug_requests),
+        ):
+            if not upstream_requests:
+                continue
+            batch = [{**request, "id": index} for index, request in enumerate(upstream_requests)]
+            upstream_responses = json.loads(endpoint_session_pool.post(upstream_uri, json.dumps(batch), timeout=60))
+            if isinstance(upstream_responses, dict):
+                upstream_responses = [upstream_responses]
+            for response in upstream_responses:
+                index = response.get("id")
+                if not isinstance(index, int) or not 0 <= index < len(upstream_requests):
+                    continue
+                error = response.get("error")
+                if error is not None and error.get("code") in TRANSIENT_ERROR_CODES:
+                    logger.warning(f"Not recording the failed {upstream_requests[index]['method']} request: {error}")
+                    continue
+                request = upstream_requests[index]
+                self.fixture.put(request["method"], request.get("params", []), response)
+                recorded += 1
+        return recorded
@@ -0,0 +1,134 @@
+import gzip
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from eth_abi import decode, encode
+from eth_abi.exceptions import DecodingError
+
+from common.utils.format_utils import bytes_to_hex_str, hex_str_to_bytes
+from indexer.utils.multicall_hemera.abi import AGGREGATE_FUNC, TRY_BLOCK_AND_AGGREGATE_FUNC
+
+
+def request_key(method: str, params) -> str:
+    return json.dumps([method, params], sort_keys=True, separators=(",", ":"))
+
+
+def _aggregate_call(method: str, params) -> Optional[Tuple[str, str, bool, List[Tuple[str, str]]]]:
+    """(multicall address, block, require_success, [(target, call data)]) of a multicall eth_call, None otherwise."""
+    if method != "eth_call" or not isinstance(params, list) or len(params) < 2 or not isinstance(params[0], dict):
+        return None
+    data = params[0].get("data") or params[0].get("input") or ""
+    if data.startswith(TRY_BLOCK_AND_AGGREGATE_FUNC.get_signature()):
+        require_success, calls = decode(TRY_BLOCK_AND_AGGREGATE_FUNC.get_inputs_type(), hex_str_to_bytes(data)[4:])
+    elif data.startswith(AGGREGATE_FUNC.get_signature()):
+        require_success, (calls,) = True, decode(AGGREGATE_FUNC.get_inputs_type(), hex_str_to_bytes(data)[4:])
+    else:
+        return None
+    calls = [(target.lower(), bytes_to_hex_str(call_data)) for target, call_data in calls]
+    return str(params[0].get("to", "")).lower(), str(params[1]), require_success, calls
+
+
+class RpcFixture:
+    """
+    JSON-RPC responses recorded for a block range, keyed by method and params so that a replay answers
+    the same whatever the request id or the batch a request comes in.
+
+    Multicall payloads depend on how calls were coalesced and on the batch sizes learned while running,
+    so the result of every call they carry is also kept on its own, and a payload grouping recorded calls
+    differently is answered from those.
+
+    Saved as gzip compressed JSON lines, the first line holding the metadata of the recording.
+    """
+
+    def __init__(self, meta: Optional[dict] = None):
+        self.meta = meta or {}
+        self._responses: Dict[str, dict] = {}
+        # (multicall address, block, target, call data) -> (success, return data)
+        self._calls: Dict[Tuple[str, str, str, str], Tuple[bool, str]] = {}
+        # (multicall address, block) -> (block number, block hash)
+        self._blocks: Dict[Tuple[str, str], Tuple[int, bytes]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._responses)
+
+    @classmethod
+    def load(cls, path: str) -> "RpcFixture":
+        with gzip.open(path, "rt", encoding="utf-8") as fixture_file:
+            fixture = cls(json.loads(fixture_file.readline())["meta"])
+            for line in fixture_file:
+                entry = json.loads(line)
+                fixture.put(entry["method"], entry["params"], entry["response"])
+        return fixture
+
+    def save(self, path: str):
+        with self._lock:
+            responses = list(self._responses.items())
+        with gzip.open(path, "wt", encoding="utf-8") as fixture_file:
+            fixture_file.write(json.dumps({"meta": self.meta}) + "\n")
+            for key, response in sorted(responses):
+                method, params = json.loads(key)
+                fixture_file.write(json.dumps({"method": method, "params": params, "response": response}) + "\n")
+
+    def put(self, method: str, params, response: dict):
+        """Records the result or the error of a request, response being a JSON-RPC response without its id."""
+        response = {field: response[field] for field in ("result", "error") if field in response}
+        with self._lock:
+            self._responses[request_key(method, params)] = response
+        if "result" in response:
+            self._index_calls(method, params, response["result"])
+
+    def get(self, method: str, params) -> Optional[dict]:
+        response = self._responses.get(request_key(method, params))
+        if response is None:
+            response = self._assemble_aggregate(method, params)
+        return response
+
+    def _index_calls(self, method: str, params, result):
+        aggregate = _aggregate_call(method, params)
+        if aggregate is None or not isinstance(result, str):
+            return
+        multicall_address, block, require_success, calls = aggregate
+        try:
+            if require_success:
+                block_number, return_data = decode(AGGREGATE_FUNC.get_outputs_type(), hex_str_to_bytes(result))
+                block_hash, results = None, [(True, data) for data in return_data]
+            else:
+                block_number, block_hash, results = decode(
+                    TRY_BLOCK_AND_AGGREGATE_FUNC.get_outputs_type(), hex_str_to_bytes(result)
+                )
+        except DecodingError:
+            # No multicall contract at that block, the response is only replayed as it was recorded.
+            return
+        with self._lock:
+            if block_hash is not None or (multicall_address, block) not in self._blocks:
+                self._blocks[(multicall_address, block)] = (block_number, block_hash)
+            for (target, call_data), (success, data) in zip(calls, results):
+                self._calls[(multicall_address, block, target, call_data)] = (success, bytes_to_hex_str(data))
+
+    def _assemble_aggregate(self, method: str, params) -> Optional[dict]:
+        aggregate = _aggregate_call(method, params)
+        if aggregate is None:
+            return None
+        multicall_address, block, require_success, calls = aggregate
+        block_info = self._blocks.get((multicall_address, block))
+        results = [self._calls.get((multicall_address, block, target, call_data)) for target, call_data in calls]
+        if block_info is None or any(result is None for result in results):
+            return None
+
+        block_number, block_hash = block_info
+        if require_success:
+            if not all(success for success, _ in results):
+                return None
+            output = encode(
+                AGGREGATE_FUNC.get_outputs_type(), [block_number, [hex_str_to_bytes(data) for _, data in results]]
+            )
+        else:
+            if block_hash is None:
+                return None
+            output = encode(
+                TRY_BLOCK_AND_AGGREGATE_FUNC.get_outputs_type(),
+                [block_number, block_hash, [(success, hex_str_to_bytes(data)) for success, data in results]],
+            )
+        return {"result": bytes_to_hex_str(output)}
@@ -0,0 +1,277 @@
+import logging
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from enumeration.entity_type import calculate_entity_value, generate_output_types
+from indexer.benchmark.replay_server import RpcReplayServer
+from indexer.benchmark.rpc_fixture import RpcFixture
+
+logger = logging.getLogger(__name__)
+
+# The entity types each standard pipeline indexes.
+PIPELINES = {
+    "blocks": "EXPLORER_BASE",
+    "tokens": "EXPLORER_TOKEN",
+    "traces": "EXPLORER_TRACE",
+    "address_index": "ADDRESS_INDEX",
+    "uniswap_v3": "UNISWAP_V3",
+}
+
+# Report fields where a lower value is a regression, the others regress when they grow.
+HIGHER_IS_BETTER = {"blocks_per_second", "exported_items_per_second"}
+
+
+@dataclass
+class BenchmarkOptions:
+    start_block: int
+    end_block: int
+    chain_id: int
+    output: str = "void"
+    config: dict = field(default_factory=dict)
+    block_batch_size: int = 10
+    batch_size: int = 10
+    debug_batch_size: int = 1
+    max_workers: int = 5
+    multicall: bool = True
+    pipeline_batch_size: Optional[int] = None
+    pipeline_max_in_flight: int = 3
+    export_mode: str = "sync"
+
+
+def pipeline_output_types(pipeline: str) -> list:
+    if pipeline not in PIPELINES:
+        raise ValueError(f"Unknown pipeline {pipeline}, should be one of {', '.join(PIPELINES)}.")
+    return list(set(generate_output_types(calculate_entity_value(PIPELINES[pipeline]))))
+
+
+def peak_rss_bytes() -> Optional[int]:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def run_pipeline(pipeline: str, provider_uri: str, options: BenchmarkOptions) -> dict:
+    """Indexes the range of options with the jobs of pipeline through provider_uri, returns what it measured."""
+    from indexer.controller.scheduler.job_scheduler import JobScheduler
+    from indexer.exporters.async_export_queue import export_seconds, exported_items
+    from indexer.exporters.item_exporter import create_item_exporters
+    from indexer.utils.provider import get_provider_from_uri
+    from indexer.utils.thread_local_proxy import ThreadLocalProxy
+
+    config = {**options.config, "chain_id": options.chain_id}
+    setup_start = time.perf_counter()
+    job_scheduler = JobScheduler(
+        batch_web3_provider=ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True)),
+        batch_web3_debug_provider=ThreadLocalProxy(lambda: get_provider_from_uri(provider_uri, batch=True)),
+        item_exporters=create_item_exporters(options.output, config),
+        batch_size=options.batch_size,
+        debug_batch_size=options.debug_batch_size,
+        max_workers=options.max_workers,
+        config=config,
+        required_output_types=pipeline_output_types(pipeline),
+        multicall=options.multicall,
+        pipeline_batch_size=options.pipeline_batch_size,
+        pipeline_max_in_flight=options.pipeline_max_in_flight,
+        export_mode=options.export_mode,
+    )
+    setup_seconds = time.perf_counter() - setup_start
+
+    items_before = exported_items.total()
+    export_seconds_before, _ = export_seconds.total()
+    start = time.perf_counter()
+    try:
+        for batch_start in range(options.start_block, options.end_block + 1, options.block_batch_size):
+            job_scheduler.run_jobs(batch_start, min(batch_start + options.block_batch_size - 1, options.end_block))
+            job_scheduler.clear_data_buff()
+    finally:
+        job_scheduler.close()
+    seconds = time.perf_counter() - start
+
+    blocks = options.end_block - options.start_block + 1
+    items = exported_items.total() - items_before
+    export_time = export_seconds.total()[0] - export_seconds_before
+    return {
+        "pipeline": pipeline,
+        "blocks": blocks,
+        "setup_seconds": round(setup_seconds, 3),
+        "seconds": round(seconds, 3),
+        "blocks_per_second": round(blocks / seconds, 2) if seconds else None,
+        "exported_items": int(items),
+        "export_seconds": round(export_time, 3),
+        "exported_items_per_second": round(items / export_time, 1) if export_time else None,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def run_pipeline_isolated(pipeline: str, provider_uri: str, options: BenchmarkOptions) -> dict:
+    """
+    run_pipeline in a new process, so that its peak RSS is its own and no cache of a previous pipeline
+    spares it requests.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_pipeline, pipeline, provider_uri, options).result()
+
+
+def run_benchmarks(
+    server: RpcReplayServer, pipelines: List[str], options: BenchmarkOptions, isolated: bool = True
+) -> List[dict]:
+    """Runs every pipeline against server one after the other, adding the requests server answered to each report."""
+    reports = []
+    for pipeline in pipelines:
+        server.stats.reset()
+        logger.info(f"Benchmarking pipeline {pipeline} over blocks [{options.start_block}, {options.end_block}].")
+        run = run_pipeline_isolated if isolated else run_pipeline
+        try:
+            report = run(pipeline, server.uri, options)
+        except Exception as e:
+            misses = server.stats.snapshot()["misses_by_method"]
+            if misses:
+                raise RuntimeError(f"Pipeline {pipeline} sent requests the fixture does not hold: {misses}") from e
+            raise
+        stats = server.stats.snapshot()
+        report.update(
+            {
+                "http_requests": stats["http_requests"],
+                "rpc_calls": stats["rpc_calls"],
+                "rpc_calls_by_method": stats["rpc_calls_by_method"],
+                "misses": stats["misses"],
+                "recorded": stats["recorded"],
+            }
+        )
+        if stats["misses"]:
+            logger.warning(f"Pipeline {pipeline} sent {stats['misses']} requests the fixture does not hold.")
+        reports.append(report)
+    return reports
+
+
+def replay(
+    fixture_path: str,
+    pipelines: Optional[List[str]] = None,
+    latency: float = 0.0,
+    jitter: float = 0.0,
+    call_latency: float = 0.0,
+    seed: int = 0,
+    isolated: bool = True,
+    **options,
+) -> List[dict]:
+    """Benchmarks pipelines over the range recorded in fixture_path, all the recorded pipelines by default."""
+    fixture = RpcFixture.load(fixture_path)
+    meta = fixture.meta
+    benchmark_options = BenchmarkOptions(
+        start_block=meta["start_block"],
+        end_block=meta["end_block"],
+        chain_id=meta["chain_id"],
+        config=meta.get("config", {}),
+        **options,
+    )
+    unrecorded = set(pipelines or []) - set(meta["pipelines"])
+    if unrecorded:
+        raise ValueError(f"Pipelines {sorted(unrecorded)} are not recorded in {fixture_path}.")
+    with RpcReplayServer(fixture, latency=latency, jitter=jitter, call_latency=call_latency, seed=seed) as server:
+        return run_benchmarks(server, pipelines or meta["pipelines"], benchmark_options, isolated=isolated)
+
+
+def record(
+    fixture_path: str,
+    provider_uri: str,
+    start_block: int,
+    end_block: int,
+    pipelines: List[str],
+    debug_provider_uri: Optional[str] = None,
+    config: Optional[dict] = None,
+    isolated: bool = True,
+    **options,
+) -> List[dict]:
+    """
+    Indexes [start_block, end_block] with pipelines through a server recording what provider_uri answers,
+    adding the responses to the fixture at fixture_path. Recording the same range again only fetches
+    what the fixture still misses.
+    """
+    from web3 import Web3
+
+    from indexer.utils.provider import get_provider_from_uri
+
+    fixture = RpcFixture.load(fixture_path) if os.path.exists(fixture_path) else RpcFixture()
+    meta = fixture.meta
+    if meta and (meta["start_block"], meta["end_block"]) != (start_block, end_block):
+        raise ValueError(
+            f"{fixture_path} holds blocks [{meta['start_block']}, {meta['end_block']}], "
+            f"not [{start_block}, {end_block}]."
+        )
+
+    with RpcReplayServer(fixture, upstream_uri=provider_uri, debug_upstream_uri=debug_provider_uri) as server:
+        chain_id = Web3(get_provider_from_uri(server.uri)).eth.chain_id
+        benchmark_options = BenchmarkOptions(
+            start_block=start_block,
+            end_block=end_block,
+            chain_id=chain_id,
+            config=config if config is not None else meta.get("config", {}),
+            **options,
+        )
+        reports = run_benchmarks(server, pipelines, benchmark_options, isolated=isolated)
+
+    fixture.meta = {
+        "chain_id": chain_id,
+        "start_block": start_block,
+        "end_block": end_block,
+        "pipelines": sorted(set(meta.get("pipelines", [])) | set(pipelines)),
+        "config": benchmark_options.config,
+        "recorded_at": int(time.time()),
+    }
+    fixture.save(fixture_path)
+    return reports
+
+
+def format_reports(reports: List[dict]) -> str:
+    columns = [
+        ("pipeline", "pipeline"),
+        ("blocks", "blocks"),
+        ("blocks_per_second", "blocks/s"),
+        ("http_requests", "http requests"),
+        ("rpc_calls", "rpc calls"),
+        ("peak_rss_bytes", "peak rss MB"),
+        ("exported_items", "items"),
+        ("exported_items_per_second", "items/s exported"),
+        ("misses", "misses"),
+    ]
+    rows = [[title for _, title in columns]]
+    for report in reports:
+        row = []
+        for name, _ in columns:
+            value = report.get(name)
+            if name == "peak_rss_bytes" and value is not None:
+                value = round(value / 1024 / 1024, 1)
+            row.append("-" if value is None else str(value))
+        rows.append(row)
+    widths = [max(len(row[index]) for row in rows) for index in range(len(columns))]
+    return "\n".join("  ".join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+
+
+def compare_reports(baseline: List[dict], reports: List[dict], tolerance: float = 0.1) -> List[str]:
+    """
+    The regressions of reports against the baseline reports of the same pipelines: throughput falling, or
+    RPC calls and peak RSS growing, by more than tolerance.
+    """
+    baseline_by_pipeline: Dict[str, dict] = {report["pipeline"]: report for report in baseline}
+    regressions = []
+    for report in reports:
+        previous = baseline_by_pipeline.get(report["pipeline"])
+        if previous is None:
+            continue
+        for name in ("blocks_per_second", "exported_items_per_second", "rpc_calls", "peak_rss_bytes"):
+            before, after = previous.get(name), report.get(name)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if (change < -tolerance) if name in HIGHER_IS_BETTER else (change > tolerance):
+                regressions.append(f"{report['pipeline']} {name}: {before} -> {after} ({change:+.1%})")
+    return regressions
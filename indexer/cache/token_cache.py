@@ -0,0 +1,202 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Iterable, List, Optional
+
+from pottery import RedisDict
+from redis.client import Redis
+
+from common.models.tokens import Tokens
+from common.utils.format_utils import bytes_to_hex_str, hex_str_to_bytes
+from enumeration.token_type import TokenType
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 100_000
+DEFAULT_NOT_TOKEN_TTL = 24 * 3600
+DB_QUERY_CHUNK_SIZE = 1000
+
+
+def token_from_row(token: Tokens) -> dict:
+    return {
+        "address": bytes_to_hex_str(token.address),
+        "token_type": token.token_type,
+        "name": token.name,
+        "symbol": token.symbol,
+        "decimals": int(token.decimals) if token.decimals is not None else None,
+        "block_number": token.block_number,
+        "total_supply": int(token.total_supply) if token.total_supply is not None else None,
+    }
+
+
+def get_tokens_from_db(service, addresses: Optional[Iterable[str]] = None) -> dict:
+    """The tokens table as {address: token}, only the rows of addresses when given."""
+    tokens = {}
+    with service.session_scope() as s:
+        if addresses is None:
+            for token in s.query(Tokens).all():
+                tokens[bytes_to_hex_str(token.address)] = token_from_row(token)
+            return tokens
+
+        addresses = list(addresses)
+        for i in range(0, len(addresses), DB_QUERY_CHUNK_SIZE):
+            chunk = [hex_str_to_bytes(address) for address in addresses[i : i + DB_QUERY_CHUNK_SIZE]]
+            for token in s.query(Tokens).filter(Tokens.address.in_(chunk)).all():
+                tokens[bytes_to_hex_str(token.address)] = token_from_row(token)
+    return tokens
+
+
+class MemoryTokenStore:
+    """The most recently used max_size tokens of the process."""
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE):
+        if max_size < 1:
+            raise ValueError(f"max_size should be a positive integer, got {max_size}.")
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._tokens: OrderedDict = OrderedDict()
+
+    def get(self, address: str) -> Optional[dict]:
+        with self._lock:
+            token = self._tokens.get(address)
+            if token is not None:
+                self._tokens.move_to_end(address)
+            return token
+
+    def put(self, address: str, token: dict):
+        with self._lock:
+            self._tokens[address] = token
+            self._tokens.move_to_end(address)
+            if len(self._tokens) > self.max_size:
+                self._tokens.popitem(last=False)
+
+    def delete(self, address: str):
+        with self._lock:
+            self._tokens.pop(address, None)
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+class RedisTokenStore:
+    """Tokens in the "token" redis hash, shared by every process and kept across runs."""
+
+    def __init__(self, redis: Redis, key: str = "token"):
+        self._tokens = RedisDict(redis=redis, key=key)
+
+    def get(self, address: str) -> Optional[dict]:
+        return self._tokens.get(address)
+
+    def put(self, address: str, token: dict):
+        self._tokens[address] = token
+
+    def delete(self, address: str):
+        self._tokens.pop(address, None)
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+class TokenCache:
+    """
+    Token metadata by address, loaded on demand.
+
+    Jobs call load with the addresses of a batch, only those not cached yet are read from the tokens table.
+    Contracts answering none of name, symbol, decimals and totalSupply are cached as not tokens for
+    not_token_ttl seconds, then dropped so the next transfer fetches them again. The total supply of
+    a token is refreshed at most once per total_supply_ttl seconds, 0 refreshes it with every batch.
+
+    Supports the dict operations jobs used on the plain token dict: in, [] and []=.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        db_service=None,
+        not_token_ttl: float = DEFAULT_NOT_TOKEN_TTL,
+        total_supply_ttl: float = 0,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.store = store if store is not None else MemoryTokenStore()
+        self.db_service = db_service
+        self.not_token_ttl = not_token_ttl
+        self.total_supply_ttl = total_supply_ttl
+        self._clock = clock
+
+    @staticmethod
+    def is_not_token(token: dict) -> bool:
+        return token.get("token_type") != TokenType.ERC1155.value and all(
+            token.get(key) is None for key in ("name", "symbol", "decimals", "total_supply")
+        )
+
+    def get(self, address: str) -> Optional[dict]:
+        token = self.store.get(address)
+        if token is None:
+            return None
+        if self.is_not_token(token) and self._clock() - token.get("cached_at", 0) >= self.not_token_ttl:
+            self.store.delete(address)
+            return None
+        return token
+
+    def put(self, token: dict):
+        token = dict(token, cached_at=self._clock())
+        token.setdefault("total_supply_refreshed_at", token["cached_at"])
+        self.store.put(token["address"], token)
+
+    def load(self, addresses: Iterable[str]) -> List[str]:
+        """Read the tokens of addresses that are not cached from the database, returns the ones still unknown."""
+        missing = [address for address in set(addresses) if self.get(address) is None]
+        if missing and self.db_service is not None:
+            for address, token in get_tokens_from_db(self.db_service, missing).items():
+                self.put(token)
+            missing = [address for address in missing if self.store.get(address) is None]
+        return missing
+
+    def total_supply_due(self, address: str) -> bool:
+        token = self.get(address)
+        if token is None or self.is_not_token(token):
+            return False
+        return self._clock() - token.get("total_supply_refreshed_at", 0) >= self.total_supply_ttl
+
+    def total_supply_refreshed(self, address: str, total_supply: Optional[int]):
+        token = self.get(address)
+        if token is not None:
+            token = dict(token, total_supply_refreshed_at=self._clock())
+            if total_supply is not None:
+                token["total_supply"] = total_supply
+            self.store.put(address, token)
+
+    def __contains__(self, address: str) -> bool:
+        return self.get(address) is not None
+
+    def __getitem__(self, address: str) -> dict:
+        token = self.get(address)
+        if token is None:
+            raise KeyError(address)
+        return token
+
+    def __setitem__(self, address: str, token: dict):
+        self.put(dict(token, address=address))
+
+    def __len__(self):
+        return len(self.store)
+
+
+def build_token_cache(cache: Optional[str], db_service=None, config: Optional[dict] = None) -> TokenCache:
+    """The token cache of the cache option, memory or a redis:// uri, with the token_cache section of the config."""
+    config = config or {}
+    store = None
+    if cache is not None and cache[:5] == "redis":
+        try:
+            store = RedisTokenStore(Redis.from_url(cache))
+        except Exception as e:
+            logger.warning(f"Error connecting to redis cache: {e}, using memory cache instead")
+    if store is None:
+        store = MemoryTokenStore(config.get("max_size", DEFAULT_MAX_SIZE))
+    return TokenCache(
+        store,
+        db_service=db_service,
+        not_token_ttl=config.get("not_token_ttl", DEFAULT_NOT_TOKEN_TTL),
+        total_supply_ttl=config.get("total_supply_ttl", 0),
+    )
@@ -2,16 +2,18 @@ import logging
 import time
 from datetime import datetime, timezone
 
+import orjson
 from sqlalchemy import and_, update
 from sqlalchemy.dialects.postgresql import insert
 
 from common.models.blocks import Blocks
 from common.models.fix_record import FixRecord
 from common.utils.exception_control import HemeraBaseException
-from common.utils.format_utils import hex_str_to_bytes
-from common.utils.web3_utils import build_web3
+from common.utils.format_utils import bytes_to_hex_str
 from indexer.controller.base_controller import BaseController
 from indexer.utils.exception_recorder import ExceptionRecorder
+from indexer.utils.json_rpc_requests import generate_get_block_by_number_json_rpc
+from indexer.utils.rpc_utils import rpc_response_to_result, zip_rpc_response
 
 exception_recorder = ExceptionRecorder()
 
@@ -20,7 +22,6 @@ class ReorgController(BaseController):
 
     def __init__(self, batch_web3_provider, job_scheduler, ranges, config, max_retries=5):
         self.ranges = ranges
-        self.web3 = build_web3(batch_web3_provider)
         self.db_service = config.get("db_service")
         self.job_scheduler = job_scheduler
         self.max_retries = max_retries
@@ -47,40 +48,28 @@ class ReorgController(BaseController):
 
         self.update_job_info(job_id, {"job_status": "running"})
 
-        offset, limit = 0, remains
+        lowest_block = block_number - remains + 1
+        last_fixed_block_number, remain_process = block_number + 1, remains
         try:
-            while offset < limit:
-                fix_need = self.check_block_been_synced(block_number - offset) and self.check_block_need_fix(
-                    block_number - offset
-                )
-
-                if fix_need:
-                    logging.info(f"Reorging block No.{block_number - offset}")
-                    self._do_fixing(block_number - offset, retry_errors)
-                else:
-                    logging.info(
-                        f"Block No.{block_number - offset} is verified to be correct or has not been synced. "
-                        f"Skip to the next one."
-                    )
-
-                if fix_need and offset == limit - 1:
-                    offset += 1
+            for fix_start, fix_end in self.fixing_ranges(self.blocks_need_fix(lowest_block, block_number)):
+                logging.info(f"Reorging blocks No.{fix_start} to No.{fix_end}")
+                self._do_fixing(fix_start, fix_end, retry_errors)
 
+                last_fixed_block_number, remain_process = fix_start, fix_start - lowest_block
                 self.update_job_info(
                     job_id,
                     job_info={
-                        "last_fixed_block_number": block_number - offset,
-                        "remain_process": limit - offset - 1,
+                        "last_fixed_block_number": last_fixed_block_number,
+                        "remain_process": remain_process,
                         "update_time": datetime.now(timezone.utc),
                     },
                 )
-                offset += 1
         except (Exception, KeyboardInterrupt, HemeraBaseException) as e:
             self.update_job_info(
                 job_id,
                 job_info={
-                    "last_fixed_block_number": block_number - offset + 1,
-                    "remain_process": limit - offset,
+                    "last_fixed_block_number": last_fixed_block_number,
+                    "remain_process": remain_process,
                     "update_time": datetime.now(timezone.utc),
                     "job_status": "interrupt",
                 },
@@ -88,19 +77,27 @@ class ReorgController(BaseController):
             logging.error(f"Reorging mission catch exception: {e}")
             raise e
 
-        self.update_job_info(job_id, job_info={"job_status": "completed"})
+        self.update_job_info(
+            job_id,
+            job_info={
+                "last_fixed_block_number": lowest_block,
+                "remain_process": 0,
+                "update_time": datetime.now(timezone.utc),
+                "job_status": "completed",
+            },
+        )
 
         logging.info(f"Reorging mission start from block No.{block_number} and ranges {remains} has been completed.")
 
-    def _do_fixing(self, fix_block, retry_errors=True):
+    def _do_fixing(self, fix_start, fix_end, retry_errors=True):
         tries, tries_reset = 0, True
         while True:
             try:
                 # Main reorging logic
                 tries_reset = True
-                self.job_scheduler.run_jobs(fix_block, fix_block)
+                self.job_scheduler.run_jobs(fix_start, fix_end)
 
-                logging.info(f"Block No.{fix_block} and relative entities completely fixed .")
+                logging.info(f"Blocks No.{fix_start} to No.{fix_end} and relative entities completely fixed .")
                 break
 
             except HemeraBaseException as e:
@@ -196,31 +193,53 @@ class ReorgController(BaseController):
 
         return job
 
-    def check_block_been_synced(self, block_number):
-        session = self.db_service.get_service_session()
-        try:
-            result = session.query(Blocks).filter(and_(Blocks.number == block_number)).first()
-        finally:
-            session.close()
-        return result is not None
-
-    def check_block_need_fix(self, block_number):
-        block = self.web3.eth.get_block(block_number)
-        block_hash = block.hash.hex()
+    def blocks_need_fix(self, start_block, end_block):
+        """
+        The synced blocks of [start_block, end_block] whose indexed hash is not the canonical one, highest first.
 
+        The indexed blocks of the range are read with one query and their canonical hashes fetched in batches,
+        instead of two queries and one request per block.
+        """
         session = self.db_service.get_service_session()
         try:
             result = (
-                session.query(Blocks)
-                .filter(
-                    and_(
-                        Blocks.number == block_number,
-                        Blocks.hash == hex_str_to_bytes(block_hash),
-                        Blocks.reorg == False,
-                    )
-                )
-                .first()
+                session.query(Blocks.number, Blocks.hash, Blocks.reorg)
+                .filter(and_(Blocks.number >= start_block, Blocks.number <= end_block))
+                .all()
             )
         finally:
             session.close()
-        return result is None
+
+        indexed_hashes = {}
+        for number, block_hash, reorg in result:
+            indexed_hashes.setdefault(number, set())
+            if not reorg:
+                indexed_hashes[number].add(bytes_to_hex_str(block_hash))
+
+        canonical_hashes = self.get_canonical_hashes(sorted(indexed_hashes))
+        return sorted(
+            (number for number, hashes in indexed_hashes.items() if canonical_hashes.get(number) not in hashes),
+            reverse=True,
+        )
+
+    def get_canonical_hashes(self, block_numbers):
+        canonical_hashes = {}
+        batch_size = self.job_scheduler.batch_size
+        for index in range(0, len(block_numbers), batch_size):
+            numbers = block_numbers[index : index + batch_size]
+            requests = list(generate_get_block_by_number_json_rpc(numbers, False))
+            response = self.job_scheduler.batch_web3_provider.make_request(params=orjson.dumps(requests))
+            for request, result in zip_rpc_response(requests, response, index="id"):
+                canonical_hashes[numbers[request["id"]]] = rpc_response_to_result(result)["hash"]
+        return canonical_hashes
+
+    @staticmethod
+    def fixing_ranges(block_numbers):
+        """Groups block numbers sorted highest first into (start, end) ranges of consecutive blocks."""
+        ranges = []
+        for number in block_numbers:
+            if ranges and ranges[-1][0] == number + 1:
+                ranges[-1] = (number, ranges[-1][1])
+            else:
+                ranges.append((number, number))
+        return ranges
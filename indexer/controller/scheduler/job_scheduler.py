@@ -1,13 +1,13 @@
 import logging
+import threading
 from collections import defaultdict, deque
 from typing import List, Set, Type
 
-from pottery import RedisDict
-from redis.client import Redis
-
-from common.models.tokens import Tokens
-from common.utils.format_utils import bytes_to_hex_str
-from common.utils.module_loading import import_submodules
+from common.utils.discovery_manifest import import_job_modules
+from common.utils.exception_control import ReorgDetectedError, RetriableError
+from indexer.cache.token_cache import build_token_cache
+from indexer.executors.pipeline_executor import PipelineExecutor
+from indexer.exporters.async_export_queue import AsyncExportQueue
 from indexer.exporters.console_item_exporter import ConsoleItemExporter
 from indexer.jobs import CSVSourceJob
 from indexer.jobs.base_job import (
@@ -19,27 +19,12 @@ from indexer.jobs.base_job import (
 )
 from indexer.jobs.check_block_consensus_job import CheckBlockConsensusJob
 from indexer.jobs.export_blocks_job import ExportBlocksJob
+from indexer.jobs.run_context import RunContext
 from indexer.jobs.source_job.pg_source_job import PGSourceJob
+from indexer.utils.reorg import clean_reorged_range
 
-import_submodules("indexer.modules")
-
-
-def get_tokens_from_db(service):
-    with service.session_scope() as s:
-        dict = {}
-        result = s.query(Tokens).all()
-        if result is not None:
-            for token in result:
-                dict[bytes_to_hex_str(token.address)] = {
-                    "address": bytes_to_hex_str(token.address),
-                    "token_type": token.token_type,
-                    "name": token.name,
-                    "symbol": token.symbol,
-                    "decimals": int(token.decimals) if token.decimals is not None else None,
-                    "block_number": token.block_number,
-                    "total_supply": int(token.total_supply) if token.total_supply is not None else None,
-                }
-        return dict
+EXPORT_MODES = ["sync", "async"]
+MAX_REORG_ROUNDS = 3
 
 
 def get_source_job_type(source_path: str):
@@ -67,6 +52,10 @@ class JobScheduler:
         multicall=None,
         auto_reorg=True,
         force_filter_mode=False,
+        pipeline_batch_size=None,
+        pipeline_max_in_flight=3,
+        export_mode="sync",
+        export_queue_size=2,
     ):
         self.logger = logging.getLogger(__name__)
         self.auto_reorg = auto_reorg
@@ -78,11 +67,21 @@ class JobScheduler:
         self.debug_batch_size = debug_batch_size
         self.max_workers = max_workers
         self.config = config
+        self.pipeline_batch_size = pipeline_batch_size
+        self.pipeline_max_in_flight = pipeline_max_in_flight
+        if export_mode not in EXPORT_MODES:
+            raise ValueError(f"Unknown export mode: {export_mode}, should be one of {EXPORT_MODES}")
+        self.export_queue = (
+            AsyncExportQueue(max_pending=export_queue_size, name="JobSchedulerExport")
+            if export_mode == "async"
+            else None
+        )
         required_output_types.sort(key=lambda x: x.type())
         self.required_output_types = required_output_types
         self.required_source_types = required_source_types
         self.load_from_source = config.get("source_path") if "source_path" in config else None
         self.jobs = []
+        self._thread_jobs = threading.local()
         self.job_classes = []
         self.job_map = defaultdict(list)
         self.dependency_map = defaultdict(list)
@@ -95,20 +94,7 @@ class JobScheduler:
             self.is_pipeline_filter = True
 
         self.resolved_job_classes = self.resolve_dependencies(self.required_job_classes)
-        token_dict_from_db = defaultdict()
-        if self.pg_service is not None:
-            token_dict_from_db = get_tokens_from_db(self.pg_service)
-        if cache is None or cache == "memory":
-            BaseJob.init_token_cache(token_dict_from_db)
-        else:
-            if cache[:5] == "redis":
-                try:
-                    redis = Redis.from_url(cache)
-                    tokens = RedisDict(token_dict_from_db, redis=redis, key="token")
-                    BaseJob.init_token_cache(tokens)
-                except Exception as e:
-                    self.logger.warning(f"Error connecting to redis cache: {e}, using memory cache instead")
-                    BaseJob.init_token_cache(token_dict_from_db)
+        BaseJob.init_token_cache(build_token_cache(cache, self.pg_service, config.get("token_cache")))
         self.instantiate_jobs()
         self.logger.info("Export output types: ")
         for output_type in self.required_output_types:
@@ -150,12 +136,17 @@ class JobScheduler:
         return required_job_classes, is_filter
 
     def clear_data_buff(self):
-        BaseJob._data_buff.clear()
+        run_context = getattr(self._thread_jobs, "run_context", None)
+        if run_context is not None:
+            run_context.clear()
 
     def get_data_buff(self):
-        return BaseJob._data_buff
+        # The buffer of the last unpipelined run_jobs call of this thread, pipelined batches are cleared once done.
+        run_context = getattr(self._thread_jobs, "run_context", None)
+        return run_context.data_buff if run_context is not None else RunContext().data_buff
 
     def discover_and_register_job_classes(self):
+        import_job_modules(self.required_output_types)
         if self.load_from_source:
             source_job = get_source_job_type(source_path=self.load_from_source)
             if source_job is PGSourceJob:
@@ -191,6 +182,20 @@ class JobScheduler:
                 self.dependency_map[dependency.type()].append(cls)
 
     def instantiate_jobs(self):
+        self.jobs = self.build_jobs()
+        self._thread_jobs.jobs = self.jobs
+
+    def get_jobs(self) -> List[BaseJob]:
+        # Job instances keep per-run executor state, so every thread running ranges gets its own set.
+        # Providers, exporters, the token cache and the db service are shared between the sets.
+        jobs = getattr(self._thread_jobs, "jobs", None)
+        if jobs is None:
+            jobs = self.build_jobs()
+            self._thread_jobs.jobs = jobs
+        return jobs
+
+    def build_jobs(self) -> List[BaseJob]:
+        jobs = []
         filters = []
         for job_class in self.resolved_job_classes:
             if job_class is ExportBlocksJob or job_class is PGSourceJob:
@@ -209,7 +214,7 @@ class JobScheduler:
             if isinstance(job, FilterTransactionDataJob):
                 filters.append(job.get_filter())
 
-            self.jobs.append(job)
+            jobs.append(job)
 
         if ExportBlocksJob in self.resolved_job_classes:
             export_blocks_job = ExportBlocksJob(
@@ -225,7 +230,7 @@ class JobScheduler:
                 is_filter=self.is_pipeline_filter,
                 filters=filters,
             )
-            self.jobs.insert(0, export_blocks_job)
+            jobs.insert(0, export_blocks_job)
         else:
             pg_source_job = PGSourceJob(
                 required_output_types=self.required_output_types,
@@ -240,7 +245,7 @@ class JobScheduler:
                 is_filter=self.is_pipeline_filter,
                 filters=filters,
             )
-            self.jobs.insert(0, pg_source_job)
+            jobs.insert(0, pg_source_job)
 
         if self.auto_reorg:
             check_job = CheckBlockConsensusJob(
@@ -255,23 +260,121 @@ class JobScheduler:
                 config=self.config,
                 filters=filters,
             )
-            self.jobs.append(check_job)
+            jobs.append(check_job)
 
-    def run_jobs(self, start_block, end_block):
-        self.clear_data_buff()
+        return jobs
+
+    def run_jobs(self, start_block, end_block, on_batch_complete=None):
+        try:
+            if self.pipeline_batch_size and end_block - start_block + 1 > self.pipeline_batch_size:
+                self._thread_jobs.run_context = None
+                self.run_jobs_pipelined(start_block, end_block, on_batch_complete)
+            else:
+                self.run_batch(start_block, end_block, on_batch_complete)
+        except ReorgDetectedError as e:
+            self.reindex_reorged_blocks(e.fork_point, end_block, on_batch_complete)
+
+    def reindex_reorged_blocks(self, fork_point, end_block, on_batch_complete=None):
+        """
+        Index [fork_point, end_block] again as one batch after CheckBlockConsensusJob found the chain reorganized,
+        once what the jobs wrote for those blocks is dropped. A reorg found meanwhile moves the fork point.
+        """
+        for _ in range(MAX_REORG_ROUNDS):
+            self.logger.warning(f"Chain reorganized, indexing blocks [{fork_point}, {end_block}] again.")
+            if self.pg_service is not None:
+                clean_reorged_range(self.get_jobs(), fork_point, end_block, self.pg_service)
+            try:
+                self.run_batch(fork_point, end_block, on_batch_complete)
+                return
+            except ReorgDetectedError as e:
+                fork_point = min(fork_point, e.fork_point)
+        raise RetriableError(f"Chain kept reorganizing while blocks [{fork_point}, {end_block}] were indexed again.")
+
+    def run_batch(self, start_block, end_block, on_batch_complete=None):
+        run_context = RunContext(
+            start_block, end_block, export_queue=self.export_queue, item_exporters=self.item_exporters
+        )
+        self._thread_jobs.run_context = run_context
         try:
-            for job in self.jobs:
-                job.run(start_block=start_block, end_block=end_block)
+            for job in self.get_jobs():
+                job.run(start_block=start_block, end_block=end_block, run_context=run_context)
 
-            for output_type in self.required_output_types:
-                message = f"{output_type.type()} : {len(self.get_data_buff().get(output_type.type())) if self.get_data_buff().get(output_type.type()) else 0}"
-                self.logger.info(f"{message}")
+            # The range only counts as synced once everything it produced is written and committed.
+            run_context.wait_for_exports()
+            run_context.commit_exports()
+            self.log_output_counts(run_context.data_buff)
 
         except Exception as e:
+            # Let what the failed range already queued settle, then drop it before the range is retried.
+            run_context.wait_for_exports(raise_errors=False)
+            run_context.rollback_exports()
             raise e
         finally:
             pass
 
+        if on_batch_complete is not None:
+            on_batch_complete(end_block)
+
+    def run_jobs_pipelined(self, start_block, end_block, on_batch_complete=None):
+        """
+        Split [start_block, end_block] into micro-batches of pipeline_batch_size blocks and overlap them
+        across the topologically sorted jobs: while one job works on batch N, the job before it is already
+        working on batch N+1. Every batch owns its RunContext, and a job only ever holds one batch at a time,
+        so jobs see the same input as in run_jobs. on_batch_complete(end_block) is called in block order,
+        and only after every job (including its export) has finished the batch.
+        """
+        open_batches = []
+
+        def batches():
+            for batch_start in range(start_block, end_block + 1, self.pipeline_batch_size):
+                batch = RunContext(
+                    batch_start,
+                    min(batch_start + self.pipeline_batch_size - 1, end_block),
+                    export_queue=self.export_queue,
+                    item_exporters=self.item_exporters,
+                )
+                open_batches.append(batch)
+                yield batch
+
+        def on_complete(batch: RunContext):
+            batch.wait_for_exports()
+            batch.commit_exports()
+            open_batches.remove(batch)
+            self.logger.info(f"Pipeline batch [{batch.start_block}, {batch.end_block}] completed.")
+            self.log_output_counts(batch.data_buff)
+            batch.clear()
+            if on_batch_complete is not None:
+                on_batch_complete(batch.end_block)
+
+        pipeline = PipelineExecutor(
+            [self._pipeline_stage(job) for job in self.get_jobs()],
+            max_in_flight=self.pipeline_max_in_flight,
+            job_name="JobSchedulerPipeline",
+        )
+        try:
+            pipeline.execute(batches(), on_item_complete=on_complete)
+        except Exception:
+            for batch in list(open_batches):
+                batch.wait_for_exports(raise_errors=False)
+                batch.rollback_exports()
+            raise
+
+    def close(self):
+        if self.export_queue is not None:
+            self.export_queue.close()
+
+    @staticmethod
+    def _pipeline_stage(job: BaseJob):
+        def run_stage(batch: RunContext):
+            job.run(start_block=batch.start_block, end_block=batch.end_block, run_context=batch)
+
+        return run_stage
+
+    def log_output_counts(self, data_buff):
+        for output_type in self.required_output_types:
+            message = f"{output_type.type()} : {data_buff.count(output_type.type())}"
+            self.logger.info(f"{message}")
+
     def resolve_dependencies(self, required_jobs: Set[Type[BaseJob]]) -> List[Type[BaseJob]]:
         sorted_order = []
         job_graph = defaultdict(list)
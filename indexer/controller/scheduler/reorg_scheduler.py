@@ -2,36 +2,13 @@ import logging
 from collections import defaultdict, deque
 from typing import List, Set, Type
 
-from pottery import RedisDict
-from redis.client import Redis
-
-from common.models.tokens import Tokens
-from common.utils.format_utils import bytes_to_hex_str
-from common.utils.module_loading import import_submodules
+from common.utils.discovery_manifest import import_job_modules
+from indexer.cache.token_cache import build_token_cache
 from indexer.jobs import FilterTransactionDataJob
 from indexer.jobs.base_job import BaseExportJob, BaseJob, ExtensionJob
 from indexer.jobs.export_blocks_job import ExportBlocksJob
 from indexer.jobs.export_reorg_job import ExportReorgJob
-
-import_submodules("indexer.modules")
-
-
-def get_tokens_from_db(service):
-    with service.session_scope() as s:
-        dict = {}
-        result = s.query(Tokens).all()
-        if result is not None:
-            for token in result:
-                dict[bytes_to_hex_str(token.address)] = {
-                    "address": bytes_to_hex_str(token.address),
-                    "token_type": token.token_type,
-                    "name": token.name,
-                    "symbol": token.symbol,
-                    "decimals": int(token.decimals) if token.decimals is not None else None,
-                    "block_number": token.block_number,
-                    "total_supply": int(token.total_supply) if token.total_supply is not None else None,
-                }
-        return dict
+from indexer.jobs.run_context import RunContext
 
 
 class ReorgScheduler:
@@ -57,6 +34,7 @@ class ReorgScheduler:
         self.config = config
         self.required_output_types = required_output_types
         self.jobs = []
+        self.run_context = RunContext()
         self.job_classes = []
         self.job_map = defaultdict(list)
         self.dependency_map = defaultdict(list)
@@ -66,31 +44,17 @@ class ReorgScheduler:
         self.discover_and_register_job_classes()
         self.required_job_classes = self.get_required_job_classes(required_output_types)
         self.resolved_job_classes = self.resolve_dependencies(self.required_job_classes)
-        token_dict_from_db = defaultdict()
-        if self.pg_service is not None:
-            token_dict_from_db = get_tokens_from_db(self.pg_service)
-        if cache is None or cache == "memory":
-            BaseJob.init_token_cache(token_dict_from_db)
-        else:
-            if cache[:5] == "redis":
-                try:
-                    redis = Redis.from_url(cache)
-                    tokens = RedisDict(token_dict_from_db, redis=redis, key="token")
-                    BaseJob.init_token_cache(tokens)
-                except Exception as e:
-                    logging.warning(f"Error connecting to redis cache: {e}, using memory cache instead")
-                    BaseJob.init_token_cache(token_dict_from_db)
+        BaseJob.init_token_cache(build_token_cache(cache, self.pg_service, config.get("token_cache")))
         self.instantiate_jobs()
 
-    @staticmethod
-    def get_data_buff():
-        return BaseJob._data_buff
+    def get_data_buff(self):
+        return self.run_context.data_buff
 
-    @staticmethod
-    def clear_data_buff():
-        BaseJob._data_buff.clear()
+    def clear_data_buff(self):
+        self.run_context.clear()
 
     def discover_and_register_job_classes(self):
+        import_job_modules(self.required_output_types)
         all_subclasses = BaseExportJob.discover_jobs()
 
         all_subclasses.extend(ExtensionJob.discover_jobs())
@@ -158,9 +122,9 @@ class ReorgScheduler:
         self.jobs.append(export_reorg_job)
 
     def run_jobs(self, start_block, end_block):
-        self.clear_data_buff()
+        self.run_context = RunContext(start_block, end_block)
         for job in self.jobs:
-            job.run(start_block=start_block, end_block=end_block)
+            job.run(start_block=start_block, end_block=end_block, run_context=self.run_context)
 
     def get_required_job_classes(self, output_types):
         required_job_classes = set()
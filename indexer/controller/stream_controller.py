@@ -1,6 +1,6 @@
 import logging
 import os
-import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import mpire
 
@@ -9,11 +9,20 @@ from common.utils.file_utils import delete_file, write_to_file
 from common.utils.web3_utils import build_web3
 from indexer.controller.base_controller import BaseController
 from indexer.controller.scheduler.job_scheduler import JobScheduler
+from indexer.executors.batch_size_controller import batch_size_controllers
+from indexer.utils.http_pool import endpoint_session_pool
 from indexer.utils.limit_reader import LimitReader
+from indexer.utils.metrics import registry
 from indexer.utils.sync_recorder import BaseRecorder
 
 logger = logging.getLogger(__name__)
 
+chain_head_block = registry.gauge("hemera_chain_head_block", "The latest block the limit reader reported.")
+last_synced_block_gauge = registry.gauge("hemera_last_synced_block", "The last block recorded as synced.")
+indexing_lag_blocks = registry.gauge(
+    "hemera_indexing_lag_blocks", "Blocks between the chain head and the last synced one."
+)
+
 
 class StreamController(BaseController):
 
@@ -29,6 +38,7 @@ class StreamController(BaseController):
         process_numbers=1,
         process_size=None,
         process_time_out=None,
+        parallel_mode="process",
     ):
         self.entity_types = 1
         self.web3 = build_web3(batch_web3_provider)
@@ -42,10 +52,17 @@ class StreamController(BaseController):
         self.process_numbers = process_numbers
         self.process_size = process_size
         self.process_time_out = process_time_out
+        self.parallel_mode = parallel_mode
         if self.process_numbers <= 1:
             self.pool = None
-        else:
+        elif self.parallel_mode == "thread":
+            # Ranges run on threads sharing one scheduler, every run_jobs call owns its RunContext
+            # and every thread its own job instances, while providers and caches are shared.
+            self.pool = ThreadPoolExecutor(max_workers=self.process_numbers, thread_name_prefix="stream")
+        elif self.parallel_mode == "process":
             self.pool = mpire.WorkerPool(n_jobs=self.process_numbers, use_dill=True, keep_alive=True)
+        else:
+            raise ValueError(f"Unknown parallel mode: {parallel_mode}, should be one of 'process' or 'thread'.")
 
     def action(
         self,
@@ -81,6 +98,8 @@ class StreamController(BaseController):
                         "If you're using PGLimitReader, please confirm blocks table has one record at least."
                     )
 
+                chain_head_block.set(current_block)
+                indexing_lag_blocks.set(max(current_block - last_synced_block, 0))
                 target_block = self._calculate_target_block(
                     current_block, last_synced_block, end_block, block_batch_size
                 )
@@ -94,19 +113,22 @@ class StreamController(BaseController):
 
                 if synced_blocks != 0:
                     if not self.pool:
-                        self._do_stream(last_synced_block + 1, target_block)
+                        # The scheduler reports every fully exported batch in block order,
+                        # so in pipelined mode the sync record advances batch by batch.
+                        self._do_stream(last_synced_block + 1, target_block, self._record_synced_block)
                     else:
                         splits = self.split_blocks(last_synced_block + 1, target_block, self.process_size)
-                        self.pool.map(func=self._do_stream, iterable_of_args=splits, task_timeout=self.process_time_out)
-                    logger.info("Writing last synced block {}".format(target_block))
-                    self.sync_recorder.set_last_synced_block(target_block)
+                        self._map_splits(splits)
+                        self._record_synced_block(target_block)
                     last_synced_block = target_block
 
                 if synced_blocks <= 0:
-                    logger.info("Nothing to sync. Sleeping for {} seconds...".format(period_seconds))
-                    time.sleep(period_seconds)
+                    logger.info("Nothing to sync. Waiting up to {} seconds for a new block...".format(period_seconds))
+                    self.limit_reader.wait_for_new_block(current_block, period_seconds)
 
         finally:
+            endpoint_session_pool.log_metrics()
+            batch_size_controllers.log_state()
             if pid_file is not None:
                 logger.info("Deleting pid file {}".format(pid_file))
                 delete_file(pid_file)
@@ -114,18 +136,48 @@ class StreamController(BaseController):
     def _shutdown(self):
         pass
 
+    def _map_splits(self, splits):
+        if self.parallel_mode == "thread":
+            futures = {self.pool.submit(self._do_stream, start, end): (start, end) for start, end in splits}
+            done, not_done = wait(futures, timeout=self.process_time_out)
+            for future in done:
+                future.result()
+            if not_done:
+                # Python threads cannot be killed: ranges which had not started are cancelled, running ones
+                # keep going in the background. Failing here keeps the sync record before all of them.
+                timed_out = [futures[future] for future in not_done if not future.cancel()]
+                raise TimeoutError(
+                    f"Block ranges {sorted(futures[future] for future in not_done)} did not finish within "
+                    f"{self.process_time_out}s, still running in the background: {sorted(timed_out)}"
+                )
+        else:
+            self.pool.map(func=self._do_stream, iterable_of_args=splits, task_timeout=self.process_time_out)
+
+    def _record_synced_block(self, block_number):
+        logger.info("Writing last synced block {}".format(block_number))
+        self.sync_recorder.set_last_synced_block(block_number)
+        last_synced_block_gauge.set(block_number)
+        indexing_lag_blocks.set(max(chain_head_block.value() - block_number, 0))
+
     def split_blocks(self, start_block, end_block, step):
         blocks = []
         for i in range(start_block, end_block + 1, step):
             blocks.append((i, min(i + step - 1, end_block)))
         return blocks
 
-    def _do_stream(self, start_block, end_block):
+    def _do_stream(self, start_block, end_block, on_batch_complete=None):
+        synced_block = start_block - 1
+
+        def record_batch(block_number):
+            nonlocal synced_block
+            synced_block = block_number
+            if on_batch_complete is not None:
+                on_batch_complete(block_number)
 
         for retry in range(self.max_retries + 1):
             try:
-                # ETL program's main logic
-                self.job_scheduler.run_jobs(start_block, end_block)
+                # ETL program's main logic, a retry resumes after the last fully exported batch
+                self.job_scheduler.run_jobs(synced_block + 1, end_block, on_batch_complete=record_batch)
                 return
 
             except HemeraBaseException as e:
@@ -162,6 +214,10 @@ class StreamController(BaseController):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         try:
-            self.pool.terminate()
+            if self.parallel_mode == "thread":
+                self.pool.shutdown(wait=False)
+            else:
+                self.pool.terminate()
         except Exception:
             pass
+        self.job_scheduler.close()
@@ -1,8 +1,10 @@
+from collections.abc import Mapping
 from dataclasses import asdict, dataclass, fields, is_dataclass
 from typing import Any, Dict, Union, get_args, get_origin
 
+from common.utils.discovery_manifest import get_manifest
 from common.utils.format_utils import to_snake_case
-from common.utils.module_loading import import_string, scan_subclass_by_path_patterns
+from common.utils.module_loading import import_string
 
 model_path_patterns = [
     "indexer/domain",
@@ -52,7 +54,7 @@ class Domain(metaclass=DomainMeta):
 
     @classmethod
     def get_all_domain_dict(cls):
-        return DomainMeta.get_all_subclasses_with_type()
+        return domains_mapping
 
     @classmethod
     def type(cls) -> str:
@@ -136,15 +138,23 @@ def dataclass_to_dict(instance: Domain) -> Dict[str, Any]:
     return result
 
 
-def generate_domains_mapping():
-    mapping = {}
-    for domain in __domain_imports.keys():
-        mapping[to_snake_case(domain)] = import_string(__domain_imports[domain])
+class DomainsMapping(Mapping):
+    """
+    Domain classes by type, imported the first time they are looked up. Where each one is defined comes
+    from the discovery manifest, domains defined elsewhere are found once their module is loaded.
+    """
+
+    def __getitem__(self, domain_type: str):
+        domain_path = get_manifest().domain_path(domain_type)
+        if domain_path is not None:
+            return import_string(domain_path)
+        return DomainMeta.get_all_subclasses_with_type()[domain_type]
+
+    def __iter__(self):
+        return iter(set(get_manifest().domains).union(DomainMeta.get_all_subclasses_with_type()))
 
-    return mapping
+    def __len__(self):
+        return len(set(get_manifest().domains).union(DomainMeta.get_all_subclasses_with_type()))
 
 
-__domain_imports = {
-    k: v["cls_import_path"] for k, v in scan_subclass_by_path_patterns(model_path_patterns, Domain).items()
-}
-domains_mapping = generate_domains_mapping()
+domains_mapping = DomainsMapping()
@@ -0,0 +1,381 @@
+import copy
+from array import array
+from dataclasses import MISSING, fields
+from types import FunctionType, MethodType
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+    get_args,
+    get_origin,
+    get_type_hints,
+)
+
+from indexer.domain import Domain, dataclass_to_dict
+from indexer.domain.log import Log
+
+_VALUE, _NONE, _EMPTY = 0, 1, 2
+
+
+class HexColumn:
+    """
+    Stores lower-case '0x' prefixed hex strings (addresses, hashes, input data) as raw bytes in one
+    contiguous buffer. Values which would not survive the round trip unchanged (mixed case, missing
+    prefix, odd length) are kept as they are in a side table.
+    """
+
+    __slots__ = ("_buffer", "_offsets", "_states", "_raw")
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._offsets = array("Q", [0])
+        self._states = bytearray()
+        self._raw: Dict[int, Any] = {}
+
+    def append(self, value: Optional[str]):
+        if value is None:
+            self._states.append(_NONE)
+        elif value == "":
+            self._states.append(_EMPTY)
+        elif isinstance(value, str) and value.startswith("0x") and value.islower() and len(value) % 2 == 0:
+            try:
+                self._buffer += bytes.fromhex(value[2:])
+                self._states.append(_VALUE)
+            except ValueError:
+                self._raw[len(self._states)] = value
+                self._states.append(_NONE)
+        else:
+            self._raw[len(self._states)] = value
+            self._states.append(_NONE)
+        self._offsets.append(len(self._buffer))
+
+    def __len__(self):
+        return len(self._states)
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        state = self._states[index]
+        if state == _VALUE:
+            return "0x" + self._buffer[self._offsets[index] : self._offsets[index + 1]].hex()
+        if state == _EMPTY:
+            return ""
+        return self._raw.get(index)
+
+    def __setitem__(self, index: int, value: Optional[str]):
+        self._states[index] = _NONE
+        self._raw[index] = value
+
+    def __iter__(self):
+        for index in range(len(self._states)):
+            yield self[index]
+
+    def get_bytes(self, index: int) -> Optional[bytes]:
+        """Same result as hex_str_to_bytes(self[index]), without building the intermediate string."""
+        state = self._states[index]
+        if state == _VALUE:
+            return bytes(self._buffer[self._offsets[index] : self._offsets[index + 1]])
+        value = self._raw.get(index)
+        if isinstance(value, bytes):
+            return value
+        if isinstance(value, int):
+            return value.to_bytes(32, byteorder="big")
+        if not value or not isinstance(value, str):
+            return None
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+
+    def to_bytes_list(self) -> List[Optional[bytes]]:
+        return [self.get_bytes(index) for index in range(len(self._states))]
+
+    def take(self, indices: Iterable[int]) -> "HexColumn":
+        column = HexColumn()
+        for index in indices:
+            if self._states[index] == _VALUE:
+                column._buffer += self._buffer[self._offsets[index] : self._offsets[index + 1]]
+                column._states.append(_VALUE)
+            else:
+                if index in self._raw:
+                    column._raw[len(column._states)] = self._raw[index]
+                column._states.append(self._states[index])
+            column._offsets.append(len(column._buffer))
+        return column
+
+
+class IntColumn:
+    """
+    Stores integers in a signed 64-bit array while they fit, and falls back to a plain list once a value
+    does not (uint256 token amounts, for example).
+    """
+
+    __slots__ = ("_values", "_nulls")
+
+    def __init__(self):
+        self._values: Union[array, list] = array("q")
+        self._nulls = bytearray()
+
+    def _widen(self):
+        self._values = [None if null else value for value, null in zip(self._values, self._nulls)]
+
+    def append(self, value: Optional[int]):
+        if isinstance(self._values, array):
+            if value is None:
+                self._values.append(0)
+                self._nulls.append(1)
+                return
+            if type(value) is int:
+                try:
+                    self._values.append(value)
+                    self._nulls.append(0)
+                    return
+                except OverflowError:
+                    pass
+            self._widen()
+        self._values.append(value)
+        self._nulls.append(0)
+
+    def __len__(self):
+        return len(self._nulls)
+
+    def __getitem__(self, index: int) -> Optional[int]:
+        if isinstance(self._values, array) and self._nulls[index]:
+            return None
+        return self._values[index]
+
+    def __setitem__(self, index: int, value: Optional[int]):
+        if isinstance(self._values, array):
+            self._widen()
+        self._values[index] = value
+
+    def __iter__(self):
+        for index in range(len(self._nulls)):
+            yield self[index]
+
+    def take(self, indices: Iterable[int]) -> "IntColumn":
+        column = IntColumn()
+        for index in indices:
+            column.append(self[index])
+        return column
+
+
+class ObjectColumn(list):
+    """Any other field, kept as a plain list of python objects."""
+
+    def take(self, indices: Iterable[int]) -> "ObjectColumn":
+        return ObjectColumn(self[index] for index in indices)
+
+
+class RowView:
+    """
+    A lazily materialised row of a ColumnarBatch. Field reads go straight to the columns and domain
+    methods (e.g. Log.get_bytes_data) run against the view, so most job code can use it where it
+    would use the domain instance. Call to_domain() where a real dataclass instance is needed.
+
+    Every columnar domain gets its own view class carrying the domain's dataclass fields, so asdict,
+    fields and dataclass_to_dict treat views like the domain. Copying or pickling a view gives a
+    domain instance.
+    """
+
+    __slots__ = ("_batch", "_index")
+
+    def __init__(self, batch: "ColumnarBatch", index: int):
+        object.__setattr__(self, "_batch", batch)
+        object.__setattr__(self, "_index", index)
+
+    @property
+    def __class__(self):
+        # Lets isinstance(view, Log) hold, decoders and parsers check their input that way.
+        return self._batch.domain_cls
+
+    def __getattr__(self, name):
+        column = self._batch._columns.get(name)
+        if column is not None:
+            return column[self._index]
+
+        attr = getattr(self._batch.domain_cls, name)
+        if isinstance(attr, FunctionType):
+            return MethodType(attr, self)
+        return attr
+
+    def __setattr__(self, name, value):
+        if name not in self._batch._columns:
+            raise AttributeError(f"{self._batch.domain_cls.__name__} has no field {name}")
+        self._batch._columns[name][self._index] = value
+
+    def __copy__(self) -> Domain:
+        return self.to_domain()
+
+    def __deepcopy__(self, memo) -> Domain:
+        return copy.deepcopy(self.to_domain(), memo)
+
+    def __reduce_ex__(self, protocol):
+        return self.to_domain().__reduce_ex__(protocol)
+
+    def to_domain(self) -> Domain:
+        return self._batch.domain_cls(**{name: column[self._index] for name, column in self._batch._columns.items()})
+
+    def __repr__(self):
+        return f"RowView({dataclass_to_dict(self.to_domain())})"
+
+
+class ColumnarSchema:
+    def __init__(self, domain_cls: Type[Domain], hex_fields: Sequence[str]):
+        self.domain_cls = domain_cls
+        self.columns: Dict[str, type] = {}
+        self.defaults: Dict[str, Any] = {}
+
+        hints = get_type_hints(domain_cls)
+        for field in fields(domain_cls):
+            if field.name in hex_fields:
+                self.columns[field.name] = HexColumn
+            elif _is_int_type(hints[field.name]):
+                self.columns[field.name] = IntColumn
+            else:
+                self.columns[field.name] = ObjectColumn
+
+            if field.default is not MISSING:
+                self.defaults[field.name] = lambda default=field.default: default
+            elif field.default_factory is not MISSING:
+                self.defaults[field.name] = field.default_factory
+
+        missing = set(hex_fields) - set(self.columns)
+        if missing:
+            raise ValueError(f"{domain_cls.__name__} has no fields {missing}")
+
+        self.view_cls = type(
+            f"{domain_cls.__name__}RowView",
+            (RowView,),
+            {
+                "__slots__": (),
+                "__dataclass_fields__": domain_cls.__dataclass_fields__,
+                "__dataclass_params__": domain_cls.__dataclass_params__,
+            },
+        )
+
+
+def _is_int_type(annotation) -> bool:
+    if annotation is int:
+        return True
+    if get_origin(annotation) is Union:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return args == [int]
+    return False
+
+
+_schemas: Dict[Type[Domain], ColumnarSchema] = {}
+
+
+def register_columnar_domain(domain_cls: Type[Domain], hex_fields: Sequence[str]):
+    _schemas[domain_cls] = ColumnarSchema(domain_cls, hex_fields)
+
+
+def is_columnar_domain(domain_cls: Type[Domain]) -> bool:
+    return domain_cls in _schemas
+
+
+class ColumnarBatch:
+    """
+    An array-backed batch of one domain type, one column per dataclass field.
+
+    Rows are only turned into dataclass instances when someone asks for them (to_domains, or a job
+    reading the run's data buffer), exporters which understand the batch can convert whole columns.
+    """
+
+    def __init__(self, domain_cls: Type[Domain], columns: Optional[Dict[str, Any]] = None):
+        if domain_cls not in _schemas:
+            raise ValueError(f"{domain_cls.__name__} is not registered as a columnar domain.")
+
+        self.domain_cls = domain_cls
+        self._schema = _schemas[domain_cls]
+        if columns is None:
+            columns = {name: column_cls() for name, column_cls in self._schema.columns.items()}
+        self._columns = columns
+
+    @classmethod
+    def from_domains(cls, domain_cls: Type[Domain], domains: Iterable[Domain]) -> "ColumnarBatch":
+        batch = cls(domain_cls)
+        for domain in domains:
+            batch.append_domain(domain)
+        return batch
+
+    @classmethod
+    def concat(cls, batches: Sequence["ColumnarBatch"]) -> "ColumnarBatch":
+        if len(batches) == 0:
+            raise ValueError("Can not concat an empty list of batches.")
+        batch = cls(batches[0].domain_cls)
+        for other in batches:
+            if other.domain_cls is not batch.domain_cls:
+                raise ValueError(f"Can not concat {other.domain_cls.__name__} into {batch.domain_cls.__name__}")
+            for index in range(len(other)):
+                for name, column in batch._columns.items():
+                    column.append(other._columns[name][index])
+        return batch
+
+    def type(self) -> str:
+        return self.domain_cls.type()
+
+    def append(self, **values):
+        for name, column in self._columns.items():
+            if name in values:
+                column.append(values[name])
+            elif name in self._schema.defaults:
+                column.append(self._schema.defaults[name]())
+            else:
+                raise ValueError(f"Missing value of {self.domain_cls.__name__}.{name}")
+
+    def append_domain(self, domain: Domain):
+        for name, column in self._columns.items():
+            column.append(getattr(domain, name))
+
+    def column(self, name: str):
+        return self._columns[name]
+
+    def columns(self) -> List[Tuple[str, Any]]:
+        return list(self._columns.items())
+
+    def row(self, index: int) -> RowView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Row {index} out of range of {self!r}")
+        return self._schema.view_cls(self, index)
+
+    def rows(self) -> Iterable[RowView]:
+        view_cls = self._schema.view_cls
+        for index in range(len(self)):
+            yield view_cls(self, index)
+
+    def to_domains(self) -> List[Domain]:
+        names = list(self._columns.keys())
+        return [self.domain_cls(**dict(zip(names, values))) for values in zip(*(self._columns[name] for name in names))]
+
+    def take(self, indices: Sequence[int]) -> "ColumnarBatch":
+        return ColumnarBatch(self.domain_cls, {name: column.take(indices) for name, column in self._columns.items()})
+
+    def sort_by(self, *names: str) -> "ColumnarBatch":
+        keys = list(zip(*(self._columns[name] for name in names)))
+        return self.take(sorted(range(len(self)), key=keys.__getitem__))
+
+    def sort_key(self, index: int, names: Sequence[str]) -> tuple:
+        return tuple(self._columns[name][index] for name in names)
+
+    def __len__(self):
+        return len(next(iter(self._columns.values())))
+
+    def __getitem__(self, index: int) -> RowView:
+        return self.row(index)
+
+    def __iter__(self):
+        return self.rows()
+
+    def __repr__(self):
+        return f"<ColumnarBatch {self.domain_cls.__name__} rows={len(self)}>"
+
+
+register_columnar_domain(
+    Log,
+    hex_fields=["address", "data", "transaction_hash", "block_hash", "topic0", "topic1", "topic2", "topic3"],
+)
@@ -23,8 +23,12 @@ class Log(Domain):
 
     @staticmethod
     def from_rpc(log_dict: dict, block_timestamp=None, block_hash=None, block_number=None):
+        return Log(**Log.fields_from_rpc(log_dict, block_timestamp, block_hash, block_number))
+
+    @staticmethod
+    def fields_from_rpc(log_dict: dict, block_timestamp=None, block_hash=None, block_number=None) -> dict:
         topics = log_dict.get("topics", [])
-        return Log(
+        return dict(
             log_index=to_int(hexstr=log_dict["logIndex"]),
             address=to_normalized_address(log_dict["address"]),
             data=log_dict["data"],
@@ -40,20 +44,17 @@ class Log(Domain):
         )
 
     def get_bytes_topics(self) -> bytes:
-        topics = ""
-        for i in range(4):
-            topic = getattr(self, f"topic{i}")
-            if topic and i != 0:
-                if topic.startswith("0x"):
-                    topic = topic[2:]
-                topics += topic
-        return bytearray.fromhex(topics)
+        return bytes.fromhex(
+            "".join(
+                topic[2:] if topic.startswith("0x") else topic
+                for topic in (self.topic1, self.topic2, self.topic3)
+                if topic
+            )
+        )
 
     def get_bytes_data(self) -> bytes:
         data = self.data
-        if data.startswith("0x"):
-            data = self.data[2:]
-        return bytearray.fromhex(data)
+        return bytes.fromhex(data[2:] if data.startswith("0x") else data)
 
     def get_topic_with_data(self) -> bytes:
         return self.get_bytes_topics() + self.get_bytes_data()
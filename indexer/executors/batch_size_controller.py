@@ -0,0 +1,247 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from requests.exceptions import HTTPError
+from requests.exceptions import Timeout as RequestsTimeout
+
+from indexer.utils.metrics import endpoint_label, registry
+from indexer.utils.rpc_utils import METHOD_PATTERN, rpc_response_errors
+
+logger = logging.getLogger(__name__)
+
+rpc_batch_size = registry.gauge(
+    "hemera_rpc_batch_size", "Calls per batch request the AIMD controller allows.", ["endpoint", "method"]
+)
+rpc_batch_size_decreases = registry.counter(
+    "hemera_rpc_batch_size_decreases_total", "Times a batch request was too large or too slow.", ["endpoint", "method"]
+)
+
+# (seconds, response bytes) a single batch request of the method should stay within.
+DEFAULT_BUDGET = (5.0, 16 * 1024 * 1024)
+METHOD_BUDGETS = {
+    "eth_getBlockByNumber": (3.0, 16 * 1024 * 1024),
+    "eth_getTransactionReceipt": (3.0, 16 * 1024 * 1024),
+    "eth_getBlockReceipts": (10.0, 64 * 1024 * 1024),
+    "debug_traceBlockByNumber": (15.0, 64 * 1024 * 1024),
+    "eth_call": (10.0, 8 * 1024 * 1024),
+}
+
+# How far above the configured batch size a controller may grow when the node keeps up.
+MAX_GROWTH_FACTOR = 4
+
+# Status codes meaning the batch itself was too large or too slow for the node.
+SIZE_RELATED_STATUS_CODES = {408, 413, 429, 502, 503, 504}
+
+# JSON-RPC errors nodes answer with when a batch or its response is too large or too slow,
+# -32005 is the "limit exceeded" code of EIP-1474.
+SIZE_RELATED_ERROR_CODES = {-32005}
+SIZE_RELATED_ERROR_MARKERS = ("batch", "too large", "too many", "response size", "exceed", "limit", "timeout")
+
+
+def is_size_related_error(error: dict) -> bool:
+    if error.get("code") in SIZE_RELATED_ERROR_CODES:
+        return True
+    message = str(error.get("message", "")).lower()
+    return any(marker in message for marker in SIZE_RELATED_ERROR_MARKERS)
+
+
+class AIMDBatchSizeController:
+    """
+    Additive increase, multiplicative decrease of the number of requests put in one batch
+    of an RPC method sent to one endpoint.
+
+    Every batch that fills the current size and comes back within the latency and response
+    size budget grows the size by additive_step. A batch over budget, or one failing with a timeout
+    or a size related HTTP status, shrinks it by decrease_factor at once. So the size settles just
+    below what the node handles comfortably instead of sawing between the maximum and one.
+    """
+
+    def __init__(
+        self,
+        method: str,
+        endpoint_uri: str,
+        initial_batch_size: int,
+        max_batch_size: int,
+        min_batch_size: int = 1,
+        target_seconds: Optional[float] = None,
+        target_bytes: Optional[int] = None,
+        additive_step: float = 1,
+        decrease_factor: float = 0.5,
+    ):
+        default_seconds, default_bytes = METHOD_BUDGETS.get(method, DEFAULT_BUDGET)
+        self.method = method
+        self.endpoint_uri = endpoint_uri
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max(max_batch_size, min_batch_size)
+        self.target_seconds = target_seconds or default_seconds
+        self.target_bytes = target_bytes or default_bytes
+        self.additive_step = additive_step
+        self.decrease_factor = decrease_factor
+        self._size = float(min(max(initial_batch_size, min_batch_size), self.max_batch_size))
+        self._lock = threading.Lock()
+        self.increases = 0
+        self.decreases = 0
+        self.last_seconds = None
+        self.last_bytes = None
+        self._labels = {"endpoint": endpoint_label(endpoint_uri), "method": method}
+        rpc_batch_size.set(self.batch_size, **self._labels)
+
+    @property
+    def batch_size(self) -> int:
+        return int(self._size)
+
+    def observe(self, batch_size: int, seconds: float, response_bytes: int):
+        with self._lock:
+            self.last_seconds = seconds
+            self.last_bytes = response_bytes
+            if seconds > self.target_seconds or response_bytes > self.target_bytes:
+                self._decrease(batch_size)
+            elif batch_size >= int(self._size) and self._size < self.max_batch_size:
+                # Only full batches say something about whether a larger one would fit.
+                self._size = min(self.max_batch_size, self._size + self.additive_step)
+                self.increases += 1
+                rpc_batch_size.set(self.batch_size, **self._labels)
+
+    def observe_failure(self, batch_size: int):
+        with self._lock:
+            self._decrease(batch_size)
+
+    def _decrease(self, batch_size: int):
+        new_size = max(self.min_batch_size, min(self._size, batch_size) * self.decrease_factor)
+        if int(new_size) < int(self._size):
+            logger.info(
+                f"Reducing {self.method} batch size for {self.endpoint_uri} from {int(self._size)} to {int(new_size)}."
+            )
+        self._size = new_size
+        self.decreases += 1
+        rpc_batch_size.set(self.batch_size, **self._labels)
+        rpc_batch_size_decreases.inc(**self._labels)
+
+    def state(self) -> dict:
+        return {
+            "method": self.method,
+            "endpoint_uri": self.endpoint_uri,
+            "batch_size": self.batch_size,
+            "min_batch_size": self.min_batch_size,
+            "max_batch_size": self.max_batch_size,
+            "target_seconds": self.target_seconds,
+            "target_bytes": self.target_bytes,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "last_seconds": self.last_seconds,
+            "last_bytes": self.last_bytes,
+        }
+
+
+class BatchSizeControllers:
+    """
+    The controllers of the process keyed by (method, endpoint). Executors register the ones they
+    size their batches with, providers report every batch request they send to the matching one.
+    """
+
+    def __init__(self):
+        self._controllers: Dict[Tuple[str, str], AIMDBatchSizeController] = {}
+        self._lock = threading.Lock()
+
+    def get(self, method: str, endpoint_uri: str, initial_batch_size: int, max_batch_size: int = None):
+        key = (method, endpoint_uri)
+        controller = self._controllers.get(key)
+        if controller is None:
+            with self._lock:
+                controller = self._controllers.get(key)
+                if controller is None:
+                    controller = AIMDBatchSizeController(
+                        method,
+                        endpoint_uri,
+                        initial_batch_size,
+                        max_batch_size or initial_batch_size * MAX_GROWTH_FACTOR,
+                    )
+                    self._controllers[key] = controller
+        return controller
+
+    def find(self, method: str, endpoint_uri: str) -> Optional[AIMDBatchSizeController]:
+        return self._controllers.get((method, endpoint_uri))
+
+    def group(
+        self,
+        method: str,
+        endpoint_uris: List[str],
+        initial_batch_size: int,
+        available_endpoint_uris: Callable[[], List[str]] = None,
+    ) -> "BatchSizeGroup":
+        return BatchSizeGroup(
+            [self.get(method, endpoint_uri, initial_batch_size) for endpoint_uri in endpoint_uris],
+            available_endpoint_uris,
+        )
+
+    def state(self):
+        return [controller.state() for controller in list(self._controllers.values())]
+
+    def log_state(self):
+        for state in self.state():
+            logger.info(
+                "Batch size of %s on %s: %s (%s increases, %s decreases)",
+                state["method"],
+                state["endpoint_uri"],
+                state["batch_size"],
+                state["increases"],
+                state["decreases"],
+            )
+
+
+class BatchSizeGroup:
+    """
+    The controllers of one method on every endpoint a provider may send a batch to. Batches are cut
+    before the endpoint is chosen, so they are sized for the smallest size among the endpoints
+    currently in use, endpoints taken out of rotation do not hold the others back.
+    """
+
+    def __init__(self, controllers: List[AIMDBatchSizeController], available_endpoint_uris=None):
+        self.controllers = controllers
+        self._available_endpoint_uris = available_endpoint_uris
+
+    @property
+    def batch_size(self) -> int:
+        controllers = self.controllers
+        if self._available_endpoint_uris is not None:
+            available = set(self._available_endpoint_uris())
+            controllers = [
+                controller for controller in controllers if controller.endpoint_uri in available
+            ] or controllers
+        return min(controller.batch_size for controller in controllers)
+
+
+def observed_post(endpoint_uri: str, request_data: bytes, post: Callable[[], bytes]) -> bytes:
+    """
+    Send a batch request to one endpoint through post() and report its size, latency and response size
+    to the controller of its method and endpoint, when an executor registered one. Timeouts, size related
+    HTTP statuses and size related JSON-RPC errors count as failures of the batch size.
+    """
+    match = METHOD_PATTERN.search(request_data) if request_data.lstrip()[:1] == b"[" else None
+    controller = batch_size_controllers.find(match.group(1).decode(), endpoint_uri) if match else None
+    if controller is None:
+        return post()
+
+    batch_size = request_data.count(b'"method"')
+    start = time.monotonic()
+    try:
+        raw_response = post()
+    except (RequestsTimeout, RequestsConnectionError):
+        controller.observe_failure(batch_size)
+        raise
+    except HTTPError as e:
+        if e.response is not None and e.response.status_code in SIZE_RELATED_STATUS_CODES:
+            controller.observe_failure(batch_size)
+        raise
+
+    if any(is_size_related_error(error) for error in rpc_response_errors(raw_response)):
+        controller.observe_failure(batch_size)
+    else:
+        controller.observe(batch_size, time.monotonic() - start, len(raw_response))
+    return raw_response
+
+
+batch_size_controllers = BatchSizeControllers()
@@ -9,7 +9,9 @@ from web3._utils.threads import Timeout as Web3Timeout
 
 from common.utils.exception_control import FastShutdownError, RetriableError
 from indexer.executors.bounded_executor import BoundedExecutor
+from indexer.utils.metrics import registry
 from indexer.utils.progress_logger import ProgressLogger
+from indexer.utils.rpc_balancer import batch_size_group
 
 RETRY_EXCEPTIONS = (
     ConnectionError,
@@ -23,8 +25,17 @@ RETRY_EXCEPTIONS = (
 
 BATCH_CHANGE_COOLDOWN_PERIOD_SECONDS = 2 * 60
 
+executor_batch_size = registry.gauge(
+    "hemera_executor_batch_size", "Work items per batch of executors sizing their batches themselves.", ["executor"]
+)
+executor_batch_retries = registry.counter(
+    "hemera_executor_batch_retries_total", "Batches that failed and were retried split or as they were.", ["executor"]
+)
+
 
 # Executes the given work in batches, reducing the batch size exponentially in case of errors.
+# When the rpc method the work sends is known, the batch size follows the AIMD controller of that
+# method and endpoint instead, which the provider feeds with the latency and size of every request.
 class BatchWorkExecutor:
     def __init__(
         self,
@@ -33,20 +44,40 @@ class BatchWorkExecutor:
         job_name="BatchWorkExecutor",
         retry_exceptions=RETRY_EXCEPTIONS,
         max_retries=5,
+        rpc_method=None,
+        endpoint_uri=None,
     ):
-        self.batch_size = starting_batch_size
+        self._batch_size = starting_batch_size
         self.max_batch_size = starting_batch_size
+        # A starting batch size of 1 means the job sends single requests, those are never batched up.
+        self.batch_size_group = (
+            batch_size_group(rpc_method, endpoint_uri, starting_batch_size)
+            if rpc_method is not None and endpoint_uri is not None and starting_batch_size > 1
+            else None
+        )
         self.latest_batch_size_change_time = None
         self.max_workers = max_workers
         # Using bounded executor prevents unlimited queue growth
         # and allows monitoring in-progress futures and failing fast in case of errors.
-        self.executor = BoundedExecutor(100, self.max_workers)
+        self.executor = BoundedExecutor(100, self.max_workers, name=job_name)
         self._futures = []
         self.retry_exceptions = retry_exceptions
         self.max_retries = max_retries
+        self.job_name = job_name
         self.logger = logging.getLogger(job_name)
         self.progress_logger = ProgressLogger(name=job_name, logger=self.logger)
 
+    @property
+    def batch_size(self):
+        if self.batch_size_group is not None:
+            return self.batch_size_group.batch_size
+        return self._batch_size
+
+    @batch_size.setter
+    def batch_size(self, batch_size):
+        self._batch_size = batch_size
+        executor_batch_size.set(batch_size, executor=self.job_name)
+
     def execute(self, work_iterable, work_handler, collector=None, total_items=None, split_method=None):
         self.progress_logger.start(total_items=total_items)
         submit_batches = (
@@ -72,10 +103,15 @@ class BatchWorkExecutor:
                 self._try_increase_batch_size(len(batch))
         except self.retry_exceptions as e:
             self.logger.exception("An exception occurred while executing work_handler.")
+            executor_batch_retries.inc(executor=self.job_name)
             if not custom_splitting and len(batch) > 1:
                 self._try_decrease_batch_size(len(batch))
-                self.logger.info("The batch of size {} will be retried one item at a time.".format(len(batch)))
-                for sub_batch in dynamic_batch_iterator(batch, lambda: self.batch_size):
+                # Always split, the controller only shrinks for failures caused by the batch size.
+                sub_batch_size = max(1, min(self.batch_size, len(batch) // 2))
+                self.logger.info(
+                    "The batch of size {} will be retried in batches of {}.".format(len(batch), sub_batch_size)
+                )
+                for sub_batch in dynamic_batch_iterator(batch, lambda: sub_batch_size):
                     self._fail_safe_execute(work_handler, sub_batch, collector, custom_splitting)
             else:
                 execute_with_retries(
@@ -90,6 +126,8 @@ class BatchWorkExecutor:
 
     # Some acceptable race conditions are possible
     def _try_decrease_batch_size(self, current_batch_size):
+        if self.batch_size_group is not None:
+            return
         batch_size = self.batch_size
         if batch_size > 1:
             new_batch_size = int(current_batch_size / 2)
@@ -98,6 +136,8 @@ class BatchWorkExecutor:
             self.latest_batch_size_change_time = time.time()
 
     def _try_increase_batch_size(self, current_batch_size):
+        if self.batch_size_group is not None:
+            return
         if current_batch_size * 2 <= self.max_batch_size:
             current_time = time.time()
             latest_batch_size_change_time = self.latest_batch_size_change_time
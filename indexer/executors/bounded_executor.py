@@ -1,6 +1,12 @@
 from concurrent.futures import ThreadPoolExecutor
 from threading import BoundedSemaphore
 
+from indexer.utils.metrics import registry
+
+queued_work_items = registry.gauge(
+    "hemera_executor_queued_items", "Work items submitted to an executor and not done yet.", ["executor"]
+)
+
 
 class BoundedExecutor:
     """BoundedExecutor behaves as a ThreadPoolExecutor which will block on
@@ -8,25 +14,33 @@ class BoundedExecutor:
     execution.
     :param bound: Integer - the maximum number of items in the work queue
     :param max_workers: Integer - the size of the thread pool
+    :param name: String - the executor label of the queue depth metric
     """
 
-    def __init__(self, bound, max_workers):
+    def __init__(self, bound, max_workers, name="BoundedExecutor"):
         self._delegate = ThreadPoolExecutor(max_workers=max_workers)
         self._semaphore = BoundedSemaphore(bound + max_workers)
+        self.name = name
 
     """See concurrent.futures.Executor#submit"""
 
     def submit(self, fn, *args, **kwargs):
         self._semaphore.acquire()
+        queued_work_items.inc(executor=self.name)
         try:
             future = self._delegate.submit(fn, *args, **kwargs)
         except Exception as e:
             self._semaphore.release()
+            queued_work_items.dec(executor=self.name)
             raise e
         else:
-            future.add_done_callback(lambda x: self._semaphore.release())
+            future.add_done_callback(self._on_done)
             return future
 
+    def _on_done(self, future):
+        self._semaphore.release()
+        queued_work_items.dec(executor=self.name)
+
     """See concurrent.futures.Executor#shutdown"""
 
     def shutdown(self, wait=True):
@@ -0,0 +1,115 @@
+import logging
+import queue
+import threading
+from typing import Any, Callable, Iterable, List, Optional
+
+_STOP = object()
+
+
+class _PipelineItem:
+    __slots__ = ("payload", "ok")
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.ok = True
+
+
+# Executes an ordered stream of work items through a chain of stages, one thread per stage.
+# Stage k works on item N while stage k+1 works on item N-1, so the wall-clock time of the whole
+# run approaches the latency of the slowest stage instead of the sum of all stages.
+class PipelineExecutor:
+    """
+    :param stages: Ordered list of callables, each one takes a single work item.
+    :param max_in_flight: Maximum number of work items that have entered the pipeline but not yet
+        left the last stage. Bounds the memory held by partially processed items.
+    """
+
+    def __init__(self, stages: List[Callable[[Any], None]], max_in_flight=3, job_name="PipelineExecutor"):
+        if len(stages) == 0:
+            raise ValueError("PipelineExecutor requires at least one stage.")
+        if max_in_flight < 1:
+            raise ValueError(f"max_in_flight should be a positive integer, got {max_in_flight}.")
+
+        self.stages = stages
+        self.max_in_flight = max_in_flight
+        self.logger = logging.getLogger(job_name)
+
+    def execute(self, work_iterable: Iterable[Any], on_item_complete: Optional[Callable[[Any], None]] = None):
+        """
+        Run every work item through all stages. Items leave the pipeline in the order they entered it,
+        and on_item_complete is invoked in the caller's thread only for items that passed every stage.
+        The first exception raised by a stage stops the pipeline and is re-raised here once all stage
+        threads have drained.
+        """
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        stop_event = threading.Event()
+        failures = []
+        queues = [queue.Queue() for _ in range(len(self.stages) + 1)]
+
+        def feed():
+            try:
+                for payload in work_iterable:
+                    while not in_flight.acquire(timeout=0.1):
+                        if stop_event.is_set():
+                            return
+                    if stop_event.is_set():
+                        in_flight.release()
+                        return
+                    queues[0].put(_PipelineItem(payload))
+            except BaseException as e:
+                failures.append(e)
+                stop_event.set()
+            finally:
+                queues[0].put(_STOP)
+
+        def work(stage_index):
+            stage = self.stages[stage_index]
+            inbox, outbox = queues[stage_index], queues[stage_index + 1]
+            while True:
+                item = inbox.get()
+                if item is _STOP:
+                    outbox.put(_STOP)
+                    return
+
+                if item.ok and not stop_event.is_set():
+                    try:
+                        stage(item.payload)
+                    except BaseException as e:
+                        self.logger.exception(f"Pipeline stage {stage_index} failed.")
+                        failures.append(e)
+                        stop_event.set()
+                        item.ok = False
+                else:
+                    item.ok = False
+                outbox.put(item)
+
+        threads = [threading.Thread(target=feed, name=f"{self.logger.name}-feeder", daemon=True)]
+        threads.extend(
+            threading.Thread(target=work, args=(index,), name=f"{self.logger.name}-stage-{index}", daemon=True)
+            for index in range(len(self.stages))
+        )
+        for thread in threads:
+            thread.start()
+
+        callback_failed = False
+        try:
+            while True:
+                item = queues[-1].get()
+                if item is _STOP:
+                    break
+                in_flight.release()
+                if item.ok and not callback_failed and on_item_complete is not None:
+                    try:
+                        on_item_complete(item.payload)
+                    except BaseException as e:
+                        callback_failed = True
+                        failures.append(e)
+                        stop_event.set()
+        finally:
+            # Reached early only when the caller is interrupted, tell the stages to drain what is left.
+            stop_event.set()
+            for thread in threads:
+                thread.join()
+
+        if failures:
+            raise failures[0]
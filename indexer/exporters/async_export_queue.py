@@ -0,0 +1,183 @@
+import copy
+import logging
+import os
+import queue
+import threading
+import time
+from collections import Counter
+from typing import Dict, Hashable, List, Optional
+
+from indexer.domain.columnar import ColumnarBatch
+from indexer.exporters.base_exporter import BaseExporter
+from indexer.utils.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+exported_items = registry.counter("hemera_exported_items_total", "Items written by exporters.", ["exporter", "type"])
+export_seconds = registry.histogram(
+    "hemera_export_seconds", "Time an exporter took to write a job's output.", ["exporter"]
+)
+
+
+def count_items_by_type(items) -> Dict[str, int]:
+    counts = Counter()
+    for item in items:
+        if isinstance(item, ColumnarBatch):
+            counts[item.domain_cls.type()] += len(item)
+        elif hasattr(item, "type"):
+            counts[item.type()] += 1
+        else:
+            counts[item.__class__.__name__] += 1
+    return counts
+
+
+def write_items(item_exporters: List[BaseExporter], items, job_name: Optional[str] = None, scope: Hashable = None):
+    counts = count_items_by_type(items)
+    for item_exporter in item_exporters:
+        exporter_name = item_exporter.__class__.__name__
+        start = time.monotonic()
+        item_exporter.open()
+        item_exporter.export_items(items, job_name=job_name, scope=scope)
+        item_exporter.close()
+        export_seconds.observe(time.monotonic() - start, exporter=exporter_name)
+        for item_type, count in counts.items():
+            exported_items.inc(count, exporter=exporter_name, type=item_type)
+
+
+def snapshot_items(items) -> list:
+    """
+    Copies of items as they are now. Jobs running later in the same range reassign fields of the
+    domains they consume, the writer must not see those changes half way through an export.
+    """
+    snapshot = []
+    for item in items:
+        if isinstance(item, ColumnarBatch):
+            snapshot.append(item.take(range(len(item))))
+        else:
+            snapshot.append(copy.copy(item))
+    return snapshot
+
+
+class AsyncExportQueue:
+    """
+    Moves exporting off the jobs' critical path. Jobs submit their output and carry on while a
+    background writer drains the queue in submission order.
+
+    :param max_pending: Number of submitted exports allowed to wait behind the one being written.
+        When the queue is full submit blocks, which bounds the memory held by pending exports
+        and slows extraction down to the pace of the exporters.
+
+    Every submit returns a ticket and may name a scope, the scheduler uses the RunContext of the
+    range. wait(ticket, scope) is the completion barrier: it returns once that export and all earlier
+    ones are written, and re-raises the first export failure of the scope. Once an export of a scope
+    has failed, the exports submitted to it afterwards are discarded, so nothing of a failed range gets
+    half written behind the caller's back, while other scopes carry on. Failures stay with their scope,
+    a retried range runs in a fresh scope and does not see them. Items are copied on submit.
+
+    The writer thread is started on first use and again in every forked worker process,
+    since threads do not survive a fork.
+    """
+
+    def __init__(self, max_pending=2, name="AsyncExportQueue"):
+        if max_pending < 1:
+            raise ValueError(f"max_pending should be a positive integer, got {max_pending}.")
+
+        self.max_pending = max_pending
+        self.name = name
+        self._closed = False
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_writer(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue(maxsize=self.max_pending)
+            self._condition = threading.Condition()
+            # Held from allocating a ticket until it is queued, so tickets are written in order.
+            self._submit_lock = threading.Lock()
+            self._next_ticket = 0
+            self._done_ticket = -1
+            self._errors: Dict[Hashable, Exception] = {}
+            self._writer = threading.Thread(target=self._drain, name=self.name, daemon=True)
+            self._writer.start()
+            self._pid = os.getpid()
+
+    def __getstate__(self):
+        # Only the settings travel to other processes, the writer is rebuilt there.
+        return {"max_pending": self.max_pending, "name": self.name, "_closed": self._closed, "_pid": None}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._start_lock = threading.Lock()
+
+    def submit(
+        self,
+        item_exporters: List[BaseExporter],
+        items,
+        job_name: Optional[str] = None,
+        scope: Hashable = None,
+    ) -> int:
+        if self._closed:
+            raise RuntimeError("AsyncExportQueue is closed.")
+        self._ensure_writer()
+        items = snapshot_items(items)
+        # Blocking on a full queue under the submit lock only, the writer needs the condition to make progress.
+        with self._submit_lock:
+            with self._condition:
+                ticket = self._next_ticket
+                self._next_ticket += 1
+            self._queue.put((ticket, item_exporters, items, job_name, scope))
+        return ticket
+
+    def _drain(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is _STOP:
+                    return
+
+                ticket, item_exporters, items, job_name, scope = task
+                if scope in self._errors:
+                    logger.warning(f"Discarding export of {job_name}, an earlier export of its scope failed.")
+                else:
+                    try:
+                        write_items(item_exporters, items, job_name, scope)
+                    except Exception as e:
+                        logger.exception(f"Exporting items of {job_name} failed.")
+                        with self._condition:
+                            self._errors[scope] = e
+
+                with self._condition:
+                    self._done_ticket = ticket
+                    self._condition.notify_all()
+            finally:
+                self._queue.task_done()
+
+    def wait(self, ticket: Optional[int] = None, timeout: Optional[float] = None, scope: Hashable = None):
+        if self._pid != os.getpid():
+            # Nothing was submitted from this process.
+            return
+        with self._condition:
+            if ticket is None:
+                ticket = self._next_ticket - 1
+            if not self._condition.wait_for(lambda: self._done_ticket >= ticket, timeout=timeout):
+                raise TimeoutError(f"Exports up to ticket {ticket} not finished within {timeout} seconds.")
+
+            # The scope is done with once its barrier is passed, later submits to it start clean.
+            error = self._errors.pop(scope, None)
+        if error is not None:
+            raise error
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        if self._pid != os.getpid():
+            return
+        self._queue.put(_STOP)
+        self._writer.join()
@@ -1,7 +1,8 @@
 import collections
-from typing import List
+from typing import List, Union
 
 from indexer.domain import Domain
+from indexer.domain.columnar import ColumnarBatch, RowView
 
 
 class BaseExporter(object):
@@ -20,11 +21,47 @@ class BaseExporter(object):
     def batch_finish(self):
         pass
 
+    def commit_scope(self, scope):
+        """Make everything exported with scope=scope visible, for exporters which write a range in one transaction."""
+        pass
+
+    def rollback_scope(self, scope):
+        pass
 
-def group_by_item_type(items: List[Domain]):
+
+def group_by_item_type(items: List[Union[Domain, ColumnarBatch]], keep_columnar=False):
+    """
+    Group items by domain class. ColumnarBatches are expanded into domain instances unless
+    keep_columnar is set, in which case the batch itself is placed in its domain's group.
+    """
     result = collections.defaultdict(list)
     for item in items:
-        key = item.__class__
-        result[key].append(item)
+        if isinstance(item, ColumnarBatch):
+            if keep_columnar:
+                result[item.domain_cls].append(item)
+            else:
+                result[item.domain_cls].extend(item.to_domains())
+        elif isinstance(item, RowView):
+            result[item.__class__].append(item.to_domain())
+        else:
+            key = item.__class__
+            result[key].append(item)
 
     return result
+
+
+def expand_columnar_batches(items: List[Union[Domain, ColumnarBatch]]) -> List[Domain]:
+    if not any(isinstance(item, ColumnarBatch) for item in items):
+        return items
+
+    expanded = []
+    for item in items:
+        if isinstance(item, ColumnarBatch):
+            expanded.extend(item.to_domains())
+        else:
+            expanded.append(item)
+    return expanded
+
+
+def count_items(items: List[Union[Domain, ColumnarBatch]]) -> int:
+    return sum(len(item) if isinstance(item, ColumnarBatch) else 1 for item in items)
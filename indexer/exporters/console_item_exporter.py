@@ -1,6 +1,6 @@
 import logging
 
-from indexer.exporters.base_exporter import BaseExporter
+from indexer.exporters.base_exporter import BaseExporter, expand_columnar_batches
 
 logger = logging.getLogger(__name__)
 
@@ -8,7 +8,7 @@ logger = logging.getLogger(__name__)
 class ConsoleItemExporter(BaseExporter):
 
     def export_items(self, items, **kwargs):
-        for item in items:
+        for item in expand_columnar_batches(items):
             self.export_item(item, **kwargs)
 
     def export_item(self, item, **kwargs):
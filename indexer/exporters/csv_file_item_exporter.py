@@ -8,7 +8,7 @@ from dateutil.tz import tzlocal
 
 from common.utils.file_utils import smart_open
 from indexer.domain import Domain, dataclass_to_dict
-from indexer.exporters.base_exporter import BaseExporter, group_by_item_type
+from indexer.exporters.base_exporter import BaseExporter, count_items, group_by_item_type
 
 logger = logging.getLogger(__name__)
 
@@ -39,7 +39,9 @@ class CSVFileItemExporter(BaseExporter):
             pass
         end_time = datetime.now(tzlocal())
         logger.info(
-            "Exporting items to CSV file end, Item count: {}, Took {}".format(len(items), (end_time - start_time))
+            "Exporting items to CSV file end, Item count: {}, Took {}".format(
+                count_items(items), (end_time - start_time)
+            )
         )
 
     def split_items_to_file(self, item_type: str, items: List[Domain]):
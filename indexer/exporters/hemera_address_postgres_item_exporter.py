@@ -57,13 +57,11 @@ class HemeraAddressPostgresItemExporter(BaseExporter):
                     table = pg_config["table"]
                     do_update = pg_config["conflict_do_update"]
                     update_strategy = pg_config["update_strategy"]
-                    converter = pg_config["converter"]
+                    row_converter = pg_config["row_converter"]
 
                     cur = conn.cursor()
-                    data = [converter(table, item, do_update) for item in item_group]
-
-                    columns = list(data[0].keys())
-                    values = [tuple(d.values()) + (self.chain_id,) for d in data]
+                    values = [row + (self.chain_id,) for row in row_converter.convert_many(item_group)]
+                    columns = row_converter.columns
 
                     insert_stmt = sql_insert_statement(table, do_update, columns, where_clause=update_strategy)
 
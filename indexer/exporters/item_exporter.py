@@ -17,11 +17,18 @@ def create_item_exporter(output, config):
     if item_exporter_type == ItemExporterType.CONSOLE:
         item_exporter = ConsoleItemExporter()
     elif item_exporter_type == ItemExporterType.POSTGRES:
-        item_exporter = PostgresItemExporter(postgres_url=config["db_service"].jdbc_url)
+        item_exporter = PostgresItemExporter(
+            postgres_url=config["db_service"].jdbc_url, load_mode=config.get("pg_load_mode")
+        )
     elif item_exporter_type == ItemExporterType.JSONFILE:
         item_exporter = JSONFileItemExporter(output, config)
     elif item_exporter_type == ItemExporterType.CSVFILE:
         item_exporter = CSVFileItemExporter(output, config)
+    elif item_exporter_type == ItemExporterType.PARQUETFILE:
+        # pyarrow is only loaded when Parquet files are written.
+        from indexer.exporters.parquet_file_item_exporter import ParquetFileItemExporter
+
+        item_exporter = ParquetFileItemExporter(output, config)
     elif item_exporter_type == ItemExporterType.HEMERA_ADDRESS_POSTGRES:
         item_exporter = HemeraAddressPostgresItemExporter(output, config["chain_id"])
     elif item_exporter_type == ItemExporterType.VOID:
@@ -52,6 +59,8 @@ def determine_item_exporter_type(output):
         return ItemExporterType.JSONFILE
     elif output is not None and output.startswith("csvfile://"):
         return ItemExporterType.CSVFILE
+    elif output is not None and output.startswith("parquetfile://"):
+        return ItemExporterType.PARQUETFILE
     elif output is not None and output == "void":
         return ItemExporterType.VOID
     elif output is None or output == "console":
@@ -66,6 +75,7 @@ class ItemExporterType:
     POSTGRES = "postgres"
     JSONFILE = "jsonfile"
     CSVFILE = "csvfile"
+    PARQUETFILE = "parquetfile"
     CONSOLE = "console"
     UNKNOWN = "unknown"
     HEMERA_ADDRESS_POSTGRES = "hemera_address_postgres"
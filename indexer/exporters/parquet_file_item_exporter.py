@@ -0,0 +1,239 @@
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from dataclasses import fields, is_dataclass
+from datetime import datetime
+from decimal import Decimal
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Type, Union, get_args, get_origin, get_type_hints
+
+import orjson
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from dateutil.tz import tzlocal
+from sqlalchemy import Numeric
+
+from common.converter.pg_converter import domain_model_mapping
+from indexer.domain import Domain
+from indexer.exporters.base_exporter import BaseExporter, count_items, group_by_item_type
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCKS_PER_FILE = os.environ.get("DEFAULT_BLOCKS_PER_FILE", 1000)
+DEFAULT_COMPRESSION = "zstd"
+
+# Parquet decimals hold up to 38 digits in 16 bytes, wider numerics (uint256 amounts) are kept as decimal strings.
+MAX_DECIMAL_PRECISION = 38
+
+
+class ParquetColumn:
+    __slots__ = ("name", "arrow_type", "convert")
+
+    def __init__(self, name: str, arrow_type: pa.DataType, convert=None):
+        self.name = name
+        self.arrow_type = arrow_type
+        self.convert = convert
+
+
+def _unwrap_optional(hint):
+    if get_origin(hint) is Union:
+        args = [arg for arg in get_args(hint) if arg is not type(None)]
+        if len(args) == 1:
+            return args[0]
+    return hint
+
+
+def _string_value(value):
+    # Some fields hold other values than their annotation says, Trace.status is 0 or 1.
+    return value if value is None or isinstance(value, str) else str(value)
+
+
+def _json_value(value):
+    return orjson.dumps(value).decode() if value is not None else None
+
+
+def _decimal_string(value):
+    return str(value) if value is not None else None
+
+
+def _decimal_value(value):
+    return Decimal(value) if value is not None else None
+
+
+def _arrow_column(name: str, hint, model_column) -> Optional[ParquetColumn]:
+    hint = _unwrap_optional(hint)
+    origin = get_origin(hint)
+
+    if hint is bool:
+        return ParquetColumn(name, pa.bool_())
+    if hint is int:
+        if model_column is not None and isinstance(model_column.type, Numeric):
+            precision = model_column.type.precision
+            if precision is not None and precision <= MAX_DECIMAL_PRECISION:
+                return ParquetColumn(name, pa.decimal128(precision, 0), _decimal_value)
+            return ParquetColumn(name, pa.string(), _decimal_string)
+        return ParquetColumn(name, pa.int64())
+    if hint is float:
+        return ParquetColumn(name, pa.float64())
+    if hint is str:
+        return ParquetColumn(name, pa.string(), _string_value)
+    if hint is bytes:
+        return ParquetColumn(name, pa.binary())
+    if origin in (list, List):
+        element = _unwrap_optional(get_args(hint)[0]) if get_args(hint) else None
+        if isinstance(element, type) and is_dataclass(element):
+            # Nested domains (the transactions of a block) are exported as their own type.
+            return None
+        if element in (int, str, bool, float):
+            return ParquetColumn(name, pa.list_(_arrow_column(name, element, None).arrow_type))
+    return ParquetColumn(name, pa.string(), _json_value)
+
+
+@lru_cache(maxsize=None)
+def parquet_columns(domain_cls: Type[Domain]) -> Tuple[ParquetColumn, ...]:
+    """
+    The typed columns of a domain, one per dataclass field. Integer fields stored as NUMERIC in the domain's
+    table become decimals, or decimal strings past 38 digits, the other integers are int64.
+    """
+    hints = get_type_hints(domain_cls)
+    model = domain_model_mapping.get(domain_cls)
+    model_columns = model["table"].__table__.columns if model is not None else {}
+
+    columns = []
+    for field in fields(domain_cls):
+        column = _arrow_column(field.name, hints.get(field.name, str), model_columns.get(field.name))
+        if column is not None:
+            columns.append(column)
+    return tuple(columns)
+
+
+def parquet_schema(domain_cls: Type[Domain]) -> pa.Schema:
+    return pa.schema([pa.field(column.name, column.arrow_type) for column in parquet_columns(domain_cls)])
+
+
+def dictionary_columns(domain_cls: Type[Domain]) -> List[str]:
+    # Addresses repeat a lot within a file, hashes and amounts hardly ever do.
+    return [column.name for column in parquet_columns(domain_cls) if column.name.endswith("address")]
+
+
+def domains_to_table(domain_cls: Type[Domain], items: List[Domain]) -> pa.Table:
+    arrays = []
+    for column in parquet_columns(domain_cls):
+        values = [getattr(item, column.name) for item in items]
+        if column.convert is not None:
+            values = [column.convert(value) for value in values]
+        arrays.append(pa.array(values, type=column.arrow_type))
+    return pa.Table.from_arrays(arrays, schema=parquet_schema(domain_cls))
+
+
+def block_number_field(domain_cls: Type[Domain]) -> Optional[str]:
+    names = {field.name for field in fields(domain_cls)}
+    if "number" in names:
+        return "number"
+    if "block_number" in names:
+        return "block_number"
+    return None
+
+
+class ParquetFileItemExporter(BaseExporter):
+    """
+    Writes every domain type into Parquet files of blocks_per_file blocks, under <dir>/<type>/.
+
+    Windows are aligned on multiples of blocks_per_file and a file is named after the blocks it covers,
+    <type>-<first>-<last>.parquet, so ranges of at least blocks_per_file blocks write one file per window.
+    Files are written under a temporary name and renamed once complete.
+
+    When the scheduler exports a range in a scope, items are converted to Arrow tables as they are exported
+    and the files of the scope are only written once it commits, a failed range leaves none behind. Types
+    without block numbers go to one <type>-<first>-<last>.parquet file per range.
+    """
+
+    def __init__(self, direction, config):
+        self.dir = direction.replace("parquetfile://", "")
+        self.blocks_per_file = int(config.get("blocks_per_file", DEFAULT_BLOCKS_PER_FILE))
+        self.compression = config.get("parquet_compression", DEFAULT_COMPRESSION)
+        self._pending: Dict[object, Dict[Type[Domain], List[pa.Table]]] = {}
+        self._lock = threading.Lock()
+
+    def export_items(self, items, scope=None, **kwargs):
+        start_time = datetime.now(tzlocal())
+
+        tables = {
+            item_type: [domains_to_table(item_type, item_group)]
+            for item_type, item_group in group_by_item_type(items).items()
+            if item_group
+        }
+        if scope is None:
+            self.write_tables(tables)
+        else:
+            with self._lock:
+                pending = self._pending.setdefault(scope, defaultdict(list))
+                for item_type, item_tables in tables.items():
+                    pending[item_type].extend(item_tables)
+
+        end_time = datetime.now(tzlocal())
+        logger.info(
+            "Exporting items to Parquet file end, Item count: {}, Took {}".format(
+                count_items(items), (end_time - start_time)
+            )
+        )
+
+    def commit_scope(self, scope):
+        with self._lock:
+            pending = self._pending.pop(scope, None)
+        if pending:
+            self.write_tables(pending, getattr(scope, "start_block", None), getattr(scope, "end_block", None))
+
+    def rollback_scope(self, scope):
+        with self._lock:
+            self._pending.pop(scope, None)
+
+    def write_tables(
+        self,
+        tables: Dict[Type[Domain], List[pa.Table]],
+        start_block: Optional[int] = None,
+        end_block: Optional[int] = None,
+    ):
+        for item_type, item_tables in tables.items():
+            table = pa.concat_tables(item_tables)
+            number_field = block_number_field(item_type)
+            if number_field is None:
+                self.write_file(item_type, table, start_block, end_block)
+                continue
+
+            table = table.sort_by(number_field)
+            numbers = table.column(number_field)
+            windows = pc.divide(numbers, self.blocks_per_file)
+            for window in pc.unique(windows).to_pylist():
+                window_table = table.filter(pc.equal(windows, window))
+                first = window * self.blocks_per_file
+                last = first + self.blocks_per_file - 1
+                if start_block is not None and end_block is not None:
+                    first, last = max(first, start_block), min(last, end_block)
+                else:
+                    first, last = pc.min_max(window_table.column(number_field)).values()
+                    first, last = first.as_py(), last.as_py()
+                self.write_file(item_type, window_table, first, last)
+
+    def write_file(self, item_type: Type[Domain], table: pa.Table, first: Optional[int], last: Optional[int]):
+        type_dir = os.path.join(self.dir, item_type.type())
+        os.makedirs(type_dir, exist_ok=True)
+        name = f"{item_type.type()}-{first}-{last}.parquet" if first is not None else f"{item_type.type()}.parquet"
+        target_path = os.path.join(type_dir, name)
+        temp_path = os.path.join(type_dir, f".{name}.{uuid.uuid4().hex}.tmp")
+
+        try:
+            pq.write_table(
+                table,
+                temp_path,
+                compression=self.compression,
+                use_dictionary=dictionary_columns(item_type),
+            )
+            os.replace(temp_path, target_path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -1,18 +1,33 @@
+import io
+import itertools
+import json
 import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
 from typing import Type
 
+from psycopg2._json import Json
 from psycopg2.extras import execute_values
 from tqdm import tqdm
 
 from common.converter.pg_converter import domain_model_mapping
-from common.models import HemeraModel
+from common.models import HemeraModel, general_columnar_converter
 from common.services.postgresql_service import PostgreSQLService
-from indexer.exporters.base_exporter import BaseExporter, group_by_item_type
+from indexer.domain.columnar import ColumnarBatch
+from indexer.exporters.base_exporter import BaseExporter, count_items, group_by_item_type
+from indexer.utils.metrics import registry
 
 logger = logging.getLogger(__name__)
 
 COMMIT_BATCH_SIZE = 1000
 
+LOAD_MODES = ["insert", "copy"]
+
+table_rows = registry.counter("hemera_pg_rows_total", "Rows written to each table.", ["table"])
+table_write_seconds = registry.histogram("hemera_pg_write_seconds", "Time spent writing rows of a table.", ["table"])
+
 
 class TqdmExtraFormat(tqdm):
     """Provides both estimated and actual total time format parameters"""
@@ -32,7 +47,50 @@ class PostgresItemExporter(BaseExporter):
         self.postgres_url = service["postgres_url"]
         self.db_version = service.get("db_version")
         self.init_schema = service.get("init_schema")
+        self.load_mode = service.get("load_mode") or "insert"
+        if self.load_mode not in LOAD_MODES:
+            raise ValueError(f"Unknown postgres load mode: {self.load_mode}, should be one of {LOAD_MODES}.")
         # self.service = service
+        # In copy mode the connection holding the open transaction of every export scope (block range).
+        self._scope_connections = {}
+        self._scope_lock = threading.Lock()
+
+    def get_service(self):
+        return PostgreSQLService(self.postgres_url, db_version=self.db_version, init_schema=self.init_schema)
+
+    @contextmanager
+    def _cursor(self, service, scope):
+        if self.load_mode != "copy" or scope is None:
+            with self._cursor(service, scope) as cur:
+                yield cur
+            return
+
+        with self._scope_lock:
+            conn = self._scope_connections.get(scope)
+            if conn is None:
+                conn = service.connection_pool.getconn()
+                self._scope_connections[scope] = conn
+        with conn.cursor() as cur:
+            yield cur
+
+    def _release_scope(self, scope, commit):
+        with self._scope_lock:
+            conn = self._scope_connections.pop(scope, None)
+        if conn is None:
+            return
+        try:
+            if commit:
+                conn.commit()
+            else:
+                conn.rollback()
+        finally:
+            self.get_service().connection_pool.putconn(conn)
+
+    def commit_scope(self, scope):
+        self._release_scope(scope, commit=True)
+
+    def rollback_scope(self, scope):
+        self._release_scope(scope, commit=False)
 
     def export_items(self, items, **kwargs):
         # Initialize main progress bar
@@ -41,20 +99,23 @@ class PostgresItemExporter(BaseExporter):
             desc = f"{job_name}(PG)"
         else:
             desc = "Exporting items"
-        service = PostgreSQLService(self.postgres_url, db_version=self.db_version, init_schema=self.init_schema)
+        service = self.get_service()
+        # Within an export scope the scheduler commits once all jobs of the range have exported.
+        scope = kwargs.get("scope")
+        owns_transaction = self.load_mode == "copy" and scope is None
         self.main_progress = TqdmExtraFormat(
-            total=len(items),
+            total=count_items(items),
             desc=desc.ljust(35),
             unit="items",
             position=0,
             ncols=90,
             bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}] Est: {total_time}",
         )
-        with service.cursor_scope() as cur:
+        with self._cursor(service, scope) as cur:
 
             try:
                 insert_stmt = ""
-                items_grouped_by_type = group_by_item_type(items)
+                items_grouped_by_type = group_by_item_type(items, keep_columnar=True)
                 tables = []
 
                 # Process each item type
@@ -66,12 +127,11 @@ class PostgresItemExporter(BaseExporter):
                         table = pg_config["table"]
                         do_update = pg_config["conflict_do_update"]
                         update_strategy = pg_config["update_strategy"]
-                        converter = pg_config["converter"]
+                        row_converter = pg_config["row_converter"]
 
-                        # Initialize sub-progress bar for current table
                         # Initialize sub-progress bar for current table
                         self.sub_progress = TqdmExtraFormat(
-                            total=len(item_group),
+                            total=count_items(item_group),
                             desc=f"Processing {table.__tablename__}".ljust(35),
                             unit="items",
                             position=1,
@@ -79,16 +139,37 @@ class PostgresItemExporter(BaseExporter):
                             ncols=90,
                             bar_format="{desc}: {percentage:3.0f}%|{bar}| {n_fmt}/{total_fmt} [{elapsed}<{remaining}]",
                         )
-                        data = []
-                        # Process items with progress tracking
+                        rows = []
+                        columnar_data = []
                         for item in item_group:
-                            converted_item = converter(table, item, do_update)
-                            data.append(converted_item)
-                            self.sub_progress.update(1)
-                            self.main_progress.update(1)
-                        if data:
-                            columns = list(data[0].keys())
-                            values = [tuple(d.values()) for d in data]
+                            if isinstance(item, ColumnarBatch):
+                                if row_converter.is_compiled and not row_converter.column_getters:
+                                    columnar_data.append(general_columnar_converter(table, item, do_update))
+                                elif row_converter.is_compiled:
+                                    # Compiled converters read attributes only, the rows need not be built.
+                                    rows.extend(item.rows())
+                                else:
+                                    rows.extend(item.to_domains())
+                            else:
+                                rows.append(item)
+
+                        # Rows go through the converter compiled for this domain and table, see RowConverter
+                        if rows:
+                            values = row_converter.convert_many(rows)
+                            columnar_data.append((row_converter.columns, values))
+                        self.sub_progress.update(count_items(item_group))
+                        self.main_progress.update(count_items(item_group))
+
+                        write_start = time.monotonic()
+                        for columns, values in columnar_data:
+                            if not values:
+                                continue
+                            table_rows.inc(len(values), table=table.__tablename__)
+                            if self.load_mode == "copy":
+                                insert_stmt = copy_and_upsert(
+                                    cur, table, do_update, columns, values, where_clause=update_strategy
+                                )
+                                continue
 
                             insert_stmt = sql_insert_statement(table, do_update, columns, where_clause=update_strategy)
 
@@ -97,17 +178,104 @@ class PostgresItemExporter(BaseExporter):
                                 batch = values[i : i + COMMIT_BATCH_SIZE]
                                 execute_values(cur, insert_stmt, batch)
                                 cur.connection.commit()
+                        table_write_seconds.observe(time.monotonic() - write_start, table=table.__tablename__)
 
                         tables.append(table.__tablename__)
                         self.sub_progress.close()
 
+                if owns_transaction:
+                    # Everything exported by this call becomes visible at once, or not at all.
+                    cur.connection.commit()
+
             except Exception as e:
+                if owns_transaction:
+                    cur.connection.rollback()
                 logger.error(f"Error exporting items: {e}")
                 logger.error(f"{insert_stmt}")
                 raise e
 
 
-def sql_insert_statement(model: Type[HemeraModel], do_update: bool, columns, where_clause=None):
+def copy_and_upsert(cur, model: Type[HemeraModel], do_update: bool, columns, values, where_clause=None):
+    """
+    Stream values into a temporary staging table with COPY FROM STDIN, then move them into the target
+    table with one INSERT ... SELECT carrying the same ON CONFLICT clause as sql_insert_statement.
+    The caller owns the transaction, the staging table is dropped when it commits.
+    """
+    staging_table = f"_staging_{model.__tablename__}_{next(_staging_counter)}"
+    column_list = ", ".join(columns)
+
+    cur.execute(
+        "CREATE TEMP TABLE {} ON COMMIT DROP AS SELECT {} FROM {}.{} WITH NO DATA".format(
+            staging_table, column_list, model.schema(), model.__tablename__
+        )
+    )
+    cur.execute("ALTER TABLE {} ADD COLUMN _copy_ordinal BIGSERIAL".format(staging_table))
+    cur.copy_expert(
+        "COPY {} ({}) FROM STDIN".format(staging_table, column_list),
+        io.StringIO("".join(copy_text_line(row) for row in values)),
+    )
+
+    pk_list = [pk.name for pk in model.__table__.primary_key.columns]
+    if do_update and set(pk_list).issubset(columns):
+        # A single INSERT may not update the same row twice, keep the last value per key like
+        # row by row inserts would.
+        select = "SELECT DISTINCT ON ({pk}) {columns} FROM {staging} ORDER BY {pk}, _copy_ordinal DESC".format(
+            pk=", ".join(pk_list), columns=column_list, staging=staging_table
+        )
+    else:
+        select = "SELECT {} FROM {} ORDER BY _copy_ordinal".format(column_list, staging_table)
+
+    insert_stmt = sql_insert_statement(model, do_update, columns, where_clause=where_clause, source=select)
+    cur.execute(insert_stmt)
+    cur.execute("DROP TABLE {}".format(staging_table))
+    return insert_stmt
+
+
+_staging_counter = itertools.count()
+
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+
+def copy_text_value(value) -> str:
+    """Render one value in the text format of COPY, \\N stands for NULL."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\\\x" + bytes(value).hex()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Json):
+        return value.dumps(value.adapted).translate(_COPY_ESCAPES)
+    if isinstance(value, dict):
+        return json.dumps(value).translate(_COPY_ESCAPES)
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value).translate(_COPY_ESCAPES)
+    return str(value).translate(_COPY_ESCAPES)
+
+
+def _array_literal(values) -> str:
+    elements = []
+    for value in values:
+        if value is None:
+            elements.append("NULL")
+            continue
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            element = "\\x" + bytes(value).hex()
+        elif isinstance(value, bool):
+            element = "t" if value else "f"
+        else:
+            element = str(value)
+        elements.append('"' + element.replace("\\", "\\\\").replace('"', '\\"') + '"')
+    return "{" + ",".join(elements) + "}"
+
+
+def copy_text_line(row) -> str:
+    return "\t".join(copy_text_value(value) for value in row) + "\n"
+
+
+def sql_insert_statement(model: Type[HemeraModel], do_update: bool, columns, where_clause=None, source="VALUES %s"):
     pk_list = []
     for pk in model.__table__.primary_key.columns:
         pk_list.append(pk.name)
@@ -115,19 +283,21 @@ def sql_insert_statement(model: Type[HemeraModel], do_update: bool, columns, whe
     update_list = list(set(columns) - set(pk_list))
 
     if do_update:
-        insert_stmt = "INSERT INTO {}.{} ({}) VALUES %s ON CONFLICT ({}) DO UPDATE SET {}".format(
+        insert_stmt = "INSERT INTO {}.{} ({}) {} ON CONFLICT ({}) DO UPDATE SET {}".format(
             model.schema(),
             model.__tablename__,
             ", ".join(columns),
+            source,
             ", ".join(pk_list),
             ", ".join(["{} = EXCLUDED.{}".format(column, column) for column in update_list]),
         )
         if where_clause:
             insert_stmt += " WHERE {}".format(where_clause)
     else:
-        insert_stmt = "INSERT INTO {}.{} ({}) VALUES %s ON CONFLICT DO NOTHING ".format(
+        insert_stmt = "INSERT INTO {}.{} ({}) {} ON CONFLICT DO NOTHING ".format(
             model.schema(),
             model.__tablename__,
             ", ".join(columns),
+            source,
         )
     return insert_stmt
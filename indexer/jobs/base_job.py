@@ -1,5 +1,5 @@
 import logging
-import threading
+import time
 from collections import defaultdict
 from datetime import datetime
 from typing import Generic, List, Type, TypeVar, Union, get_args, get_origin, get_type_hints
@@ -11,17 +11,29 @@ from common.converter.pg_converter import domain_model_mapping
 from common.utils.exception_control import FastShutdownError
 from common.utils.format_utils import to_snake_case
 from indexer.domain import Domain
+from indexer.domain.columnar import ColumnarBatch
+from indexer.domain.log import Log
 from indexer.domain.transaction import Transaction
-from indexer.utils.reorg import should_reorg
+from indexer.exporters.async_export_queue import write_items
+from indexer.jobs.run_context import DEFAULT_RUN_CONTEXT, RunContext
+from indexer.specification.specification import TransactionFilterByLogs
+from indexer.utils.log_index import topic_specifications
+from indexer.utils.metrics import registry
+from indexer.utils.provider import get_provider_from_uri
+from indexer.utils.reorg import reorged_tables
 
 T = TypeVar("T")
 
+job_run_seconds = registry.histogram("hemera_job_run_seconds", "Time a job took to run a batch.", ["job"])
+job_failures = registry.counter("hemera_job_failures_total", "Batches a job failed to run.", ["job"])
+
 
 class Collector(Generic[T]):
 
-    def __init__(self, job, collect_types: List[Domain]):
+    def __init__(self, job, collect_types: List[Domain], run_context: RunContext):
         self.job = job
         self.collect_types = set(collect_types)
+        self.run_context = run_context
 
     def check_collect_type(self, cls):
         if cls not in self.collect_types:
@@ -32,13 +44,13 @@ class Collector(Generic[T]):
 
     def collect_item(self, key: str, data: Domain):
         self.check_collect_type(type(data))
-        with self.job._data_buff_lock[key]:
-            self.job._data_buff[key].append(data)
+        with self.run_context.data_buff_lock[key]:
+            self.run_context.data_buff[key].append(data)
 
     def collect_items(self, key, datas: List[Domain]):
         self.check_collect_type(type(datas[0]))
-        with self.job._data_buff_lock[key]:
-            self.job._data_buff[key].extend(datas)
+        with self.run_context.data_buff_lock[key]:
+            self.run_context.data_buff[key].extend(datas)
 
     def collect_domain(self, domain: Domain):
         self.check_collect_type(type(domain))
@@ -50,13 +62,18 @@ class Collector(Generic[T]):
 
     def collect(self, domain: Domain):
         self.check_collect_type(type(domain))
-        with self.job._data_buff_lock[domain.type()]:
-            self.job._data_buff[domain.type()].append(domain)
+        with self.run_context.data_buff_lock[domain.type()]:
+            self.run_context.data_buff[domain.type()].append(domain)
 
     def collects(self, domains: List[Domain]):
         self.check_collect_type(type(domains[0]))
-        with self.job._data_buff_lock[domains[0].type()]:
-            self.job._data_buff[domains[0].type()].extend(domains)
+        with self.run_context.data_buff_lock[domains[0].type()]:
+            self.run_context.data_buff[domains[0].type()].extend(domains)
+
+    def collect_batch(self, batch: ColumnarBatch):
+        self.check_collect_type(batch.domain_cls)
+        with self.run_context.data_buff_lock[batch.type()]:
+            self.run_context.data_buff.add_batch(batch.type(), batch)
 
     def update(self, domains: List[Domain]):
         self.job._update_domains(domains)
@@ -89,9 +106,6 @@ class BaseJobMeta(type):
 
 
 class BaseJob(metaclass=BaseJobMeta):
-    _data_buff = defaultdict(list)
-    _data_buff_lock = defaultdict(threading.Lock)
-
     tokens = None
 
     is_locked = False
@@ -108,6 +122,14 @@ class BaseJob(metaclass=BaseJobMeta):
     def job_name(self):
         return self.__class__.__name__
 
+    @property
+    def _data_buff(self):
+        return self._run_context.data_buff
+
+    @property
+    def _data_buff_lock(self):
+        return self._run_context.data_buff_lock
+
     @classmethod
     def init_token_cache(cls, _token=None):
         cls.tokens = _token
@@ -117,12 +139,17 @@ class BaseJob(metaclass=BaseJobMeta):
         self._required_output_types = kwargs["required_output_types"]
         self._item_exporters = kwargs["item_exporters"]
         self._batch_web3_provider = kwargs["batch_web3_provider"]
-        self._web3 = Web3(Web3.HTTPProvider(self._batch_web3_provider.endpoint_uri))
+        self._web3 = Web3(get_provider_from_uri(self._batch_web3_provider.endpoint_uri))
         self.logger = logging.getLogger(self.__class__.__name__)
         self._is_batch = kwargs["batch_size"] > 1 if kwargs.get("batch_size") else False
         self._reorg = kwargs["reorg"] if kwargs.get("reorg") else False
 
-        self._chain_id = kwargs.get("chain_id") or (self._web3.eth.chain_id if self._batch_web3_provider else None)
+        self._chain_id = (
+            kwargs.get("chain_id")
+            or kwargs["config"].get("chain_id")
+            or (self._web3.eth.chain_id if self._batch_web3_provider else None)
+        )
+        self._run_context = DEFAULT_RUN_CONTEXT
 
         self._should_reorg = False
         self._should_reorg_type = set()
@@ -131,7 +158,11 @@ class BaseJob(metaclass=BaseJobMeta):
         job_name_snake = to_snake_case(self.job_name)
         self.user_defined_config = kwargs["config"][job_name_snake] if kwargs["config"].get(job_name_snake) else {}
 
-    def run(self, **kwargs):
+    def run(self, run_context: RunContext = None, **kwargs):
+        # A job instance serves one run at a time, the context stays bound until the next run
+        # so that callers can still inspect the buffer afterwards.
+        self._run_context = run_context if run_context is not None else DEFAULT_RUN_CONTEXT
+        start = time.monotonic()
         try:
             self._start(**kwargs)
 
@@ -152,8 +183,12 @@ class BaseJob(metaclass=BaseJobMeta):
             if not self._reorg:
                 self._export()
 
+        except Exception:
+            job_failures.inc(job=self.job_name)
+            raise
         finally:
             self._end()
+            job_run_seconds.observe(time.monotonic() - start, job=self.job_name)
 
     def _start(self, **kwargs):
         pass
@@ -162,17 +197,16 @@ class BaseJob(metaclass=BaseJobMeta):
         if self._service is None:
             raise FastShutdownError("PG Service is not set")
 
-        reorg_block = int(kwargs["start_block"])
-
         output_table = {}
         for domain in self.output_types:
-            output_table[domain_model_mapping[domain.__name__]["table"]] = domain.type()
-            # output_table.add(domain_model_mapping[domain.__name__]["table"])
+            if domain in domain_model_mapping:
+                output_table[domain_model_mapping[domain]["table"]] = domain.type()
 
-        for table in output_table.keys():
-            if should_reorg(reorg_block, table, self._service):
-                self._should_reorg_type.add(output_table[table])
-                self._should_reorg = True
+        for table in reorged_tables(
+            list(output_table.keys()), int(kwargs["start_block"]), int(kwargs["end_block"]), self._service
+        ):
+            self._should_reorg_type.add(output_table[table])
+            self._should_reorg = True
 
     def _end(self):
         if self._reorg:
@@ -242,7 +276,7 @@ class BaseJob(metaclass=BaseJobMeta):
             else:
                 parameters[param] = []
 
-        parameters["output"] = Collector(self, self.output_types)
+        parameters["output"] = Collector(self, self.output_types, self._run_context)
         return parameters
 
     def _udf(self, **kwargs):
@@ -253,12 +287,13 @@ class BaseJob(metaclass=BaseJobMeta):
 
         for output_type in self.output_types:
             if output_type in self._required_output_types:
-                items.extend(self._data_buff[output_type.type()])
+                # Columnar batches are handed over as they are, exporters convert them column by column.
+                items.extend(self._data_buff.get_exportable(output_type.type()))
 
-        for item_exporter in self._item_exporters:
-            item_exporter.open()
-            item_exporter.export_items(items, job_name=self.job_name)
-            item_exporter.close()
+        if self._run_context.export_queue is not None:
+            self._run_context.submit_export(self._item_exporters, items, self.job_name)
+        else:
+            write_items(self._item_exporters, items, self.job_name, scope=self._run_context.export_scope)
 
     def get_buff(self):
         return self._data_buff
@@ -285,7 +320,15 @@ class FilterTransactionDataJob(ExtensionJob):
         raise NotImplementedError
 
     def get_filter_transactions(self):
-        return list(filter(self.get_filter().is_satisfied_by, self._data_buff[Transaction.type()]))
+        transaction_filter = self.get_filter()
+        if isinstance(transaction_filter, TransactionFilterByLogs):
+            hashes = self._run_context.log_index().transaction_hashes(transaction_filter.specifications)
+            return [transaction for transaction in self._data_buff[Transaction.type()] if transaction.hash in hashes]
+        return list(filter(transaction_filter.is_satisfied_by, self._data_buff[Transaction.type()]))
+
+    def get_filter_logs(self) -> List[Log]:
+        """The logs of the run matching the TopicSpecifications of get_filter, looked up in the run's log index."""
+        return self._run_context.log_index().match(topic_specifications(self.get_filter()))
 
 
 def is_overwrite_udf(cls: Type[BaseJob]):
@@ -1,94 +1,75 @@
 import logging
-import subprocess
-from typing import Union
 
 from sqlalchemy import and_
 
 from common.models.blocks import Blocks
-from common.utils.format_utils import as_dict
-from indexer.domain import dict_to_dataclass
+from common.utils.exception_control import ReorgDetectedError
+from common.utils.format_utils import bytes_to_hex_str
 from indexer.domain.block import Block
 from indexer.jobs.base_job import BaseJob
+from indexer.utils.reorg import DEFAULT_HEADER_WINDOW_SIZE, HeaderWindow, find_fork_point
 
 logger = logging.getLogger(__name__)
 
 
 class CheckBlockConsensusJob(BaseJob):
+    """
+    Checks that every block of a batch links to the canonical block before it.
+
+    The hashes of the last header_window_size blocks are kept in memory, the database is only read when a
+    batch does not follow the blocks already seen. On a parent hash mismatch the fork point is searched
+    in the window and ReorgDetectedError asks the scheduler to index the blocks from there again.
+    """
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self._config = kwargs["config"]
-        self._batch_web3_debug_provider = kwargs["batch_web3_debug_provider"]
-        self._batch_size = kwargs["batch_size"]
-        self._multicall = kwargs["multicall"]
-        self._debug_batch_size = kwargs["debug_batch_size"]
         self.db_service = self._config.get("db_service") if "db_service" in self._config else None
-        self._postgre_uri = self.db_service.get_service_uri() if self.db_service else None
 
-        self.last_batch_end_block = None
-        self.check_switch = self._config.get("db_service", None) is not None
+        self.check_switch = self.db_service is not None
+        self._header_window = HeaderWindow(
+            self.user_defined_config.get("header_window_size", DEFAULT_HEADER_WINDOW_SIZE)
+        )
 
     def _process(self, **kwargs):
         if not self.check_switch:
             return
 
-        batch_blocks = self._data_buff[Block.type()]
-
-        if self.last_batch_end_block:
-            batch_blocks = [self.last_batch_end_block] + batch_blocks
-        else:
-            last_block = self._query_last_block(batch_blocks[0])
-            if last_block:
-                batch_blocks = [last_block] + batch_blocks
-
-        batch_blocks.reverse()
-        parent_hash = batch_blocks[0].parent_hash
-        for block in batch_blocks[1:]:
-            block_hash = block.hash
-            if block_hash != parent_hash:
-                # non-consensus detected
-                ranges = max(len(batch_blocks), 5)
-                command = [
-                    "python",
-                    "hemera.py",
-                    "reorg",
-                    "-p",
-                    self._batch_web3_provider.endpoint_uri,
-                    "-d",
-                    self._batch_web3_debug_provider.endpoint_uri,
-                    "-b",
-                    f"{self._batch_size}",
-                    "--debug-batch-size",
-                    f"{self._debug_batch_size}",
-                    "-m",
-                    f"{self._multicall}",
-                    "-pg",
-                    self._postgre_uri,
-                    "--block-number",
-                    f"{block.number}",
-                    "--ranges",
-                    f"{ranges}",
-                    "--log-file",
-                    f"./logs/auto_reorg_{block.number}_{ranges}.log",
-                ]
-                subprocess.Popen(command, start_new_session=True)
-                self.logger.info(f"Reorg process started with command: {command}")
-                break
-
-            parent_hash = block.parent_hash
-
-        self.last_batch_end_block = batch_blocks[0]
-
-    def _query_last_block(self, block: Block) -> Union[Block, None]:
-        if block is None:
-            return None
-
-        check_block_number = block.number - 1
+        batch_blocks = sorted(self._data_buff[Block.type()], key=lambda block: block.number)
+        if not batch_blocks:
+            return
 
+        if batch_blocks[0].number - 1 not in self._header_window:
+            self._load_header_window(batch_blocks[0].number - 1)
+
+        for block in batch_blocks:
+            parent_hash = self._header_window.hash_at(block.number - 1)
+            if parent_hash is not None and parent_hash != block.parent_hash:
+                fork_point = find_fork_point(self._batch_web3_provider.make_request, self._header_window, block.number)
+                self._header_window.drop_from(fork_point)
+                raise ReorgDetectedError(
+                    fork_point,
+                    f"Block {block.number} does not follow the indexed block {block.number - 1}, "
+                    f"the chain reorganized from block {fork_point}.",
+                )
+            self._header_window.add(block.number, block.hash, block.parent_hash)
+
+    def _load_header_window(self, block_number: int):
         session = self.db_service.get_service_session()
         try:
-            result = session.query(Blocks).filter(and_(Blocks.number == check_block_number)).first()
+            result = (
+                session.query(Blocks.number, Blocks.hash, Blocks.parent_hash)
+                .filter(
+                    and_(
+                        Blocks.number > block_number - self._header_window.size,
+                        Blocks.number <= block_number,
+                        Blocks.reorg == False,
+                    )
+                )
+                .all()
+            )
         finally:
             session.close()
 
-        block = dict_to_dataclass(as_dict(result), Block) if result else None
-        return block
+        for number, block_hash, parent_hash in sorted(result):
+            self._header_window.add(number, bytes_to_hex_str(block_hash), bytes_to_hex_str(parent_hash))
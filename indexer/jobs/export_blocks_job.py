@@ -36,6 +36,8 @@ class ExportBlocksJob(BaseExportJob):
             kwargs["batch_size"],
             kwargs["max_workers"],
             job_name=self.__class__.__name__,
+            rpc_method="eth_getBlockByNumber",
+            endpoint_uri=self._batch_web3_provider.endpoint_uri,
         )
         self._is_batch = kwargs["batch_size"] > 1
         self._filters = flatten(kwargs.get("filters", []))
@@ -47,8 +49,7 @@ class ExportBlocksJob(BaseExportJob):
         if self._service is None:
             raise FastShutdownError("PG Service is not set")
 
-        reorg_block = int(kwargs["start_block"])
-        set_reorg_sign(self._reorg_jobs, reorg_block, self._service)
+        set_reorg_sign(self._reorg_jobs, int(kwargs["start_block"]), int(kwargs["end_block"]), self._service)
         self._should_reorg_type.add(Block.type())
         self._should_reorg = True
 
@@ -16,7 +16,7 @@ class ExportReorgJob(BaseJob):
         self._should_reorg = True
 
     def _process(self, **kwargs):
-        block_number = int(kwargs["start_block"])
+        start_block, end_block = int(kwargs["start_block"]), int(kwargs["end_block"])
         conn = self._service.get_conn()
         cur = conn.cursor()
 
@@ -25,10 +25,10 @@ class ExportReorgJob(BaseJob):
                 if len(self._data_buff[key]) > 0:
                     items = self._data_buff[key]
                     domain = type(items[0])
-                    if domain.__name__ not in domain_model_mapping:
+                    if domain not in domain_model_mapping:
                         continue
 
-                    pg_config = domain_model_mapping[domain.__name__]
+                    pg_config = domain_model_mapping[domain]
 
                     table = pg_config["table"]
                     do_update = pg_config["conflict_do_update"]
@@ -46,7 +46,7 @@ class ExportReorgJob(BaseJob):
                     insert_stmt = sql_insert_statement(table, do_update, columns, where_clause=update_strategy)
 
                     if table.__tablename__ != "blocks":
-                        cur.execute(self._build_clean_sql(table.__tablename__, block_number))
+                        cur.execute(self._build_clean_sql(table.__tablename__), (start_block, end_block))
 
                     execute_values(cur, insert_stmt, values, page_size=500)
 
@@ -61,5 +61,5 @@ class ExportReorgJob(BaseJob):
         self._data_buff.clear()
 
     @staticmethod
-    def _build_clean_sql(table, block_number):
-        return f"DELETE FROM {table} WHERE block_number={block_number} AND reorg=TRUE"
+    def _build_clean_sql(table):
+        return f"DELETE FROM {table} WHERE block_number BETWEEN %s AND %s AND reorg=TRUE"
@@ -1,27 +1,37 @@
 import logging
+import random
 from dataclasses import dataclass
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Set, Union
 
 from eth_utils import to_hex
 from hexbytes import HexBytes
+from sqlalchemy import tuple_
 
+from common.models.current_token_balances import CurrentTokenBalances
+from common.utils.format_utils import bytes_to_hex_str, hex_str_to_bytes
 from common.utils.web3_utils import ZERO_ADDRESS
+from enumeration.token_type import TokenType
 from indexer.domain import dict_to_dataclass
 from indexer.domain.current_token_balance import CurrentTokenBalance
 from indexer.domain.token_balance import TokenBalance
 from indexer.domain.token_transfer import ERC20TokenTransfer, ERC721TokenTransfer, ERC1155TokenTransfer
 from indexer.executors.batch_work_executor import BatchWorkExecutor
+from indexer.exporters.postgres_item_exporter import PostgresItemExporter
 from indexer.jobs.base_job import BaseExportJob
 from indexer.utils.abi import pad_address, uint256_to_bytes
 from indexer.utils.abi_setting import ERC20_BALANCE_OF_FUNCTION, ERC1155_TOKEN_ID_BALANCE_OF_FUNCTION
 from indexer.utils.collection_utils import distinct_collections_by_group
 from indexer.utils.exception_recorder import ExceptionRecorder
 from indexer.utils.multicall_hemera.util import calculate_execution_time
+from indexer.utils.token_balance_ledger import DEFAULT_MAX_HOLDERS, LedgerKey, TokenBalanceLedger, transfer_keys
 from indexer.utils.token_fetcher import TokenFetcher
 
 logger = logging.getLogger(__name__)
 exception_recorder = ExceptionRecorder()
 
+DEFAULT_RECONCILE_SAMPLE_RATE = 0.05
+DATABASE_SEED_CHUNK_SIZE = 1000
+
 
 @dataclass(frozen=True)
 class TokenBalanceParam:
@@ -51,12 +61,166 @@ class ExportTokenBalancesJob(BaseExportJob):
         self._is_multi_call = kwargs["multicall"]
         self.token_fetcher = TokenFetcher(self._web3, kwargs)
 
+        self._ledger = None
+        if self.user_defined_config.get("erc20_balance_ledger", False):
+            self._ledger = TokenBalanceLedger(
+                max_holders=int(self.user_defined_config.get("ledger_max_holders", DEFAULT_MAX_HOLDERS)),
+                spill_dir=self.user_defined_config.get("ledger_spill_dir"),
+            )
+            self._reconcile_tokens = {
+                token.lower() for token in self.user_defined_config.get("ledger_reconcile_tokens") or []
+            }
+            self._reconcile_sample_rate = float(
+                self.user_defined_config.get("ledger_reconcile_sample_rate", DEFAULT_RECONCILE_SAMPLE_RATE)
+            )
+            self._absent_holders_hold_nothing = self.user_defined_config.get(
+                "ledger_absent_holders_hold_nothing", False
+            )
+            # The table only tells the balances before a batch when every earlier block went through it,
+            # which ranges indexed side by side or exported elsewhere do not guarantee.
+            self._seed_from_database = (
+                self._service is not None
+                and not kwargs["config"].get("parallel_ranges", False)
+                and any(isinstance(exporter, PostgresItemExporter) for exporter in kwargs["item_exporters"])
+            )
+            # Tokens whose balances moved without a transfer (fee on transfer, rebasing), read with balanceOf.
+            self._balance_of_tokens: Set[str] = set()
+
     @calculate_execution_time
     def _collect(self, **kwargs):
         token_transfers = self._collect_all_token_transfers()
         parameters = extract_token_parameters(token_transfers)
+        if self._ledger is not None:
+            ledger_keys = self._collect_ledger_balances(token_transfers, kwargs["start_block"], kwargs["end_block"])
+            parameters = [
+                parameter
+                for parameter in parameters
+                if parameter["token_type"] != TokenType.ERC20.value
+                or (parameter["token_address"], parameter["address"]) not in ledger_keys
+            ]
         self._collect_batch(parameters)
 
+    @calculate_execution_time
+    def _collect_ledger_balances(self, token_transfers, start_block, end_block) -> Set[LedgerKey]:
+        """
+        Collects the balances of ERC-20 transfers computed by the ledger, returns the (token, holder) pairs
+        they cover. The other pairs, those of tokens read with balanceOf and of holders whose balance could
+        not be seeded, are left to balanceOf.
+        """
+        transfers = [
+            transfer
+            for transfer in token_transfers
+            if isinstance(transfer, ERC20TokenTransfer) and transfer.token_address not in self._balance_of_tokens
+        ]
+        self._ledger.begin(start_block)
+        self._seed_ledger(transfer_keys(transfers), start_block)
+        balances = self._ledger.apply(transfers, end_block)
+
+        drifted_tokens = {token for (token, _, _), (balance, _) in balances.items() if balance < 0}
+        if drifted_tokens:
+            logger.warning(
+                f"Tokens {sorted(drifted_tokens)} moved balances without transfers, they are read with balanceOf."
+            )
+            self._balance_of_tokens.update(drifted_tokens)
+        drifted_tokens.update(self._reconcile_ledger(balances))
+        for token in drifted_tokens:
+            self._ledger.discard_token(token)
+
+        self._collect_items(
+            TokenBalance.type(),
+            [
+                TokenBalance(
+                    address=address,
+                    token_id=None,
+                    token_type=TokenType.ERC20.value,
+                    token_address=token,
+                    balance=balance,
+                    block_number=block_number,
+                    block_timestamp=block_timestamp,
+                )
+                for (token, address, block_number), (balance, block_timestamp) in balances.items()
+                if token not in drifted_tokens
+            ],
+        )
+        return {(token, address) for token, address, _ in balances if token not in drifted_tokens}
+
+    def _seed_ledger(self, keys: List[LedgerKey], start_block):
+        missing = self._ledger.missing(keys)
+        if not missing:
+            return
+
+        # A pair untouched since the ledger started holds the balance it had before the ledger's first block.
+        seeds = self._database_balances(missing) if self._seed_from_database else {}
+        if self._absent_holders_hold_nothing:
+            seeds = {key: seeds.get(key, 0) for key in missing}
+
+        unseeded = [key for key in missing if key not in seeds]
+        if unseeded:
+            for token_balance in self.token_fetcher.fetch_token_balance(
+                [balance_parameter(token, address, start_block - 1) for token, address in unseeded]
+            ):
+                if token_balance["balance"] is not None:
+                    seeds[(token_balance["token_address"], token_balance["address"])] = token_balance["balance"]
+
+        for key, balance in seeds.items():
+            self._ledger.set(key, balance)
+
+    def _database_balances(self, keys: List[LedgerKey]) -> Dict[LedgerKey, int]:
+        seeds = {}
+        session = self._service.get_service_session()
+        try:
+            for index in range(0, len(keys), DATABASE_SEED_CHUNK_SIZE):
+                chunk = keys[index : index + DATABASE_SEED_CHUNK_SIZE]
+                result = (
+                    session.query(
+                        CurrentTokenBalances.token_address,
+                        CurrentTokenBalances.address,
+                        CurrentTokenBalances.balance,
+                        CurrentTokenBalances.block_number,
+                    )
+                    .filter(
+                        tuple_(CurrentTokenBalances.token_address, CurrentTokenBalances.address).in_(
+                            [(hex_str_to_bytes(token), hex_str_to_bytes(address)) for token, address in chunk]
+                        ),
+                        CurrentTokenBalances.token_id == -1,
+                        CurrentTokenBalances.reorg == False,
+                    )
+                    .all()
+                )
+                for token, address, balance, block_number in result:
+                    # Rows written from the ledger's first block on come from an earlier run of those blocks.
+                    if balance is not None and block_number < self._ledger.start_block:
+                        seeds[(bytes_to_hex_str(token), bytes_to_hex_str(address))] = int(balance)
+        finally:
+            session.close()
+        return seeds
+
+    def _reconcile_ledger(self, balances) -> Set[str]:
+        """
+        Checks a sample of the balances of the tokens flagged in ledger_reconcile_tokens with balanceOf, returns
+        those that drifted. Their balances in this batch are read with balanceOf and their holders seeded again.
+        """
+        sampled = [
+            (key, balance)
+            for key, (balance, _) in balances.items()
+            if key[0] in self._reconcile_tokens and random.random() < self._reconcile_sample_rate
+        ]
+        if not sampled:
+            return set()
+
+        token_balances = self.token_fetcher.fetch_token_balance(
+            [balance_parameter(token, address, block_number) for (token, address, block_number), _ in sampled]
+        )
+        drifted_tokens = set()
+        for token_balance, ((token, address, block_number), balance) in zip(token_balances, sampled):
+            if token_balance["balance"] != balance:
+                logger.warning(
+                    f"Ledger balance {balance} of {address} in token {token} at block {block_number} differs "
+                    f"from balanceOf {token_balance['balance']}, the token is seeded again."
+                )
+                drifted_tokens.add(token)
+        return drifted_tokens
+
     @calculate_execution_time
     def _collect_batch(self, parameters):
         token_balances = self.token_fetcher.fetch_token_balance(parameters)
@@ -109,6 +273,20 @@ def encode_balance_abi_parameter(address, token_type, token_id):
         return to_hex(HexBytes(ERC20_BALANCE_OF_FUNCTION.get_signature()) + encoded_arguments)
 
 
+def balance_parameter(token_address, address, block_number):
+    return {
+        "address": address,
+        "token_address": token_address,
+        "token_id": None,
+        "token_type": TokenType.ERC20.value,
+        "param_to": token_address,
+        "param_data": encode_balance_abi_parameter(address, TokenType.ERC20.value, None),
+        "param_number": block_number,
+        "block_number": block_number,
+        "block_timestamp": None,
+    }
+
+
 @calculate_execution_time
 def extract_token_parameters(
     token_transfers: List[Union[ERC20TokenTransfer, ERC721TokenTransfer, ERC1155TokenTransfer]],
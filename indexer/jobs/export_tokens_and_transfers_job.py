@@ -75,6 +75,7 @@ class ExportTokensAndTransfersJob(FilterTransactionDataJob):
         self._is_batch = kwargs["batch_size"] > 1
         self.weth_address = self.user_defined_config.get("weth_address")
         self.filter_token_address = self.user_defined_config.get("filter_token_address") or []
+        self._token_types: Dict[str, str] = {}
 
     def get_filter(self):
         filters = []
@@ -100,25 +101,28 @@ class ExportTokensAndTransfersJob(FilterTransactionDataJob):
 
     def _collect(self, **kwargs):
 
-        filtered_logs = [
-            log
-            for log in self._data_buff[Log.type()]
-            if log.topic0
-            in [
-                ERC20_TRANSFER_EVENT.get_signature(),
-                ERC1155_SINGLE_TRANSFER_EVENT.get_signature(),
-                ERC1155_BATCH_TRANSFER_EVENT.get_signature(),
-            ]
-            or (
-                log.topic0 in [WETH_DEPOSIT_EVENT.get_signature(), WETH_WITHDRAW_EVENT.get_signature()]
-                and log.address == self.weth_address
+        specifications = [
+            TopicSpecification(
+                topics=[
+                    ERC20_TRANSFER_EVENT.get_signature(),
+                    ERC1155_SINGLE_TRANSFER_EVENT.get_signature(),
+                    ERC1155_BATCH_TRANSFER_EVENT.get_signature(),
+                ]
             )
         ]
+        if self.weth_address:
+            specifications.append(
+                TopicSpecification(
+                    addresses=[self.weth_address],
+                    topics=[WETH_DEPOSIT_EVENT.get_signature(), WETH_WITHDRAW_EVENT.get_signature()],
+                )
+            )
+        filtered_logs = self._run_context.log_index().match(specifications)
 
         self._batch_work_executor.execute(
             filtered_logs,
             self._extract_batch,
-            total_items=len(self._data_buff[Log.type()]),
+            total_items=len(filtered_logs),
         )
         self._batch_work_executor.wait()
 
@@ -139,11 +143,17 @@ class ExportTokensAndTransfersJob(FilterTransactionDataJob):
                     block_number=transfer.block_number,
                 )
 
+        # Only the tokens of this batch are read from the tokens table, evicted ones are read again.
+        self.tokens.load(token_dict.keys())
+        token_types: Dict[str, str] = {}
         for address, token in token_dict.items():
-            if address not in self.tokens:
+            cached_token = self.tokens.get(address)
+            if cached_token is None:
                 new_token_dict[address] = token
             else:
-                old_token_dict[address] = token
+                token_types[address] = cached_token["token_type"]
+                if self.tokens.total_supply_due(address):
+                    old_token_dict[address] = token
 
         self._batch_work_executor.execute(
             [dataclass_to_dict(x) for x in new_token_dict.values()],
@@ -154,8 +164,12 @@ class ExportTokensAndTransfersJob(FilterTransactionDataJob):
 
         for token in self.get_buff()[Token.type()]:
             self.tokens[token.address] = asdict(token)
+            token_types[token.address] = token.token_type
+        self._token_types = token_types
 
-        filtered_old_tokens = [token for token in token_dict.values() if token.token_type != TokenType.ERC1155.value]
+        filtered_old_tokens = [
+            token for token in old_token_dict.values() if token.token_type != TokenType.ERC1155.value
+        ]
         self._batch_work_executor.execute(
             [dataclass_to_dict(x) for x in filtered_old_tokens],
             self._export_token_total_supply_batch,
@@ -178,7 +192,7 @@ class ExportTokensAndTransfersJob(FilterTransactionDataJob):
     def _generate_token_transfers(self, token_transfers):
         for transfer in token_transfers:
             if transfer.token_id is None:
-                transfer.token_type = self.tokens[transfer.token_address]["token_type"]
+                transfer.token_type = self._token_types[transfer.token_address]
             self._collect_domain(transfer.to_specific_transfer())
 
     def _export_token_info_batch(self, tokens):
@@ -189,6 +203,7 @@ class ExportTokensAndTransfersJob(FilterTransactionDataJob):
     def _export_token_total_supply_batch(self, tokens):
         token_updates = tokens_total_supply_rpc_requests(self._batch_web3_provider.make_request, tokens, self._is_batch)
         for token in token_updates:
+            self.tokens.total_supply_refreshed(token["address"], token.get("total_supply"))
             if token.get("total_supply") is not None:
                 self._collect_item(UpdateToken.type(), dict_to_dataclass(token, UpdateToken))
 
@@ -15,11 +15,16 @@ from indexer.executors.batch_work_executor import BatchWorkExecutor
 from indexer.jobs.base_job import BaseExportJob
 from indexer.utils.exception_recorder import ExceptionRecorder
 from indexer.utils.json_rpc_requests import generate_trace_block_by_number_json_rpc
+from indexer.utils.provider import get_provider_from_uri
 from indexer.utils.rpc_utils import rpc_response_to_result, zip_rpc_response
+from indexer.utils.thread_local_proxy import ThreadLocalProxy
 
 logger = logging.getLogger(__name__)
 exception_recorder = ExceptionRecorder()
 
+# Blocks with at least this many transactions are traced in a request of their own.
+DEFAULT_LARGE_BLOCK_TRANSACTIONS = 500
+
 
 # Exports traces
 class ExportTracesJob(BaseExportJob):
@@ -31,22 +36,54 @@ class ExportTracesJob(BaseExportJob):
         super().__init__(**kwargs)
 
         self._batch_web3_provider = kwargs["batch_web3_debug_provider"]
+        block_timeout = self.user_defined_config.get("block_timeout")
+        if block_timeout:
+            endpoint_uri = self._batch_web3_provider.endpoint_uri
+            self._batch_web3_provider = ThreadLocalProxy(
+                lambda: get_provider_from_uri(endpoint_uri, timeout=block_timeout, batch=True)
+            )
         self._batch_work_executor = BatchWorkExecutor(
             kwargs["debug_batch_size"],
-            kwargs["max_workers"],
+            self.user_defined_config.get("max_workers", kwargs["max_workers"]),
             job_name=self.__class__.__name__,
+            max_retries=self.user_defined_config.get("max_retries", 5),
+            rpc_method="debug_traceBlockByNumber",
+            endpoint_uri=self._batch_web3_provider.endpoint_uri,
         )
         self._is_batch = kwargs["debug_batch_size"] > 1
+        self._large_block_transactions = self.user_defined_config.get(
+            "large_block_transactions", DEFAULT_LARGE_BLOCK_TRANSACTIONS
+        )
 
     def _collect(self, **kwargs):
+        # Largest blocks first, so the slowest traces do not start last and hold the batch back.
+        blocks = sorted(self._data_buff[Block.type()], key=lambda block: len(block.transactions), reverse=True)
         self._batch_work_executor.execute(
-            self._data_buff[Block.type()],
+            blocks,
             self._collect_batch,
-            total_items=len(self._data_buff[Block.type()]),
+            total_items=len(blocks),
+            split_method=self._split_blocks,
         )
 
         self._batch_work_executor.wait()
 
+    def _split_blocks(self, blocks):
+        """
+        Batches of blocks to trace in one request. A large block is always traced alone, so a timeout or
+        retry of its request does not hold back other blocks.
+        """
+        batch = []
+        for block in blocks:
+            if not self._is_batch or len(block.transactions) >= self._large_block_transactions:
+                yield [block]
+                continue
+            batch.append(block)
+            if len(batch) >= self._batch_work_executor.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
     def _collect_batch(self, blocks):
         traces = traces_rpc_requests(
             self._batch_web3_provider.make_request,
@@ -98,67 +135,68 @@ class ExtractTraces:
         for tx_index, tx in enumerate(transaction_traces):
             self._trace_idx = 0
 
-            traces.extend(self._iterate_transaction_trace(geth_trace, tx_index, tx["txHash"], tx["result"]))
+            self._iterate_transaction_trace(geth_trace, tx_index, tx["txHash"], tx["result"], traces)
 
         return traces
 
-    def _iterate_transaction_trace(self, geth_trace, tx_index, tx_hash, tx_trace, trace_address=[]):
-        block_number = geth_trace["block_number"]
-        transaction_index = tx_index
-        trace_index = self._trace_idx
-
-        self._trace_idx += 1
-        trace_id = f"{block_number}_{transaction_index}_{trace_index}"
-
-        # lowercase for compatibility with parity traces
-        trace_type = tx_trace.get("type").lower()
-        call_type = ""
-        calls = tx_trace.get("calls", [])
-        if trace_type == "selfdestruct":
-            # rename to suicide for compatibility with parity traces
-            trace_type = "suicide"
-
-        elif trace_type in ("call", "callcode", "delegatecall", "staticcall"):
-            call_type = trace_type
-            trace_type = "call"
-
-        trace = {
-            "trace_id": trace_id,
-            "from_address": tx_trace.get("from"),
-            "to_address": tx_trace.get("to"),
-            "input": tx_trace.get("input"),
-            "output": tx_trace.get("output"),
-            "value": tx_trace.get("value"),
-            "gas": tx_trace.get("gas"),
-            "gas_used": tx_trace.get("gasUsed"),
-            "trace_type": trace_type,
-            "call_type": call_type,
-            "subtraces": len(calls),
-            "trace_address": trace_address,
-            "error": tx_trace.get("error"),
-            "status": 1 if tx_trace.get("error") is None else 0,
-            "block_number": block_number,
-            "block_hash": geth_trace["block_hash"],
-            "block_timestamp": geth_trace["block_timestamp"],
-            "transaction_index": tx_index,
-            "transaction_hash": tx_hash,
-            "trace_index": self._trace_idx,
-        }
-
-        result = [trace]
+    def _iterate_transaction_trace(self, geth_trace, tx_index, tx_hash, tx_trace, traces):
+        """
+        Appends the traces of the call tree of a transaction to traces, depth first in call order.
 
-        for call_index, call_trace in enumerate(calls):
-            result.extend(
-                self._iterate_transaction_trace(
-                    geth_trace,
-                    tx_index,
-                    tx_hash,
-                    call_trace,
-                    trace_address + [call_index],
-                )
+        The tree is walked with a stack instead of recursion, deep call stacks neither reach the recursion
+        limit nor copy the traces of every subtree into the list of its parent.
+        """
+        block_number = geth_trace["block_number"]
+        block_hash = geth_trace["block_hash"]
+        block_timestamp = geth_trace["block_timestamp"]
+
+        stack = [(tx_trace, [])]
+        while stack:
+            call_trace, trace_address = stack.pop()
+            trace_id = f"{block_number}_{tx_index}_{self._trace_idx}"
+            self._trace_idx += 1
+
+            # lowercase for compatibility with parity traces
+            trace_type = call_trace.get("type").lower()
+            call_type = ""
+            calls = call_trace.get("calls") or []
+            if trace_type == "selfdestruct":
+                # rename to suicide for compatibility with parity traces
+                trace_type = "suicide"
+
+            elif trace_type in ("call", "callcode", "delegatecall", "staticcall"):
+                call_type = trace_type
+                trace_type = "call"
+
+            error = call_trace.get("error")
+            traces.append(
+                {
+                    "trace_id": trace_id,
+                    "from_address": call_trace.get("from"),
+                    "to_address": call_trace.get("to"),
+                    "input": call_trace.get("input"),
+                    "output": call_trace.get("output"),
+                    "value": call_trace.get("value"),
+                    "gas": call_trace.get("gas"),
+                    "gas_used": call_trace.get("gasUsed"),
+                    "trace_type": trace_type,
+                    "call_type": call_type,
+                    "subtraces": len(calls),
+                    "trace_address": trace_address,
+                    "error": error,
+                    "status": 1 if error is None else 0,
+                    "block_number": block_number,
+                    "block_hash": block_hash,
+                    "block_timestamp": block_timestamp,
+                    "transaction_index": tx_index,
+                    "transaction_hash": tx_hash,
+                    "trace_index": self._trace_idx,
+                }
             )
 
-        return result
+            # Pushed last to first, so the first call is the next one popped.
+            for call_index in range(len(calls) - 1, -1, -1):
+                stack.append((calls[call_index], trace_address + [call_index]))
 
 
 def traces_rpc_requests(make_requests, blocks: List[dict], is_batch):
@@ -1,19 +1,42 @@
 import logging
-from typing import List, Union
+import threading
+from functools import partial
+from typing import Dict, List, Optional, Union
 
 import orjson
 
 from indexer.domain.block import Block
+from indexer.domain.columnar import ColumnarBatch
 from indexer.domain.log import Log
 from indexer.domain.receipt import Receipt
 from indexer.domain.transaction import Transaction
 from indexer.executors.batch_work_executor import BatchWorkExecutor
 from indexer.jobs.base_job import BaseExportJob, Collector
-from indexer.utils.json_rpc_requests import generate_get_receipt_json_rpc
-from indexer.utils.rpc_utils import rpc_response_batch_to_results
+from indexer.utils.json_rpc_requests import generate_get_block_receipts_json_rpc, generate_get_receipt_json_rpc
+from indexer.utils.rpc_utils import is_unsupported_method_error, rpc_response_batch_to_results, zip_rpc_response
 
 logger = logging.getLogger(__name__)
 
+RECEIPT_METHODS = ("auto", "block", "transaction")
+
+# Whether the endpoints behind a provider uri answer eth_getBlockReceipts, learned by the first job that asks.
+_block_receipts_support: Dict[str, bool] = {}
+_block_receipts_support_lock = threading.Lock()
+
+
+def supports_block_receipts(endpoint_uri: str) -> Optional[bool]:
+    return _block_receipts_support.get(endpoint_uri)
+
+
+def set_block_receipts_support(endpoint_uri: str, supported: bool):
+    with _block_receipts_support_lock:
+        if _block_receipts_support.get(endpoint_uri) != supported:
+            logger.info(
+                f"eth_getBlockReceipts is {'' if supported else 'not '}supported by {endpoint_uri}, "
+                f"fetching receipts per {'block' if supported else 'transaction'}."
+            )
+        _block_receipts_support[endpoint_uri] = supported
+
 
 # Exports transactions and logs
 class ExportTransactionsAndLogsJob(BaseExportJob):
@@ -26,38 +49,148 @@ class ExportTransactionsAndLogsJob(BaseExportJob):
             kwargs["batch_size"],
             kwargs["max_workers"],
             job_name=self.__class__.__name__,
+            rpc_method="eth_getTransactionReceipt",
+            endpoint_uri=self._batch_web3_provider.endpoint_uri,
         )
         self._is_batch = kwargs["batch_size"] > 1
+        # Keep logs in one array-backed batch shared by the receipts and the data buffer through
+        # lightweight row views, no dataclass instance is built per log.
+        self._columnar_logs = self.user_defined_config.get("columnar_logs", False)
+
+        # "block" asks eth_getBlockReceipts for every block, "transaction" eth_getTransactionReceipt for every
+        # transaction, "auto" uses block receipts unless the node turns out not to support them.
+        self._receipt_method = self.user_defined_config.get("receipt_method", "auto")
+        if self._receipt_method not in RECEIPT_METHODS:
+            raise ValueError(f"Unknown receipt_method {self._receipt_method}, should be one of {RECEIPT_METHODS}.")
+        # A block's receipts weigh as much as a batch of transaction receipts, so fewer of them go in a batch.
+        self._block_receipts_executor = BatchWorkExecutor(
+            self.user_defined_config.get("block_receipts_batch_size", min(kwargs["batch_size"], 10)),
+            kwargs["max_workers"],
+            job_name=self.__class__.__name__,
+            rpc_method="eth_getBlockReceipts",
+            endpoint_uri=self._batch_web3_provider.endpoint_uri,
+        )
+
+    def _use_block_receipts(self) -> bool:
+        if self._receipt_method == "auto":
+            return supports_block_receipts(self._batch_web3_provider.endpoint_uri) is not False
+        return self._receipt_method == "block"
+
+    def request_for_block_receipts(self, blocks: List[Block], output: Collector, pending_logs: list = None):
+        transaction_hash_mapper = {
+            transaction.hash: transaction for block in blocks for transaction in block.transactions
+        }
+        block_receipts = block_receipts_rpc_requests(
+            self._batch_web3_provider.make_request,
+            [block.number for block in blocks],
+            self._is_batch,
+        )
 
-    def request_for_receipt(self, transactions: List[Transaction], output: Collector):
+        fallback = []
+        for block, (receipts, error) in zip(blocks, block_receipts):
+            if receipts is None:
+                if error is not None and is_unsupported_method_error(error):
+                    set_block_receipts_support(self._batch_web3_provider.endpoint_uri, False)
+                fallback.extend(block.transactions)
+                continue
+            if supports_block_receipts(self._batch_web3_provider.endpoint_uri) is None:
+                set_block_receipts_support(self._batch_web3_provider.endpoint_uri, True)
+
+            # Filtered blocks only keep some of their transactions, the receipts of the others are dropped.
+            receipts = [receipt for receipt in receipts if receipt.get("transactionHash") in transaction_hash_mapper]
+            answered = {receipt["transactionHash"] for receipt in receipts}
+            fallback.extend(transaction for transaction in block.transactions if transaction.hash not in answered)
+            self._fill_receipts(receipts, transaction_hash_mapper, output, pending_logs)
+
+        if fallback:
+            self.request_for_receipt(fallback, output, pending_logs)
+
+    def request_for_receipt(self, transactions: List[Transaction], output: Collector, pending_logs: list = None):
         transaction_hash_mapper = {transaction.hash: transaction for transaction in transactions}
         results = receipt_rpc_requests(
             self._batch_web3_provider.make_request,
             transaction_hash_mapper.keys(),
             self._is_batch,
         )
+        self._fill_receipts(results, transaction_hash_mapper, output, pending_logs)
 
-        for receipt in results:
+    @staticmethod
+    def _fill_receipts(receipts, transaction_hash_mapper, output: Collector, pending_logs: list = None):
+        for receipt in receipts:
             transaction = transaction_hash_mapper[receipt["transactionHash"]]
+            if pending_logs is None:
+                receipt_entity = Receipt.from_rpc(
+                    receipt,
+                    transaction.block_timestamp,
+                    transaction.block_hash,
+                    transaction.block_number,
+                )
+                transaction.fill_with_receipt(receipt_entity)
+
+                for log in transaction.receipt.logs:
+                    output.collect(log)
+                continue
+
             receipt_entity = Receipt.from_rpc(
-                receipt,
+                {**receipt, "logs": []},
                 transaction.block_timestamp,
                 transaction.block_hash,
                 transaction.block_number,
             )
             transaction.fill_with_receipt(receipt_entity)
+            pending_logs.extend(
+                (
+                    transaction,
+                    Log.fields_from_rpc(
+                        log_dict, transaction.block_timestamp, transaction.block_hash, transaction.block_number
+                    ),
+                )
+                for log_dict in receipt.get("logs", [])
+            )
+
+    def _collect_columnar_logs(self, pending_logs: list, output: Collector):
+        """
+        Put the logs of every worker into a single sorted batch and hand the receipts views of that batch,
+        so the receipts and the data buffer share the same rows.
+        """
+        if len(pending_logs) == 0:
+            return
+
+        keys = [(fields["block_number"], fields["log_index"]) for _, fields in pending_logs]
+        ordered = [pending_logs[index] for index in sorted(range(len(pending_logs)), key=keys.__getitem__)]
 
-            for log in transaction.receipt.logs:
-                output.collect(log)
+        logs = ColumnarBatch(Log)
+        for _, fields in ordered:
+            logs.append(**fields)
+        for (transaction, _), log in zip(ordered, logs.rows()):
+            transaction.receipt.logs.append(log)
+        output.collect_batch(logs)
 
     def _udf(self, blocks: List[Block], output: Collector[Union[Transaction, Log]]):
-        transactions: List[Transaction] = [transaction for block in blocks for transaction in block.transactions]
-        self._batch_work_executor.execute(
-            transactions, self.request_for_receipt, collector=output, total_items=len(transactions)
-        )
-        self._batch_work_executor.wait()
+        pending_logs = [] if self._columnar_logs else None
+        if self._use_block_receipts():
+            blocks = [block for block in blocks if block.transactions]
+            self._block_receipts_executor.execute(
+                blocks,
+                partial(self.request_for_block_receipts, pending_logs=pending_logs),
+                collector=output,
+                total_items=len(blocks),
+            )
+            self._block_receipts_executor.wait()
+        else:
+            transactions: List[Transaction] = [transaction for block in blocks for transaction in block.transactions]
+            self._batch_work_executor.execute(
+                transactions,
+                partial(self.request_for_receipt, pending_logs=pending_logs),
+                collector=output,
+                total_items=len(transactions),
+            )
+            self._batch_work_executor.wait()
 
-        self._data_buff[Log.type()].sort(key=lambda x: (x.block_number, x.log_index))
+        if self._columnar_logs:
+            self._collect_columnar_logs(pending_logs, output)
+        else:
+            self._data_buff[Log.type()].sort(key=lambda x: (x.block_number, x.log_index))
 
 
 def receipt_rpc_requests(make_request, transaction_hashes, is_batch):
@@ -70,3 +203,26 @@ def receipt_rpc_requests(make_request, transaction_hashes, is_batch):
 
     results = rpc_response_batch_to_results(response)
     return results
+
+
+def block_receipts_rpc_requests(make_request, block_numbers, is_batch):
+    """
+    The receipts of every block as (receipts, None), or (None, error) for blocks the node did not answer
+    with a list of receipts, error being the JSON-RPC error when there was one.
+    """
+    block_receipts_rpc = list(generate_get_block_receipts_json_rpc(block_numbers))
+
+    if is_batch:
+        response = make_request(params=orjson.dumps(block_receipts_rpc))
+    else:
+        response = [make_request(params=orjson.dumps(request)) for request in block_receipts_rpc]
+
+    if isinstance(response, dict):
+        # Some nodes reject a whole batch of a method they do not know with a single error object.
+        return [(None, response.get("error"))] * len(block_receipts_rpc)
+
+    answers = {request["id"]: (None, None) for request in block_receipts_rpc}
+    for request, response_item in zip_rpc_response(block_receipts_rpc, response, index="id"):
+        result = response_item.get("result")
+        answers[request["id"]] = (result, None) if isinstance(result, list) else (None, response_item.get("error"))
+    return [answers[request["id"]] for request in block_receipts_rpc]
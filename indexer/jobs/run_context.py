@@ -0,0 +1,193 @@
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Union
+
+from indexer.domain import Domain
+from indexer.domain.columnar import ColumnarBatch, RowView
+from indexer.domain.log import Log
+from indexer.exporters.async_export_queue import AsyncExportQueue
+from indexer.utils.log_index import LogIndex
+
+
+class DataBuffer(defaultdict):
+    """
+    The per-run mapping of domain type to collected domains.
+
+    Besides plain lists of domains it can hold ColumnarBatches, which stay columnar until somebody
+    reads the type through the usual mapping access. At that point the batches are moved into the list
+    as row views over the same columns, so they stay shared with whatever else references those rows
+    (e.g. the receipts of the transactions the logs belong to) and no dataclass is built per row.
+    Code which is aware of batches should use get_batches, iter_rows and count to read them and
+    get_exportable to export them, which keeps the batches intact for the exporters.
+    """
+
+    def __init__(self):
+        super().__init__(list)
+        self._batches: Dict[str, List[ColumnarBatch]] = defaultdict(list)
+
+    def add_batch(self, key: str, batch: ColumnarBatch):
+        self._batches[key].append(batch)
+
+    def has_batches(self, key: str) -> bool:
+        return len(self._batches.get(key, [])) > 0
+
+    def get_batches(self, key: str) -> List[ColumnarBatch]:
+        return self._batches.get(key, [])
+
+    def set_batches(self, key: str, batches: List[ColumnarBatch]):
+        self._batches[key] = batches
+
+    def iter_rows(self, key: str) -> Iterable[Union[Domain, RowView]]:
+        yield from super().get(key, [])
+        for batch in self._batches.get(key, []):
+            yield from batch.rows()
+
+    def get_exportable(self, key: str) -> List[Union[Domain, ColumnarBatch]]:
+        return list(super().get(key, [])) + list(self._batches.get(key, []))
+
+    def count(self, key: str) -> int:
+        return len(super().get(key, [])) + sum(len(batch) for batch in self._batches.get(key, []))
+
+    def _materialize(self, key):
+        batches = self._batches.pop(key, None)
+        if batches:
+            rows = super().__getitem__(key)
+            for batch in batches:
+                rows.extend(batch.rows())
+
+    def _materialize_all(self):
+        for key in list(self._batches.keys()):
+            self._materialize(key)
+
+    def __getitem__(self, key):
+        self._materialize(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        self._batches.pop(key, None)
+        super().__setitem__(key, value)
+
+    def __contains__(self, key):
+        return super().__contains__(key) or self.has_batches(key)
+
+    def get(self, key, default=None):
+        self._materialize(key)
+        return super().get(key, default)
+
+    def pop(self, key, *args):
+        self._materialize(key)
+        return super().pop(key, *args)
+
+    def _keys(self) -> List[str]:
+        keys = list(super().keys())
+        return keys + [key for key in self._batches if self.has_batches(key) and key not in keys]
+
+    def keys(self):
+        return self._keys()
+
+    def values(self):
+        self._materialize_all()
+        return super().values()
+
+    def items(self):
+        self._materialize_all()
+        return super().items()
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def clear(self):
+        self._batches.clear()
+        super().clear()
+
+
+class RunContext:
+    """
+            Holds the data buffer of a single scheduler run over one block range.
+
+            Every run_jobs call owns a fresh RunContext which is handed to each job and its Collector,
+            so several ranges can be processed concurrently in one process (e.g. on threads) without
+            seeing each other's data. Long-lived resources such as RPC providers, the token cache and
+            the multicall thread pool are not part of the context and stay shared between runs.
+
+            When the scheduler exports asynchronously it attaches its export queue here. Jobs then submit
+            their output to the queue instead of writing it, and last_export_ticket tracks the latest
+            submission of this run so the scheduler can wait for the range to be fully written. The context is
+        the scope of its exports in the queue, a failed export only fails the range it belongs to.
+
+    With item_exporters set the context is also the export scope handed to the exporters, those writing
+    in transactions (PostgresItemExporter in copy mode) keep the range's writes open until the scheduler
+    calls commit_exports once every job of the range has exported, or rollback_exports when it failed.
+    """
+
+    def __init__(
+        self,
+        start_block: Optional[int] = None,
+        end_block: Optional[int] = None,
+        export_queue: Optional["AsyncExportQueue"] = None,
+        item_exporters: Optional[list] = None,
+    ):
+        self.start_block = start_block
+        self.end_block = end_block
+        self.data_buff: DataBuffer = DataBuffer()
+        self.data_buff_lock: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self.export_queue = export_queue
+        self.item_exporters = item_exporters
+        self.last_export_ticket: Optional[int] = None
+        self._ticket_lock = threading.Lock()
+        self._log_index: Optional[LogIndex] = None
+        self._log_index_lock = threading.Lock()
+
+    def log_index(self) -> LogIndex:
+        """
+        The index of the logs collected so far, built by the first job asking for it after the logs were
+        exported and shared by every job after it. It is rebuilt when the number of logs changed since.
+        """
+        count = self.data_buff.count(Log.type())
+        with self._log_index_lock:
+            if self._log_index is None or self._log_index.size != count:
+                self._log_index = LogIndex(self.data_buff.iter_rows(Log.type()))
+            return self._log_index
+
+    def record_export_ticket(self, ticket: int):
+        with self._ticket_lock:
+            if self.last_export_ticket is None or ticket > self.last_export_ticket:
+                self.last_export_ticket = ticket
+
+    @property
+    def export_scope(self) -> Optional["RunContext"]:
+        # Only contexts owned by a scheduler get committed, jobs run directly write as they go.
+        return self if self.item_exporters is not None else None
+
+    def commit_exports(self):
+        for item_exporter in self.item_exporters or []:
+            item_exporter.commit_scope(self)
+
+    def rollback_exports(self):
+        for item_exporter in self.item_exporters or []:
+            item_exporter.rollback_scope(self)
+
+    def submit_export(self, item_exporters, items, job_name: Optional[str] = None):
+        self.record_export_ticket(self.export_queue.submit(item_exporters, items, job_name, scope=self))
+
+    def wait_for_exports(self, raise_errors: bool = True):
+        if self.export_queue is not None and self.last_export_ticket is not None:
+            try:
+                self.export_queue.wait(self.last_export_ticket, scope=self)
+            except Exception:
+                if raise_errors:
+                    raise
+
+    def clear(self):
+        self.data_buff.clear()
+        self._log_index = None
+
+    def __repr__(self):
+        return f"<RunContext [{self.start_block}, {self.end_block}]>"
+
+
+# Used by jobs which are run directly instead of through a scheduler.
+DEFAULT_RUN_CONTEXT = RunContext()
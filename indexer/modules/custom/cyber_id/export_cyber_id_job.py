@@ -1,6 +1,6 @@
 import logging
 from itertools import groupby
-from typing import List
+from typing import Iterable, List
 
 from indexer.domain.log import Log
 from indexer.domain.transaction import Transaction
@@ -62,7 +62,7 @@ class ExportCyberIDJob(FilterTransactionDataJob):
         for transaction in transactions:
             self._process_transaction(transaction)
 
-        logs: List[Log] = self._data_buff.get(Log.type(), [])
+        logs: Iterable[Log] = self._data_buff.iter_rows(Log.type())
         for log in logs:
             self._process_log(log)
 
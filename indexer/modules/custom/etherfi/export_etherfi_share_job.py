@@ -1,6 +1,6 @@
 import logging
 from itertools import groupby
-from typing import List
+from typing import Iterable
 
 from web3 import Web3
 
@@ -77,9 +77,9 @@ class ExportEtherFiShareJob(FilterTransactionDataJob):
         pass
 
     def _process(self, **kwargs):
-        logs: List[Log] = self._data_buff.get(Log.type(), [])
-        if len(logs) == 0:
+        if self._data_buff.count(Log.type()) == 0:
             return
+        logs: Iterable[Log] = self._data_buff.iter_rows(Log.type())
         # block_number -> address set
         shares_holders = {}
         block_to_update_position = set()
@@ -26,6 +26,7 @@ from indexer.modules.custom.hemera_ens.ens_domain import (
 from indexer.modules.custom.hemera_ens.ens_hash import namehash
 from indexer.modules.custom.hemera_ens.extractors import BaseExtractor, RegisterExtractor
 from indexer.modules.custom.hemera_ens.util import convert_str_ts
+from indexer.utils.provider import get_provider_from_uri
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +38,7 @@ class EnsConfLoader:
         self.function_map = None
         if not provider:
             provider = "https://ethereum-rpc.publicnode.com"
-        self.w3 = Web3(Web3.HTTPProvider(provider))
+        self.w3 = Web3(get_provider_from_uri(provider))
         self.w3.codec = ABICodec(lifo_registry)
         self.build_contract_map()
 
@@ -73,7 +73,7 @@ class ExportEnsJob(FilterTransactionDataJob):
 
     def _collect(self, **kwargs):
         transactions: List[Transaction] = self._data_buff.get(Transaction.type(), [])
-        logs = self._data_buff.get(Log.type(), [])
+        logs = self._data_buff.iter_rows(Log.type())
         middles = []
         transactions_map = {}
         group_data = defaultdict(list)
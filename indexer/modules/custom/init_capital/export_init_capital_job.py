@@ -98,7 +98,7 @@ class InitCapitalJob(FilterTransactionDataJob):
     def _collect(self, **kwargs):
         # This is how you get your dependency dataclass indexer prepared for you
         # Note that filter will apply
-        logs = self._data_buff[Log.type()]
+        logs = list(self._data_buff.iter_rows(Log.type()))
 
         # Core logic of UDF
         # 1. Create new position (if any)
@@ -67,7 +67,7 @@ class ExportLidoShareJob(FilterTransactionDataJob):
         pass
 
     def _process(self, **kwargs):
-        logs: List[Log] = self._data_buff.get(Log.type(), [])
+        logs: List[Log] = self.get_filter_logs()
         if len(logs) == 0:
             return
 
@@ -32,6 +32,7 @@ from indexer.modules.custom.merchant_moe.models.feature_merchant_moe_pool import
 from indexer.specification.specification import TopicSpecification, TransactionFilterByLogs
 from indexer.utils.collection_utils import distinct_collections_by_group
 from indexer.utils.multicall_hemera import Call
+from indexer.utils.multicall_hemera.call_coalescer import wait_calls
 from indexer.utils.multicall_hemera.multi_call_helper import MultiCallHelper
 
 logger = logging.getLogger(__name__)
@@ -162,7 +163,7 @@ class ExportMerchantMoe1155LiquidityJob(FilterTransactionDataJob):
         self._collect_domains(supply_records)
 
         # collect bins, which will change also in the case of swap
-        logs = self._data_buff["log"]
+        logs = self._data_buff.iter_rows(Log.type())
         for log in logs:
             if log.topic0 == SWAP_EVENT.get_signature():
                 decode_dict = SWAP_EVENT.decode_log(log)
@@ -218,7 +219,7 @@ class ExportMerchantMoe1155LiquidityJob(FilterTransactionDataJob):
         self.get_active_id_and_bin_step()
 
     def _collect_pools(self):
-        logs = self._data_buff["log"]
+        logs = self._data_buff.iter_rows(Log.type())
         for log in logs:
             if log.topic0 == LB_PAIR_CREATED_EVENT.get_signature():
                 decoded_log_dict = LB_PAIR_CREATED_EVENT.decode_log(log)
@@ -236,7 +237,7 @@ class ExportMerchantMoe1155LiquidityJob(FilterTransactionDataJob):
 
     def get_active_id_and_bin_step(self):
         global bin_step_call, bin_step_call
-        logs = self._data_buff["log"]
+        logs = self._data_buff.iter_rows(Log.type())
 
         call_dict_list = {}
         for log in logs:
@@ -261,8 +262,7 @@ class ExportMerchantMoe1155LiquidityJob(FilterTransactionDataJob):
             call = Call(function_abi=GET_BIN_STEP_FUNCTION, **call_dict)
             bin_step_call_list.append(call)
 
-        self.multi_call_helper.execute_calls(active_id_call_list)
-        self.multi_call_helper.execute_calls(bin_step_call_list)
+        wait_calls(self.multi_call_helper.submit_calls(active_id_call_list + bin_step_call_list))
 
         records = []
 
@@ -1,6 +1,6 @@
 import logging
 from itertools import groupby
-from typing import List
+from typing import Iterable
 
 from web3 import Web3
 
@@ -62,9 +62,9 @@ class PendleTokenBalanceJob(FilterTransactionDataJob):
         pass
 
     def _process(self, **kwargs):
-        logs: List[Log] = self._data_buff.get(Log.type(), [])
-        if len(logs) == 0:
+        if self._data_buff.count(Log.type()) == 0:
             return
+        logs: Iterable[Log] = self._data_buff.iter_rows(Log.type())
 
         to_requests = set()
         for log in logs:
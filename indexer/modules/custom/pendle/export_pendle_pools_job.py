@@ -1,5 +1,5 @@
 import logging
-from typing import List
+from typing import Iterable
 
 from web3 import Web3
 
@@ -56,9 +56,9 @@ class PendlePoolsJob(FilterTransactionDataJob):
         pass
 
     def _process(self, **kwargs):
-        logs: List[Log] = self._data_buff.get(Log.type(), [])
-        if len(logs) == 0:
+        if self._data_buff.count(Log.type()) == 0:
             return
+        logs: Iterable[Log] = self._data_buff.iter_rows(Log.type())
         calls = []
         pools = {}
         for log in logs:
@@ -71,7 +71,7 @@ class ExportLockedFBTCDetailJob(FilterTransactionDataJob):
         )
 
     def _collect(self, **kwargs):
-        logs = self._data_buff[Log.type()]
+        logs = self._data_buff.iter_rows(Log.type())
         staked_details, current_status_list, current_holdings = collect_detail(
             logs, self._current_holdings, self.staked_abi_dict, self.staked_protocol_dict
         )
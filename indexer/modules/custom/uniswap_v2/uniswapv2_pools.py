@@ -25,7 +25,7 @@ class ExportUniSwapV2PoolJob(FilterTransactionDataJob):
         )
 
     def _process(self, **kwargs):
-        logs = self._data_buff[Log.type()]
+        logs = self.get_filter_logs()
         for log in logs:
             pool = None
 
@@ -25,40 +25,29 @@ class ExportUniSwapV2SwapEventJob(FilterTransactionDataJob):
         )
 
     def _process(self, **kwargs):
-        logs = self._data_buff[Log.type()]
-        for log in logs:
-            swap_event = None
-
-            if log.topic0 == UNISWAPV2_SWAP_EVENT.get_signature():
-                decoded_dict = UNISWAPV2_SWAP_EVENT.decode_log(log)
-                swap_event = UniswapV2SwapEvent(
-                    pool_address=log.address,
-                    sender=decoded_dict["sender"],
-                    to_address=decoded_dict["to"],
-                    amount0_in=decoded_dict["amount0In"],
-                    amount1_in=decoded_dict["amount1In"],
-                    amount0_out=decoded_dict["amount0Out"],
-                    amount1_out=decoded_dict["amount1Out"],
-                    block_number=log.block_number,
-                    block_timestamp=log.block_timestamp,
-                    transaction_hash=log.transaction_hash,
-                    log_index=log.log_index,
-                )
-            elif log.topic0 == AERODROME_SWAP_EVENT.get_signature():
-                decoded_dict = AERODROME_SWAP_EVENT.decode_log(log)
-                swap_event = UniswapV2SwapEvent(
-                    pool_address=log.address,
-                    sender=decoded_dict["sender"],
-                    to_address=decoded_dict["to"],
-                    amount0_in=decoded_dict["amount0In"],
-                    amount1_in=decoded_dict["amount1In"],
-                    amount0_out=decoded_dict["amount0Out"],
-                    amount1_out=decoded_dict["amount1Out"],
-                    block_number=log.block_number,
-                    block_timestamp=log.block_timestamp,
-                    transaction_hash=log.transaction_hash,
-                    log_index=log.log_index,
+        log_index = self._run_context.log_index()
+        swap_events = []
+        for event in (UNISWAPV2_SWAP_EVENT, AERODROME_SWAP_EVENT):
+            # Both events carry the same fields, every log of one is decoded with the same compiled decoder.
+            logs = log_index.select(topics=[event.get_signature()])
+            for log, decoded_dict in zip(logs, event.decode_logs(logs)):
+                if decoded_dict is None:
+                    continue
+                swap_events.append(
+                    UniswapV2SwapEvent(
+                        pool_address=log.address,
+                        sender=decoded_dict["sender"],
+                        to_address=decoded_dict["to"],
+                        amount0_in=decoded_dict["amount0In"],
+                        amount1_in=decoded_dict["amount1In"],
+                        amount0_out=decoded_dict["amount0Out"],
+                        amount1_out=decoded_dict["amount1Out"],
+                        block_number=log.block_number,
+                        block_timestamp=log.block_timestamp,
+                        transaction_hash=log.transaction_hash,
+                        log_index=log.log_index,
+                    )
                 )
 
-            if swap_event:
-                self._collect_domain(swap_event)
+        swap_events.sort(key=lambda swap_event: (swap_event.block_number, swap_event.log_index))
+        self._collect_domains(swap_events)
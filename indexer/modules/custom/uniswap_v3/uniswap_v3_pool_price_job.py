@@ -16,6 +16,7 @@ from indexer.modules.custom.uniswap_v3.models.feature_uniswap_v3_pools import Un
 from indexer.modules.custom.uniswap_v3.util import AddressManager
 from indexer.specification.specification import TopicSpecification, TransactionFilterByLogs
 from indexer.utils.multicall_hemera import Call
+from indexer.utils.multicall_hemera.call_coalescer import wait_calls
 from indexer.utils.multicall_hemera.multi_call_helper import MultiCallHelper
 
 logger = logging.getLogger(__name__)
@@ -96,11 +97,10 @@ class ExportUniSwapV3PoolJob(FilterTransactionDataJob):
             token1_list.append(Call(function_abi=abi_module.TOKEN1_FUNCTION, **call_dict))
             tick_spacing_list.append(Call(function_abi=abi_module.TICK_SPACING_FUNCTION, **call_dict))
 
-        self.multi_call_helper.execute_calls(factory_list)
-        self.multi_call_helper.execute_calls(fee_list)
-        self.multi_call_helper.execute_calls(token0_list)
-        self.multi_call_helper.execute_calls(token1_list)
-        self.multi_call_helper.execute_calls(tick_spacing_list)
+        # The five calls of every pool go out in one round, packed per block.
+        wait_calls(
+            self.multi_call_helper.submit_calls(factory_list + fee_list + token0_list + token1_list + tick_spacing_list)
+        )
 
         for factory_call, fee_call, token0_call, token1_call, tick_spacing_call in zip(
             factory_list, fee_list, token0_list, token1_list, tick_spacing_list
@@ -17,6 +17,7 @@ from indexer.modules.custom.uniswap_v3.models.feature_uniswap_v3_tokens import U
 from indexer.modules.custom.uniswap_v3.util import AddressManager
 from indexer.specification.specification import TopicSpecification, TransactionFilterByLogs
 from indexer.utils.multicall_hemera import Call
+from indexer.utils.multicall_hemera.call_coalescer import wait_calls
 from indexer.utils.multicall_hemera.multi_call_helper import MultiCallHelper
 
 logger = logging.getLogger(__name__)
@@ -55,7 +56,7 @@ class ExportUniSwapV3TokensJob(FilterTransactionDataJob):
             for tt in self._data_buff["erc721_token_transfer"]
             if tt.token_address in self._address_manager.position_token_address_list
         ]
-        logs = self._data_buff["log"]
+        logs = self._data_buff.iter_rows(Log.type())
 
         erc721_token_transfers.sort(key=lambda x: x.block_number)
 
@@ -139,13 +140,14 @@ class ExportUniSwapV3TokensJob(FilterTransactionDataJob):
             abi_module = self._address_manager.get_abi_by_position(call_dict.get("target"))
 
             owner_call_list.append(Call(function_abi=abi_module.OWNER_OF_FUNCTION, **call_dict))
-        self.multi_call_helper.execute_calls(owner_call_list)
+        owner_futures = self.multi_call_helper.submit_calls(owner_call_list)
 
         positions_call_list = []
         for call_dict in call_dict_list:
             abi_module = self._address_manager.get_abi_by_position(call_dict.get("target"))
             positions_call_list.append(Call(function_abi=abi_module.POSITIONS_FUNCTION, **call_dict))
-        self.multi_call_helper.execute_calls(positions_call_list)
+        # Sent in the same round as the owner calls.
+        wait_calls(owner_futures + self.multi_call_helper.submit_calls(positions_call_list))
 
         positions_data_list = []
         # decode data
@@ -0,0 +1,134 @@
+import pytest
+from eth_abi import decode, encode
+
+from common.utils.format_utils import bytes_to_hex_str, hex_str_to_bytes
+from indexer.benchmark.replay_server import RpcReplayServer
+from indexer.benchmark.rpc_fixture import RpcFixture
+from indexer.benchmark.runner import compare_reports, record, replay
+from indexer.utils.multicall_hemera.abi import TRY_BLOCK_AND_AGGREGATE_FUNC
+
+MULTICALL = "0x" + "ca" * 20
+TOKEN = "0x" + "aa" * 20
+TRANSACTION_HASH = "0x" + "ab" * 32
+
+
+def _block(number, transactions):
+    return {
+        "number": hex(number),
+        "hash": "0x%064x" % number,
+        "parentHash": "0x%064x" % (number - 1),
+        "nonce": "0x0000000000000000",
+        "sha3Uncles": "0x" + "00" * 32,
+        "logsBloom": "0x" + "00" * 256,
+        "transactionsRoot": "0x" + "00" * 32,
+        "stateRoot": "0x" + "00" * 32,
+        "receiptsRoot": "0x" + "00" * 32,
+        "miner": "0x" + "11" * 20,
+        "difficulty": "0x0",
+        "totalDifficulty": "0x0",
+        "size": "0x100",
+        "extraData": "0x",
+        "gasLimit": "0x1c9c380",
+        "gasUsed": "0x5208",
+        "timestamp": hex(1700000000 + 12 * number),
+        "transactions": transactions,
+        "uncles": [],
+        "baseFeePerGas": "0x7",
+    }
+
+
+def _node_fixture():
+    transaction = {
+        "hash": TRANSACTION_HASH,
+        "nonce": "0x1",
+        "blockHash": "0x%064x" % 2,
+        "blockNumber": "0x2",
+        "transactionIndex": "0x0",
+        "from": "0x" + "22" * 20,
+        "to": "0x" + "33" * 20,
+        "value": "0xde0b6b3a7640000",
+        "gas": "0x5208",
+        "gasPrice": "0x7",
+        "input": "0x",
+        "type": "0x0",
+        "v": "0x1b",
+        "r": "0x1",
+        "s": "0x1",
+    }
+    receipt = {
+        "transactionHash": TRANSACTION_HASH,
+        "transactionIndex": "0x0",
+        "blockHash": "0x%064x" % 2,
+        "blockNumber": "0x2",
+        "from": "0x" + "22" * 20,
+        "to": "0x" + "33" * 20,
+        "cumulativeGasUsed": "0x5208",
+        "gasUsed": "0x5208",
+        "effectiveGasPrice": "0x7",
+        "contractAddress": None,
+        "logs": [],
+        "logsBloom": "0x" + "00" * 256,
+        "status": "0x1",
+        "type": "0x0",
+    }
+    node = RpcFixture()
+    node.put("eth_chainId", [], {"result": "0x1"})
+    node.put("eth_getBlockByNumber", ["0x1", True], {"result": _block(1, [])})
+    node.put("eth_getBlockByNumber", ["0x2", True], {"result": _block(2, [transaction])})
+    node.put("eth_getBlockReceipts", ["0x2"], {"result": [receipt]})
+    return node
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_recorded_range_is_indexed_again_without_the_node(tmp_path):
+    fixture_path = str(tmp_path / "blocks-1-2.jsonl.gz")
+    with RpcReplayServer(_node_fixture()) as node:
+        (recording,) = record(fixture_path, node.uri, 1, 2, ["blocks"], isolated=False)
+    assert recording["recorded"] == recording["rpc_calls"]
+
+    fixture = RpcFixture.load(fixture_path)
+    assert fixture.meta["chain_id"] == 1 and fixture.meta["pipelines"] == ["blocks"]
+
+    (report,) = replay(fixture_path, latency=0.01, jitter=0.005, isolated=False)
+    assert report["misses"] == 0 and report["recorded"] == 0
+    assert report["rpc_calls"] == recording["rpc_calls"]
+    assert report["rpc_calls_by_method"] == {"eth_getBlockByNumber": 2, "eth_getBlockReceipts": 1}
+    assert report["exported_items"] >= 3
+    assert report["blocks_per_second"] > 0
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_multicall_payloads_grouped_differently_are_answered_from_recorded_calls():
+    def aggregate(calls):
+        call_data = TRY_BLOCK_AND_AGGREGATE_FUNC.encode_function_call_data(
+            [False, [[TOKEN, hex_str_to_bytes(data)] for data in calls]]
+        )
+        return [{"to": MULTICALL, "data": call_data}, "0x10"]
+
+    fixture = RpcFixture()
+    output = encode(
+        TRY_BLOCK_AND_AGGREGATE_FUNC.get_outputs_type(),
+        [16, b"\x12" * 32, [(True, b"\x00" * 31 + b"\x12"), (False, b"")]],
+    )
+    fixture.put("eth_call", aggregate(["0x313ce567", "0x95d89b41"]), {"result": bytes_to_hex_str(output)})
+
+    response = fixture.get("eth_call", aggregate(["0x95d89b41", "0x313ce567"]))
+    block_number, block_hash, results = decode(
+        TRY_BLOCK_AND_AGGREGATE_FUNC.get_outputs_type(), hex_str_to_bytes(response["result"])
+    )
+    assert (block_number, block_hash) == (16, b"\x12" * 32)
+    assert results == ((False, b""), (True, b"\x00" * 31 + b"\x12"))
+    assert fixture.get("eth_call", aggregate(["0x313ce567", "0x06fdde03"])) is None
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_reports_regress_when_throughput_falls_or_calls_grow_beyond_tolerance():
+    baseline = [{"pipeline": "blocks", "blocks_per_second": 100, "rpc_calls": 200, "peak_rss_bytes": 1000}]
+    assert compare_reports(baseline, [{"pipeline": "blocks", "blocks_per_second": 95, "rpc_calls": 210}]) == []
+    assert compare_reports(baseline, [{"pipeline": "blocks", "blocks_per_second": 80, "rpc_calls": 300}]) == [
+        "blocks blocks_per_second: 100 -> 80 (-20.0%)",
+        "blocks rpc_calls: 200 -> 300 (+50.0%)",
+    ]
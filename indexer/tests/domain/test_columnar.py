@@ -0,0 +1,159 @@
+import copy
+import csv
+import dataclasses
+import pickle
+
+import pytest
+
+from common.models import general_columnar_converter, general_converter
+from common.models.logs import Logs
+from indexer.domain.columnar import ColumnarBatch, IntColumn
+from indexer.domain.log import Log
+from indexer.domain.receipt import Receipt
+from indexer.domain.token_transfer import extract_transfer_from_log
+from indexer.domain.transaction import Transaction
+from indexer.exporters.csv_file_item_exporter import CSVFileItemExporter
+from indexer.jobs.run_context import RunContext
+
+
+def _log(block_number, log_index, data="0x000000000000000000000000000000000000000000000000004fcac4d4c7af2e"):
+    return Log(
+        log_index=log_index,
+        address="0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2",
+        data=data,
+        transaction_hash="0xa997e7b311a972a5a1f6f99bee98eaca3f719c549f2a756e0a74d76ed6061028",
+        transaction_index=39,
+        block_timestamp=1722382175,
+        block_number=block_number,
+        block_hash="0x6db7768a30446e0a6d00c624d4ec1d17e5eabd8b4cb464396900b967fd9a6058",
+        topic0="0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",
+        topic1="0x00000000000000000000000086d169ffe8f1ac313abea5fa64aad51725ceaf32",
+        topic2="0x00000000000000000000000042619f1eb89b993f7f5193de6ab1423a703fc344",
+    )
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_columnar_batch_round_trips_domains():
+    logs = [_log(20425048, 30), _log(20425048, 31, data="0x"), _log(20425049, 0, data="0xABCD")]
+    batch = ColumnarBatch.from_domains(Log, logs)
+
+    assert len(batch) == 3
+    assert batch.to_domains() == logs
+    assert batch[1].data == "0x"
+    assert batch[2].data == "0xABCD"
+    assert batch[0].topic3 is None
+    assert batch.column("data").get_bytes(0) == bytes.fromhex(logs[0].data[2:])
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_row_view_runs_domain_logic():
+    batch = ColumnarBatch.from_domains(Log, [_log(20425048, 30)])
+    view = batch[0]
+
+    assert view.get_topic_with_data() == batch.to_domains()[0].get_topic_with_data()
+    assert extract_transfer_from_log(view) == extract_transfer_from_log(batch.to_domains()[0])
+    assert view.type() == Log.type()
+    assert isinstance(view, Log)
+
+    view.block_number = 1
+    assert batch.to_domains()[0].block_number == 1
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_int_column_widens_for_uint256():
+    column = IntColumn()
+    for value in [1, None, 2**255, 2]:
+        column.append(value)
+
+    assert list(column) == [1, None, 2**255, 2]
+    assert list(column.take([2, 1])) == [2**255, None]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_data_buffer_materializes_batches_lazily():
+    run_context = RunContext(1, 2)
+    run_context.data_buff.add_batch(Log.type(), ColumnarBatch.from_domains(Log, [_log(1, 0), _log(2, 0)]))
+
+    assert Log.type() in run_context.data_buff
+    assert run_context.data_buff.count(Log.type()) == 2
+    assert len(run_context.data_buff.get_exportable(Log.type())) == 1
+    assert [log.block_number for log in run_context.data_buff.iter_rows(Log.type())] == [1, 2]
+
+    assert list(run_context.data_buff.keys()) == [Log.type()]
+    assert run_context.data_buff.has_batches(Log.type())
+
+    logs = run_context.data_buff[Log.type()]
+    assert all(isinstance(log, Log) for log in logs)
+    assert not run_context.data_buff.has_batches(Log.type())
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_materialized_rows_share_the_batch_with_receipts():
+    batch = ColumnarBatch.from_domains(Log, [_log(1, 0)])
+    receipt_log = batch[0]
+    run_context = RunContext(1, 1)
+    run_context.data_buff.add_batch(Log.type(), batch)
+
+    (buffered_log,) = run_context.data_buff[Log.type()]
+    buffered_log.block_number = 2
+
+    assert receipt_log.block_number == 2
+    assert buffered_log == receipt_log.to_domain()
+    assert dataclasses.is_dataclass(buffered_log)
+    assert copy.deepcopy(buffered_log) == receipt_log.to_domain()
+    assert type(copy.copy(buffered_log)) is Log
+    assert type(pickle.loads(pickle.dumps(buffered_log))) is Log
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_csv_exporter_writes_transactions_with_columnar_logs(tmp_path):
+    logs = ColumnarBatch.from_domains(Log, [_log(20425048, 30), _log(20425048, 31)])
+    receipt = Receipt(
+        transaction_hash=logs[0].transaction_hash,
+        transaction_index=39,
+        contract_address=None,
+        status=1,
+        logs=list(logs.rows()),
+    )
+    transaction = Transaction(
+        hash=logs[0].transaction_hash,
+        nonce=1,
+        transaction_index=39,
+        from_address="0x86d169ffe8f1ac313abea5fa64aad51725ceaf32",
+        to_address="0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2",
+        value=0,
+        gas_price=1,
+        gas=21000,
+        transaction_type=2,
+        input="0x",
+        block_number=20425048,
+        block_timestamp=1722382175,
+        block_hash="0x6db7768a30446e0a6d00c624d4ec1d17e5eabd8b4cb464396900b967fd9a6058",
+        receipt=receipt,
+    )
+
+    CSVFileItemExporter(f"csvfile://{tmp_path}", {}).export_items([transaction, logs])
+
+    with open(tmp_path / "transaction" / "transaction-20425048-20425048.csv") as csv_file:
+        (row,) = csv.DictReader(csv_file)
+    assert row["hash"] == transaction.hash
+    assert "'log_index': 31" in row["receipt"]
+    with open(tmp_path / "log" / "log-20425048-20425048.csv") as csv_file:
+        assert [row["log_index"] for row in csv.DictReader(csv_file)] == ["30", "31"]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_columnar_converter_matches_general_converter():
+    logs = [_log(20425048, 30), _log(20425048, 31, data="0x")]
+    columns, values = general_columnar_converter(Logs, ColumnarBatch.from_domains(Log, logs))
+
+    expected = [general_converter(Logs, log) for log in logs]
+    assert columns == list(expected[0].keys())
+    assert values == [tuple(row.values()) for row in expected]
@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from indexer.executors.batch_size_controller import (
+    AIMDBatchSizeController,
+    batch_size_controllers,
+    is_size_related_error,
+    observed_post,
+)
+from indexer.executors.batch_work_executor import BatchWorkExecutor
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_aimd_grows_additively_and_shrinks_multiplicatively():
+    controller = AIMDBatchSizeController(
+        "eth_getBlockByNumber", "http://node", 10, 40, target_seconds=1, target_bytes=1000
+    )
+
+    for _ in range(5):
+        controller.observe(controller.batch_size, 0.1, 100)
+    assert controller.batch_size == 15
+
+    # Partial batches do not prove a larger one would fit.
+    controller.observe(3, 0.1, 100)
+    assert controller.batch_size == 15
+
+    controller.observe(15, 2.5, 100)
+    assert controller.batch_size == 7
+    controller.observe(7, 0.1, 5000)
+    assert controller.batch_size == 3
+
+    controller.observe_failure(3)
+    controller.observe_failure(1)
+    assert controller.batch_size == 1
+    assert controller.state()["decreases"] == 4
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_json_rpc_size_errors_shrink_the_batch_of_the_serving_endpoint():
+    first = batch_size_controllers.get("eth_getBlockByNumber", "http://first-node", 8)
+    second = batch_size_controllers.get("eth_getBlockByNumber", "http://second-node", 8)
+    group = batch_size_controllers.group("eth_getBlockByNumber", ["http://first-node", "http://second-node"], 8)
+    request_data = json.dumps(
+        [{"jsonrpc": "2.0", "method": "eth_getBlockByNumber", "params": [], "id": i} for i in range(8)]
+    ).encode()
+
+    error = b'{"jsonrpc": "2.0", "id": null, "error": {"code": -32005, "message": "batch limit exceeded"}}'
+    assert observed_post("http://first-node", request_data, lambda: error) == error
+    assert (first.batch_size, second.batch_size, group.batch_size) == (4, 8, 4)
+
+    observed_post("http://second-node", request_data, lambda: b'[{"jsonrpc": "2.0", "id": 1, "result": null}]')
+    assert second.decreases == 0
+    assert not is_size_related_error({"code": -32000, "message": "header not found"})
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_executor_follows_controller_and_keeps_splitting_failures():
+    executor = BatchWorkExecutor(8, 1, rpc_method="eth_getTransactionReceipt", endpoint_uri="http://executor-test")
+    try:
+        (controller,) = executor.batch_size_group.controllers
+        assert executor.batch_size == 8
+
+        controller.observe_failure(8)
+        assert executor.batch_size == 4
+
+        handled = []
+
+        def handler(batch):
+            if len(batch) > 2:
+                raise ConnectionError("batch too large")
+            handled.append(list(batch))
+
+        executor.execute(range(4), handler, total_items=4)
+        executor.wait()
+        assert sorted(item for batch in handled for item in batch) == [0, 1, 2, 3]
+        assert all(len(batch) <= 2 for batch in handled)
+    finally:
+        executor.shutdown()
+
+    executor = BatchWorkExecutor(1, 1, rpc_method="eth_getBlockByNumber", endpoint_uri="x")
+    try:
+        assert executor.batch_size_group is None
+    finally:
+        executor.shutdown()
@@ -0,0 +1,73 @@
+import threading
+import time
+
+import pytest
+
+from indexer.executors.pipeline_executor import PipelineExecutor
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_pipeline_executor_keeps_order_and_overlaps_stages():
+    lock = threading.Lock()
+    running = set()
+    max_running = []
+    trace = []
+
+    def make_stage(name):
+        def stage(item):
+            with lock:
+                running.add(name)
+                max_running.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.discard(name)
+                trace.append((name, item))
+
+        return stage
+
+    completed = []
+    executor = PipelineExecutor([make_stage("fetch"), make_stage("receipt"), make_stage("export")], max_in_flight=3)
+    executor.execute(range(6), on_item_complete=completed.append)
+
+    assert completed == list(range(6))
+    for name in ["fetch", "receipt", "export"]:
+        assert [item for stage, item in trace if stage == name] == list(range(6))
+    assert max(max_running) > 1
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_pipeline_executor_bounds_in_flight_items():
+    lock = threading.Lock()
+    entered, left = [], []
+
+    def first(item):
+        with lock:
+            entered.append(item)
+            assert len(entered) - len(left) <= 2
+
+    def last(item):
+        time.sleep(0.01)
+        with lock:
+            left.append(item)
+
+    PipelineExecutor([first, last], max_in_flight=2).execute(range(10))
+    assert left == list(range(10))
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_pipeline_executor_stops_on_failure_and_reports_only_complete_items():
+    def fetch(item):
+        if item == 3:
+            raise ValueError("rpc failed")
+
+    completed = []
+    with pytest.raises(ValueError, match="rpc failed"):
+        PipelineExecutor([fetch, lambda item: None], max_in_flight=2).execute(
+            range(10), on_item_complete=completed.append
+        )
+
+    assert completed == list(range(len(completed)))
+    assert 3 not in completed
@@ -0,0 +1,149 @@
+import orjson
+import pytest
+
+from indexer.domain.block import Block
+from indexer.domain.log import Log
+from indexer.domain.transaction import Transaction
+from indexer.jobs.base_job import Collector
+from indexer.jobs.export_transactions_and_logs_job import ExportTransactionsAndLogsJob, supports_block_receipts
+from indexer.jobs.run_context import RunContext
+
+ZERO_HASH = "0x" + "00" * 32
+
+
+def _transaction_hash(block_number, index):
+    return "0x" + f"{block_number:032x}{index:032x}"
+
+
+def _block(number, transaction_count):
+    transactions = [
+        {
+            "hash": _transaction_hash(number, index),
+            "nonce": "0x0",
+            "transactionIndex": hex(index),
+            "from": "0x" + "11" * 20,
+            "to": "0x" + "22" * 20,
+            "value": "0x0",
+            "gasPrice": "0x1",
+            "gas": "0x5208",
+            "input": "0x",
+            "type": "0x0",
+        }
+        for index in range(transaction_count)
+    ]
+    return Block.from_rpc(
+        {
+            "number": hex(number),
+            "timestamp": "0x1",
+            "hash": ZERO_HASH,
+            "parentHash": ZERO_HASH,
+            "nonce": "0x0",
+            "gasLimit": "0x1",
+            "gasUsed": "0x1",
+            "difficulty": "0x0",
+            "miner": "0x" + "00" * 20,
+            "sha3Uncles": ZERO_HASH,
+            "transactionsRoot": ZERO_HASH,
+            "stateRoot": ZERO_HASH,
+            "receiptsRoot": ZERO_HASH,
+            "transactions": transactions,
+        }
+    )
+
+
+def _receipt(transaction_hash, index, block_number):
+    return {
+        "transactionHash": transaction_hash,
+        "transactionIndex": hex(index),
+        "status": "0x1",
+        "gasUsed": "0x5208",
+        "logs": [
+            {
+                "logIndex": hex(index),
+                "address": "0x" + "33" * 20,
+                "data": "0x",
+                "topics": [],
+                "transactionHash": transaction_hash,
+                "transactionIndex": hex(index),
+                "blockNumber": hex(block_number),
+            }
+        ],
+    }
+
+
+class FakeNode:
+    def __init__(self, endpoint_uri, block_receipts=True, transaction_counts=None):
+        self.endpoint_uri = endpoint_uri
+        self.block_receipts = block_receipts
+        self.transaction_counts = transaction_counts or {}
+        self.methods = []
+
+    def make_request(self, params=None):
+        requests = orjson.loads(params)
+        responses = [self.answer(request) for request in (requests if isinstance(requests, list) else [requests])]
+        return responses if isinstance(requests, list) else responses[0]
+
+    def answer(self, request):
+        self.methods.append(request["method"])
+        if request["method"] == "eth_getBlockReceipts":
+            if not self.block_receipts:
+                return {"jsonrpc": "2.0", "id": request["id"], "error": {"code": -32601, "message": "method not found"}}
+            number = int(request["params"][0], 16)
+            receipts = [
+                _receipt(_transaction_hash(number, index), index, number)
+                for index in range(self.transaction_counts[number])
+            ]
+            return {"jsonrpc": "2.0", "id": request["id"], "result": receipts}
+
+        transaction_hash = request["params"][0]
+        number, index = int(transaction_hash[2:34], 16), int(transaction_hash[34:], 16)
+        return {"jsonrpc": "2.0", "id": request["id"], "result": _receipt(transaction_hash, index, number)}
+
+
+def _run(node, blocks, receipt_method="auto"):
+    job = ExportTransactionsAndLogsJob(
+        required_output_types=[Transaction, Log],
+        batch_web3_provider=node,
+        item_exporters=[],
+        batch_size=10,
+        max_workers=1,
+        config={"chain_id": 1, "export_transactions_and_logs_job": {"receipt_method": receipt_method}},
+    )
+    run_context = RunContext(blocks[0].number, blocks[-1].number)
+    job._run_context = run_context
+    job._udf(blocks, Collector(job, [Transaction, Log], run_context))
+    return run_context
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_jobs
+def test_receipts_are_fetched_per_block_when_supported():
+    node = FakeNode("http://block-receipts-node", transaction_counts={1: 3, 2: 0, 3: 2})
+    # Block 3 was filtered down to one of its two transactions.
+    blocks = [_block(1, 3), _block(2, 0), _block(3, 2)]
+    blocks[2].transactions = blocks[2].transactions[1:]
+
+    run_context = _run(node, blocks)
+
+    assert node.methods == ["eth_getBlockReceipts", "eth_getBlockReceipts"]
+    assert supports_block_receipts(node.endpoint_uri) is True
+    transactions = [transaction for block in blocks for transaction in block.transactions]
+    assert all(transaction.receipt.transaction_hash == transaction.hash for transaction in transactions)
+    logs = run_context.data_buff[Log.type()]
+    assert [(log.block_number, log.log_index) for log in logs] == [(1, 0), (1, 1), (1, 2), (3, 1)]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_jobs
+def test_receipts_fall_back_to_transactions_when_unsupported():
+    node = FakeNode("http://transaction-receipts-node", block_receipts=False)
+    blocks = [_block(1, 2), _block(2, 1)]
+
+    _run(node, blocks)
+    assert node.methods == ["eth_getBlockReceipts"] * 2 + ["eth_getTransactionReceipt"] * 3
+    assert supports_block_receipts(node.endpoint_uri) is False
+    assert all(transaction.receipt is not None for block in blocks for transaction in block.transactions)
+
+    node.methods.clear()
+    _run(node, [_block(3, 1)])
+    assert node.methods == ["eth_getTransactionReceipt"]
@@ -0,0 +1,101 @@
+import orjson
+import pytest
+
+from common.utils.exception_control import ReorgDetectedError
+from indexer.domain.block import Block
+from indexer.jobs.check_block_consensus_job import CheckBlockConsensusJob
+from indexer.jobs.run_context import RunContext
+
+ZERO_HASH = "0x" + "00" * 32
+
+
+def _hash(branch, number):
+    return "0x" + f"{branch:032x}{number:032x}"
+
+
+def _block(number, branch, parent_branch=None):
+    parent_branch = branch if parent_branch is None else parent_branch
+    return Block.from_rpc(
+        {
+            "number": hex(number),
+            "timestamp": "0x1",
+            "hash": _hash(branch, number),
+            "parentHash": _hash(parent_branch, number - 1),
+            "nonce": "0x0",
+            "gasLimit": "0x1",
+            "gasUsed": "0x1",
+            "difficulty": "0x0",
+            "miner": "0x" + "00" * 20,
+            "sha3Uncles": ZERO_HASH,
+            "transactionsRoot": ZERO_HASH,
+            "stateRoot": ZERO_HASH,
+            "receiptsRoot": ZERO_HASH,
+            "transactions": [],
+        }
+    )
+
+
+class FakeNode:
+    """Blocks below fork_point are on branch 1, the ones from fork_point on on branch 2."""
+
+    endpoint_uri = "http://reorg-node"
+
+    def __init__(self, fork_point):
+        self.fork_point = fork_point
+        self.requests = 0
+
+    def make_request(self, params=None):
+        self.requests += 1
+        responses = []
+        for request in orjson.loads(params):
+            number = int(request["params"][0], 16)
+            branch = 1 if number < self.fork_point else 2
+            responses.append({"jsonrpc": "2.0", "id": request["id"], "result": {"hash": _hash(branch, number)}})
+        return responses
+
+
+class EmptyBlocksTable:
+    def get_service_session(self):
+        return self
+
+    def query(self, *columns):
+        return self
+
+    def filter(self, *conditions):
+        return self
+
+    def all(self):
+        return []
+
+    def close(self):
+        pass
+
+
+def _check(job, blocks):
+    run_context = RunContext(blocks[0].number, blocks[-1].number)
+    run_context.data_buff[Block.type()] = blocks
+    job._run_context = run_context
+    job._process()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_jobs
+def test_fork_point_is_found_in_the_header_window():
+    node = FakeNode(fork_point=8)
+    job = CheckBlockConsensusJob(
+        required_output_types=[],
+        batch_web3_provider=node,
+        item_exporters=[],
+        batch_size=10,
+        config={"chain_id": 1, "db_service": EmptyBlocksTable()},
+    )
+    _check(job, [_block(number, 1) for number in range(1, 11)])
+    assert node.requests == 0
+
+    with pytest.raises(ReorgDetectedError) as reorg:
+        _check(job, [_block(11, 2), _block(12, 2)])
+
+    assert reorg.value.fork_point == 8
+    assert node.requests == 1
+    # Indexing the new branch from the fork point again passes the check.
+    _check(job, [_block(8, 2, parent_branch=1)] + [_block(number, 2) for number in range(9, 13)])
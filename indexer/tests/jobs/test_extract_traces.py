@@ -0,0 +1,56 @@
+import pytest
+
+from indexer.jobs.export_traces_job import ExtractTraces
+
+
+def call(to, calls=None):
+    trace = {"type": "CALL", "from": "0xfrom", "to": to, "input": "0x", "value": "0x0", "gas": "0x1", "gasUsed": "0x1"}
+    if calls:
+        trace["calls"] = calls
+    return trace
+
+
+def geth_trace(*transaction_results):
+    return {
+        "block_number": "0x10",
+        "block_hash": "0xblock",
+        "block_timestamp": "0x1",
+        "transaction_traces": [
+            {"txHash": f"0xtx{index}", "result": result} for index, result in enumerate(transaction_results)
+        ],
+    }
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_jobs
+def test_traces_are_flattened_depth_first_in_call_order():
+    tree = call("0xa", [call("0xb", [call("0xc"), call("0xd")]), call("0xe")])
+
+    traces = ExtractTraces().geth_trace_to_traces(geth_trace(tree, call("0xf")))
+
+    assert [trace["to_address"] for trace in traces] == ["0xa", "0xb", "0xc", "0xd", "0xe", "0xf"]
+    assert [trace["trace_address"] for trace in traces] == [[], [0], [0, 0], [0, 1], [1], []]
+    assert [trace["subtraces"] for trace in traces] == [2, 2, 0, 0, 0, 0]
+    assert [trace["trace_id"] for trace in traces] == [
+        "0x10_0_0",
+        "0x10_0_1",
+        "0x10_0_2",
+        "0x10_0_3",
+        "0x10_0_4",
+        "0x10_1_0",
+    ]
+    assert [trace["trace_index"] for trace in traces] == [1, 2, 3, 4, 5, 1]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_jobs
+def test_call_stacks_deeper_than_the_recursion_limit():
+    tree = call("0x0")
+    for depth in range(1, 5000):
+        tree = call(hex(depth), [tree])
+
+    traces = ExtractTraces().geth_trace_to_traces(geth_trace(tree))
+
+    assert len(traces) == 5000
+    assert traces[-1]["to_address"] == "0x0"
+    assert traces[-1]["trace_address"] == [0] * 4999
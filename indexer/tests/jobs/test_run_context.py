@@ -0,0 +1,54 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from indexer.domain.log import Log
+from indexer.jobs.base_job import Collector
+from indexer.jobs.run_context import RunContext
+
+
+def _log(block_number, log_index=0):
+    return Log(
+        log_index=log_index,
+        address="0x0000000000000000000000000000000000000000",
+        data="0x",
+        transaction_hash="0x",
+        transaction_index=0,
+        block_timestamp=0,
+        block_number=block_number,
+        block_hash="0x",
+    )
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_jobs
+def test_collector_writes_into_its_run_context():
+    first, second = RunContext(1, 10), RunContext(11, 20)
+
+    Collector(None, [Log], first).collect(_log(1))
+    Collector(None, [Log], second).collects([_log(11), _log(12, 1)])
+
+    assert [log.block_number for log in first.data_buff[Log.type()]] == [1]
+    assert [log.block_number for log in second.data_buff[Log.type()]] == [11, 12]
+
+    first.clear()
+    assert Log.type() not in first.data_buff
+    assert len(second.data_buff[Log.type()]) == 2
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_jobs
+def test_run_contexts_stay_isolated_across_threads():
+    contexts = [RunContext(start, start + 99) for start in range(0, 800, 100)]
+
+    def fill(run_context):
+        output = Collector(None, [Log], run_context)
+        for block_number in range(run_context.start_block, run_context.end_block + 1):
+            output.collect(_log(block_number))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(fill, contexts))
+
+    for run_context in contexts:
+        block_numbers = [log.block_number for log in run_context.data_buff[Log.type()]]
+        assert block_numbers == list(range(run_context.start_block, run_context.end_block + 1))
@@ -0,0 +1,129 @@
+import threading
+from dataclasses import dataclass
+
+import pytest
+
+from indexer.exporters.async_export_queue import AsyncExportQueue
+from indexer.exporters.base_exporter import BaseExporter
+
+
+@dataclass
+class BlockHash:
+    number: int
+    hash: str
+
+
+class RecordingExporter(BaseExporter):
+    def __init__(self, gate=None, fail_on=None):
+        self.gate = gate
+        self.fail_on = fail_on
+        self.exported = []
+
+    def export_items(self, items, **kwargs):
+        if self.gate is not None:
+            self.gate.wait()
+        if kwargs.get("job_name") == self.fail_on:
+            raise ValueError(f"failed to export {self.fail_on}")
+        self.exported.append((kwargs.get("job_name"), list(items)))
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_async_export_queue_writes_in_order_with_backpressure():
+    gate = threading.Event()
+    exporter = RecordingExporter(gate=gate)
+    export_queue = AsyncExportQueue(max_pending=1)
+
+    export_queue.submit([exporter], [1], "first")
+    export_queue.submit([exporter], [2], "second")
+
+    blocked = threading.Thread(target=export_queue.submit, args=([exporter], [3], "third"))
+    blocked.start()
+    blocked.join(timeout=0.2)
+    assert blocked.is_alive()
+
+    gate.set()
+    blocked.join(timeout=5)
+    export_queue.wait()
+    export_queue.close()
+
+    assert exporter.exported == [("first", [1]), ("second", [2]), ("third", [3])]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_async_export_queue_raises_failures_at_the_barrier():
+    exporter = RecordingExporter(fail_on="first")
+    export_queue = AsyncExportQueue(max_pending=2)
+
+    export_queue.submit([exporter], [1], "first")
+    ticket = export_queue.submit([exporter], [2], "second")
+    with pytest.raises(ValueError):
+        export_queue.wait(ticket)
+    assert exporter.exported == []
+
+    export_queue.wait(export_queue.submit([exporter], [3], "third"))
+    export_queue.close()
+    assert exporter.exported == [("third", [3])]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_async_export_queue_scopes_failures_to_their_run():
+    exporter = RecordingExporter(fail_on="failing")
+    export_queue = AsyncExportQueue(max_pending=2)
+    failed_run, other_run, retry_run = object(), object(), object()
+
+    export_queue.submit([exporter], [1], "failing", scope=failed_run)
+    failed_ticket = export_queue.submit([exporter], [2], "after_failure", scope=failed_run)
+    other_ticket = export_queue.submit([exporter], [3], "other", scope=other_run)
+
+    export_queue.wait(other_ticket, scope=other_run)
+    with pytest.raises(ValueError):
+        export_queue.wait(failed_ticket, scope=failed_run)
+
+    export_queue.wait(export_queue.submit([exporter], [4], "retry", scope=retry_run), scope=retry_run)
+    export_queue.close()
+    assert exporter.exported == [("other", [3]), ("retry", [4])]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_async_export_queue_writes_concurrent_submits_in_ticket_order():
+    gate = threading.Event()
+    exporter = RecordingExporter(gate=gate)
+    export_queue = AsyncExportQueue(max_pending=1)
+
+    tickets = {}
+
+    def submit(index):
+        tickets[index] = export_queue.submit([exporter], [index], str(index))
+
+    threads = [threading.Thread(target=submit, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    gate.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    export_queue.wait()
+    export_queue.close()
+
+    by_ticket = [str(index) for index, _ in sorted(tickets.items(), key=lambda item: item[1])]
+    assert [job_name for job_name, _ in exporter.exported] == by_ticket
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_async_export_queue_exports_items_as_submitted():
+    gate = threading.Event()
+    exporter = RecordingExporter(gate=gate)
+    export_queue = AsyncExportQueue(max_pending=1)
+    block = BlockHash(number=1, hash="0x01")
+
+    export_queue.submit([exporter], [block], "blocks")
+    block.hash = "0x02"
+    gate.set()
+    export_queue.wait()
+    export_queue.close()
+
+    assert exporter.exported[0][1][0].hash == "0x01"
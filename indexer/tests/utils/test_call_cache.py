@@ -0,0 +1,83 @@
+from types import SimpleNamespace
+
+import orjson
+import pytest
+
+from common.utils.abi_code_utils import Function
+from indexer.utils.multicall_hemera import Call
+from indexer.utils.multicall_hemera.call_cache import CallResultCache
+from indexer.utils.multicall_hemera.multi_call_helper import MultiCallHelper
+
+BALANCE_OF_FUNCTION = Function(
+    {
+        "constant": True,
+        "inputs": [{"name": "who", "type": "address"}],
+        "name": "balanceOf",
+        "outputs": [{"name": "balance", "type": "uint256"}],
+        "payable": False,
+        "stateMutability": "view",
+        "type": "function",
+    }
+)
+TOKEN = "0xdac17f958d2ee523a2206206994597c13d831ec7"
+HOLDER = "0x5041ed759dd4afc3a72b8192c143f72f4724081a"
+
+
+def block_value(block_id):
+    return 0 if block_id == "latest" else int(block_id, 16)
+
+
+def make_helper(cache):
+    web3 = SimpleNamespace(provider=SimpleNamespace(endpoint_uri="http://127.0.0.1:1"), eth=SimpleNamespace(chain_id=1))
+    helper = MultiCallHelper(web3, {"batch_size": 1, "multicall": False, "max_workers": 2})
+    helper.call_cache = cache
+    sent = []
+
+    def make_request(params):
+        requests = orjson.loads(params)
+        sent.extend(requests)
+        # The balance answered is the block number the call was made at.
+        return [
+            {"jsonrpc": "2.0", "id": request["id"], "result": "0x" + format(block_value(request["params"][1]), "064x")}
+            for request in requests
+        ]
+
+    helper.make_request = make_request
+    return helper, sent
+
+
+def balance_call(block_number):
+    return Call(target=TOKEN, function_abi=BALANCE_OF_FUNCTION, parameters=[HOLDER], block_number=block_number)
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_duplicate_calls_are_sent_once():
+    helper, sent = make_helper(CallResultCache())
+    calls = [balance_call(100), balance_call(100), balance_call(101), balance_call(100)]
+
+    helper.execute_calls(calls)
+
+    assert len(sent) == 2
+    assert [call.returns["balance"] for call in calls] == [100, 100, 101, 100]
+    assert calls[0].returns is not calls[1].returns
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_cached_results_are_shared_between_helpers():
+    cache = CallResultCache(max_size=2)
+    helper, sent = make_helper(cache)
+    helper.execute_calls([balance_call(100), balance_call(101)])
+    assert len(sent) == 2
+
+    other_helper, other_sent = make_helper(cache)
+    calls = [balance_call(100), balance_call(101), balance_call(102), balance_call("latest")]
+    other_helper.execute_calls(calls)
+
+    assert [call.returns["balance"] for call in calls[:3]] == [100, 101, 102]
+    assert [request["params"][1] for request in other_sent] == ["0x66", "latest"]
+    assert cache.hits == 2
+    # Bounded to the two most recently used results.
+    assert cache.size() == 2
+    assert cache.get((1, TOKEN, calls[0].data, 100)) is None
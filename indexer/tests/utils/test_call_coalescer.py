@@ -0,0 +1,41 @@
+import pytest
+
+from indexer.tests.utils.test_call_cache import balance_call, make_helper
+from indexer.utils.multicall_hemera import call_coalescer
+from indexer.utils.multicall_hemera.call_cache import CallResultCache
+from indexer.utils.multicall_hemera.call_coalescer import CallCoalescer, wait_calls
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_calls_of_helpers_sharing_an_endpoint_go_out_in_one_round(monkeypatch):
+    monkeypatch.setattr(call_coalescer, "_coalescers", {})
+    helper, sent = make_helper(CallResultCache())
+    other_helper, other_sent = make_helper(CallResultCache())
+    assert other_helper.coalescer is helper.coalescer
+
+    futures = helper.submit_calls([balance_call(100), balance_call(101)])
+    other_futures = other_helper.submit_calls([balance_call(102)])
+    assert helper.coalescer.pending() == 3
+
+    assert [returns["balance"] for returns in wait_calls(futures)] == [100, 101]
+    assert all(future.done() for future in other_futures)
+    assert other_futures[0].result()["balance"] == 102
+    assert helper.coalescer.rounds == 1
+    assert len(sent) + len(other_sent) == 3
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_failed_round_fails_every_waiting_future():
+    class FailingHelper:
+        def execute_calls(self, calls):
+            raise ConnectionError("node down")
+
+    coalescer = CallCoalescer(FailingHelper())
+    futures = coalescer.submit_all([balance_call(100), balance_call(101)])
+
+    with pytest.raises(ConnectionError):
+        futures[0].result()
+    assert isinstance(futures[1].exception(timeout=0), ConnectionError)
+    assert coalescer.pending() == 0
@@ -0,0 +1,62 @@
+import pytest
+
+from common.utils import discovery_manifest
+from common.utils.discovery_manifest import DiscoveryManifest, get_manifest
+
+
+def manifest_data(fingerprint="a"):
+    return {
+        "version": discovery_manifest.MANIFEST_VERSION,
+        "fingerprint": fingerprint,
+        "domains": {"block": "domain.Block", "log": "domain.Log", "swap": "domain.Swap", "ens": "domain.Ens"},
+        "models": {"model.Blocks": ["domain.Block"], "model.Swaps": ["domain.Swap"]},
+        "jobs": {
+            "jobs.ExportBlocksJob": {"module": "jobs.blocks", "output_types": ["domain.Block"], "dependency_types": []},
+            "jobs.ExportLogsJob": {
+                "module": "jobs.logs",
+                "output_types": ["domain.Log"],
+                "dependency_types": ["domain.Block"],
+            },
+            "jobs.ExportSwapsJob": {
+                "module": "modules.swaps",
+                "output_types": ["domain.Swap"],
+                "dependency_types": ["domain.Log"],
+            },
+            "jobs.ExportEnsJob": {"module": "modules.ens", "output_types": ["domain.Ens"], "dependency_types": []},
+        },
+    }
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_job_modules_are_the_producers_of_the_outputs_and_their_dependencies():
+    manifest = DiscoveryManifest(manifest_data())
+
+    assert manifest.job_modules(["domain.Swap"]) == ["modules.swaps", "jobs.logs", "jobs.blocks"]
+    assert manifest.job_modules(["domain.Block"]) == ["jobs.blocks"]
+    assert manifest.models_of_domain("domain.Swap") == ["model.Swaps"]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_manifest_is_reused_until_the_sources_change(tmp_path, monkeypatch):
+    fingerprint = {"value": "a"}
+    builds = []
+
+    def build_manifest(current_fingerprint):
+        builds.append(current_fingerprint)
+        return DiscoveryManifest(manifest_data(current_fingerprint)), True
+
+    monkeypatch.setenv("HEMERA_DISCOVERY_MANIFEST", str(tmp_path / "manifest.json"))
+    monkeypatch.setattr(discovery_manifest, "source_fingerprint", lambda: fingerprint["value"])
+    monkeypatch.setattr(discovery_manifest, "build_manifest", build_manifest)
+
+    for _ in range(2):
+        monkeypatch.setattr(discovery_manifest, "_manifest", None)
+        assert get_manifest().domain_path("swap") == "domain.Swap"
+    assert builds == ["a"]
+
+    fingerprint["value"] = "b"
+    monkeypatch.setattr(discovery_manifest, "_manifest", None)
+    get_manifest()
+    assert builds == ["a", "b"]
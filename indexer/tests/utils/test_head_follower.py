@@ -0,0 +1,98 @@
+import json
+import queue
+import threading
+import time
+
+import pytest
+from websockets.sync.server import serve
+
+from indexer.utils.head_follower import NewHeadsLimitReader
+from indexer.utils.limit_reader import LimitReader
+
+
+class StaticLimitReader(LimitReader):
+    def __init__(self, block_number):
+        self.block_number = block_number
+
+    def get_current_block_number(self):
+        return self.block_number
+
+
+def header(number, block_hash, parent_hash):
+    return {"number": hex(number), "hash": block_hash, "parentHash": parent_hash}
+
+
+def start_node(headers: queue.Queue):
+    def handler(websocket):
+        request = json.loads(websocket.recv())
+        assert request["method"] == "eth_subscribe" and request["params"] == ["newHeads"]
+        websocket.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": "0xsub"}))
+        while True:
+            head = headers.get()
+            if head is None:
+                return
+            websocket.send(
+                json.dumps(
+                    {
+                        "jsonrpc": "2.0",
+                        "method": "eth_subscription",
+                        "params": {"subscription": "0xsub", "result": head},
+                    }
+                )
+            )
+
+    server = serve(handler, "127.0.0.1", 0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"ws://127.0.0.1:{server.socket.getsockname()[1]}"
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_pushed_heads_wake_the_waiter_and_reveal_reorgs():
+    headers = queue.Queue()
+    server, uri = start_node(headers)
+    reorgs = []
+    reader = NewHeadsLimitReader(
+        uri, fallback=StaticLimitReader(5), on_reorg=lambda number, head: reorgs.append(number)
+    )
+    try:
+        assert reader.get_current_block_number() == 5
+        headers.put(header(10, "0xa10", "0xa9"))
+        assert wait_until(lambda: reader.following)
+        assert reader.get_current_block_number() == 10
+
+        threading.Timer(0.2, headers.put, args=(header(11, "0xa11", "0xa10"),)).start()
+        start = time.monotonic()
+        reader.wait_for_new_block(10, timeout=10)
+        assert time.monotonic() - start < 5
+        assert reader.get_current_block_number() == 11
+        assert reader.header(11)["hash"] == "0xa11"
+
+        headers.put(header(12, "0xb12", "0xb11"))
+        assert wait_until(lambda: reorgs == [11])
+        assert reader.header(11) is None
+        assert reader.get_current_block_number() == 12
+    finally:
+        reader.close()
+        headers.put(None)
+        server.shutdown()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_falls_back_to_polling_without_subscription():
+    reader = NewHeadsLimitReader("ws://127.0.0.1:1", fallback=StaticLimitReader(7), stale_seconds=0.5)
+    try:
+        assert reader.get_current_block_number() == 7
+        start = time.monotonic()
+        reader.wait_for_new_block(7, timeout=0.2)
+        assert time.monotonic() - start >= 0.2
+    finally:
+        reader.close()
@@ -0,0 +1,72 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from indexer.utils.http_pool import EndpointSessionPool
+from indexer.utils.provider import BatchHTTPProvider
+
+
+class JsonRpcHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        requests = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps([{"jsonrpc": "2.0", "id": request["id"], "result": "0x1"} for request in requests]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_providers_share_keep_alive_connections(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), JsonRpcHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint_uri = f"http://127.0.0.1:{server.server_port}"
+
+    pool = EndpointSessionPool(pool_size=2)
+    monkeypatch.setattr("indexer.utils.provider.endpoint_session_pool", pool)
+    request = json.dumps([{"jsonrpc": "2.0", "method": "eth_blockNumber", "params": [], "id": 1}])
+
+    try:
+        for _ in range(3):
+            threads = [
+                threading.Thread(target=BatchHTTPProvider(endpoint_uri).make_request, kwargs={"params": request})
+                for _ in range(2)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert BatchHTTPProvider(endpoint_uri).make_request(params=request) == [
+            {"jsonrpc": "2.0", "id": 1, "result": "0x1"}
+        ]
+        metrics = pool.metrics()[endpoint_uri]
+        assert metrics["requests"] == 7
+        assert metrics["errors"] == 0
+        assert metrics["in_flight"] == 0
+        assert 1 <= metrics["connections_opened"] <= 2
+    finally:
+        pool.close()
+        server.shutdown()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_forked_process_gets_its_own_sessions(monkeypatch):
+    pool = EndpointSessionPool()
+    parent_session = pool.get_session("http://127.0.0.1:1")
+    assert pool.get_session("http://127.0.0.1:1") is parent_session
+
+    monkeypatch.setattr("indexer.utils.http_pool.os.getpid", lambda: -1)
+    child_session = pool.get_session("http://127.0.0.1:1")
+    assert child_session is not parent_session
+    assert pool.get_session("http://127.0.0.1:1") is child_session
@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import pytest
+
+from indexer.domain.columnar import ColumnarBatch
+from indexer.domain.log import Log
+from indexer.jobs.run_context import RunContext
+from indexer.specification.specification import TopicSpecification, TransactionFilterByLogs
+from indexer.utils.log_index import LogIndex, topic_specifications
+
+TRANSFER = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+SWAP = "0xd78ad95fa46c994b6551d0da85fc275fe613ce37657fb8d5e3d130840159d822"
+TOKEN = "0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2"
+POOL = "0xb4e16d0168e52d35cacd2c6185b44281ec28c9dc"
+
+
+def _log(log_index, topic0, address):
+    return Log(
+        log_index=log_index,
+        address=address,
+        data="0x",
+        transaction_hash=f"0x{log_index:064x}",
+        transaction_index=log_index,
+        block_timestamp=0,
+        block_number=1,
+        block_hash="0x",
+        topic0=topic0,
+    )
+
+
+def _transaction(log):
+    # TopicSpecification only looks at the receipt logs of the transaction.
+    return SimpleNamespace(receipt=SimpleNamespace(logs=[log]))
+
+
+LOGS = [_log(0, TRANSFER, TOKEN), _log(1, SWAP, POOL), _log(2, TRANSFER, POOL), _log(3, None, TOKEN)]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+@pytest.mark.parametrize(
+    "specifications",
+    [
+        [TopicSpecification(topics=[TRANSFER])],
+        [TopicSpecification(addresses=[TOKEN])],
+        [TopicSpecification(topics=[TRANSFER, SWAP], addresses=[POOL])],
+        [TopicSpecification(topics=[SWAP]), TopicSpecification(topics=[TRANSFER], addresses=[TOKEN])],
+        [TopicSpecification()],
+    ],
+)
+def test_index_matches_like_the_specifications(specifications):
+    index = LogIndex(LOGS)
+    expected = [log for log in LOGS if any(spec.is_satisfied_by(_transaction(log)) for spec in specifications)]
+
+    assert index.match(specifications) == expected
+    assert index.transaction_hashes(specifications) == {log.transaction_hash for log in expected}
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_index_normalizes_the_specification_case():
+    index = LogIndex(LOGS)
+    assert index.select(topics=[TRANSFER.upper().replace("0X", "0x")], addresses=[TOKEN.upper()]) == [LOGS[0]]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_run_context_shares_the_index_until_logs_change():
+    run_context = RunContext(1, 1)
+    run_context.data_buff.add_batch(Log.type(), ColumnarBatch.from_domains(Log, LOGS[:2]))
+
+    index = run_context.log_index()
+    assert run_context.log_index() is index
+    assert [log.log_index for log in index.select(topics=[TRANSFER])] == [0]
+
+    run_context.data_buff.add_batch(Log.type(), ColumnarBatch.from_domains(Log, LOGS[2:]))
+    assert [log.log_index for log in run_context.log_index().select(topics=[TRANSFER])] == [0, 2]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_topic_specifications_of_single_and_listed_filters():
+    by_logs = TransactionFilterByLogs([TopicSpecification(topics=[TRANSFER])])
+    assert topic_specifications(by_logs) == by_logs.specifications
+    assert topic_specifications([by_logs, object()]) == by_logs.specifications
@@ -0,0 +1,75 @@
+import os
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from indexer.domain.trace import Trace
+from indexer.exporters.item_exporter import create_item_exporter
+from indexer.jobs.run_context import RunContext
+
+
+def trace(block_number, trace_index, value=10**30):
+    return Trace(
+        trace_id=f"{block_number}_0_{trace_index}",
+        from_address="0x" + "aa" * 20,
+        to_address="0x" + "bb" * 20,
+        value=value,
+        input="0x",
+        output="0x",
+        trace_type="call",
+        call_type="call",
+        gas=21000,
+        gas_used=21000,
+        subtraces=0,
+        error=None,
+        status=1,
+        block_number=block_number,
+        block_hash="0x" + "cc" * 32,
+        block_timestamp=1,
+        transaction_index=0,
+        transaction_hash="0x" + "dd" * 32,
+        trace_index=trace_index,
+        trace_address=[0, trace_index],
+    )
+
+
+def files(directory):
+    return sorted(os.listdir(directory)) if os.path.exists(directory) else []
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_scope_writes_one_typed_file_per_window_on_commit(tmp_path):
+    exporter = create_item_exporter(f"parquetfile://{tmp_path}", {"blocks_per_file": 100})
+    scope = RunContext(100, 299)
+    exporter.export_items([trace(250, 1), trace(120, 0)], scope=scope)
+    exporter.export_items([trace(120, 1)], scope=scope)
+
+    assert files(tmp_path / "trace") == []
+    exporter.commit_scope(scope)
+    assert files(tmp_path / "trace") == ["trace-100-199.parquet", "trace-200-299.parquet"]
+
+    table = pq.read_table(tmp_path / "trace" / "trace-100-199.parquet")
+    assert table.column("trace_index").to_pylist() == [0, 1]
+    assert str(table.schema.field("block_number").type) == "int64"
+    assert table.column("value").to_pylist() == [str(10**30)] * 2
+    assert table.column("status").to_pylist() == ["1", "1"]
+    assert table.column("trace_address").to_pylist() == [[0, 0], [0, 1]]
+    metadata = pq.ParquetFile(tmp_path / "trace" / "trace-100-199.parquet").metadata.row_group(0)
+    assert metadata.column(0).compression == "ZSTD"
+    encodings = {metadata.column(i).path_in_schema: metadata.column(i).encodings for i in range(metadata.num_columns)}
+    assert "RLE_DICTIONARY" in encodings["from_address"]
+    assert "RLE_DICTIONARY" not in encodings["transaction_hash"]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_rolled_back_scope_leaves_no_file(tmp_path):
+    exporter = create_item_exporter(f"parquetfile://{tmp_path}", {"blocks_per_file": 100})
+    scope = RunContext(100, 199)
+    exporter.export_items([trace(150, 0)], scope=scope)
+    exporter.rollback_scope(scope)
+    exporter.commit_scope(scope)
+
+    assert files(tmp_path / "trace") == []
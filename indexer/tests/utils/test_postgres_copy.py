@@ -0,0 +1,129 @@
+import contextlib
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from psycopg2._json import Json
+
+from common.models.logs import Logs
+from common.models.tokens import Tokens
+from indexer.exporters.postgres_item_exporter import (
+    PostgresItemExporter,
+    copy_and_upsert,
+    copy_text_line,
+    sql_insert_statement,
+)
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+        self.copied = None
+
+    def execute(self, statement):
+        self.statements.append(statement)
+
+    def copy_expert(self, statement, file):
+        self.statements.append(statement)
+        self.copied = file.read()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_copy_text_line_escapes_values():
+    line = copy_text_line(
+        [
+            None,
+            b"\x01\xab",
+            "tab\tnew\nline\\",
+            True,
+            datetime(2024, 7, 31, 1, 2, 3),
+            Json({"a": "b"}),
+            [b"\x01", None],
+            2**255,
+        ]
+    )
+
+    assert line.split("\t") == [
+        "\\N",
+        "\\\\x01ab",
+        "tab\\tnew\\nline\\\\",
+        "t",
+        "2024-07-31T01:02:03",
+        '{"a": "b"}',
+        '{"\\\\\\\\x01",NULL}',
+        str(2**255) + "\n",
+    ]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_copy_and_upsert_keeps_conflict_semantics():
+    cur = RecordingCursor()
+    statement = copy_and_upsert(
+        cur,
+        Tokens,
+        True,
+        ["address", "block_number"],
+        [(b"\x01", 1), (b"\x01", 2)],
+        where_clause="tokens.block_number <= EXCLUDED.block_number",
+    )
+
+    assert statement.startswith("INSERT INTO public.tokens (address, block_number) SELECT DISTINCT ON (address)")
+    assert "ON CONFLICT (address) DO UPDATE SET block_number = EXCLUDED.block_number" in statement
+    assert statement.endswith(" WHERE tokens.block_number <= EXCLUDED.block_number")
+    assert cur.copied == "\\\\x01\t1\n\\\\x01\t2\n"
+
+    cur = RecordingCursor()
+    statement = copy_and_upsert(cur, Logs, False, ["log_index"], [(1,)])
+    assert statement.endswith("ORDER BY _copy_ordinal ON CONFLICT DO NOTHING ")
+    assert sql_insert_statement(Logs, False, ["log_index"]).startswith("INSERT INTO public.logs (log_index) VALUES %s")
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.events = []
+
+    def cursor(self):
+        return contextlib.nullcontext(RecordingCursor())
+
+    def commit(self):
+        self.events.append("commit")
+
+    def rollback(self):
+        self.events.append("rollback")
+
+
+class RecordingPool:
+    def __init__(self):
+        self.connections = []
+        self.returned = []
+
+    def getconn(self):
+        self.connections.append(RecordingConnection())
+        return self.connections[-1]
+
+    def putconn(self, conn):
+        self.returned.append(conn)
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_copy_mode_holds_one_transaction_per_scope(monkeypatch):
+    pool = RecordingPool()
+    service = SimpleNamespace(connection_pool=pool)
+    exporter = PostgresItemExporter(postgres_url="postgresql://test", load_mode="copy")
+    monkeypatch.setattr(exporter, "get_service", lambda: service)
+
+    committed_range, failed_range = object(), object()
+    for scope in (committed_range, committed_range, failed_range):
+        with exporter._cursor(service, scope):
+            pass
+    assert len(pool.connections) == 2 and pool.returned == []
+
+    exporter.commit_scope(committed_range)
+    exporter.rollback_scope(failed_range)
+    exporter.commit_scope(failed_range)
+
+    assert [conn.events for conn in pool.connections] == [["commit"], ["rollback"]]
+    assert pool.returned == pool.connections
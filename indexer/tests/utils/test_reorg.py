@@ -0,0 +1,49 @@
+import pytest
+
+from common.models.blocks import Blocks
+from common.models.logs import Logs
+from common.models.transactions import Transactions
+from indexer.utils.reorg import reorged_tables
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        self.conn.executed.append((sql, params))
+
+    def fetchall(self):
+        return self.conn.rows
+
+
+class FakeService:
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+        self.released = 0
+
+    def get_conn(self):
+        return self
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def release_conn(self, conn):
+        self.released += 1
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_reorged_tables_are_found_with_one_query():
+    service = FakeService(rows=[("transactions",)])
+
+    tables = reorged_tables([Blocks, Transactions, Logs, Transactions], 100, 110, service)
+
+    assert tables == {Transactions}
+    assert len(service.executed) == 1
+    sql, params = service.executed[0]
+    assert sql.count("UNION ALL") == 2
+    assert "number BETWEEN" in sql and "block_number BETWEEN" in sql
+    assert params == {"start_block": 100, "end_block": 110}
+    assert service.released == 1
@@ -0,0 +1,179 @@
+import copy
+from dataclasses import fields
+from types import SimpleNamespace
+from typing import Optional, get_type_hints
+
+import pytest
+from sqlalchemy.dialects.postgresql import ARRAY, BYTEA, JSON, JSONB, TIMESTAMP
+
+from common.converter.pg_converter import domain_model_mapping
+from common.models import general_converter
+from indexer.domain.block import Block
+from indexer.domain.log import Log
+from indexer.domain.token import UpdateToken
+from indexer.domain.token_balance import TokenBalance
+from indexer.domain.token_id_infos import ERC721TokenIdDetail, ERC1155TokenIdDetail
+from indexer.domain.transaction import Transaction
+from indexer.modules.custom.all_features_value_record import AllFeatureValueRecordUniswapV3Pool
+
+
+def _general(domain, item):
+    pg_config = domain_model_mapping[domain]
+    return general_converter(pg_config["table"], item, pg_config["conflict_do_update"])
+
+
+def _without(columns, values, column):
+    return [value for name, value in zip(columns, values) if name != column]
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_compiled_converter_matches_general_converter():
+    log = Log(
+        log_index=30,
+        address="0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2",
+        data="0x",
+        transaction_hash="0xa997e7b311a972a5a1f6f99bee98eaca3f719c549f2a756e0a74d76ed6061028",
+        transaction_index=39,
+        block_timestamp=1722382175,
+        block_number=20425048,
+        block_hash="0x6db7768a30446e0a6d00c624d4ec1d17e5eabd8b4cb464396900b967fd9a6058",
+        topic0="0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",
+    )
+    row_converter = domain_model_mapping[Log]["row_converter"]
+    expected = _general(Log, log)
+
+    assert row_converter.is_compiled
+    assert row_converter.columns == list(expected.keys())
+    assert row_converter.convert(log) == tuple(expected.values())
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_compiled_converter_handles_update_time_and_json():
+    for domain, item in [
+        (UpdateToken, UpdateToken(address="0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2", block_number=1)),
+        (
+            AllFeatureValueRecordUniswapV3Pool,
+            AllFeatureValueRecordUniswapV3Pool(
+                feature_id=1,
+                block_number=1,
+                address="0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2",
+                value={"a": 1},
+                update_time=1722382175,
+            ),
+        ),
+    ]:
+        row_converter = domain_model_mapping[domain]["row_converter"]
+        expected = _general(domain, item)
+        converted = row_converter.convert(item)
+
+        assert row_converter.columns == list(expected.keys())
+        assert "update_time" in row_converter.columns
+        compared = [
+            (value.adapted if hasattr(value, "adapted") else value)
+            for value in _without(row_converter.columns, converted, "update_time")
+        ]
+        assert compared == [
+            (value.adapted if hasattr(value, "adapted") else value)
+            for value in _without(row_converter.columns, expected.values(), "update_time")
+        ]
+
+
+def _sample_value(column_type, annotation):
+    if isinstance(column_type, BYTEA):
+        return "0x01"
+    if isinstance(column_type, TIMESTAMP):
+        return 1722382175
+    if isinstance(column_type, ARRAY) and isinstance(column_type.item_type, BYTEA):
+        return ["0x01"]
+    if isinstance(column_type, (JSON, JSONB)):
+        return {"a": 1}
+    if annotation is bool:
+        return True
+    if annotation in (int, Optional[int]):
+        return 1
+    if annotation in (str, Optional[str]):
+        return "a"
+    return None
+
+
+def _sample(domain, table):
+    hints = get_type_hints(domain)
+    values = {}
+    for field in fields(domain):
+        column = table.__table__.c.get(field.name)
+        values[field.name] = _sample_value(column.type if column is not None else None, hints[field.name])
+    return domain(**values)
+
+
+def _comparable(columns, values):
+    return {
+        name: (value.adapted if hasattr(value, "adapted") else value)
+        for name, value in zip(columns, values)
+        if name != "update_time"
+    }
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_compiled_converters_match_their_converter_for_every_mapping():
+    for domain, pg_config in domain_model_mapping.items():
+        row_converter = pg_config["row_converter"]
+        if not row_converter.is_compiled:
+            continue
+
+        item = _sample(domain, pg_config["table"])
+        expected = pg_config["converter"](pg_config["table"], copy.copy(item), pg_config["conflict_do_update"])
+        converted = row_converter.convert(item)
+
+        assert row_converter.columns == list(expected.keys()), domain.__name__
+        assert _comparable(row_converter.columns, converted) == _comparable(
+            expected.keys(), expected.values()
+        ), domain.__name__
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_custom_converters_are_compiled():
+    for domain in (Transaction, Block, ERC721TokenIdDetail, ERC1155TokenIdDetail):
+        assert domain_model_mapping[domain]["row_converter"].is_compiled, domain.__name__
+
+    detail = ERC721TokenIdDetail(
+        token_address="0x01", token_id=1, token_uri="ipfs://a b", block_number=1, block_timestamp=1
+    )
+    row_converter = domain_model_mapping[ERC721TokenIdDetail]["row_converter"]
+    converted = dict(zip(row_converter.columns, row_converter.convert(detail)))
+    assert converted["token_uri"] == "ipfs%3A%2F%2Fa+b"
+    assert detail.token_uri == "ipfs://a b"
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_exporter
+def test_composed_converters_read_nested_and_defaulted_values():
+    pg_config = domain_model_mapping[Transaction]
+    transaction = _sample(Transaction, pg_config["table"])
+    transaction.receipt = SimpleNamespace(
+        root="0x02",
+        status=1,
+        gas_used=21000,
+        cumulative_gas_used=42000,
+        effective_gas_price=7,
+        l1_fee=None,
+        l1_fee_scalar=None,
+        l1_gas_used=None,
+        l1_gas_price=None,
+        blob_gas_used=None,
+        blob_gas_price=None,
+        contract_address=None,
+    )
+    expected = pg_config["converter"](pg_config["table"], transaction, False)
+    converted = pg_config["row_converter"].convert(transaction)
+    assert dict(zip(pg_config["row_converter"].columns, converted))["receipt_root"] == b"\x02"
+    assert _comparable(pg_config["row_converter"].columns, converted) == _comparable(expected.keys(), expected.values())
+
+    pg_config = domain_model_mapping[TokenBalance]
+    balance = _sample(TokenBalance, pg_config["table"])
+    balance.token_id = None
+    converted = dict(zip(pg_config["row_converter"].columns, pg_config["row_converter"].convert(balance)))
+    assert converted["token_id"] == -1 and balance.token_id is None
@@ -0,0 +1,147 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from indexer.utils.provider import LoadBalancedHTTPProvider, parse_block_number
+from indexer.utils.rpc_balancer import RpcLoadBalancer
+
+
+def start_node(head=100, status=200, delay=0.0, body=None):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            time.sleep(delay)
+            answer = {"jsonrpc": "2.0", "id": request["id"], **(body or {"result": hex(head)})}
+            raw_answer = json.dumps(answer).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(raw_answer)))
+            self.end_headers()
+            self.wfile.write(raw_answer)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def request(method="eth_getBlockByNumber"):
+    return json.dumps({"jsonrpc": "2.0", "method": method, "params": [], "id": 1}).encode()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_balancer_fails_over_and_ejects_broken_node():
+    broken, broken_uri = start_node(status=500)
+    healthy, healthy_uri = start_node()
+    balancer = RpcLoadBalancer([broken_uri, healthy_uri], eject_after=1, eject_seconds=60)
+    try:
+        for _ in range(20):
+            served_by, raw_response = balancer.post(request(), ["eth_getBlockByNumber"], timeout=5)
+            assert served_by == healthy_uri
+            assert parse_block_number(raw_response) == 100
+
+        assert balancer.endpoints[0].is_ejected(time.monotonic())
+        assert balancer.ranked()[0].endpoint_uri == healthy_uri
+    finally:
+        broken.shutdown()
+        healthy.shutdown()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_head_probe_skips_lagging_nodes():
+    servers = [start_node(head=head) for head in (100, 98, 50)]
+    uris = [uri for _, uri in servers]
+    balancer = RpcLoadBalancer(uris, max_head_lag=5)
+    try:
+        served_by, raw_response = balancer.post_head_probe(request("eth_blockNumber"), parse_block_number, timeout=5)
+        assert (served_by, parse_block_number(raw_response)) == (uris[1], 98)
+        assert [endpoint.endpoint_uri for endpoint in balancer.ranked()][-1] == uris[2]
+    finally:
+        for server, _ in servers:
+            server.shutdown()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_hedged_request_takes_the_faster_node():
+    slow, slow_uri = start_node(delay=2)
+    fast, fast_uri = start_node()
+    balancer = RpcLoadBalancer(
+        [slow_uri, fast_uri], hedge_methods=["debug_traceBlockByNumber"], hedge_factor=1, min_hedge_delay=0.1
+    )
+    balancer.endpoints[1].latency = 10
+    try:
+        provider = LoadBalancedHTTPProvider(f"{slow_uri},{fast_uri}", request_kwargs={"timeout": 5}, batch=True)
+        provider.balancer = balancer
+
+        start = time.monotonic()
+        response = provider.make_request(params=request("debug_traceBlockByNumber").decode())
+        assert response["result"] == hex(100)
+        assert time.monotonic() - start < 1.5
+    finally:
+        slow.shutdown()
+        fast.shutdown()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_error_and_null_answers_fail_over_to_the_next_node():
+    unsynced, unsynced_uri = start_node(body={"result": None})
+    failing, failing_uri = start_node(body={"error": {"code": -32000, "message": "header not found"}})
+    healthy, healthy_uri = start_node()
+    balancer = RpcLoadBalancer([unsynced_uri, failing_uri, healthy_uri], eject_after=1, eject_seconds=60)
+    try:
+        for _ in range(20):
+            served_by, raw_response = balancer.post(request(), ["eth_getBlockByNumber"], timeout=5)
+            assert served_by == healthy_uri
+            assert parse_block_number(raw_response) == 100
+
+        status = {endpoint["endpoint_uri"]: endpoint for endpoint in balancer.status()}
+        assert status[unsynced_uri]["ejected"] and status[failing_uri]["ejected"]
+        assert not status[healthy_uri]["ejected"]
+
+        # With no node left to try, the caller gets the error answer as it would without balancing.
+        balancer = RpcLoadBalancer([failing_uri], eject_after=1)
+        served_by, raw_response = balancer.post(request(), ["eth_getBlockByNumber"], timeout=5)
+        assert json.loads(raw_response)["error"]["message"] == "header not found"
+    finally:
+        unsynced.shutdown()
+        failing.shutdown()
+        healthy.shutdown()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_reverted_calls_do_not_count_against_the_node():
+    reverting, reverting_uri = start_node(body={"error": {"code": 3, "message": "execution reverted"}})
+    balancer = RpcLoadBalancer([reverting_uri], eject_after=1)
+    try:
+        balancer.post(request("eth_call"), ["eth_call"], timeout=5)
+        assert not balancer.endpoints[0].is_ejected(time.monotonic())
+    finally:
+        reverting.shutdown()
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_head_probe_does_not_wait_for_slow_nodes():
+    slow, slow_uri = start_node(head=200, delay=2)
+    fast, fast_uri = start_node(head=100)
+    balancer = RpcLoadBalancer([slow_uri, fast_uri], eject_after=1, probe_seconds=0.3)
+    try:
+        start = time.monotonic()
+        served_by, raw_response = balancer.post_head_probe(request("eth_blockNumber"), parse_block_number, timeout=5)
+        assert time.monotonic() - start < 1.5
+        assert (served_by, parse_block_number(raw_response)) == (fast_uri, 100)
+        assert balancer.endpoints[0].is_ejected(time.monotonic())
+    finally:
+        slow.shutdown()
+        fast.shutdown()
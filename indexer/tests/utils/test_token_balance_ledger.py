@@ -0,0 +1,78 @@
+import pytest
+
+from common.utils.web3_utils import ZERO_ADDRESS
+from indexer.domain.token_transfer import ERC20TokenTransfer
+from indexer.utils.token_balance_ledger import TokenBalanceLedger, transfer_keys
+
+TOKEN = "0x" + "aa" * 20
+ALICE = "0x" + "01" * 20
+BOB = "0x" + "02" * 20
+CAROL = "0x" + "03" * 20
+
+
+def _transfer(block_number, log_index, from_address, to_address, value):
+    return ERC20TokenTransfer(
+        transaction_hash="0x" + "00" * 32,
+        log_index=log_index,
+        from_address=from_address,
+        to_address=to_address,
+        value=value,
+        token_type="ERC20",
+        token_address=TOKEN,
+        block_number=block_number,
+        block_hash="0x" + "00" * 32,
+        block_timestamp=block_number * 12,
+    )
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_balances_are_taken_at_the_end_of_every_block():
+    ledger = TokenBalanceLedger()
+    transfers = [
+        _transfer(11, 0, ALICE, BOB, 30),
+        _transfer(10, 5, BOB, ALICE, 5),
+        _transfer(10, 1, ZERO_ADDRESS, ALICE, 100),
+        _transfer(11, 3, BOB, CAROL, 10),
+    ]
+    assert ledger.begin(10)
+    assert transfer_keys(transfers) == [(TOKEN, ALICE), (TOKEN, BOB), (TOKEN, CAROL)]
+    ledger.set((TOKEN, ALICE), 0)
+    ledger.set((TOKEN, BOB), 50)
+
+    balances = ledger.apply(transfers, 11)
+
+    assert balances == {
+        (TOKEN, ALICE, 10): (105, 120),
+        (TOKEN, BOB, 10): (45, 120),
+        (TOKEN, ALICE, 11): (75, 132),
+        (TOKEN, BOB, 11): (65, 132),
+    }
+    # Carol was never seeded, her balance is left to balanceOf.
+    assert ledger.missing(transfer_keys(transfers)) == [(TOKEN, CAROL)]
+    assert not ledger.begin(12)
+    assert ledger.begin(11)
+    assert ledger.get((TOKEN, ALICE)) is None
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_least_recent_holders_spill_and_come_back(tmp_path):
+    ledger = TokenBalanceLedger(max_holders=2, spill_dir=str(tmp_path))
+    ledger.begin(1)
+    ledger.set((TOKEN, ALICE), 10**30)
+    ledger.set((TOKEN, BOB), 2)
+    ledger.set((TOKEN, CAROL), 3)
+
+    assert len(ledger._balances) == 2
+    assert ledger.get((TOKEN, ALICE)) == 10**30
+    assert ledger.get((TOKEN, BOB)) == 2
+
+    ledger.discard_token(TOKEN)
+    assert ledger.missing([(TOKEN, ALICE), (TOKEN, BOB), (TOKEN, CAROL)]) == [
+        (TOKEN, ALICE),
+        (TOKEN, BOB),
+        (TOKEN, CAROL),
+    ]
+    ledger.close()
+    assert list(tmp_path.iterdir()) == []
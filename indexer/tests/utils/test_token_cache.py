@@ -0,0 +1,82 @@
+import pytest
+
+from indexer.cache import token_cache
+from indexer.cache.token_cache import MemoryTokenStore, TokenCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def erc20(address, total_supply=100):
+    return {
+        "address": address,
+        "token_type": "ERC20",
+        "name": "Token",
+        "symbol": "TKN",
+        "decimals": 18,
+        "block_number": 1,
+        "total_supply": total_supply,
+    }
+
+
+def not_a_token(address):
+    return {
+        "address": address,
+        "token_type": "ERC721",
+        "name": None,
+        "symbol": None,
+        "decimals": None,
+        "block_number": 1,
+        "total_supply": None,
+    }
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_load_reads_only_unknown_addresses_from_db(monkeypatch):
+    queried = []
+
+    def get_tokens_from_db(service, addresses):
+        queried.append(sorted(addresses))
+        return {address: erc20(address) for address in addresses if address != "0xc"}
+
+    monkeypatch.setattr(token_cache, "get_tokens_from_db", get_tokens_from_db)
+    cache = TokenCache(MemoryTokenStore(max_size=2), db_service=object())
+    cache["0xa"] = erc20("0xa")
+
+    assert cache.load(["0xa", "0xb", "0xc"]) == ["0xc"]
+    assert queried == [["0xb", "0xc"]]
+    assert "0xb" in cache and cache["0xb"]["token_type"] == "ERC20"
+
+    # Bounded to the two most recently used tokens.
+    cache["0xd"] = erc20("0xd")
+    assert len(cache) == 2
+    assert "0xa" not in cache
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_not_tokens_expire_and_skip_total_supply_refresh():
+    clock = Clock()
+    cache = TokenCache(not_token_ttl=60, total_supply_ttl=30, clock=clock)
+    cache["0xa"] = erc20("0xa")
+    cache["0xb"] = not_a_token("0xb")
+
+    assert not cache.total_supply_due("0xa")
+    assert not cache.total_supply_due("0xb")
+
+    clock.now += 30
+    assert cache.total_supply_due("0xa")
+    cache.total_supply_refreshed("0xa", 200)
+    assert cache["0xa"]["total_supply"] == 200
+    assert not cache.total_supply_due("0xa")
+    assert "0xb" in cache
+
+    clock.now += 30
+    assert "0xb" not in cache
+    assert cache.get("0xb") is None
@@ -1,6 +1,6 @@
 import pytest
 
-from common.utils.abi_code_utils import Event, Function, decode_data
+from common.utils.abi_code_utils import Event, Function, decode_data, decode_log
 from common.utils.format_utils import bytes_to_hex_str, hex_str_to_bytes
 from indexer.domain.log import Log
 from indexer.domain.receipt import Receipt
@@ -176,3 +176,75 @@ def test_hex_bytes_convert():
         hex_str_to_bytes(address)
     except Exception as e:
         assert str(e) == f"non-hexadecimal number found in fromhex() arg at position 1"
+
+
+def _transfer_log(log_index, from_address, to_address, value):
+    return Log(
+        log_index=log_index,
+        address="0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2",
+        data="0x" + f"{value:064x}",
+        transaction_hash="0x2b66fa257d39c63e44daf67a39feaa3c9780d93c8163c937f646eb08ee1f21e9",
+        transaction_index=0,
+        block_timestamp=1720502543,
+        block_number=20266821,
+        block_hash="0x57e6790144b04dc31ae17601635cbfc5dce540fe23978dff419f470b7f482bdd",
+        topic0="0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef",
+        topic1="0x" + from_address[2:].rjust(64, "0"),
+        topic2="0x" + to_address[2:].rjust(64, "0"),
+    )
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_event_decode_logs_matches_decode_log():
+    transfer = Event(
+        {
+            "anonymous": False,
+            "inputs": [
+                {"indexed": True, "name": "from", "type": "address"},
+                {"indexed": False, "name": "value", "type": "uint256"},
+                {"indexed": True, "name": "to", "type": "address"},
+            ],
+            "name": "Transfer",
+            "type": "event",
+        }
+    )
+    logs = [
+        _transfer_log(0, "0x" + "11" * 20, "0x" + "22" * 20, 10**18),
+        _transfer_log(1, "0x" + "33" * 20, "0x" + "44" * 20, 7),
+        _transfer_log(2, "0x" + "33" * 20, "0x" + "44" * 20, 7),
+    ]
+    logs[2].data = "0x"
+
+    assert transfer.decode_logs(logs) == [transfer.decode_log(log) for log in logs]
+    assert transfer.decode_logs(logs[:2], as_tuples=True) == [
+        ("0x" + "11" * 20, 10**18, "0x" + "22" * 20),
+        ("0x" + "33" * 20, 7, "0x" + "44" * 20),
+    ]
+    assert transfer.decode_logs(logs)[2] is None
+    assert transfer.decode_log_ignore_indexed(logs[0]) == {
+        "from": "0x" + "11" * 20,
+        "to": "0x" + "22" * 20,
+        "value": 10**18,
+    }
+
+
+@pytest.mark.indexer
+@pytest.mark.indexer_utils
+def test_event_decodes_indexed_strings_as_hashes_without_changing_the_abi():
+    event_abi = {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "name", "type": "string"},
+            {"indexed": False, "name": "value", "type": "uint256"},
+        ],
+        "name": "NameSet",
+        "type": "event",
+    }
+    name_hash = "0x" + "ab" * 32
+    log = _transfer_log(0, "0x" + "11" * 20, "0x" + "22" * 20, 5)
+    log.topic1, log.topic2 = name_hash, None
+
+    assert Event(event_abi).decode_log(log) == {"name": bytes.fromhex("ab" * 32), "value": 5}
+    assert decode_log(event_abi, log) == {"name": bytes.fromhex("ab" * 32), "value": 5}
+    assert event_abi["inputs"][0]["type"] == "string"
@@ -0,0 +1,193 @@
+import json
+import logging
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from urllib.parse import urlparse
+
+from websockets.sync.client import connect
+
+from indexer.utils.limit_reader import LimitReader
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBE_REQUEST = {"jsonrpc": "2.0", "id": 1, "method": "eth_subscribe", "params": ["newHeads"]}
+RECONNECT_SECONDS = (0.5, 1, 2, 5, 10)
+
+
+class WebSocketHeads:
+    def __init__(self, uri: str, timeout: float):
+        self._client = connect(uri, open_timeout=timeout, close_timeout=1, max_size=None)
+        self._timeout = timeout
+
+    def __enter__(self):
+        self._connection = self._client.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._client.__exit__(*exc_info)
+
+    def send(self, message: dict):
+        self._connection.send(json.dumps(message))
+
+    def receive(self) -> dict:
+        return json.loads(self._connection.recv(timeout=self._timeout))
+
+
+class IPCHeads:
+    def __init__(self, path: str, timeout: float):
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.settimeout(timeout)
+        self._socket.connect(path)
+        self._buffer = ""
+        self._decoder = json.JSONDecoder()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._socket.close()
+
+    def send(self, message: dict):
+        self._socket.sendall(json.dumps(message).encode())
+
+    def receive(self) -> dict:
+        # Messages on the socket are concatenated JSON objects without a separator.
+        while True:
+            self._buffer = self._buffer.lstrip()
+            if self._buffer:
+                try:
+                    message, end = self._decoder.raw_decode(self._buffer)
+                    self._buffer = self._buffer[end:]
+                    return message
+                except json.JSONDecodeError:
+                    pass
+            chunk = self._socket.recv(65536)
+            if not chunk:
+                raise ConnectionError("IPC socket closed by the node")
+            self._buffer += chunk.decode()
+
+
+def open_heads_connection(uri: str, timeout: float):
+    parsed = urlparse(uri)
+    if parsed.scheme in ("ws", "wss"):
+        return WebSocketHeads(uri, timeout)
+    if parsed.scheme == "file":
+        return IPCHeads(parsed.path, timeout)
+    raise ValueError(f"Unknown head subscription uri scheme {uri}, should be ws://, wss:// or file://")
+
+
+class NewHeadsLimitReader(LimitReader):
+    """
+    Follows the chain head through an eth_subscribe newHeads subscription over WebSocket or IPC.
+
+    The head is pushed by the node as soon as a block is imported, so the stream controller wakes up
+    on the new block instead of sleeping period_seconds. The last max_headers headers are kept; a header
+    whose parentHash is not the hash kept for its parent is reported to on_reorg the moment it arrives.
+
+    While the subscription is down, or silent for more than stale_seconds, the head comes from the
+    fallback reader and the follower reconnects in the background.
+    """
+
+    def __init__(
+        self,
+        uri: str,
+        fallback: LimitReader,
+        stale_seconds: float = 30,
+        max_headers: int = 256,
+        on_reorg: Optional[Callable[[int, dict], None]] = None,
+        connection_factory: Callable = open_heads_connection,
+    ):
+        self.uri = uri
+        self.fallback = fallback
+        self.stale_seconds = stale_seconds
+        self.max_headers = max_headers
+        self.on_reorg = on_reorg
+        self._connection_factory = connection_factory
+        self._condition = threading.Condition()
+        self._headers: OrderedDict = OrderedDict()
+        self._head: Optional[int] = None
+        self._received_at = 0.0
+        self._connected = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._follow, name="NewHeadsLimitReader", daemon=True)
+        self._thread.start()
+
+    @property
+    def following(self) -> bool:
+        return self._connected and time.monotonic() - self._received_at < self.stale_seconds
+
+    def get_current_block_number(self):
+        if self.following:
+            return self._head
+        return self.fallback.get_current_block_number()
+
+    def wait_for_new_block(self, current_block, timeout):
+        if not self.following:
+            return super().wait_for_new_block(current_block, timeout)
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._closed or (self._head is not None and self._head > current_block), timeout
+            )
+
+    def header(self, block_number: int) -> Optional[dict]:
+        with self._condition:
+            return self._headers.get(block_number)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def _follow(self):
+        attempt = 0
+        while not self._closed:
+            try:
+                with self._connection_factory(self.uri, self.stale_seconds) as connection:
+                    connection.send(SUBSCRIBE_REQUEST)
+                    subscription = connection.receive()
+                    if "result" not in subscription:
+                        raise ConnectionError(f"newHeads subscription refused: {subscription.get('error')}")
+                    logger.info(f"Subscribed to newHeads on {self.uri}")
+                    self._connected = True
+                    attempt = 0
+                    while not self._closed:
+                        message = connection.receive()
+                        header = message.get("params", {}).get("result")
+                        if message.get("method") == "eth_subscription" and header:
+                            self.on_header(header)
+            except Exception as e:
+                logger.warning(f"newHeads subscription on {self.uri} lost, polling the head meanwhile: {e}")
+            finally:
+                self._connected = False
+            if not self._closed:
+                time.sleep(RECONNECT_SECONDS[min(attempt, len(RECONNECT_SECONDS) - 1)])
+                attempt += 1
+
+    def on_header(self, header: dict):
+        number = int(header["number"], 16)
+        reorged = None
+        with self._condition:
+            parent = self._headers.get(number - 1)
+            replaced = self._headers.get(number)
+            if parent is not None and parent["hash"] != header["parentHash"]:
+                reorged = number - 1
+            elif replaced is not None and replaced["hash"] != header["hash"]:
+                reorged = number
+            if reorged is not None:
+                # Headers above the fork point belong to the abandoned branch.
+                for stale_number in [n for n in self._headers if n >= reorged]:
+                    del self._headers[stale_number]
+            self._headers[number] = header
+            while len(self._headers) > self.max_headers:
+                self._headers.popitem(last=False)
+            self._head = number
+            self._received_at = time.monotonic()
+            self._condition.notify_all()
+
+        if reorged is not None:
+            logger.warning(f"Parent hash mismatch at block {reorged} seen with head {number}, the chain reorganized")
+            if self.on_reorg is not None:
+                self.on_reorg(reorged, header)
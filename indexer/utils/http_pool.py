@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from indexer.utils.metrics import endpoint_label, registry
+from indexer.utils.rpc_utils import METHOD_PATTERN
+
+logger = logging.getLogger(__name__)
+
+rpc_requests = registry.counter(
+    "hemera_rpc_requests_total", "HTTP requests sent to RPC endpoints, a batch counts once.", ["endpoint", "method"]
+)
+rpc_calls = registry.counter(
+    "hemera_rpc_calls_total", "JSON-RPC calls sent to RPC endpoints, every call of a batch.", ["endpoint", "method"]
+)
+rpc_errors = registry.counter(
+    "hemera_rpc_request_errors_total", "RPC requests failing at the HTTP level.", ["endpoint", "method"]
+)
+rpc_sent_bytes = registry.counter("hemera_rpc_sent_bytes_total", "Bytes of RPC requests.", ["endpoint", "method"])
+rpc_received_bytes = registry.counter(
+    "hemera_rpc_received_bytes_total", "Bytes of RPC responses.", ["endpoint", "method"]
+)
+rpc_request_seconds = registry.histogram(
+    "hemera_rpc_request_seconds", "Latency of RPC requests.", ["endpoint", "method"]
+)
+
+
+def rpc_method(data) -> str:
+    """The method of a request, the one of its first call for a batch."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    match = METHOD_PATTERN.search(data) if data else None
+    return match.group(1).decode() if match else "unknown"
+
+
+DEFAULT_POOL_SIZE = 64
+
+
+class EndpointMetrics:
+    """
+    Request counters of one RPC endpoint, updated by every thread posting to it.
+    """
+
+    def __init__(self, endpoint_uri: str):
+        self.endpoint_uri = endpoint_uri
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.connections_opened = 0
+
+    def on_connect(self):
+        with self._lock:
+            self.connections_opened += 1
+
+    def on_start(self, bytes_sent: int):
+        with self._lock:
+            self.in_flight += 1
+            self.bytes_sent += bytes_sent
+
+    def on_finish(self, seconds: float, bytes_received: int = 0, error: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.errors += 1 if error else 0
+            self.bytes_received += bytes_received
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "endpoint_uri": self.endpoint_uri,
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "avg_seconds": self.total_seconds / self.requests if self.requests else 0.0,
+                "max_seconds": self.max_seconds,
+                "connections_opened": self.connections_opened,
+            }
+
+
+def counting_pool_cls(pool_cls, on_connect: Callable[[], None]):
+    """A subclass of the urllib3 pool class whose connections call on_connect whenever they open a socket."""
+
+    class CountingConnection(pool_cls.ConnectionCls):
+        def connect(self):
+            on_connect()
+            super().connect()
+
+    return type(pool_cls.__name__, (pool_cls,), {"ConnectionCls": CountingConnection})
+
+
+class CountingHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter reporting every connection its pools open to on_connect."""
+
+    def __init__(self, on_connect: Callable[[], None], **kwargs):
+        self._on_connect = on_connect
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            scheme: counting_pool_cls(pool_cls, self._on_connect)
+            for scheme, pool_cls in self.poolmanager.pool_classes_by_scheme.items()
+        }
+
+
+class EndpointSessionPool:
+    """
+    One keep-alive requests.Session per RPC endpoint, shared by every provider in the process.
+
+    web3 keeps a session per thread and endpoint in a small LRU cache, so each job executor
+    and multicall worker thread opens its own connections and evicted sessions close theirs.
+    Here all threads post through the same connection pool of pool_size connections per endpoint,
+    connections are reused across jobs and batches, and the pool counts how many it had to open.
+
+    Sockets are not shared across a fork, a worker process starts with sessions of its own.
+    """
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE):
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, requests.Session] = {}
+        self._metrics: Dict[str, EndpointMetrics] = {}
+        self._pid = os.getpid()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Dropped without closing, closing would shut down the parent's connections too.
+                    self._sessions = {}
+                    self._metrics = {}
+                    self._pid = os.getpid()
+
+    def configure(self, pool_size: Optional[int] = None):
+        """Applies to sessions created afterwards, so it is meant to be called before the first request."""
+        if pool_size is not None:
+            if pool_size < 1:
+                raise ValueError(f"pool_size should be a positive integer, got {pool_size}.")
+            self.pool_size = pool_size
+
+    def get_session(self, endpoint_uri: str) -> requests.Session:
+        self._check_pid()
+        session = self._sessions.get(endpoint_uri)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(endpoint_uri)
+                if session is None:
+                    metrics = EndpointMetrics(endpoint_uri)
+                    adapter = CountingHTTPAdapter(metrics.on_connect, pool_connections=1, pool_maxsize=self.pool_size)
+                    session = requests.Session()
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._metrics[endpoint_uri] = metrics
+                    self._sessions[endpoint_uri] = session
+        return session
+
+    def get_metrics(self, endpoint_uri: str) -> EndpointMetrics:
+        self.get_session(endpoint_uri)
+        return self._metrics[endpoint_uri]
+
+    def post(self, endpoint_uri: str, data, **kwargs) -> bytes:
+        session = self.get_session(endpoint_uri)
+        metrics = self._metrics[endpoint_uri]
+        bytes_sent = len(data) if data is not None else 0
+        labels = {"endpoint": endpoint_label(endpoint_uri), "method": rpc_method(data)}
+        rpc_requests.inc(**labels)
+        rpc_calls.inc(
+            max(1, data.count(b'"method"' if isinstance(data, bytes) else '"method"')) if data else 1, **labels
+        )
+        rpc_sent_bytes.inc(bytes_sent, **labels)
+        metrics.on_start(bytes_sent)
+        start = time.monotonic()
+        try:
+            response = session.post(endpoint_uri, data=data, **kwargs)
+            response.raise_for_status()
+        except Exception:
+            metrics.on_finish(time.monotonic() - start, error=True)
+            rpc_errors.inc(**labels)
+            rpc_request_seconds.observe(time.monotonic() - start, **labels)
+            raise
+        content = response.content
+        seconds = time.monotonic() - start
+        metrics.on_finish(seconds, len(content))
+        rpc_received_bytes.inc(len(content), **labels)
+        rpc_request_seconds.observe(seconds, **labels)
+        return content
+
+    def connections_opened(self, endpoint_uri: str) -> int:
+        metrics = self._metrics.get(endpoint_uri)
+        return metrics.connections_opened if metrics is not None else 0
+
+    def metrics(self) -> Dict[str, dict]:
+        return {endpoint_uri: metrics.snapshot() for endpoint_uri, metrics in list(self._metrics.items())}
+
+    def log_metrics(self):
+        for endpoint_uri, snapshot in self.metrics().items():
+            logger.info(
+                "RPC endpoint %s: %s requests, %s errors, %.3fs avg, %.3fs max, %s connections opened",
+                endpoint_uri,
+                snapshot["requests"],
+                snapshot["errors"],
+                snapshot["avg_seconds"],
+                snapshot["max_seconds"],
+                snapshot["connections_opened"],
+            )
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+endpoint_session_pool = EndpointSessionPool()
@@ -1,3 +1,5 @@
+import time
+
 from sqlalchemy import func
 
 from common.models.blocks import Blocks
@@ -11,6 +13,10 @@ class LimitReader(object):
     def get_current_block_number(self):
         pass
 
+    def wait_for_new_block(self, current_block, timeout):
+        """Returns once a block above current_block may be available, pollers just sleep for timeout."""
+        time.sleep(timeout)
+
 
 class RPCLimitReader(LimitReader):
 
@@ -38,10 +44,14 @@ class PGLimitReader(LimitReader):
         return block_number
 
 
-def create_limit_reader(postgres_uri: str, rpc_uri: ThreadLocalProxy) -> LimitReader:
+def create_limit_reader(postgres_uri: str, rpc_uri: ThreadLocalProxy, head_uri: str = None) -> LimitReader:
     if postgres_uri and postgres_uri.startswith("postgresql://"):
         return PGLimitReader(postgres_uri=postgres_uri)
     elif rpc_uri is not None:
+        if head_uri:
+            from indexer.utils.head_follower import NewHeadsLimitReader
+
+            return NewHeadsLimitReader(head_uri, fallback=RPCLimitReader(rpc_uri=rpc_uri))
         return RPCLimitReader(rpc_uri=rpc_uri)
     else:
         raise FastShutdownError(
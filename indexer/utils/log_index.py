@@ -0,0 +1,68 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from indexer.domain.log import Log
+from indexer.specification.specification import TopicSpecification, TransactionFilterByLogs
+
+
+class LogIndex:
+    """
+    The logs of one run keyed by topic0, by address and by (topic0, address), so jobs look up the logs
+    their TopicSpecifications ask for instead of scanning every log of the run.
+
+    Lookups return the logs in the order they have in the data buffer.
+    """
+
+    def __init__(self, logs: Iterable[Log]):
+        self.logs: List[Log] = list(logs)
+        self._by_topic: Dict[str, List[int]] = defaultdict(list)
+        self._by_address: Dict[str, List[int]] = defaultdict(list)
+        self._by_topic_address: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for position, log in enumerate(self.logs):
+            self._by_topic[log.topic0].append(position)
+            self._by_address[log.address].append(position)
+            self._by_topic_address[(log.topic0, log.address)].append(position)
+
+    @property
+    def size(self) -> int:
+        return len(self.logs)
+
+    def _positions(self, topics: Sequence[str], addresses: Sequence[str]) -> Iterable[int]:
+        topics = {topic.lower() for topic in topics if topic}
+        addresses = {address.lower() for address in addresses if address}
+        if topics and addresses:
+            for topic in topics:
+                for address in addresses:
+                    yield from self._by_topic_address.get((topic, address), ())
+        elif topics:
+            for topic in topics:
+                yield from self._by_topic.get(topic, ())
+        elif addresses:
+            for address in addresses:
+                yield from self._by_address.get(address, ())
+        else:
+            yield from range(len(self.logs))
+
+    def select(self, topics: Sequence[str] = (), addresses: Sequence[str] = ()) -> List[Log]:
+        """The logs whose topic0 is one of topics and address one of addresses, an empty list matches anything."""
+        return [self.logs[position] for position in sorted(set(self._positions(topics, addresses)))]
+
+    def match(self, specifications: Iterable[TopicSpecification]) -> List[Log]:
+        positions = set()
+        for specification in specifications:
+            positions.update(self._positions(specification.topics, specification.addresses))
+        return [self.logs[position] for position in sorted(positions)]
+
+    def transaction_hashes(self, specifications: Iterable[TopicSpecification]) -> Set[str]:
+        return {log.transaction_hash for log in self.match(specifications)}
+
+
+def topic_specifications(filters) -> List[TopicSpecification]:
+    """The TopicSpecifications of what a job's get_filter returns, a single filter or a list of them."""
+    filters = filters if isinstance(filters, list) else [filters]
+    return [
+        specification
+        for transaction_filter in filters
+        if isinstance(transaction_filter, TransactionFilterByLogs)
+        for specification in transaction_filter.specifications
+    ]
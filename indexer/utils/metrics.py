@@ -0,0 +1,286 @@
+import logging
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote, urlparse
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def endpoint_label(endpoint_uri: str) -> str:
+    """The host of an endpoint, paths and credentials of provider uris often carry API keys."""
+    parsed = urlparse(endpoint_uri)
+    return parsed.hostname + (f":{parsed.port}" if parsed.port else "") if parsed.hostname else parsed.scheme
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], object] = {}
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"Metric {self.name} takes labels {self.labelnames}, got {tuple(labels)}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        with self._lock:
+            samples = list(self._values.items())
+        for key, value in sorted(samples):
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"]
+
+
+class Counter(Metric):
+    metric_type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        """The sum of the counter over every label set."""
+        with self._lock:
+            return sum(self._values.values())
+
+
+class Gauge(Metric):
+    metric_type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    metric_type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            sample = self._values.get(key)
+            if sample is None:
+                # (count per bucket, sum, count)
+                sample = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    sample[0][index] += 1
+                    break
+            sample[1] += value
+            sample[2] += 1
+
+    def count(self, **labels) -> int:
+        sample = self._values.get(self._key(labels))
+        return sample[2] if sample is not None else 0
+
+    def total(self) -> Tuple[float, int]:
+        """The sum and the count of the observations of every label set."""
+        with self._lock:
+            samples = list(self._values.values())
+        return sum(sample[1] for sample in samples), sum(sample[2] for sample in samples)
+
+    def _render_sample(self, key, value) -> List[str]:
+        bucket_counts, total, count = value
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, bucket_counts):
+            cumulative += bucket_count
+            labels = _format_labels(self.labelnames, key, ("le", _format_value(bound)))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The metrics of the process, rendered in the Prometheus text format. Modules declare the metrics of
+    their choke points once at import, asking again for a name returns the metric already declared.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, metric_class, name, documentation, labelnames, **kwargs) -> Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} is already declared as a {metric.metric_type} of {metric.labelnames}.")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class MetricsServer:
+    """Serves the registry at http://<host>:<port>/metrics from a daemon thread."""
+
+    def __init__(self, port: int, host: str = "0.0.0.0", metrics_registry: MetricsRegistry = registry):
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if urlparse(self.path).path not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics_registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics request: " + format, *args)
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True)
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "MetricsServer":
+        self._thread.start()
+        logger.info(f"Serving metrics on port {self.port}.")
+        return self
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MetricsPusher:
+    """
+    Pushes the registry to a Prometheus Pushgateway every interval seconds, for runs the scraper
+    cannot reach or that end before being scraped. The last push happens on close.
+    """
+
+    def __init__(
+        self,
+        gateway_url: str,
+        job: str = "hemera",
+        interval: float = 15,
+        metrics_registry: MetricsRegistry = registry,
+        timeout: float = 10,
+    ):
+        self.url = f"{gateway_url.rstrip('/')}/metrics/job/{quote(job, safe='')}"
+        self.interval = interval
+        self.timeout = timeout
+        self.metrics_registry = metrics_registry
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-pusher", daemon=True)
+
+    def start(self) -> "MetricsPusher":
+        self._thread.start()
+        return self
+
+    def push(self):
+        request = urllib.request.Request(
+            self.url,
+            data=self.metrics_registry.render().encode("utf-8"),
+            method="PUT",
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self._try_push()
+
+    def _try_push(self):
+        try:
+            self.push()
+        except Exception as e:
+            logger.warning(f"Failed to push metrics to {self.url}: {e}")
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join(self.interval + self.timeout)
+        self._try_push()
+
+
+def start_metrics(port: Optional[int] = None, host: str = "0.0.0.0", push_gateway: str = None, push_interval=15):
+    """Starts what the options ask for, returns the started server and pusher to close once done."""
+    started = []
+    if port is not None:
+        started.append(MetricsServer(port, host).start())
+    if push_gateway:
+        started.append(MetricsPusher(push_gateway, interval=push_interval).start())
+    return started
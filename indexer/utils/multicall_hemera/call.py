@@ -32,6 +32,7 @@ class Call:
         self.parameters = parameters
         self.user_defined_k = user_defined_k
         self.returns = None
+        self.raw_output = None
         self.call_id = None
         self._data = None
         self._rpc_params = None
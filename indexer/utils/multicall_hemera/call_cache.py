@@ -0,0 +1,112 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+
+from redis.client import Redis
+
+logger = logging.getLogger(__name__)
+
+CallKey = Tuple[int, str, str, int]
+
+
+class CallResultCache:
+    """
+    Raw outputs of eth_calls made at a fixed block, keyed by (chain_id, target, calldata, block_number).
+
+    A call at a given block always returns the same bytes, so every MultiCallHelper of the process
+    reads the results other jobs already fetched. The most recently used max_size outputs are kept
+    in memory. With a redis:// uri the outputs are written to redis as well, so a rerun after a crash
+    fetches none of them again.
+
+    The cache is disabled until configured with a positive max_size or a redis uri.
+    """
+
+    def __init__(self, max_size: int = 0, uri: Optional[str] = None, key_prefix: str = "multicall"):
+        self.max_size = max_size
+        self.key_prefix = key_prefix
+        self._lock = threading.Lock()
+        self._outputs: OrderedDict = OrderedDict()
+        self._redis = None
+        self.hits = 0
+        self.misses = 0
+        self.configure(max_size=max_size, uri=uri)
+
+    def configure(self, max_size: Optional[int] = None, uri: Optional[str] = None):
+        if max_size is not None:
+            if max_size < 0:
+                raise ValueError(f"max_size should not be negative, got {max_size}.")
+            with self._lock:
+                self.max_size = max_size
+                while len(self._outputs) > self.max_size:
+                    self._outputs.popitem(last=False)
+        if uri is not None and uri != "memory":
+            if not uri.startswith("redis://"):
+                raise ValueError(f"Unsupported call cache uri {uri}, should be memory or redis://.")
+            self._redis = Redis.from_url(uri)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 or self._redis is not None
+
+    @staticmethod
+    def is_cacheable(key: Hashable) -> bool:
+        # Calls at "latest" or another tag are answered from a state that moves on.
+        return isinstance(key[-1], int)
+
+    def _redis_key(self, key: CallKey) -> str:
+        return f"{self.key_prefix}:" + ":".join(str(part) for part in key)
+
+    def get(self, key: CallKey) -> Optional[str]:
+        with self._lock:
+            output = self._outputs.get(key)
+            if output is not None:
+                self._outputs.move_to_end(key)
+                self.hits += 1
+                return output
+
+        if self._redis is not None:
+            try:
+                output = self._redis.get(self._redis_key(key))
+            except Exception as e:
+                logger.warning(f"Error reading call cache from redis: {e}")
+                output = None
+            if output is not None:
+                output = output.decode() if isinstance(output, bytes) else output
+                self._remember(key, output)
+                with self._lock:
+                    self.hits += 1
+                return output
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: CallKey, output: str):
+        self._remember(key, output)
+        if self._redis is not None:
+            try:
+                self._redis.set(self._redis_key(key), output)
+            except Exception as e:
+                logger.warning(f"Error writing call cache to redis: {e}")
+
+    def _remember(self, key: CallKey, output: str):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._outputs[key] = output
+            self._outputs.move_to_end(key)
+            if len(self._outputs) > self.max_size:
+                self._outputs.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._outputs)
+
+    def clear(self):
+        with self._lock:
+            self._outputs.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+call_result_cache = CallResultCache()
@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import Future
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from indexer.utils.multicall_hemera.call import Call
+
+
+class CallFuture(Future):
+    """
+    The decoded returns of one Call. Waiting on a future that was not sent yet flushes its coalescer,
+    so every call queued by then goes out in the same round.
+    """
+
+    def __init__(self, call: Call, coalescer: "CallCoalescer"):
+        super().__init__()
+        self.call = call
+        self._coalescer = coalescer
+
+    def result(self, timeout=None):
+        if not self.done():
+            self._coalescer.flush()
+        return super().result(timeout)
+
+    def exception(self, timeout=None):
+        if not self.done():
+            self._coalescer.flush()
+        return super().exception(timeout)
+
+
+class CallCoalescer:
+    """
+    Queues the Calls of every job sending eth_calls to the same endpoint and sends them in one execute_calls round.
+
+    execute_calls groups a round by block and packs each block into the fewest tryBlockAndAggregate
+    payloads, so calls that used to be separate rounds, like the factory, fee, token0 and token1
+    calls of the same pools, share payloads and HTTP requests. A flush sends everything queued by
+    any thread. With flush_size set, queuing that many calls flushes them right away.
+    """
+
+    def __init__(self, multi_call_helper, flush_size: Optional[int] = None):
+        self.multi_call_helper = multi_call_helper
+        self.flush_size = flush_size
+        self._lock = threading.Lock()
+        self._pending: List[CallFuture] = []
+        self.rounds = 0
+
+    def submit(self, call: Call) -> CallFuture:
+        future = CallFuture(call, self)
+        with self._lock:
+            self._pending.append(future)
+            flush = self.flush_size is not None and len(self._pending) >= self.flush_size
+        if flush:
+            self.flush()
+        return future
+
+    def submit_all(self, calls: Iterable[Call]) -> List[CallFuture]:
+        return [self.submit(call) for call in calls]
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self):
+        with self._lock:
+            futures, self._pending = self._pending, []
+        futures = [future for future in futures if future.set_running_or_notify_cancel()]
+        if not futures:
+            return
+        self.rounds += 1
+        try:
+            self.multi_call_helper.execute_calls([future.call for future in futures])
+        except BaseException as e:
+            for future in futures:
+                future.set_exception(e)
+            raise
+        for future in futures:
+            future.set_result(future.call.returns)
+
+
+_coalescers: Dict[Tuple, CallCoalescer] = {}
+_coalescers_lock = threading.Lock()
+
+
+def shared_coalescer(key: Tuple, multi_call_helper) -> CallCoalescer:
+    """The coalescer of key, created with the first helper asking for it and shared by every helper of the process."""
+    coalescer = _coalescers.get(key)
+    if coalescer is None:
+        with _coalescers_lock:
+            coalescer = _coalescers.setdefault(key, CallCoalescer(multi_call_helper))
+    return coalescer
+
+
+def wait_calls(futures: Iterable[Future]) -> list:
+    return [future.result() for future in futures]
@@ -11,11 +11,22 @@ from typing import List
 
 from common.utils.exception_control import FastShutdownError
 from common.utils.format_utils import bytes_to_hex_str
+from indexer.utils.metrics import registry
 from indexer.utils.multicall_hemera import Call, Multicall
 from indexer.utils.multicall_hemera.abi import TRY_BLOCK_AND_AGGREGATE_FUNC
+from indexer.utils.multicall_hemera.call_cache import call_result_cache
+from indexer.utils.multicall_hemera.call_coalescer import CallFuture, shared_coalescer
 from indexer.utils.multicall_hemera.constants import CALLS_LIMIT, GAS_LIMIT, get_multicall_network
 from indexer.utils.multicall_hemera.util import calculate_execution_time, make_request_concurrent, rebatch_by_size
 from indexer.utils.provider import get_provider_from_uri
+from indexer.utils.rpc_balancer import batch_size_group
+
+multicall_calls = registry.counter(
+    "hemera_multicall_calls_total", "Contract calls sent, by how they were sent.", ["mode"]
+)
+multicall_fallback_calls = registry.counter(
+    "hemera_multicall_fallback_calls_total", "Calls failing in a multicall and sent again as single eth_calls."
+)
 
 
 class MultiCallHelper:
@@ -31,6 +42,11 @@ class MultiCallHelper:
 
         self.batch_size = kwargs["batch_size"]
         self.max_workers = kwargs["max_workers"]
+        # Shared with every other helper sending eth_call batches to the same endpoints.
+        # A batch size of 1 is taken as configured and never grown.
+        self.batch_size_group = (
+            batch_size_group("eth_call", self.provider.endpoint_uri, self.batch_size) if self.batch_size > 1 else None
+        )
         self._is_multi_call = kwargs["multicall"]
         if not self._is_multi_call:
             self.logger.info("multicall is disabled")
@@ -43,6 +59,61 @@ class MultiCallHelper:
             except ValueError:
                 self.net = None
                 self.deploy_block_number = 2**56
+        # Shared by every helper of the process, disabled unless configured.
+        self.call_cache = call_result_cache
+        self._coalescer = None
+
+    def current_batch_size(self):
+        return self.batch_size_group.batch_size if self.batch_size_group is not None else self.batch_size
+
+    @property
+    def coalescer(self):
+        if self._coalescer is None:
+            key = (self.chain_id, self.provider.endpoint_uri, self._is_multi_call)
+            self._coalescer = shared_coalescer(key, self)
+        return self._coalescer
+
+    def submit_calls(self, calls: List[Call]) -> List[CallFuture]:
+        """Queue calls for the next round sent to this endpoint, waiting on any of the futures sends the round."""
+        return self.coalescer.submit_all(calls)
+
+    def call_key(self, call: Call):
+        return self.chain_id, call.target.lower(), call.data, call.block_number
+
+    @calculate_execution_time
+    def deduplicate_calls(self, calls: List[Call]):
+        """Group calls by (chain_id, target, calldata, block_number), answer the groups the cache knows
+        and return the groups with the one call of each group left to send."""
+        groups = defaultdict(list)
+        for call in calls:
+            if call.block_number is None:
+                raise FastShutdownError("MultiCallHelper.validate_calls failed: block_number is None")
+            call.returns = None
+            call.raw_output = None
+            groups[self.call_key(call)].append(call)
+
+        to_execute_calls = []
+        for key, same_calls in groups.items():
+            output = self.call_cache.get(key) if self.call_cache.enabled and self.call_cache.is_cacheable(key) else None
+            if output is not None:
+                for call in same_calls:
+                    call.raw_output = output
+                    call.returns = call.decode_output(output)
+            else:
+                to_execute_calls.append(same_calls[0])
+        return groups, to_execute_calls
+
+    def share_results(self, groups):
+        """Decode the output of the call sent for each group into the other calls of the group and cache it."""
+        for key, (sent_call, *duplicates) in groups.items():
+            if sent_call.raw_output is None:
+                continue
+            for call in duplicates:
+                # Decoded with each call's own abi, the output names may differ between jobs.
+                call.raw_output = sent_call.raw_output
+                call.returns = call.decode_output(sent_call.raw_output)
+            if sent_call.returns is not None and self.call_cache.enabled and self.call_cache.is_cacheable(key):
+                self.call_cache.put(key, sent_call.raw_output)
 
     @calculate_execution_time
     def validate_and_prepare_calls(self, calls):
@@ -83,12 +154,16 @@ class MultiCallHelper:
                     dic = TRY_BLOCK_AND_AGGREGATE_FUNC.decode_function_output_data(result)
                     outputs = dic["returnData"]
                     for call, (output) in zip(calls, outputs):
-                        call.returns = call.decode_output(bytes_to_hex_str(output["returnData"]))
+                        raw_output = bytes_to_hex_str(output["returnData"])
+                        call.returns = call.decode_output(raw_output)
+                        if output["success"]:
+                            call.raw_output = raw_output
 
     @calculate_execution_time
     def execute_calls(self, calls: List[Call]) -> List[Call]:
         """Execute eth calls
-        1. Validate that each call has a specified block number (required)
+        1. Validate that each call has a specified block number (required),
+           send each (target, calldata, block number) once and take the cached ones from the call cache
         2. Split calls into two groups based on multicall contract deployment block:
            - Calls that can be executed via multicall contract
            - Calls that must be executed directly (before multicall deployment)
@@ -96,20 +171,28 @@ class MultiCallHelper:
         4. Execute remaining calls directly through RPC
         5. Return all calls with their execution results attached
         """
-        to_execute_batch_calls, to_execute_multi_calls = self.validate_and_prepare_calls(calls)
+        groups, to_execute_calls = self.deduplicate_calls(calls)
+        if len(to_execute_calls) < len(calls):
+            self.logger.info(f"multicall helper deduplicated calls, got={len(calls)}, to send={len(to_execute_calls)}")
+        to_execute_batch_calls, to_execute_multi_calls = self.validate_and_prepare_calls(to_execute_calls)
         if len(to_execute_multi_calls) > 0:
             multicall_rpc = self.construct_multicall_rpc(to_execute_multi_calls)
-            chunks = list(rebatch_by_size(multicall_rpc, to_execute_multi_calls))
+            chunks = list(rebatch_by_size(multicall_rpc, to_execute_multi_calls, max_items=self.current_batch_size()))
             self.logger.info(f"multicall helper after chunk, got={len(chunks)}")
             res = self.fetch_result(chunks)
             self.decode_result(to_execute_multi_calls, res, chunks)
+            multicall_calls.inc(sum(len(cls) for cls in to_execute_multi_calls), mode="multicall")
+            fallback_count = len(to_execute_batch_calls)
             for cls in to_execute_multi_calls:
                 for cl in cls:
                     if cl.returns is None:
                         to_execute_batch_calls.append(cl)
+            multicall_fallback_calls.inc(len(to_execute_batch_calls) - fallback_count)
         if len(to_execute_batch_calls) > 0:
+            multicall_calls.inc(len(to_execute_batch_calls), mode="eth_call")
             self.logger.info(f"multicall helper batch call, got={len(to_execute_batch_calls)}")
             self.fetch_raw_calls(to_execute_batch_calls)
+        self.share_results(groups)
         return calls
 
     def fetch_raw_calls(self, calls: List[Call]):
@@ -119,13 +202,11 @@ class MultiCallHelper:
         for call in calls:
             batch_call_list.append(call)
             batch_rpc_param_list.append(call.rpc_param)
+        batch_size = self.current_batch_size()
         wrapped_rpc_param_list = [
-            (batch_rpc_param_list[i : i + self.batch_size], i)
-            for i in range(0, len(batch_rpc_param_list), self.batch_size)
-        ]
-        wrapped_call_list = [
-            (batch_call_list[i : i + self.batch_size]) for i in range(0, len(batch_call_list), self.batch_size)
+            (batch_rpc_param_list[i : i + batch_size], i) for i in range(0, len(batch_rpc_param_list), batch_size)
         ]
+        wrapped_call_list = [(batch_call_list[i : i + batch_size]) for i in range(0, len(batch_call_list), batch_size)]
 
         result = list(make_request_concurrent(self.make_request, wrapped_rpc_param_list, self.max_workers))
 
@@ -134,6 +215,8 @@ class MultiCallHelper:
                 result = data.get("result")
                 try:
                     call.returns = call.decode_output(result)
+                    if result is not None and "error" not in data:
+                        call.raw_output = result
                 except Exception:
                     call.returns = None
                     self.logger.warning(f"multicall helper failed call: {call}")
@@ -36,14 +36,16 @@ def estimate_size(item):
     return len(orjson.dumps(item))
 
 
-def rebatch_by_size(items, same_length_calls, max_size=1024 * RPC_PAYLOAD_SIZE):
-    # 250KB
+def rebatch_by_size(items, same_length_calls, max_size=1024 * RPC_PAYLOAD_SIZE, max_items=None):
+    # 250KB, and at most max_items requests per chunk when given
     current_chunk = []
     calls = []
     current_size = 0
     for idx, item in enumerate(items):
         item_size = estimate_size(item)
-        if current_size + item_size > max_size and current_chunk:
+        if current_chunk and (
+            current_size + item_size > max_size or (max_items is not None and len(current_chunk) >= max_items)
+        ):
             logger.debug(f"current chunk size {len(current_chunk)}")
             yield (current_chunk, calls)
             current_chunk = []
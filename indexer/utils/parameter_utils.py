@@ -21,6 +21,7 @@ def check_file_exporter_parameter(outputs, block_batch_size, blocks_per_file):
     if outputs is not None and (
         check_exporter_in_chosen(outputs, ItemExporterType.CSVFILE)
         or check_exporter_in_chosen(outputs, ItemExporterType.JSONFILE)
+        or check_exporter_in_chosen(outputs, ItemExporterType.PARQUETFILE)
     ):
         if block_batch_size > blocks_per_file and block_batch_size % blocks_per_file != 0:
             raise click.ClickException(
@@ -13,7 +13,9 @@ class TqdmExtraFormat(tqdm):
     def format_dict(self):
         d = super().format_dict
         d.update(
-            total_time=self.format_interval(d["total"] / (d["n"] / d["elapsed"]) if d["elapsed"] and d["n"] else 0),
+            total_time=self.format_interval(
+                d["total"] / (d["n"] / d["elapsed"]) if d["total"] and d["elapsed"] and d["n"] else 0
+            ),
             current_total_time=self.format_interval(d["elapsed"]),
         )
         return d
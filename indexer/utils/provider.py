@@ -4,13 +4,20 @@ from json import JSONDecodeError
 from urllib.parse import urlparse
 
 from web3 import HTTPProvider, IPCProvider
-from web3._utils.request import make_post_request
 from web3._utils.threads import Timeout
 
+from indexer.executors.batch_size_controller import observed_post
+from indexer.utils.http_pool import endpoint_session_pool
+from indexer.utils.rpc_balancer import get_load_balancer
+from indexer.utils.rpc_utils import find_methods, split_provider_uris
+
 DEFAULT_TIMEOUT = 60
 
 
 def get_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, batch=False):
+    if len(split_provider_uris(uri_string)) > 1:
+        return LoadBalancedHTTPProvider(uri_string, request_kwargs={"timeout": timeout}, batch=batch)
+
     uri = urlparse(uri_string)
     if uri.scheme == "file":
         if batch:
@@ -22,7 +29,7 @@ def get_provider_from_uri(uri_string, timeout=DEFAULT_TIMEOUT, batch=False):
         if batch:
             return BatchHTTPProvider(uri_string, request_kwargs=request_kwargs)
         else:
-            return HTTPProvider(uri_string, request_kwargs=request_kwargs)
+            return PooledHTTPProvider(uri_string, request_kwargs=request_kwargs)
     else:
         raise ValueError("Unknown uri scheme {}".format(uri_string))
 
@@ -63,7 +70,31 @@ class BatchIPCProvider(IPCProvider):
                         continue
 
 
-class BatchHTTPProvider(HTTPProvider):
+class PooledHTTPProvider(HTTPProvider):
+    """
+    HTTPProvider posting through the process wide keep-alive session of its endpoint
+    instead of web3's per thread sessions.
+    """
+
+    def make_request(self, method, params):
+        self.logger.debug("Making request HTTP. URI: %s, Method: %s", self.endpoint_uri, method)
+        request_data = self.encode_rpc_request(method, params)
+        raw_response = endpoint_session_pool.post(self.endpoint_uri, request_data, **self.get_request_kwargs())
+        response = self.decode_response(raw_response, params)
+        self.logger.debug(
+            "Getting response HTTP. URI: %s, Method: %s, Response: %s", self.endpoint_uri, method, response
+        )
+        return response
+
+    def decode_response(self, raw_response, params):
+        try:
+            return self.decode_rpc_response(raw_response)
+        except JSONDecodeError:
+            self.logger.error("JSON decode error, params: %s, raw_response: %s", params, raw_response)
+            raise
+
+
+class BatchHTTPProvider(PooledHTTPProvider):
 
     def make_request(self, method=None, params=None):
         self.logger.debug("Making request HTTP. URI: %s, Request: %s", self.endpoint_uri, params)
@@ -71,12 +102,12 @@ class BatchHTTPProvider(HTTPProvider):
             request_data = params.encode("utf-8")
         else:
             request_data = params
-        raw_response = make_post_request(self.endpoint_uri, request_data, **self.get_request_kwargs())
-        try:
-            response = self.decode_rpc_response(raw_response)
-        except JSONDecodeError:
-            self.logger.error("JSON decode error, params: %s, raw_response: %s", params, raw_response)
-            raise
+        raw_response = observed_post(
+            self.endpoint_uri,
+            request_data,
+            lambda: endpoint_session_pool.post(self.endpoint_uri, request_data, **self.get_request_kwargs()),
+        )
+        response = self.decode_response(raw_response, params)
         self.logger.debug(
             "Getting response HTTP. URI: %s, " "Request: %s, Response: %s",
             self.endpoint_uri,
@@ -86,6 +117,49 @@ class BatchHTTPProvider(HTTPProvider):
         return response
 
 
+class LoadBalancedHTTPProvider(PooledHTTPProvider):
+    """
+    Provider over a comma separated list of http(s) endpoints, routing every request through the
+    shared RpcLoadBalancer of that list. endpoint_uri keeps the whole list, so providers derived
+    from it (multicall, job web3 clients, the reorg subprocess) are balanced the same way.
+    """
+
+    def __init__(self, endpoint_uri, request_kwargs=None, batch=False):
+        super().__init__(endpoint_uri, request_kwargs=request_kwargs)
+        endpoint_uris = split_provider_uris(endpoint_uri)
+        for uri in endpoint_uris:
+            if urlparse(uri).scheme not in ("http", "https"):
+                raise ValueError("Only http(s) endpoints can be load balanced, got {}".format(uri))
+        self.balancer = get_load_balancer(endpoint_uris)
+        self.batch = batch
+
+    def make_request(self, method=None, params=None):
+        if self.batch:
+            request_data = params.encode("utf-8") if isinstance(params, str) else params
+            methods = find_methods(request_data)
+        else:
+            request_data = self.encode_rpc_request(method, params)
+            methods = [method]
+
+        if methods == ["eth_blockNumber"]:
+            served_by, raw_response = self.balancer.post_head_probe(
+                request_data, parse_block_number, **self.get_request_kwargs()
+            )
+        else:
+            # Batch sizes are learned per endpoint inside the balancer, for the endpoint that served the batch.
+            served_by, raw_response = self.balancer.post(request_data, methods, **self.get_request_kwargs())
+        self.logger.debug("Request %s served by %s", methods[:1], served_by)
+        return self.decode_response(raw_response, params)
+
+
+def parse_block_number(raw_response):
+    response = json.loads(raw_response)
+    if isinstance(response, list):
+        response = response[0] if len(response) == 1 else {}
+    result = response.get("result")
+    return int(result, 16) if isinstance(result, str) else None
+
+
 def has_valid_json_rpc_ending(raw_response):
     for valid_ending in [b"}\n", b"]\n"]:
         if raw_response.endswith(valid_ending):
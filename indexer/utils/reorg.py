@@ -1,69 +1,175 @@
 import logging
-from datetime import datetime, timezone
+from collections import OrderedDict
+from typing import Callable, List, Optional, Set
 
-from sqlalchemy import and_
+import orjson
 
 from common.converter.pg_converter import domain_model_mapping
 from common.models import HemeraModel
 from common.services.postgresql_service import PostgreSQLService
 from common.utils.exception_control import RetriableError
+from indexer.utils.json_rpc_requests import generate_get_block_by_number_json_rpc
 
+DEFAULT_HEADER_WINDOW_SIZE = 256
 
-def set_reorg_sign(jobs, block_number, service):
+
+def block_number_column(table: HemeraModel) -> Optional[str]:
+    if hasattr(table, "number"):
+        return "number"
+    if hasattr(table, "block_number"):
+        return "block_number"
+    return None
+
+
+def set_reorg_sign(jobs, start_block: int, end_block: int, service: PostgreSQLService):
+    """Flags the rows of blocks [start_block, end_block] in every reorg table of the jobs, in one transaction."""
     conn = service.get_conn()
     cur = conn.cursor()
     try:
-        table_done = set()
-        for job in jobs:
-            for output in job.output_types:
-                model = domain_model_mapping[output.__name__]
-                table = model["table"]
-                if table.__name__ in table_done:
-                    continue
-
-                table_done.add(table.__name__)
-                if hasattr(table, "reorg"):
-                    update_stmt = (
-                        f"UPDATE {table.__tablename__} "
-                        + f"SET reorg=TRUE, update_time='{datetime.utcfromtimestamp(datetime.now(timezone.utc).timestamp())}'"
-                    )
-
-                    if hasattr(table, "number"):
-                        update_stmt += f"WHERE number={block_number}"
-                    elif hasattr(table, "block_number"):
-                        update_stmt += f"WHERE block_number={block_number}"
-                    else:
-                        update_stmt = None
-                        logging.warning(
-                            f"Reorging table: {table} has no block number info, "
-                            f"could not complete reorg action, "
-                            f"reorging will be skipped this table."
-                        )
-
-                    if update_stmt:
-                        cur.execute(update_stmt)
+        for table in reorg_tables(jobs):
+            column = block_number_column(table)
+            if column is None:
+                logging.warning(
+                    f"Reorging table: {table} has no block number info, "
+                    f"could not complete reorg action, "
+                    f"reorging will be skipped this table."
+                )
+                continue
+            cur.execute(
+                f"UPDATE {table.__tablename__} SET reorg=TRUE, update_time=NOW() WHERE {column} BETWEEN %s AND %s",
+                (start_block, end_block),
+            )
         conn.commit()
     except Exception as e:
+        conn.rollback()
         logging.error(e)
         raise RetriableError(e)
     finally:
         service.release_conn(conn)
 
 
-def should_reorg(block_number: int, table: HemeraModel, service: PostgreSQLService):
-    if not hasattr(table, "reorg"):
-        return False
-    condition = None
-    if hasattr(table, "number"):
-        condition = and_(table.reorg == True, table.number == block_number)
-    elif hasattr(table, "block_number"):
-        condition = and_(table.reorg == True, table.block_number == block_number)
-    else:
-        return False
+def reorged_tables(
+    tables: List[HemeraModel], start_block: int, end_block: int, service: PostgreSQLService
+) -> Set[HemeraModel]:
+    """The tables holding rows flagged reorg within blocks [start_block, end_block], found with one query."""
+    checks = []
+    checked_tables = {}
+    for table in tables:
+        column = block_number_column(table)
+        if not hasattr(table, "reorg") or column is None or table.__tablename__ in checked_tables:
+            continue
+        checked_tables[table.__tablename__] = table
+        checks.append(
+            f"SELECT '{table.__tablename__}' WHERE EXISTS (SELECT 1 FROM {table.__tablename__} "
+            f"WHERE reorg=TRUE AND {column} BETWEEN %(start_block)s AND %(end_block)s)"
+        )
+    if not checks:
+        return set()
+
+    conn = service.get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(" UNION ALL ".join(checks), {"start_block": start_block, "end_block": end_block})
+        return {checked_tables[row[0]] for row in cur.fetchall()}
+    finally:
+        service.release_conn(conn)
+
+
+def reorg_tables(jobs) -> List[HemeraModel]:
+    tables = []
+    for job in jobs:
+        for output in job.output_types:
+            model = domain_model_mapping.get(output)
+            if model is not None and hasattr(model["table"], "reorg") and model["table"] not in tables:
+                tables.append(model["table"])
+    return tables
+
+
+class HeaderWindow:
+    """
+    The hash and parent hash of the last size canonical blocks seen, by block number.
+    """
+
+    def __init__(self, size: int = DEFAULT_HEADER_WINDOW_SIZE):
+        self.size = size
+        self._headers: OrderedDict = OrderedDict()
+
+    def add(self, number: int, block_hash: str, parent_hash: str):
+        self._headers.pop(number, None)
+        self._headers[number] = (block_hash, parent_hash)
+        while len(self._headers) > self.size:
+            self._headers.pop(min(self._headers))
+
+    def hash_at(self, number: int) -> Optional[str]:
+        header = self._headers.get(number)
+        return header[0] if header is not None else None
+
+    def drop_from(self, number: int):
+        for stale_number in [n for n in self._headers if n >= number]:
+            del self._headers[stale_number]
 
-    session = service.get_service_session()
+    def numbers_below(self, number: int) -> List[int]:
+        return sorted((n for n in self._headers if n < number), reverse=True)
+
+    def __contains__(self, number: int) -> bool:
+        return number in self._headers
+
+    def __len__(self):
+        return len(self._headers)
+
+
+def find_fork_point(make_request: Callable, window: HeaderWindow, below: int) -> int:
+    """
+    The first block number of the abandoned branch below block number below.
+
+    The canonical hashes of every window block below it are fetched in one batch and compared from the top
+    down, the fork point is right above the highest block still matching. A reorg deeper than the window
+    is reported at the lowest block of the window.
+    """
+    numbers = window.numbers_below(below)
+    if not numbers:
+        return below
+
+    requests = list(generate_get_block_by_number_json_rpc(numbers, False))
+    response = make_request(params=orjson.dumps(requests))
+    canonical_hashes = {}
+    for item in response:
+        if isinstance(item.get("result"), dict):
+            canonical_hashes[numbers[item["id"]]] = item["result"]["hash"]
+
+    for number in numbers:
+        if canonical_hashes.get(number) == window.hash_at(number):
+            return number + 1
+
+    logging.warning(f"Reorg below block {below} is deeper than the {len(numbers)} blocks kept to find its fork point.")
+    return numbers[-1]
+
+
+def clean_reorged_range(jobs, start_block: int, end_block: int, service: PostgreSQLService):
+    """
+    Drops what the jobs wrote for blocks [start_block, end_block] before they are indexed again, in one transaction.
+
+    Blocks are flagged reorg and kept, the rows of every other table are deleted as ExportReorgJob does
+    before writing a block again.
+    """
+    conn = service.get_conn()
+    cur = conn.cursor()
     try:
-        result = session.query(table).filter(condition).first()
+        for table in reorg_tables(jobs):
+            if block_number_column(table) == "number":
+                cur.execute(
+                    f"UPDATE {table.__tablename__} SET reorg=TRUE, update_time=NOW() WHERE number BETWEEN %s AND %s",
+                    (start_block, end_block),
+                )
+            elif block_number_column(table) == "block_number":
+                cur.execute(
+                    f"DELETE FROM {table.__tablename__} WHERE block_number BETWEEN %s AND %s",
+                    (start_block, end_block),
+                )
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        logging.error(e)
+        raise RetriableError(e)
     finally:
-        session.close()
-    return result is not None
+        service.release_conn(conn)
@@ -0,0 +1,307 @@
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from common.utils.exception_control import RetriableError
+from indexer.executors.batch_size_controller import BatchSizeGroup, batch_size_controllers, observed_post
+from indexer.utils.http_pool import endpoint_session_pool
+from indexer.utils.rpc_utils import rpc_response_failure, split_provider_uris
+
+logger = logging.getLogger(__name__)
+
+# Smoothing factor of the latency and error rate moving averages.
+EWMA_ALPHA = 0.2
+
+
+class EndpointResponseError(RetriableError):
+    """An endpoint answered, but with a body that counts as its failure, see rpc_response_failure."""
+
+    def __init__(self, message: str, raw_response: bytes):
+        super().__init__(message)
+        self.raw_response = raw_response
+
+
+class EndpointHealth:
+    """
+    What the balancer knows about one endpoint: smoothed latency and error rate, the last head
+    block it reported and whether it is currently ejected.
+    """
+
+    def __init__(self, endpoint_uri: str):
+        self.endpoint_uri = endpoint_uri
+        self.latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.consecutive_errors = 0
+        self.ejected_until = 0.0
+        self.head_block: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def record_success(self, seconds: float):
+        with self._lock:
+            self.latency = seconds if self.latency is None else EWMA_ALPHA * seconds + (1 - EWMA_ALPHA) * self.latency
+            self.error_rate = (1 - EWMA_ALPHA) * self.error_rate
+            self.consecutive_errors = 0
+            self.ejected_until = 0.0
+
+    def record_failure(self, eject_after: int, eject_seconds: float) -> bool:
+        with self._lock:
+            self.error_rate = EWMA_ALPHA + (1 - EWMA_ALPHA) * self.error_rate
+            self.consecutive_errors += 1
+            if self.consecutive_errors >= eject_after:
+                self.ejected_until = time.monotonic() + eject_seconds
+                return True
+            return False
+
+    def is_ejected(self, now: float) -> bool:
+        return self.ejected_until > now
+
+    def score(self) -> float:
+        # Lower is better. Endpoints without measurements yet score like the fastest ones so they get probed.
+        return (self.latency or 0.001) * (1 + 10 * self.error_rate)
+
+
+class RpcLoadBalancer:
+    """
+    Spreads requests over several RPC endpoints serving the same chain.
+
+    Every request goes to a healthy endpoint picked at random with weights favouring low latency
+    and low error rate. Endpoints failing eject_after times in a row are ejected for eject_seconds
+    and come back on probation afterwards. Endpoints whose head is more than max_head_lag blocks
+    behind the best one are only used when nothing else is left. A failed request is retried on the
+    next endpoint, so a degraded node costs one attempt instead of the whole run. JSON-RPC errors and
+    null blocks or receipts count as failures too, when every endpoint answers that way the last answer
+    is returned as it is.
+
+    Requests for hedge_methods (e.g. debug_traceBlockByNumber) are duplicated to a second endpoint
+    when the first has not answered within hedge_factor times its usual latency, and the faster
+    answer wins. Head probes wait probe_seconds at most, endpoints answering later count as failed.
+    """
+
+    def __init__(
+        self,
+        endpoint_uris: List[str],
+        eject_after: int = 3,
+        eject_seconds: float = 30,
+        max_head_lag: int = 5,
+        hedge_methods: Iterable[str] = (),
+        hedge_factor: float = 3,
+        min_hedge_delay: float = 1,
+        probe_seconds: float = 2,
+    ):
+        if not endpoint_uris:
+            raise ValueError("At least one endpoint uri is required.")
+        self.endpoints = [EndpointHealth(endpoint_uri) for endpoint_uri in endpoint_uris]
+        self.eject_after = eject_after
+        self.eject_seconds = eject_seconds
+        self.max_head_lag = max_head_lag
+        self.hedge_methods = set(hedge_methods)
+        self.hedge_factor = hedge_factor
+        self.min_hedge_delay = min_hedge_delay
+        self.probe_seconds = probe_seconds
+        self._executor = None
+        self._executor_pid = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Threads do not survive a fork, every worker process starts its own.
+        if self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=max(4, 2 * len(self.endpoints)), thread_name_prefix="rpc_balancer"
+                    )
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def best_head(self) -> Optional[int]:
+        heads = [endpoint.head_block for endpoint in self.endpoints if endpoint.head_block is not None]
+        return max(heads) if heads else None
+
+    def is_lagging(self, endpoint: EndpointHealth, best_head: Optional[int]) -> bool:
+        return (
+            best_head is not None
+            and endpoint.head_block is not None
+            and endpoint.head_block < best_head - self.max_head_lag
+        )
+
+    def ranked(self) -> List[EndpointHealth]:
+        """The endpoints in the order they should be tried for the next request."""
+        now = time.monotonic()
+        best_head = self.best_head()
+        healthy, degraded = [], []
+        for endpoint in self.endpoints:
+            if endpoint.is_ejected(now) or self.is_lagging(endpoint, best_head):
+                degraded.append(endpoint)
+            else:
+                healthy.append(endpoint)
+
+        ordered = []
+        while healthy:
+            weights = [1 / max(endpoint.score(), 0.001) for endpoint in healthy]
+            ordered.append(healthy.pop(random.choices(range(len(healthy)), weights=weights)[0]))
+        return ordered + sorted(degraded, key=lambda endpoint: endpoint.ejected_until)
+
+    def available_endpoint_uris(self) -> List[str]:
+        now = time.monotonic()
+        best_head = self.best_head()
+        return [
+            endpoint.endpoint_uri
+            for endpoint in self.endpoints
+            if not endpoint.is_ejected(now) and not self.is_lagging(endpoint, best_head)
+        ]
+
+    def _record_failure(self, endpoint: EndpointHealth, reason):
+        if endpoint.record_failure(self.eject_after, self.eject_seconds):
+            logger.warning(f"Ejecting rpc endpoint {endpoint.endpoint_uri} for {self.eject_seconds}s: {reason}")
+
+    def _post(self, endpoint: EndpointHealth, request_data: bytes, methods: List[str] = (), **kwargs) -> bytes:
+        start = time.monotonic()
+        try:
+            raw_response = observed_post(
+                endpoint.endpoint_uri,
+                request_data,
+                lambda: endpoint_session_pool.post(endpoint.endpoint_uri, request_data, **kwargs),
+            )
+        except Exception as e:
+            self._record_failure(endpoint, e)
+            raise
+        failure = rpc_response_failure(raw_response, methods)
+        if failure is not None:
+            self._record_failure(endpoint, failure)
+            raise EndpointResponseError(f"{endpoint.endpoint_uri} answered with a {failure}", raw_response)
+        endpoint.record_success(time.monotonic() - start)
+        return raw_response
+
+    @staticmethod
+    def _give_up(error: Exception, served_by: str) -> Tuple[str, bytes]:
+        # Nobody did better, the caller gets the answer and handles it as it would without balancing.
+        if isinstance(error, EndpointResponseError):
+            return served_by, error.raw_response
+        raise error
+
+    def post(self, request_data: bytes, methods: List[str], **kwargs) -> Tuple[str, bytes]:
+        candidates = self.ranked()
+        if len(candidates) > 1 and self.hedge_methods.intersection(methods):
+            return self._post_hedged(candidates, request_data, methods, **kwargs)
+
+        error, served_by = None, None
+        for endpoint in candidates:
+            try:
+                return endpoint.endpoint_uri, self._post(endpoint, request_data, methods, **kwargs)
+            except Exception as e:
+                logger.debug(f"Request to {endpoint.endpoint_uri} failed, trying the next endpoint: {e}")
+                error, served_by = e, endpoint.endpoint_uri
+        return self._give_up(error, served_by)
+
+    def _post_hedged(
+        self, candidates: List[EndpointHealth], request_data: bytes, methods: List[str], **kwargs
+    ) -> Tuple[str, bytes]:
+        executor = self._get_executor()
+        primary = candidates[0]
+        hedge_delay = max(self.min_hedge_delay, self.hedge_factor * (primary.latency or 0))
+
+        pending = {executor.submit(self._post, primary, request_data, methods, **kwargs): primary}
+        remaining = list(candidates[1:])
+        done, _ = wait(pending, timeout=hedge_delay)
+
+        error, served_by = None, None
+        while True:
+            for future in done:
+                endpoint = pending.pop(future)
+                try:
+                    return endpoint.endpoint_uri, future.result()
+                except Exception as e:
+                    error, served_by = e, endpoint.endpoint_uri
+            # Nothing succeeded yet: the request is slow or has failed, either way bring in the next endpoint.
+            if remaining:
+                endpoint = remaining.pop(0)
+                pending[executor.submit(self._post, endpoint, request_data, methods, **kwargs)] = endpoint
+            if not pending:
+                return self._give_up(error, served_by)
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+
+    def post_head_probe(self, request_data: bytes, parse_head, **kwargs) -> Tuple[str, bytes]:
+        """
+        Send an eth_blockNumber request to every endpoint which is not ejected and record their heads.
+        The answer returned is the lowest head among the endpoints that are not lagging, so every endpoint
+        requests get routed to already has the blocks up to it.
+        """
+        now = time.monotonic()
+        executor = self._get_executor()
+        endpoints = [endpoint for endpoint in self.endpoints if not endpoint.is_ejected(now)] or self.ranked()[:1]
+        futures = {
+            executor.submit(self._post, endpoint, request_data, ["eth_blockNumber"], **kwargs): endpoint
+            for endpoint in endpoints
+        }
+        done, not_done = wait(futures, timeout=self.probe_seconds)
+        for future in not_done:
+            self._record_failure(futures[future], f"no head within {self.probe_seconds}s")
+
+        answers, error = [], None
+        for future in done:
+            endpoint = futures[future]
+            try:
+                raw_response = future.result()
+                endpoint.head_block = parse_head(raw_response)
+                answers.append((endpoint, raw_response))
+            except Exception as e:
+                error = e
+        answers = [(endpoint, raw_response) for endpoint, raw_response in answers if endpoint.head_block is not None]
+        if not answers:
+            if error is not None:
+                raise error
+            return self.post(request_data, ["eth_blockNumber"], **kwargs)
+
+        best_head = max(endpoint.head_block for endpoint, _ in answers)
+        endpoint, raw_response = min(
+            [answer for answer in answers if not self.is_lagging(answer[0], best_head)],
+            key=lambda answer: answer[0].head_block,
+        )
+        return endpoint.endpoint_uri, raw_response
+
+    def status(self) -> List[dict]:
+        now = time.monotonic()
+        return [
+            {
+                "endpoint_uri": endpoint.endpoint_uri,
+                "latency": endpoint.latency,
+                "error_rate": endpoint.error_rate,
+                "head_block": endpoint.head_block,
+                "ejected": endpoint.is_ejected(now),
+            }
+            for endpoint in self.endpoints
+        ]
+
+
+_balancer_settings = {}
+_balancers: Dict[Tuple[str, ...], RpcLoadBalancer] = {}
+_balancers_lock = threading.Lock()
+
+
+def configure_load_balancing(**settings):
+    """Defaults for balancers created afterwards, see RpcLoadBalancer for the accepted settings."""
+    _balancer_settings.update({key: value for key, value in settings.items() if value is not None})
+
+
+def get_load_balancer(endpoint_uris: List[str]) -> RpcLoadBalancer:
+    # Providers are created per thread, the health they observe is shared per endpoint list.
+    key = tuple(endpoint_uris)
+    balancer = _balancers.get(key)
+    if balancer is None:
+        with _balancers_lock:
+            balancer = _balancers.get(key)
+            if balancer is None:
+                balancer = RpcLoadBalancer(list(endpoint_uris), **_balancer_settings)
+                _balancers[key] = balancer
+    return balancer
+
+
+def batch_size_group(method: str, endpoint_uri: str, initial_batch_size: int) -> BatchSizeGroup:
+    """The batch size controllers of method on every endpoint of a (possibly comma separated) provider uri."""
+    endpoint_uris = split_provider_uris(endpoint_uri)
+    available = get_load_balancer(endpoint_uris).available_endpoint_uris if len(endpoint_uris) > 1 else None
+    return batch_size_controllers.group(method, endpoint_uris, initial_batch_size, available)
@@ -1,12 +1,78 @@
-import random
+import json
+import re
+from typing import List, Optional
 
 from common.utils.exception_control import RetriableError, decode_response_error
 
+METHOD_PATTERN = re.compile(rb'"method"\s*:\s*"([^"]+)"')
+NULL_RESULT_PATTERN = re.compile(rb'"result"\s*:\s*null')
 
-# TODO: Implement fallback mechanism for provider uris instead of picking randomly
-def pick_random_provider_uri(provider_uri):
-    provider_uris = [uri.strip() for uri in provider_uri.split(",")]
-    return random.choice(provider_uris)
+# Methods whose null result means the node has not got the block yet rather than an empty answer.
+NULL_RESULT_FAILURE_METHODS = {
+    "eth_getBlockByNumber",
+    "eth_getBlockByHash",
+    "eth_getTransactionReceipt",
+    "eth_getBlockReceipts",
+}
+
+# Errors describing the outcome of the call itself, every node answers them the same way.
+EXECUTION_ERROR_MARKERS = (
+    "execution reverted",
+    "out of gas",
+    "invalid opcode",
+    "invalid jump",
+    "stack underflow",
+    "gas uint64 overflow",
+)
+
+
+def split_provider_uris(provider_uri):
+    return [uri.strip() for uri in provider_uri.split(",") if uri.strip()]
+
+
+def find_methods(request_data: bytes) -> List[str]:
+    return [method.decode() for method in METHOD_PATTERN.findall(request_data)]
+
+
+def rpc_response_errors(raw_response: bytes) -> List[dict]:
+    """The JSON-RPC error objects in a raw (batch) response, the body is only parsed when it mentions one."""
+    if b'"error"' not in raw_response:
+        return []
+    try:
+        response = json.loads(raw_response)
+    except ValueError:
+        return []
+    responses = response if isinstance(response, list) else [response]
+    return [item["error"] for item in responses if isinstance(item, dict) and isinstance(item.get("error"), dict)]
+
+
+# Errors of nodes that do not offer a method at all, -32601 is "method not found" in JSON-RPC 2.0.
+UNSUPPORTED_METHOD_ERROR_CODES = {-32601}
+UNSUPPORTED_METHOD_ERROR_MARKERS = ("method not found", "not supported", "does not exist", "not available")
+
+
+def is_unsupported_method_error(error: dict) -> bool:
+    if error.get("code") in UNSUPPORTED_METHOD_ERROR_CODES:
+        return True
+    message = str(error.get("message", "")).lower()
+    return any(marker in message for marker in UNSUPPORTED_METHOD_ERROR_MARKERS)
+
+
+def rpc_response_failure(raw_response: bytes, methods: List[str]) -> Optional[str]:
+    """
+    Why a raw (batch) response should count as a failure of the endpoint that sent it, None when it should not:
+    JSON-RPC errors other than execution errors and unsupported methods, and null results of methods asking
+    for blocks or receipts.
+    """
+    for error in rpc_response_errors(raw_response):
+        message = str(error.get("message", ""))
+        if is_unsupported_method_error(error):
+            continue
+        if not any(marker in message.lower() for marker in EXECUTION_ERROR_MARKERS):
+            return f"JSON-RPC error {error.get('code')}: {message}"
+    if NULL_RESULT_FAILURE_METHODS.intersection(methods) and NULL_RESULT_PATTERN.search(raw_response):
+        return "null result, the node is probably not synced"
+    return None
 
 
 def rpc_response_batch_to_results(response):
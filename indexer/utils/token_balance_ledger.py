@@ -0,0 +1,162 @@
+import atexit
+import logging
+import os
+import sqlite3
+import tempfile
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from common.utils.web3_utils import ZERO_ADDRESS
+from indexer.domain.token_transfer import ERC20TokenTransfer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_HOLDERS = 1000000
+
+# (token_address, address)
+LedgerKey = Tuple[str, str]
+
+
+def transfer_keys(transfers: Iterable[ERC20TokenTransfer]) -> List[LedgerKey]:
+    keys = {}
+    for transfer in transfers:
+        if transfer.from_address != ZERO_ADDRESS:
+            keys[(transfer.token_address, transfer.from_address)] = None
+        if transfer.to_address != ZERO_ADDRESS:
+            keys[(transfer.token_address, transfer.to_address)] = None
+    return list(keys)
+
+
+class TokenBalanceLedger:
+    """
+    ERC-20 balances maintained from transfers instead of being read with balanceOf.
+
+    Every (token, holder) pair the ledger knows holds its balance as of synced_block, the last block applied.
+    The max_holders pairs used most recently stay in memory, the others spill to a sqlite file under spill_dir
+    and are read back when touched again.
+
+    Balances only hold while blocks are applied in order: a batch not starting right after synced_block
+    (the first one, a retried range, a reorganized range) resets the ledger, and the holders of that batch
+    are seeded again before the transfers are applied.
+    """
+
+    def __init__(self, max_holders: int = DEFAULT_MAX_HOLDERS, spill_dir: Optional[str] = None):
+        if max_holders < 1:
+            raise ValueError(f"max_holders should be a positive integer, got {max_holders}.")
+        self.max_holders = max_holders
+        self.spill_dir = spill_dir
+        self.start_block = None
+        self.synced_block = None
+        self._balances: "OrderedDict[LedgerKey, int]" = OrderedDict()
+        self._spill = None
+        self._spill_path = None
+
+    def begin(self, start_block: int) -> bool:
+        """Prepares the ledger for a batch starting at start_block, returns whether it had to be reset."""
+        if self.synced_block is not None and start_block == self.synced_block + 1:
+            return False
+        if self.synced_block is not None:
+            logger.info(
+                f"Token balance ledger synced up to block {self.synced_block} is reset for a batch "
+                f"starting at block {start_block}."
+            )
+        self.reset(start_block)
+        return True
+
+    def reset(self, start_block: int):
+        self._balances.clear()
+        if self._spill is not None:
+            self._spill.execute("DELETE FROM balances")
+        self.start_block = start_block
+        self.synced_block = start_block - 1
+
+    def missing(self, keys: Iterable[LedgerKey]) -> List[LedgerKey]:
+        return [key for key in keys if self.get(key) is None]
+
+    def get(self, key: LedgerKey) -> Optional[int]:
+        balance = self._balances.get(key)
+        if balance is not None:
+            self._balances.move_to_end(key)
+            return balance
+        if self._spill is None:
+            return None
+
+        row = self._spill.execute(
+            "SELECT balance FROM balances WHERE token_address = ? AND address = ?", key
+        ).fetchone()
+        if row is None:
+            return None
+        self._spill.execute("DELETE FROM balances WHERE token_address = ? AND address = ?", key)
+        balance = int(row[0])
+        self.set(key, balance)
+        return balance
+
+    def set(self, key: LedgerKey, balance: int):
+        self._balances[key] = balance
+        self._balances.move_to_end(key)
+        if len(self._balances) > self.max_holders:
+            self._spill_least_recent()
+
+    def discard_token(self, token_address: str):
+        """Forgets every holder of token_address, they are seeded again when next touched."""
+        for key in [key for key in self._balances if key[0] == token_address]:
+            del self._balances[key]
+        if self._spill is not None:
+            self._spill.execute("DELETE FROM balances WHERE token_address = ?", (token_address,))
+
+    def apply(self, transfers: List[ERC20TokenTransfer], end_block: int) -> Dict[Tuple[str, str, int], Tuple[int, int]]:
+        """
+        Applies the transfers of blocks up to end_block in (block_number, log_index) order. Returns the balance
+        of every touched pair at the end of each block it was touched in, keyed by (token, holder, block),
+        with the timestamp of that block. Pairs the ledger does not know are left out.
+        """
+        balances = {}
+        for transfer in sorted(transfers, key=lambda transfer: (transfer.block_number, transfer.log_index)):
+            for address, delta in ((transfer.from_address, -transfer.value), (transfer.to_address, transfer.value)):
+                if address == ZERO_ADDRESS:
+                    continue
+                key = (transfer.token_address, address)
+                balance = self.get(key)
+                if balance is None:
+                    continue
+                balance += delta
+                self.set(key, balance)
+                balances[(transfer.token_address, address, transfer.block_number)] = (
+                    balance,
+                    transfer.block_timestamp,
+                )
+        self.synced_block = end_block
+        return balances
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+            if os.path.exists(self._spill_path):
+                os.remove(self._spill_path)
+
+    def _spill_least_recent(self):
+        # Spill a tenth of the entries at once, so that a full ledger does not write on every new holder.
+        count = max(len(self._balances) - self.max_holders, self.max_holders // 10, 1)
+        rows = []
+        for _ in range(min(count, len(self._balances))):
+            (token_address, address), balance = self._balances.popitem(last=False)
+            rows.append((token_address, address, str(balance)))
+        self._spill_connection().executemany("INSERT OR REPLACE INTO balances VALUES (?, ?, ?)", rows)
+
+    def _spill_connection(self) -> sqlite3.Connection:
+        if self._spill is None:
+            spill_file, self._spill_path = tempfile.mkstemp(
+                prefix="token-balance-ledger-", suffix=".db", dir=self.spill_dir
+            )
+            os.close(spill_file)
+            atexit.register(self.close)
+            # The job runs the batches of a range one after the other, possibly from different pipeline threads.
+            self._spill = sqlite3.connect(self._spill_path, isolation_level=None, check_same_thread=False)
+            self._spill.execute("PRAGMA journal_mode = OFF")
+            self._spill.execute("PRAGMA synchronous = OFF")
+            self._spill.execute(
+                "CREATE TABLE IF NOT EXISTS balances "
+                "(token_address TEXT, address TEXT, balance TEXT, PRIMARY KEY (token_address, address))"
+            )
+        return self._spill